@@ -0,0 +1,107 @@
+"""
+Measures derived from other measures of the same sample, declared in data/derived_measures.json.
+
+Every derived measure is evaluated as column arithmetic on one wide (sample x short_name) pivot, in the
+order declared so a derived measure can build on an earlier one.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Callable
+
+import pandas as pd
+
+logger = logging.getLogger("DerivedMeasures")
+
+# operation name -> (function of the x and y columns, how the calculation reads)
+OPERATIONS: dict[str, tuple[Callable[[pd.Series, pd.Series], pd.Series], str]] = {
+    "product_of_percents": (lambda x, y: ((x / 100) * (y / 100)) * 100, "({x}/100 * {y}/100) * 100"),
+    "percent_ratio": (lambda x, y: (x / y) * 100, "({x}/{y}) * 100"),
+}
+
+VALUE_TYPE_ORDER = ["count", "sequence measure", "frequency"]
+
+
+@dataclass(frozen=True)
+class DerivedMeasure:
+    x_value: str
+    y_value: str
+    short_name: str
+    long_name: str
+    operation: str = "product_of_percents"
+    value_type: str = "frequency"
+
+    def __post_init__(self) -> None:
+        if self.operation not in OPERATIONS:
+            raise ValueError(f"{self.short_name} has unknown operation {self.operation}, use one of {list(OPERATIONS)}")
+
+    @property
+    def calculation(self) -> str:
+        return f"{self.long_name} - " + OPERATIONS[self.operation][1].format(x=self.x_value, y=self.y_value)
+
+    def evaluate(self, wide_df: pd.DataFrame) -> pd.Series:
+        """The measure for every sample of a (sample x short_name) pivot, nan where an input is missing"""
+        missing = pd.Series(float("nan"), index=wide_df.index)
+        x, y = wide_df.get(self.x_value, missing), wide_df.get(self.y_value, missing)
+        return OPERATIONS[self.operation][0](x, y)
+
+
+def pivot_with_derived_measures(
+    combined_df: pd.DataFrame,
+    row_index: list[str],
+    derived_measures: list[dict[str, str]],
+    with_calculation: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
+    """Add the derived measures and pivot the long measures by short and by long name
+
+    Parameters
+    ----------
+    combined_df : pd.DataFrame
+        The long dataframe of flow and sequence measures with short_name, long_name, value_type and value
+    row_index : list[str]
+        The columns identifying a sample
+    derived_measures : list[dict[str, str]]
+        The derived measure declarations, e.g. data.get_derived_measures()
+    with_calculation : bool
+        Describe how each derived value was calculated in a calculation column
+
+    Returns
+    -------
+    tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]
+        The pivot by short name, the pivot by long name and the long dataframe with the derived measures
+    """
+    measures = [DerivedMeasure(**m) for m in derived_measures]
+    wide_df = combined_df.pivot(index=row_index, columns="short_name", values="value")
+
+    derived_dfs: list[pd.DataFrame] = []
+    for measure in measures:
+        inputs = wide_df.reindex(columns=[measure.x_value, measure.y_value])
+        wide_df[measure.short_name] = measure.evaluate(wide_df)
+        derived_df = wide_df.loc[inputs.notna().any(axis=1), [measure.short_name]].rename(
+            columns={measure.short_name: "value"}
+        )
+        derived_df = derived_df.reset_index().assign(
+            short_name=measure.short_name, value_type=measure.value_type, long_name=measure.long_name
+        )
+        if with_calculation:
+            derived_df["calculation"] = measure.calculation
+        derived_dfs.append(derived_df)
+    logger.info(f"Derived {len(measures)} measures for {len(wide_df)} samples")
+
+    combined_df = pd.concat([combined_df, *derived_dfs]).reset_index(drop=True)
+    combined_df["value_type"] = pd.Categorical(combined_df["value_type"], VALUE_TYPE_ORDER)
+    combined_df = combined_df.sort_values(["value_type", "short_name"]).reset_index(drop=True)
+
+    # pivots order their columns by name
+    wide_df = wide_df[sorted(wide_df.columns)]
+    combined_pivot = wide_df.reset_index()
+    combined_pivot.columns.name = ""
+
+    # the long name pivot is the same pivot renamed, unless names aren't one to one
+    short2long = combined_df[["short_name", "long_name"]].drop_duplicates()
+    if short2long["short_name"].is_unique and short2long["long_name"].is_unique:
+        long_wide_df = wide_df.rename(columns=dict(short2long.itertuples(index=False)))
+        combined_pivot_long = long_wide_df[sorted(long_wide_df.columns)].reset_index()
+    else:
+        combined_pivot_long = combined_df.pivot(index=row_index, columns="long_name", values="value").reset_index()
+    combined_pivot_long.columns.name = ""
+    return combined_pivot, combined_pivot_long, combined_df
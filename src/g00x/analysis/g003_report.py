@@ -1,11 +1,33 @@
+import json
 import logging
+from functools import partial
 
 import pandas as pd
 
+from g00x.analysis.derived_measures import pivot_with_derived_measures
+from g00x.analysis.gate_expressions import GateExpressionEngine
+from g00x.analysis.partitions import PartitionStore
+from g00x.analysis.sequence_measures import vrc01_class_measures
 from g00x.data import Data
 
 logger = logging.getLogger("report")
 
+# the sequence dataframe columns the sequence frequencies are calculated from
+SEQUENCE_MEASURE_COLUMNS: list[str] = [
+    "run_purpose",
+    "pubID",
+    "ptid",
+    "group",
+    "weeks",
+    "visit_id",
+    "probe_set",
+    "sample_type",
+    "c_call_heavy",
+    "top_c_call",
+    "v_call_top_heavy",
+    "is_vrc01_class",
+]
+
 
 # import pandas as pd
 # from pandera.typing import Series
@@ -82,49 +104,22 @@ def get_frequency_df(data: Data, combined_flow_df: pd.DataFrame) -> pd.DataFrame
     v.remove("value")
     logger.info(f"Frequency dataframe will drop {v}")
 
-    # Create a new dataframe object
-    new_dfs: list[pd.DataFrame] = []
-
     # Do pre-sort and sort in seperate instances
-    for q in ["PreS", "Sort", "KWTRPG003", "G3N001a", "G3N001b", "G3N001c", "G001Sort", "SortHCT019a", "SortHCT019b"]:
-        # first do for run purpose
-        sub_df = combined_flow_df.query(f"run_purpose=='{q}'")
-        # now do for each count, which will yield a dataframe
-        for count in count_measures:
-            gate = count["gate"]
-            long_name = count["easy_name"]
-
-            gate_count: pd.DataFrame = sub_df.query(f"gate=='{gate}'").set_index(sort_index)["value"].reset_index()
-
-            # Add some extra columns
-            gate_count["value_type"] = "count"
-            gate_count["short_name"] = long_name
-            gate_count["long_name"] = long_name
-
-            # Add the gate measures, e.g. P8 etc
-            gate_count["pbmc_gate_expression"] = gate
-
-            new_dfs.append(gate_count)
-
-        # now do for each frequency, which will yield a dataframe
-        for freq in frequency_measures:
-            # print(freq)
-            num_gate = freq["numerator"]
-            dom_gate = freq["denominator"]
-            num: pd.Series = sub_df.query(f"gate=='{num_gate}'").set_index(sort_index)["value"]
-            denom: pd.Series = sub_df.query(f"gate=='{dom_gate}'").set_index(sort_index)["value"]
-            freq_df = ((num / denom) * 100).reset_index()
-
-            # Add some extra columns
-            freq_df["value_type"] = "frequency"
-            freq_df["short_name"] = freq["axis_name"]
-            freq_df["long_name"] = freq["long_name"]
-
-            # Add the gate measures, e.g. P8/P5 etc
-            freq_df["pbmc_gate_expression"] = f"{num_gate}/{dom_gate}"
-
-            new_dfs.append(freq_df)
-    freq_df = pd.concat(new_dfs).reset_index(drop=True)
+    run_purposes = [
+        "PreS",
+        "Sort",
+        "KWTRPG003",
+        "G3N001a",
+        "G3N001b",
+        "G3N001c",
+        "G001Sort",
+        "SortHCT019a",
+        "SortHCT019b",
+    ]
+
+    # compile the counts and frequencies, e.g. P8/P5, and evaluate them over all samples at once
+    engine = GateExpressionEngine(count_measures, frequency_measures)
+    freq_df = engine.frequency_df(combined_flow_df, sort_index, run_purposes)
     return freq_df
 
 
@@ -200,13 +195,31 @@ def calculate_frequency_dataframe(data: Data, flow_df: pd.DataFrame) -> pd.DataF
     return frequency_df
 
 
-def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.DataFrame:
+def get_top_c_alleles(sequence_df: pd.DataFrame) -> pd.Series:
+    """The first constant allele called for each heavy chain, empty if there is none"""
+    return sequence_df["c_call_heavy"].str.split(",").str.get(0).fillna("")
+
+
+def get_ighv1_2_v_calls(sequence_df: pd.DataFrame) -> list[str]:
+    """The IGHV1-2 alleles called as top heavy v call"""
+    return [
+        v_call for v_call in sequence_df["v_call_top_heavy"].unique().tolist() if str(v_call).startswith("IGHV1-2*")
+    ]
+
+
+def calculate_sequence_frequency_dataframe(
+    sequence_df: pd.DataFrame, list_of_alleles: list[str] | None = None, list_of_v_calls: list[str] | None = None
+) -> pd.DataFrame:
     """Calulate the frequency of vrc01 sequences in the sequence dataframe
 
     Parameters
     ----------
     sequence_df : pd.DataFrame
         The sequence dataframe from the pipeline
+    list_of_alleles : list[str] | None
+        The alleles to report, by default every allele in sequence_df
+    list_of_v_calls : list[str] | None
+        The IGHV1-2 alleles to report, by default every one in sequence_df
 
     Returns
     -------
@@ -216,7 +229,7 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
 
     # we have to add this to add it to the flow
     # sequence_df["run_purpose"] = "G3N001a"
-    sequence_df["top_c_allele"] = sequence_df["c_call_heavy"].str.split(",").str.get(0).fillna("")
+    sequence_df["top_c_allele"] = get_top_c_alleles(sequence_df)
 
     gb_columns: list[str] = [
         "run_purpose",
@@ -238,103 +251,31 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
     #     gb["is_vrc01_class"].value_counts(normalize=False).reindex([True, False]).fillna(0)
     # )  # add zero here so we can distinguish between 0 and nan
 
-    counts_df = gb["is_vrc01_class"].value_counts().unstack().reset_index().fillna(0)
+    # a partition may have no VRC01-class sequences at all, so make sure both columns exist
+    counts_df = gb["is_vrc01_class"].value_counts().unstack().reindex(columns=[False, True]).reset_index().fillna(0)
 
     counts_df["num_not_vrc01_class"] = counts_df[False]
     counts_df["num_vrc01_class"] = counts_df[True]
     counts_df = counts_df[["ptid", "weeks", "num_not_vrc01_class", "num_vrc01_class", "run_purpose"]]
 
-    def get_combined_groupby(list_of_isotypes: list[str], column: str) -> list[pd.Series]:
-        # We will collect all the series in a empty array
-        collect_series: list[pd.Series] = []
-
-        # iterate through the groupby
-        for g, g_df in gb:
-            for normalize in [False, True]:
-                for isotype in list_of_isotypes:
-                    # Create an empty series from the indexing group g
-                    series = pd.Series(dict(zip(gb_columns, g)))
-
-                    # Get the break down of the vrc01 class by isotype
-                    break_down = (
-                        g_df.query(f"{column}=='{isotype}'")["is_vrc01_class"]
-                        .value_counts(normalize=normalize)
-                        .reindex([True, False])
-                        .fillna(0)
-                    )
-
-                    # if we normalize, it will be a percentage
-                    if normalize:
-                        if isotype == "":
-                            isotype = "undefined-allele"
-                        sn = f"percent_{isotype}_vrc01_class_sequences"
-                        ln = f"Percent of {isotype} sequences that are VRC01-class"
-                        break_down = break_down * 100
-
-                    # else it will be a count
-                    else:
-                        if isotype == "":
-                            isotype = "undefined-allele"
-                        sn = f"num_{isotype}_vrc01_class_sequences"
-                        ln = f"Number of {isotype} sequences that are VRC01-class"
-
-                    # Add short and long name
-                    series["short_name"] = sn
-                    series["long_name"] = ln
-
-                    # True is VRC01 class, false is non-vrc01 class
-                    series["value"] = break_down[True]
-
-                    # other meta data we can merge
-                    series["value_type"] = "sequence measure"
-                    series["pbmc_gate_expression"] = ""
-                    collect_series.append(series)
-        return collect_series
-
     list_of_isotypes = ["IGHM", "IGHG", "IGHA", "IGHD"]
-    list_of_alleles = sequence_df["top_c_allele"].unique().tolist()
-    list_of_v_calls = [
-        v_call for v_call in sequence_df["v_call_top_heavy"].unique().tolist() if str(v_call).startswith("IGHV1-2*")
-    ]
-
-    collect_series = get_combined_groupby(list_of_isotypes, "top_c_call")
-    collect_series += get_combined_groupby(list_of_alleles, "top_c_allele")
-    collect_series += get_combined_groupby(list_of_v_calls, "v_call_top_heavy")
-
-    for g, g_df in gb:
-        for normalize in [False, True]:
-            #:Need one outside of isotype for all IGHD-
-            series = pd.Series(dict(zip(gb_columns, g)))
-
-            # Get the break down of the vrc01 class by isotype
-            break_down = (
-                g_df["is_vrc01_class"].value_counts(normalize=normalize).reindex([True, False]).fillna(0)
-            )  # add zero here so we can distinguish between 0 and nan
-
-            # if we normalize, it will be a percentage
-            if normalize:
-                sn = f"percent_igdneg_vrc01_class_sequences"
-                ln = f"Percent of IGD- sequences that are VRC01-class"
-                break_down = break_down * 100
-
-            # else it will be a count
-            else:
-                sn = f"num_igdneg_vrc01_class_sequences"
-                ln = f"Number of IGD- sequences that are VRC01-class"
-
-            # Add short and long name
-            series["short_name"] = sn
-            series["long_name"] = ln
-
-            # True is VRC01 class, false is non-vrc01 class
-            series["value"] = break_down[True]
-
-            # other meta data we can merge
-            series["value_type"] = "sequence measure"
-            series["pbmc_gate_expression"] = ""
-            collect_series.append(series)
-
-    remade = pd.DataFrame(collect_series).reset_index(drop=True)
+    if list_of_alleles is None:
+        list_of_alleles = sequence_df["top_c_allele"].unique().tolist()
+    if list_of_v_calls is None:
+        list_of_v_calls = get_ighv1_2_v_calls(sequence_df)
+
+    # sequences without a c call are labeled as an undefined allele
+    allele_labels = [(allele or "undefined-allele", allele or "undefined-allele") for allele in list_of_alleles]
+
+    # count VRC01-class sequences of every sample by isotype, allele, v call and over all IGD- sequences at once
+    remade = pd.concat(
+        [
+            vrc01_class_measures(sequence_df, gb_columns, "top_c_call", list_of_isotypes),
+            vrc01_class_measures(sequence_df, gb_columns, "top_c_allele", list_of_alleles, labels=allele_labels),
+            vrc01_class_measures(sequence_df, gb_columns, "v_call_top_heavy", list_of_v_calls),
+            vrc01_class_measures(sequence_df, gb_columns, None, ["igdneg"], labels=[("igdneg", "IGD-")]),
+        ]
+    ).reset_index(drop=True)
 
     # add one final series with all the sequences counted
     logger.info("Adding number of sequences")
@@ -354,19 +295,51 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
 
 
 def g003_combine_seq_and_flow(
-    data: Data, seq_dataframe: pd.DataFrame, flow_dataframe: pd.DataFrame
+    data: Data,
+    seq_dataframe: pd.DataFrame,
+    flow_dataframe: pd.DataFrame,
+    partition_store: PartitionStore | None = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Combine the sequence and flow dataframes into one dataframe with the requisite columns"""
+    """Combine the sequence and flow dataframes into one dataframe with the requisite columns
+
+    With a partition store, the flow and sequence frequencies are only recomputed for (ptid, visit_id)
+    partitions whose rows changed since the last report.
+    """
 
     # from IPython import embed
 
     # embed()
 
-    # Get frequency dataframe
-    frequency_df = calculate_frequency_dataframe(data, flow_dataframe)
-
-    # Sequence dataframe
-    sequence_df, counts_df = calculate_sequence_frequency_dataframe(seq_dataframe)
+    if partition_store is None:
+        # Get frequency dataframe
+        frequency_df = calculate_frequency_dataframe(data, flow_dataframe)
+
+        # Sequence dataframe
+        sequence_df, counts_df = calculate_sequence_frequency_dataframe(seq_dataframe)
+    else:
+        measures = json.dumps([data.get_pbmc_gates_g003(), data.get_frequency_measures_g003()])
+        frequency_df = pd.concat(
+            partition_store.run("frequency", partial(calculate_frequency_dataframe, data), flow_dataframe, measures)
+        ).reset_index(drop=True)
+
+        # every partition reports the alleles and v calls found in any partition
+        list_of_alleles = get_top_c_alleles(seq_dataframe).unique().tolist()
+        list_of_v_calls = get_ighv1_2_v_calls(seq_dataframe)
+        sequence_dfs, counts_dfs = zip(
+            *partition_store.run(
+                "sequence",
+                partial(
+                    calculate_sequence_frequency_dataframe,
+                    list_of_alleles=list_of_alleles,
+                    list_of_v_calls=list_of_v_calls,
+                ),
+                seq_dataframe,
+                json.dumps([list_of_alleles, list_of_v_calls]),
+                [c for c in SEQUENCE_MEASURE_COLUMNS if c in seq_dataframe.columns],
+            )
+        )
+        sequence_df = pd.concat(sequence_dfs).reset_index(drop=True)
+        counts_df = pd.concat(counts_dfs).reset_index(drop=True)
 
     combined_df = pd.concat([frequency_df, sequence_df]).reset_index(drop=True)
     row_index: list[str] = [
@@ -381,74 +354,11 @@ def g003_combine_seq_and_flow(
         "sample_type",
     ]
 
-    def add_combined_frequencies(
-        df: pd.DataFrame, x_value: str, y_value: str, short_name: str, long_name: str
-    ) -> pd.DataFrame:
-        x = df.query(f"short_name=='{x_value}'").set_index(row_index)["value"]
-        y = df.query(f"short_name=='{y_value}'").set_index(row_index)["value"]
-        x = x / 100
-        y = y / 100
-        new_df = ((x * y) * 100).reset_index()
-        new_df["short_name"] = short_name
-        new_df["value_type"] = "frequency"
-        new_df["long_name"] = long_name
-        new_df["calculation"] = f"{long_name} - ({x_value}/100 * {y_value}/100) * 100"
-        return new_df
-
-    # Add percent VRC01 class among IgG
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igg",
-            "percent_IGHG_vrc01_class_sequences",
-            "percent_vrc01_among_igg",
-            "Percent of VRC01-class sequences among IgG",  # epitope specific
-        )
-    )  # type: ignore
-
-    # Add percent VRC01 class among IgM
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igm",
-            "percent_IGHM_vrc01_class_sequences",
-            "percent_vrc01_among_igm",
-            "Percent of VRC01-class sequences among IgM",
-        )
-    )
-
-    # Add percent VRC01 class among IgA
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_iga",
-            "percent_IGHA_vrc01_class_sequences",
-            "percent_vrc01_among_iga",
-            "Percent of VRC01-class sequences among IgA",
-        )
+    # Add the measures combining flow and sequencing, e.g. percent VRC01 class among IgG, and pivot
+    combined_pivot, combined_pivot_long, combined_df = pivot_with_derived_measures(
+        combined_df, row_index, data.get_derived_measures(), with_calculation=True
     )
-
-    # Add percent VRC01 class among IgD-
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igd_neg",
-            "percent_igdneg_vrc01_class_sequences",
-            "percent_vrc01_among_igd_neg",
-            "Percent of VRC01-class sequences among IgD-",
-        )
-    )
-    # from IPython import embed; embed()
-    combined_df["value_type"] = pd.Categorical(combined_df["value_type"], ["count", "sequence measure", "frequency"])
-    combined_df = combined_df.sort_values(["value_type", "short_name"]).reset_index(drop=True)
-
-    combined_pivot = combined_df.pivot(row_index, "short_name", "value").reset_index()  # type: ignore
-    combined_pivot.columns.name = ""
     combined_pivot = combined_pivot.merge(counts_df, on=["run_purpose", "ptid", "weeks"], how="left")
-
-    # With long names
-    combined_pivot_long = combined_df.pivot(row_index, "long_name", "value").reset_index()  # type: ignore
-    combined_pivot_long.columns.name = ""
     combined_pivot_long = combined_pivot_long.merge(counts_df, on=["run_purpose", "ptid", "weeks"], how="left")
 
     # With long names
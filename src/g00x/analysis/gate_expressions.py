@@ -0,0 +1,201 @@
+"""
+Flow count and frequency measures compiled into vectorized operations over a dense (sample x gate) matrix.
+
+The flow dataframe is pivoted once into a matrix with one row per sample and one column per gate. Every
+count gate and every frequency measure is compiled into column indices of that matrix, so all measures for
+all run purposes are evaluated together instead of querying the dataframe once per gate.
+
+A side of a ratio is a gate, e.g. "P8", or gates joined with "+" whose counts are summed, e.g. "P8+P9".
+"""
+import logging
+from dataclasses import dataclass
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("GateExpressions")
+
+
+@dataclass(frozen=True)
+class GateSum:
+    """A gate or several gates joined with + whose counts are summed"""
+
+    expression: str
+    gates: tuple[str, ...]
+
+    @staticmethod
+    def parse(expression: str) -> "GateSum":
+        gates = tuple(gate.strip() for gate in str(expression).split("+"))
+        if not all(gates):
+            raise ValueError(f"Invalid gate expression {expression!r}")
+        return GateSum(expression=str(expression), gates=gates)
+
+
+@dataclass(frozen=True)
+class CompiledMeasure:
+    """A count or frequency measure resolved to column indices of the gate matrix"""
+
+    value_type: str
+    short_name: str
+    long_name: str
+    expression: str
+    numerator: tuple[int, ...]
+    denominator: tuple[int, ...] = ()
+
+
+@dataclass
+class GateMatrix:
+    """Flow values pivoted to one row per sample and one column per gate
+
+    Attributes
+    ----------
+    samples : pd.DataFrame
+        The sample keys, one row per matrix row in order of first appearance
+    gates : pd.Index
+        The gate of each matrix column
+    values : np.ndarray
+        The flow values as given, as objects so counts keep their type
+    present : np.ndarray
+        Boolean mask of the sample/gate pairs found in the flow dataframe
+    """
+
+    samples: pd.DataFrame
+    gates: pd.Index
+    values: np.ndarray
+    present: np.ndarray
+
+    @staticmethod
+    def from_long(flow_df: pd.DataFrame, sample_index: list[str], extra_gates: Sequence[str] = ()) -> "GateMatrix":
+        """Pivot a long flow dataframe with gate and value columns
+
+        A sample repeated for the same gate, e.g. from two sort ids, gets a row per repeat and the
+        k-th repeat of each gate is paired with the k-th repeat of the others.
+        """
+        repeat = flow_df.groupby(sample_index + ["gate"], sort=False, dropna=False).cumcount().to_numpy()
+        keyed = flow_df[sample_index].assign(_repeat=repeat)
+        sample_codes = keyed.groupby(sample_index + ["_repeat"], sort=False, dropna=False).ngroup().to_numpy()
+        gate_codes, gates = pd.factorize(flow_df["gate"])
+        gates = gates.append(pd.Index(extra_gates).difference(gates))
+
+        first_rows = np.unique(sample_codes, return_index=True)[1]
+        samples = flow_df[sample_index].iloc[first_rows].reset_index(drop=True)
+
+        values = np.full((len(samples), len(gates)), np.nan, dtype=object)
+        present = np.zeros(values.shape, dtype=bool)
+        values[sample_codes, gate_codes] = flow_df["value"].to_numpy()
+        present[sample_codes, gate_codes] = True
+        return GateMatrix(samples=samples, gates=gates, values=values, present=present)
+
+    def columns(self, gate_sum: GateSum) -> tuple[int, ...]:
+        return tuple(int(self.gates.get_loc(gate)) for gate in gate_sum.gates)
+
+
+class GateExpressionEngine:
+    """Compiles count gates and frequency measures once and evaluates them over a gate matrix
+
+    Parameters
+    ----------
+    count_measures : list[dict[str, str]]
+        Gates reported as counts, e.g. data.get_pbmc_gates()
+    frequency_measures : list[dict[str, str]]
+        Ratios reported as percentages, e.g. data.get_frequency_measures()
+    """
+
+    def __init__(self, count_measures: list[dict[str, str]], frequency_measures: list[dict[str, str]]) -> None:
+        self.counts = [(GateSum.parse(c["gate"]), c["easy_name"], c["easy_name"]) for c in count_measures]
+        self.frequencies = [
+            (GateSum.parse(f["numerator"]), GateSum.parse(f["denominator"]), f["axis_name"], f["long_name"])
+            for f in frequency_measures
+        ]
+
+    @property
+    def gates(self) -> list[str]:
+        """Every gate a measure refers to"""
+        gates = [g for gate_sum, _, _ in self.counts for g in gate_sum.gates]
+        gates += [g for num, denom, _, _ in self.frequencies for g in num.gates + denom.gates]
+        return list(dict.fromkeys(gates))
+
+    def compile(self, matrix: GateMatrix) -> list[CompiledMeasure]:
+        """Resolve every measure to columns of the matrix, counts first"""
+        measures = [
+            CompiledMeasure("count", short_name, long_name, gate_sum.expression, matrix.columns(gate_sum))
+            for gate_sum, short_name, long_name in self.counts
+        ]
+        measures += [
+            CompiledMeasure(
+                "frequency",
+                short_name,
+                long_name,
+                f"{num.expression}/{denom.expression}",
+                matrix.columns(num),
+                matrix.columns(denom),
+            )
+            for num, denom, short_name, long_name in self.frequencies
+        ]
+        return measures
+
+    def evaluate(self, matrix: GateMatrix) -> tuple[list[CompiledMeasure], np.ndarray, np.ndarray]:
+        """Evaluate every measure for every sample
+
+        Returns
+        -------
+        tuple[list[CompiledMeasure], np.ndarray, np.ndarray]
+            The measures, their (measure x sample) values and the mask of values that exist. A value
+            exists if any gate it refers to was found for the sample; missing gates give nan.
+        """
+        measures = self.compile(matrix)
+        numbers = matrix.values.astype(float)
+        values = np.empty((len(measures), len(matrix.samples)), dtype=object)
+        present = np.zeros(values.shape, dtype=bool)
+        for i, measure in enumerate(measures):
+            columns = list(measure.numerator + measure.denominator)
+            present[i] = matrix.present[:, columns].any(axis=1)
+            if measure.value_type == "count":
+                if len(measure.numerator) == 1:
+                    values[i] = matrix.values[:, measure.numerator[0]]
+                else:
+                    values[i] = numbers[:, list(measure.numerator)].sum(axis=1)
+                continue
+            num = numbers[:, list(measure.numerator)].sum(axis=1)
+            denom = numbers[:, list(measure.denominator)].sum(axis=1)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                values[i] = (num / denom) * 100
+        return measures, values, present
+
+    def frequency_df(self, flow_df: pd.DataFrame, sample_index: list[str], run_purposes: list[str]) -> pd.DataFrame:
+        """Long form dataframe of every measure for every sample
+
+        Rows come grouped by run purpose in the order given, then by measure with counts before
+        frequencies, then by sample in order of first appearance.
+
+        Parameters
+        ----------
+        flow_df : pd.DataFrame
+            Long flow dataframe with the sample_index, gate and value columns
+        sample_index : list[str]
+            Columns identifying a sample, these are kept in the output
+        run_purposes : list[str]
+            Run purposes to report, others are left out
+        """
+        flow_df = flow_df[flow_df["run_purpose"].isin(run_purposes)]
+        matrix = GateMatrix.from_long(flow_df, sample_index, extra_gates=self.gates)
+        measures, values, present = self.evaluate(matrix)
+
+        # order present values by run purpose, measure then sample
+        purpose_rank = pd.Index(run_purposes).get_indexer(matrix.samples["run_purpose"])
+        measure_idx, sample_idx = np.nonzero(present)
+        order = np.lexsort((sample_idx, measure_idx, purpose_rank[sample_idx]))
+        measure_idx, sample_idx = measure_idx[order], sample_idx[order]
+
+        value = values[measure_idx, sample_idx]
+        if flow_df["value"].dtype != object:
+            value = value.astype(np.result_type(flow_df["value"].dtype, float))
+        frequency_df = matrix.samples.iloc[sample_idx].reset_index(drop=True)
+        frequency_df["value"] = value
+        frequency_df["value_type"] = [measures[i].value_type for i in measure_idx]
+        frequency_df["short_name"] = [measures[i].short_name for i in measure_idx]
+        frequency_df["long_name"] = [measures[i].long_name for i in measure_idx]
+        frequency_df["pbmc_gate_expression"] = [measures[i].expression for i in measure_idx]
+        logger.info(f"Evaluated {len(measures)} measures over {len(matrix.samples)} samples")
+        return frequency_df
@@ -0,0 +1,133 @@
+"""
+Per partition results of the report stages, persisted so a report only recomputes what changed.
+
+The flow and sequencing dataframes are split into (ptid, visit_id) partitions. Each partition's result is
+saved together with a fingerprint of the partition's rows and of everything else the result depends on,
+e.g. the measure definitions and the source of the report code. A new sort usually adds a partition or two,
+so only those are recomputed.
+"""
+import functools
+import hashlib
+import logging
+import os
+import pickle
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+logger = logging.getLogger("ReportPartitions")
+
+# bump when the layout of saved partitions changes, edits to the report code are picked up by report_code_fingerprint
+REPORT_PARTITION_VERSION = 1
+
+PARTITION_COLUMNS = ["ptid", "visit_id"]
+
+
+def default_partition_dir(output: str | Path) -> Path:
+    """Where partitions for a report output live unless the user gives a directory"""
+    output = str(Path(output).expanduser().absolute())
+    digest = hashlib.sha1(output.encode()).hexdigest()[:12]
+    return Path("~/.cache/g00x/report").expanduser() / f"{Path(output).name}-{digest}"
+
+
+@functools.lru_cache(maxsize=None)
+def report_code_fingerprint() -> str:
+    """Fingerprint of the g00x.analysis sources, the report stages and the frequency code they call"""
+    digest = hashlib.sha1()
+    for source in sorted(Path(__file__).parent.glob("*.py")):
+        digest.update(f"{source.name}:{hashlib.sha1(source.read_bytes()).hexdigest()}".encode())
+    return digest.hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame, context: str = "") -> str:
+    """Fingerprint of the columns, types and values of a dataframe, in row order, and of the report code"""
+    digest = hashlib.sha1(f"{REPORT_PARTITION_VERSION}\n{report_code_fingerprint()}\n{context}".encode())
+    for column in df.columns:
+        try:
+            hashes = pd.util.hash_pandas_object(df[column], index=False)
+        except TypeError:
+            # unhashable cells such as lists
+            hashes = pd.util.hash_pandas_object(df[column].astype(str), index=False)
+        digest.update(f"{column}:{df[column].dtype}".encode())
+        digest.update(hashes.to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class PartitionStore:
+    """Results of report stages per partition, saved as pickles so types round trip exactly"""
+
+    directory: Path
+
+    def partition_path(self, stage: str, key: tuple[Any, ...]) -> Path:
+        return self.directory / stage / f"{hashlib.sha1(repr(key).encode()).hexdigest()}.pkl"
+
+    def load(self, path: Path, fingerprint: str) -> Any | None:
+        """The saved result if it was computed from the same rows"""
+        if not path.exists():
+            return None
+        try:
+            saved = pickle.load(open(path, "rb"))
+        except (OSError, pickle.UnpicklingError, EOFError):
+            logger.warning(f"Ignoring unreadable report partition {path}")
+            return None
+        return saved["result"] if saved.get("fingerprint") == fingerprint else None
+
+    def save(self, path: Path, fingerprint: str, result: Any) -> None:
+        """Write atomically so an interrupted report never leaves a corrupt partition"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"fingerprint": fingerprint, "result": result}, f)
+        os.replace(tmp_path, path)
+
+    def run(
+        self,
+        stage: str,
+        calculate: Callable[[pd.DataFrame], Any],
+        df: pd.DataFrame,
+        context: str = "",
+        columns: list[str] | None = None,
+    ) -> list[Any]:
+        """Calculate a stage per partition, reusing the saved result of every unchanged partition
+
+        Parameters
+        ----------
+        stage : str
+            Name of the stage, partitions of different stages are saved separately
+        calculate : Callable[[pd.DataFrame], Any]
+            Calculates the stage for the rows of one partition
+        df : pd.DataFrame
+            The rows of every partition
+        context : str
+            Anything besides the rows the result depends on, e.g. the measure definitions
+        columns : list[str] | None
+            The columns calculate reads, only these are fingerprinted; by default all
+
+        Returns
+        -------
+        list[Any]
+            The result of every partition, ordered by partition
+        """
+        results: list[Any] = []
+        seen: set[Path] = set()
+        recomputed = 0
+        for key, partition in df.groupby(PARTITION_COLUMNS, dropna=False, sort=True):
+            path = self.partition_path(stage, key)
+            fingerprint = frame_fingerprint(partition if columns is None else partition[columns], context)
+            result = self.load(path, fingerprint)
+            if result is None:
+                result = calculate(partition.copy())
+                self.save(path, fingerprint, result)
+                recomputed += 1
+            results.append(result)
+            seen.add(path)
+
+        # forget partitions that no longer exist
+        for path in (self.directory / stage).glob("*.pkl"):
+            if path not in seen:
+                path.unlink()
+        logger.info(f"Report stage {stage}: recomputed {recomputed} of {len(results)} partitions")
+        return results
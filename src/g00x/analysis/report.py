@@ -1,11 +1,32 @@
+import json
 import logging
+from functools import partial
 
 import pandas as pd
 
+from g00x.analysis.derived_measures import pivot_with_derived_measures
+from g00x.analysis.gate_expressions import GateExpressionEngine
+from g00x.analysis.partitions import PartitionStore
+from g00x.analysis.sequence_measures import vrc01_class_measures
 from g00x.data import Data
 
 logger = logging.getLogger("report")
 
+# the sequence dataframe columns the sequence frequencies are calculated from
+SEQUENCE_MEASURE_COLUMNS: list[str] = [
+    "run_date",
+    "pubID",
+    "ptid",
+    "group",
+    "weeks",
+    "visit_id",
+    "probe_set",
+    "sample_type",
+    "c_call_heavy",
+    "top_c_call",
+    "is_vrc01_class",
+]
+
 
 def get_frequency_df(data: Data, combined_flow_df: pd.DataFrame) -> pd.DataFrame:
     """Get the flow frequency dataframe part
@@ -45,50 +66,12 @@ def get_frequency_df(data: Data, combined_flow_df: pd.DataFrame) -> pd.DataFrame
     v.remove("value")
     logger.info(f"Frequency dataframe will drop {v}")
 
-    # Create a new dataframe object
-    new_dfs: list[pd.DataFrame] = []
-
     # Do pre-sort and sort in seperate instances
-    for q in ["PreS", "Sort"]:
-        # first do for run purpose
-        sub_df = combined_flow_df.query(f"run_purpose=='{q}'")
-        # now do for each count, which will yield a dataframe
-        for count in count_measures:
-            # print(freq)
-            gate = count["gate"]
-            long_name = count["easy_name"]
-
-            gate_count: pd.DataFrame = sub_df.query(f"gate=='{gate}'").set_index(sort_index)["value"].reset_index()
-
-            # Add some extra columns
-            gate_count["value_type"] = "count"
-            gate_count["short_name"] = long_name
-            gate_count["long_name"] = long_name
-
-            # Add the gate measures, e.g. P8 etc
-            gate_count["pbmc_gate_expression"] = gate
-
-            new_dfs.append(gate_count)
-
-        # now do for each frequency, which will yield a dataframe
-        for freq in frequency_measures:
-            # print(freq)
-            num_gate = freq["numerator"]
-            dom_gate = freq["denominator"]
-            num: pd.Series = sub_df.query(f"gate=='{num_gate}'").set_index(sort_index)["value"]
-            denom: pd.Series = sub_df.query(f"gate=='{dom_gate}'").set_index(sort_index)["value"]
-            freq_df = ((num / denom) * 100).reset_index()
-
-            # Add some extra columns
-            freq_df["value_type"] = "frequency"
-            freq_df["short_name"] = freq["axis_name"]
-            freq_df["long_name"] = freq["long_name"]
-
-            # Add the gate measures, e.g. P8/P5 etc
-            freq_df["pbmc_gate_expression"] = f"{num_gate}/{dom_gate}"
-
-            new_dfs.append(freq_df)
-    freq_df = pd.concat(new_dfs).reset_index(drop=True)
+    run_purposes = ["PreS", "Sort"]
+
+    # compile the counts and frequencies, e.g. P8/P5, and evaluate them over all samples at once
+    engine = GateExpressionEngine(count_measures, frequency_measures)
+    freq_df = engine.frequency_df(combined_flow_df, sort_index, run_purposes)
     return freq_df
 
 
@@ -160,13 +143,22 @@ def calculate_frequency_dataframe(data: Data, flow_df: pd.DataFrame) -> pd.DataF
     return frequency_df
 
 
-def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.DataFrame:
+def get_top_c_alleles(sequence_df: pd.DataFrame) -> pd.Series:
+    """The first constant allele called for each heavy chain"""
+    return sequence_df["c_call_heavy"].str.split(",").str.get(0)
+
+
+def calculate_sequence_frequency_dataframe(
+    sequence_df: pd.DataFrame, list_of_alleles: list[str] | None = None
+) -> pd.DataFrame:
     """Calulate the frequency of vrc01 sequences in the sequence dataframe
 
     Parameters
     ----------
     sequence_df : pd.DataFrame
         The sequence dataframe from the pipeline
+    list_of_alleles : list[str] | None
+        The alleles to report, by default every allele in sequence_df
 
     Returns
     -------
@@ -176,7 +168,7 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
 
     # we have to add this to add it to the flow
     sequence_df["run_purpose"] = "Sort"
-    sequence_df["top_c_allele"] = sequence_df["c_call_heavy"].str.split(",").str.get(0)
+    sequence_df["top_c_allele"] = get_top_c_alleles(sequence_df)
 
     gb_columns: list[str] = [
         "run_purpose",
@@ -193,88 +185,18 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
     # go into global
     gb = sequence_df.groupby(gb_columns)
 
-    def get_combined_groupby(list_of_isotypes: list[str], column: str) -> list[pd.Series]:
-        # We will collect all the series in a empty array
-        collect_series: list[pd.Series] = []
-
-        # iterate through the groupby
-        for g, g_df in gb:
-            for normalize in [False, True]:
-                for isotype in list_of_isotypes:
-                    # Create an empty series from the indexing group g
-                    series = pd.Series(dict(zip(gb_columns, g)))
-
-                    # Get the break down of the vrc01 class by isotype
-                    break_down = (
-                        g_df.query(f"{column}=='{isotype}'")["is_vrc01_class"]
-                        .value_counts(normalize=normalize)
-                        .reindex([True, False])
-                        .fillna(0)
-                    )
-
-                    # if we normalize, it will be a percentage
-                    if normalize:
-                        sn = f"percent_{isotype}_vrc01_class_sequences"
-                        ln = f"Percent of {isotype} sequences that are VRC01-class"
-                        break_down = break_down * 100
-
-                    # else it will be a count
-                    else:
-                        sn = f"num_{isotype}_vrc01_class_sequences"
-                        ln = f"Number of {isotype} sequences that are VRC01-class"
-
-                    # Add short and long name
-                    series["short_name"] = sn
-                    series["long_name"] = ln
-
-                    # True is VRC01 class, false is non-vrc01 class
-                    series["value"] = break_down[True]
-
-                    # other meta data we can merge
-                    series["value_type"] = "sequence measure"
-                    series["pbmc_gate_expression"] = ""
-                    collect_series.append(series)
-        return collect_series
-
     list_of_isotypes = ["IGHM", "IGHG", "IGHA", "IGHD"]
-    list_of_alleles = sequence_df["top_c_allele"].unique().tolist()
-    collect_series = get_combined_groupby(list_of_isotypes, "top_c_call")
-    collect_series += get_combined_groupby(list_of_alleles, "top_c_allele")
-
-    for g, g_df in gb:
-        for normalize in [False, True]:
-            #:Need one outside of isotype for all IGHD-
-            series = pd.Series(dict(zip(gb_columns, g)))
-
-            # Get the break down of the vrc01 class by isotype
-            break_down = (
-                g_df["is_vrc01_class"].value_counts(normalize=normalize).reindex([True, False]).fillna(0)
-            )  # add zero here so we can distinguish between 0 and nan
-
-            # if we normalize, it will be a percentage
-            if normalize:
-                sn = f"percent_igdneg_vrc01_class_sequences"
-                ln = f"Percent of IGD- sequences that are VRC01-class"
-                break_down = break_down * 100
-
-            # else it will be a count
-            else:
-                sn = f"num_igdneg_vrc01_class_sequences"
-                ln = f"Number of IGD- sequences that are VRC01-class"
-
-            # Add short and long name
-            series["short_name"] = sn
-            series["long_name"] = ln
-
-            # True is VRC01 class, false is non-vrc01 class
-            series["value"] = break_down[True]
-
-            # other meta data we can merge
-            series["value_type"] = "sequence measure"
-            series["pbmc_gate_expression"] = ""
-            collect_series.append(series)
-
-    remade = pd.DataFrame(collect_series).reset_index(drop=True)
+    if list_of_alleles is None:
+        list_of_alleles = sequence_df["top_c_allele"].unique().tolist()
+
+    # count VRC01-class sequences of every sample by isotype, by allele and over all IGD- sequences at once
+    remade = pd.concat(
+        [
+            vrc01_class_measures(sequence_df, gb_columns, "top_c_call", list_of_isotypes),
+            vrc01_class_measures(sequence_df, gb_columns, "top_c_allele", list_of_alleles),
+            vrc01_class_measures(sequence_df, gb_columns, None, ["igdneg"], labels=[("igdneg", "IGD-")]),
+        ]
+    ).reset_index(drop=True)
 
     # add one final series with all the sequences counted
     logger.info("Adding number of sequences")
@@ -294,15 +216,39 @@ def calculate_sequence_frequency_dataframe(sequence_df: pd.DataFrame) -> pd.Data
 
 
 def combine_seq_and_flow(
-    data: Data, seq_dataframe: pd.DataFrame, flow_dataframe: pd.DataFrame
+    data: Data,
+    seq_dataframe: pd.DataFrame,
+    flow_dataframe: pd.DataFrame,
+    partition_store: PartitionStore | None = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
-    """Combine the sequence and flow dataframes into one dataframe with the requisite columns"""
-
-    # Get frequency dataframe
-    frequency_df = calculate_frequency_dataframe(data, flow_dataframe)
+    """Combine the sequence and flow dataframes into one dataframe with the requisite columns
 
-    # Sequence dataframe
-    sequence_df = calculate_sequence_frequency_dataframe(seq_dataframe)
+    With a partition store, the flow and sequence frequencies are only recomputed for (ptid, visit_id)
+    partitions whose rows changed since the last report.
+    """
+    if partition_store is None:
+        # Get frequency dataframe
+        frequency_df = calculate_frequency_dataframe(data, flow_dataframe)
+
+        # Sequence dataframe
+        sequence_df = calculate_sequence_frequency_dataframe(seq_dataframe)
+    else:
+        measures = json.dumps([data.get_pbmc_gates(), data.get_frequency_measures()])
+        frequency_df = pd.concat(
+            partition_store.run("frequency", partial(calculate_frequency_dataframe, data), flow_dataframe, measures)
+        ).reset_index(drop=True)
+
+        # every partition reports the alleles found in any partition
+        list_of_alleles = get_top_c_alleles(seq_dataframe).unique().tolist()
+        sequence_df = pd.concat(
+            partition_store.run(
+                "sequence",
+                partial(calculate_sequence_frequency_dataframe, list_of_alleles=list_of_alleles),
+                seq_dataframe,
+                json.dumps(list_of_alleles),
+                [c for c in SEQUENCE_MEASURE_COLUMNS if c in seq_dataframe.columns],
+            )
+        ).reset_index(drop=True)
 
     combined_df = pd.concat([frequency_df, sequence_df]).reset_index(drop=True)
     row_index: list[str] = [
@@ -317,72 +263,11 @@ def combine_seq_and_flow(
         "sample_type",
     ]
 
-    def add_combined_frequencies(
-        df: pd.DataFrame, x_value: str, y_value: str, short_name: str, long_name: str
-    ) -> pd.DataFrame:
-        x = df.query(f"short_name=='{x_value}'").set_index(row_index)["value"]
-        y = df.query(f"short_name=='{y_value}'").set_index(row_index)["value"]
-        x = x / 100
-        y = y / 100
-        new_df = ((x * y) * 100).reset_index()
-        new_df["short_name"] = short_name
-        new_df["value_type"] = "frequency"
-        new_df["long_name"] = long_name
-        return new_df
-
-    # Add percent VRC01 class among IgG
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igg",
-            "percent_IGHG_vrc01_class_sequences",
-            "percent_vrc01_among_igg",
-            "Percent of VRC01-class sequences among IgG",
-        )
-    )  # type: ignore
-
-    # Add percent VRC01 class among IgM
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igm",
-            "percent_IGHM_vrc01_class_sequences",
-            "percent_vrc01_among_igm",
-            "Percent of VRC01-class sequences among IgM",
-        )
+    # Add the measures combining flow and sequencing, e.g. percent VRC01 class among IgG, and pivot
+    combined_pivot, combined_pivot_long, combined_df = pivot_with_derived_measures(
+        combined_df, row_index, data.get_derived_measures()
     )
 
-    # Add percent VRC01 class among IgA
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_iga",
-            "percent_IGHA_vrc01_class_sequences",
-            "percent_vrc01_among_iga",
-            "Percent of VRC01-class sequences among IgA",
-        )
-    )
-
-    # Add percent VRC01 class among IgD-
-    combined_df = combined_df.append(
-        add_combined_frequencies(
-            combined_df,
-            "percent_ep_among_igd_neg",
-            "percent_igdneg_vrc01_class_sequences",
-            "percent_vrc01_among_igd_neg",
-            "Percent of VRC01-class sequences among IgD-",
-        )
-    )
-
-    combined_df["value_type"] = pd.Categorical(combined_df["value_type"], ["count", "sequence measure", "frequency"])
-    combined_df = combined_df.sort_values(["value_type", "short_name"]).reset_index(drop=True)
-    combined_pivot = combined_df.pivot(row_index, "short_name", "value").reset_index()  # type: ignore
-    combined_pivot.columns.name = ""
-
-    # With long names
-    combined_pivot_long = combined_df.pivot(row_index, "long_name", "value").reset_index()  # type: ignore
-    combined_pivot_long.columns.name = ""
-
     # if you are missing columns, add them to data.get_long_name_sort_order()
     logger.info(
         f"Missing columns won't be in final: {set(data.get_long_name_sort_order()) - set(combined_pivot_long.columns)}"
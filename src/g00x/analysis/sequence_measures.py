@@ -0,0 +1,83 @@
+"""
+VRC01-class sequence counts and percents for every sample and category from one grouped count.
+"""
+import logging
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger("SequenceMeasures")
+
+
+def vrc01_class_measures(
+    sequence_df: pd.DataFrame,
+    gb_columns: list[str],
+    column: str | None,
+    categories: list[Any],
+    labels: list[tuple[str, str]] | None = None,
+) -> pd.DataFrame:
+    """Number and percent of VRC01-class sequences for each sample and each category of a column
+
+    Parameters
+    ----------
+    sequence_df : pd.DataFrame
+        The sequence dataframe with an is_vrc01_class column
+    gb_columns : list[str]
+        The columns identifying a sample, samples with a missing key are left out
+    column : str | None
+        The column holding the categories, e.g. top_c_call, or None to count all sequences of a sample
+    categories : list[Any]
+        The categories to report, in order; a category a sample doesn't have gets 0
+    labels : list[tuple[str, str]] | None
+        The (short, long) label of each category used in the measure names, by default the category
+
+    Returns
+    -------
+    pd.DataFrame
+        The gb_columns, short_name, long_name, value, value_type and pbmc_gate_expression of every measure,
+        ordered by sample, then numbers before percents, then category
+    """
+    if labels is None:
+        labels = [(str(category), str(category)) for category in categories]
+    if column is None:
+        category = pd.Series(0, index=sequence_df.index)
+        categories = [0]
+    else:
+        category = sequence_df[column]
+
+    # like value_counts, sequences with unknown class count towards neither side of the percent
+    is_vrc01_class = sequence_df["is_vrc01_class"]
+    known = is_vrc01_class.notna()
+    sums = (
+        sequence_df[gb_columns]
+        .assign(_category=category, _vrc01=is_vrc01_class.eq(True) & known, _known=known)
+        .groupby(gb_columns + ["_category"])[["_vrc01", "_known"]]
+        .sum()
+    )
+    samples = sequence_df.groupby(gb_columns).size().index
+
+    def by_category(counts: pd.Series) -> np.ndarray:
+        return counts.unstack("_category").reindex(index=samples, columns=categories).fillna(0).to_numpy(float)
+
+    vrc01, total = by_category(sums["_vrc01"]), by_category(sums["_known"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(total > 0, (vrc01 / total) * 100, 0.0)
+
+    # (sample, number or percent, category) flattened in that order
+    n_measures = 2 * len(categories)
+    short_names = [f"num_{short}_vrc01_class_sequences" for short, _ in labels]
+    short_names += [f"percent_{short}_vrc01_class_sequences" for short, _ in labels]
+    long_names = [f"Number of {long} sequences that are VRC01-class" for _, long in labels]
+    long_names += [f"Percent of {long} sequences that are VRC01-class" for _, long in labels]
+
+    measures_df = samples.to_frame(index=False).iloc[np.repeat(np.arange(len(samples)), n_measures)]
+    measures_df = measures_df.reset_index(drop=True).assign(
+        short_name=np.tile(short_names, len(samples)) if n_measures else [],
+        long_name=np.tile(long_names, len(samples)) if n_measures else [],
+        value=np.stack([vrc01, percent], axis=1).reshape(-1),
+        value_type="sequence measure",
+        pbmc_gate_expression="",
+    )
+    logger.debug(f"{len(categories)} categories of {column} over {len(samples)} samples")
+    return measures_df
@@ -0,0 +1,343 @@
+"""
+Benchmarks of the validation, flow, AIRR and report stages on synthetic trials of increasing size.
+
+Every benchmark is timed with perf_counter over a few repeats and appended to a JSON lines store with the commit
+it ran on, so a stage can be tracked from commit to commit at 1x, 10x and 100x the current trial.
+"""
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import time
+import traceback
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import pandas as pd
+
+from g00x.benchmarks.synthetic import SyntheticTrial, TrialPaths, TrialScale
+from g00x.data import Data
+
+logger = logging.getLogger("Benchmark")
+
+DEFAULT_RESULTS = Path("~/.cache/g00x/benchmarks.jsonl")
+DEFAULT_WORKDIR = Path("~/.cache/g00x/trials")
+
+
+@dataclass
+class BenchmarkContext:
+    """A synthetic trial written to disk and the tables drawn for it"""
+
+    trial: SyntheticTrial
+    paths: dict[str, TrialPaths]
+    data: Data
+
+
+@dataclass
+class BenchmarkResult:
+    """One benchmark at one scale on one commit"""
+
+    benchmark: str
+    factor: float
+    samples: int
+    cells: int
+    commit: str | None
+    dirty: bool
+    timestamp: float
+    seconds: list[float] = field(default_factory=list)
+    best: float | None = None
+    median: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    python: str = platform.python_version()
+    pandas: str = pd.__version__
+
+
+# name -> setup, the setup returns what is timed so reading the inputs isn't
+BENCHMARKS: dict[str, Callable[[BenchmarkContext], Callable[[], Any]]] = {}
+
+
+def benchmark(name: str) -> Callable[[Callable[[BenchmarkContext], Callable[[], Any]]], Any]:
+    """Register a benchmark setup under name"""
+
+    def register(setup: Callable[[BenchmarkContext], Callable[[], Any]]) -> Callable[[BenchmarkContext], Any]:
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("validate_g002_flow")
+def _validate_g002_flow(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.validations.flow_validation import ValidateG00X
+
+    return lambda: ValidateG00X().validate_scheme(str(context.paths["g002"].flow))
+
+
+@benchmark("validate_g003_flow")
+def _validate_g003_flow(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.validations.g003_flow_validation import ValidateG003
+
+    return lambda: ValidateG003().validate_scheme(str(context.paths["g003"].flow))
+
+
+@benchmark("validate_g002_sequencing")
+def _validate_g002_sequencing(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.validations.sequencing_validation import validate_sequencing
+
+    return lambda: validate_sequencing(context.paths["g002"].sequencing)
+
+
+@benchmark("validate_g003_sequencing")
+def _validate_g003_sequencing(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.validations.g003_sequencing_validation import validate_g003_sequencing
+
+    return lambda: validate_g003_sequencing(context.paths["g003"].sequencing)
+
+
+@benchmark("parse_g002_flow")
+def _parse_g002_flow(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.flow.flow import parse_flow_data
+    from g00x.tools.file_cache import file_cache
+
+    def run() -> pd.DataFrame:
+        # read every population summary again instead of from the last repeat
+        file_cache.clear()
+        return parse_flow_data(context.data, context.paths["g002"].flow)
+
+    return run
+
+
+@benchmark("parse_g003_flow")
+def _parse_g003_flow(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.flow.g003_flow import pull_flow_from_validation
+    from g00x.tools.file_cache import file_cache
+    from g00x.validations.g003_flow_validation import validate_g003_sorting
+
+    def run() -> pd.DataFrame:
+        file_cache.clear()
+        validation = validate_g003_sorting(context.paths["g003"].flow, capture=True)
+        return pull_flow_from_validation(
+            validation,
+            {},
+            context.data.get_g003_ptid_prefix_2_group(),
+            context.data.get_g003_visit_id_2_week(),
+        )
+
+    return run
+
+
+@benchmark("pairing")
+def _pairing(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.sequencing.airr import get_pairing
+
+    cells = context.trial.cells("g002")[["barcode", "sort", "pool"]]
+    contigs = context.trial.contigs("g002").merge(cells, on="barcode")
+    pools = [pool_df.drop(columns=["barcode", "sort", "pool"]) for _, pool_df in contigs.groupby(["sort", "pool"])]
+    # get_pairing inserts the cellhash into the table it is given
+    return lambda: [get_pairing(pool_df.copy()) for pool_df in pools]
+
+
+@benchmark("demultiplex_cso")
+def _demultiplex_cso(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.sequencing.airr import get_keyed_cso_file
+
+    frame = context.trial.pool_frame("g002", context.paths["g002"])
+    return lambda: [get_keyed_cso_file(pool_df) for _, pool_df in frame.groupby("cso_output")]
+
+
+@benchmark("mutational_sets")
+def _mutational_sets(context: BenchmarkContext) -> Callable[[], Any]:
+    from sadie.airr.airrtable import LinkedAirrTable
+
+    from g00x.sequencing.airr import add_mutational_sets
+
+    airr = context.trial.paired_airr_table("g002")
+    return lambda: add_mutational_sets(context.data, LinkedAirrTable(airr.copy(), key_column="cellid"))
+
+
+@benchmark("cluster")
+def _cluster(context: BenchmarkContext) -> Callable[[], Any]:
+    from sadie.airr.airrtable import LinkedAirrTable
+
+    from g00x.sequencing.airr import cluster
+
+    airr = context.trial.paired_airr_table("g002").drop(columns=["cluster", "is_centroid"])
+    return lambda: cluster(LinkedAirrTable(airr.copy(), key_column="cellid"), cluster_n=5)
+
+
+@benchmark("report")
+def _report(context: BenchmarkContext) -> Callable[[], Any]:
+    from g00x.analysis.report import combine_seq_and_flow
+    from g00x.flow.flow import parse_flow_data
+
+    flow = parse_flow_data(context.data, context.paths["g002"].flow)
+    airr = context.trial.paired_airr_table("g002")
+    return lambda: combine_seq_and_flow(context.data, airr.copy(), flow.copy())
+
+
+def get_commit() -> tuple[str | None, bool]:
+    """The short hash of the checked out commit and whether the tree has changes, None outside a git checkout"""
+    cwd = Path(__file__).parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=cwd, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        status = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=cwd, capture_output=True, text=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+    return commit, bool(status.strip())
+
+
+def prepare_trial(workdir: str | Path, scale: TrialScale, seed: int = 0, data: Data | None = None) -> BenchmarkContext:
+    """Write the trial of scale under workdir, reusing one written before with the same scale and seed"""
+    trial = SyntheticTrial(scale, seed=seed, data=data)
+    out = Path(workdir).expanduser().absolute() / f"x{scale.factor:g}-seed{seed}"
+    manifest = out / "trial.json"
+    expected = {"scale": asdict(scale), "seed": seed}
+    if manifest.exists() and json.loads(manifest.read_text()) == expected:
+        logger.info(f"Reusing the trial in {out}")
+        paths = trial.paths(out)
+    else:
+        if out.exists():
+            # a trial of another size or seed
+            shutil.rmtree(out)
+        logger.info(f"Writing a {scale.factor:g}x trial to {out}")
+        paths = trial.write(out, tables=False)
+    return BenchmarkContext(trial=trial, paths=paths, data=trial.data)
+
+
+def time_benchmark(name: str, context: BenchmarkContext, repeat: int = 3) -> BenchmarkResult:
+    """Time one benchmark, recording a missing optional dependency as skipped and any other error as failed"""
+    commit, dirty = get_commit()
+    result = BenchmarkResult(
+        benchmark=name,
+        factor=context.trial.scale.factor,
+        samples=context.trial.scale.samples,
+        cells=len(context.trial.cells("g002")),
+        commit=commit,
+        dirty=dirty,
+        timestamp=time.time(),
+    )
+    try:
+        run = BENCHMARKS[name](context)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            result.seconds.append(time.perf_counter() - start)
+    except ImportError as e:
+        result.status = "skipped"
+        result.error = str(e)
+        logger.warning(f"Skipping {name}: {e}")
+        return result
+    except Exception as e:
+        result.status = "failed"
+        result.error = "".join(traceback.format_exception_only(type(e), e)).strip()
+        logger.error(f"{name} failed: {result.error}")
+        return result
+    result.best = min(result.seconds)
+    result.median = statistics.median(result.seconds)
+    return result
+
+
+def write_result(results: str | Path, result: BenchmarkResult) -> None:
+    path = Path(results).expanduser()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(asdict(result)) + "\n")
+
+
+def run_suite(
+    scales: list[TrialScale],
+    workdir: str | Path = DEFAULT_WORKDIR,
+    results: str | Path | None = DEFAULT_RESULTS,
+    benchmarks: list[str] | None = None,
+    repeat: int = 3,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """Run the benchmarks at every scale
+
+    Parameters
+    ----------
+    scales : list[TrialScale]
+        Trial sizes to run at, e.g. 1x, 10x and 100x
+    workdir : str | Path
+        Where the synthetic trials are written and reused from
+    results : str | Path | None
+        JSON lines store every result is appended to, None to not store them
+    benchmarks : list[str] | None
+        Names of the benchmarks to run, by default all of them
+    repeat : int
+        Times each benchmark is run
+    seed : int
+        Seed of the synthetic trials
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per benchmark and scale
+    """
+    names = benchmarks or list(BENCHMARKS)
+    unknown = set(names) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Unknown benchmarks {sorted(unknown)}, choose from {list(BENCHMARKS)}")
+    records = []
+    data = Data()
+    for scale in scales:
+        context = prepare_trial(workdir, scale, seed=seed, data=data)
+        for name in names:
+            result = time_benchmark(name, context, repeat=repeat)
+            if results is not None:
+                write_result(results, result)
+            records.append(asdict(result))
+    return pd.DataFrame(records)
+
+
+def read_results(results: str | Path) -> pd.DataFrame:
+    """Every stored result, skipping lines that can't be read"""
+    records = []
+    with open(Path(results).expanduser(), encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return pd.DataFrame(records)
+
+
+def compare(results: str | Path, baseline: str, candidate: str) -> pd.DataFrame:
+    """Median seconds of every benchmark and scale on two commits and how much faster the candidate is
+
+    Parameters
+    ----------
+    results : str | Path
+        The JSON lines store
+    baseline : str
+        Commit to compare against
+    candidate : str
+        Commit compared
+
+    Returns
+    -------
+    pd.DataFrame
+        Per benchmark and scale factor the baseline and candidate median and the speedup, baseline / candidate
+    """
+    stored = read_results(results)
+    if stored.empty:
+        raise ValueError(f"No results in {results}")
+    stored = stored[stored["status"] == "ok"]
+    medians = {}
+    for label, commit in [("baseline", baseline), ("candidate", candidate)]:
+        runs = stored[stored["commit"].astype(str).str.startswith(commit)]
+        if runs.empty:
+            raise ValueError(f"No results for commit {commit} in {results}")
+        # the latest run of a commit counts
+        medians[label] = runs.sort_values("timestamp").groupby(["benchmark", "factor"])["median"].last()
+    comparison = pd.DataFrame(medians).dropna()
+    comparison["speedup"] = comparison["baseline"] / comparison["candidate"]
+    return comparison.round(4)
@@ -0,0 +1,685 @@
+"""
+Synthetic but schema valid G002 and G003 trials, so the pipeline can be tested and benchmarked without Box and Globus.
+
+A trial is written the way the real ones are laid out: the Box flow trees, the sequencing runs with their
+manifests, the cellranger outs of every sort pool and the AIRR tables, at a multiple of the current trial size.
+Everything is drawn from a seeded generator, so the same scale and seed always give the same trial.
+"""
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from functools import cached_property
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from g00x.data import Data
+from g00x.tools.feature_matrix import NUCLEOTIDES, unique_barcodes, write_feature_matrix
+from g00x.validations.models.g00x import get_enrollment_index
+
+logger = logging.getLogger("Synthetic")
+
+# about the size of the G002 sorts, 60 participants at two visits
+CURRENT_TRIAL_SAMPLES = 120
+
+FIRST_SORT_DATE = date(2021, 1, 4)
+
+# sequencing run folders the run models accept, run0001 to run0039 and run0001 to run0019
+G002_MAX_RUNS = 39
+G003_MAX_RUNS = 19
+
+AMINO_ACIDS = b"ACDEFGHIKLMNPQRSTVWY"
+
+VRC01_HEAVY_V_CALLS = ["IGHV1-2*02", "IGHV1-2*04"]
+HEAVY_V_CALLS = ["IGHV1-2*02", "IGHV3-23*01", "IGHV4-34*01", "IGHV1-69*01", "IGHV3-30*18", "IGHV1-46*01"]
+LIGHT_V_CALLS = ["IGKV3-20*01", "IGKV1-33*01", "IGKV3-15*01", "IGLV2-14*01", "IGLV2-23*02"]
+HEAVY_J_CALLS = ["IGHJ4*02", "IGHJ6*02", "IGHJ3*02"]
+LIGHT_J_CALLS = {"IGK": ["IGKJ1*01", "IGKJ2*01"], "IGL": ["IGLJ2*01", "IGLJ3*02"]}
+D_CALLS = ["IGHD3-10*01", "IGHD6-19*01", "IGHD2-2*01"]
+# constant calls of the heavy chain and how often they are sorted, every allele the report has a measure for
+C_CALLS = {
+    "IGHG1*01": 0.4,
+    "IGHM*01": 0.22,
+    "IGHA1*01": 0.1,
+    "IGHG2*01": 0.08,
+    "IGHD*02": 0.07,
+    "IGHG3*01": 0.05,
+    "IGHA2*01": 0.03,
+    "IGHG4*01": 0.03,
+    # no constant region called
+    None: 0.02,
+}
+# kabat positions the background mutations are drawn from
+KABAT_POSITIONS = ["5", "10", "19", "24", "28", "30", "31", "33", "35", "40", "50", "52", "53", "54", "56", "57", "58"]
+KABAT_POSITIONS += ["61", "62", "64", "69", "73", "74", "76", "82A", "82B", "84", "87", "89", "93"]
+
+
+@dataclass(frozen=True)
+class TrialScale:
+    """Size of a synthetic trial as a multiple of the current trial
+
+    Parameters
+    ----------
+    factor : float
+        Multiple of the current trial size, e.g. 1, 10 or 100
+    cells_per_sample : int
+        Mean number of sorted cells recovered per sample
+    hashtags_per_pool : int
+        Samples hashed into one sort pool, at most 14
+    pools_per_sort : int
+        Sort pools of one sort, at most 9
+    """
+
+    factor: float = 1.0
+    cells_per_sample: int = 100
+    hashtags_per_pool: int = 8
+    pools_per_sort: int = 3
+
+    def __post_init__(self) -> None:
+        if not 1 <= self.hashtags_per_pool <= 14:
+            raise ValueError(f"hashtags_per_pool must be between 1 and 14, not {self.hashtags_per_pool}")
+        if not 1 <= self.pools_per_sort <= 9:
+            raise ValueError(f"pools_per_sort must be between 1 and 9, not {self.pools_per_sort}")
+
+    @property
+    def samples(self) -> int:
+        return max(1, round(CURRENT_TRIAL_SAMPLES * self.factor))
+
+
+@dataclass
+class TrialPaths:
+    """Where a synthetic trial of one study was written"""
+
+    flow: Path
+    sequencing: Path
+    output: Path
+
+
+def random_strings(rng: np.random.Generator, alphabet: bytes, lengths: np.ndarray) -> np.ndarray:
+    """Random strings of the given lengths, drawn a length at a time so they are built without a python loop"""
+    letters = np.frombuffer(alphabet, dtype=np.uint8)
+    strings = np.empty(len(lengths), dtype=object)
+    for length in np.unique(lengths):
+        mask = lengths == length
+        codes = letters[rng.integers(0, len(letters), size=(int(mask.sum()), int(length)))]
+        strings[mask] = codes.view(f"S{length}").ravel().astype(str)
+    return strings
+
+
+def gate_parents(gates: list[dict[str, str]]) -> dict[str, str]:
+    """Parent of every gate, the gate named by the phenotype before the last /, else B cells below the first four gates"""
+    by_phenotype: dict[str, str] = {}
+    for gate in gates:
+        phenotype = gate["phenotype"].strip()
+        by_phenotype[phenotype] = gate["gate"]
+        # IgD- B cells is the IgD- of IgD-/KO-
+        by_phenotype.setdefault(phenotype.split(" ")[0], gate["gate"])
+    parents = {}
+    for i, gate in enumerate(gates):
+        phenotype = gate["phenotype"].strip()
+        if i < 4:
+            # lymphocytes, singlets, dump- and B cells gate one after another
+            parents[gate["gate"]] = gates[i - 1]["gate"] if i else "All Events"
+        elif "/" in phenotype:
+            parents[gate["gate"]] = by_phenotype.get(phenotype.rsplit("/", 1)[0], gates[3]["gate"])
+        else:
+            parents[gate["gate"]] = gates[3]["gate"]
+    return parents
+
+
+class SyntheticTrial:
+    """A synthetic trial, each table drawn once and reused by everything written from it
+
+    Parameters
+    ----------
+    scale : TrialScale | None
+        Size of the trial, by default the size of the current trial
+    seed : int
+        Seed of the random generator
+    data : Data | None
+        Gates, enrollment and reference data the trial is drawn against
+    """
+
+    def __init__(self, scale: TrialScale | None = None, seed: int = 0, data: Data | None = None) -> None:
+        self.scale = scale or TrialScale()
+        self.seed = seed
+        self.data = data or Data()
+
+    def rng(self, stream: str) -> np.random.Generator:
+        """An independent generator per table, so drawing one table never changes another"""
+        return np.random.default_rng([self.seed, *stream.encode()])
+
+    def _pooled(self, samples: pd.DataFrame, study: str) -> pd.DataFrame:
+        """Hash samples into sort pools and the pools into sorts, a sort per day"""
+        index = np.arange(len(samples))
+        pool = index // self.scale.hashtags_per_pool
+        sort = pool // self.scale.pools_per_sort
+        samples["sort"] = sort
+        samples["pool"] = pool % self.scale.pools_per_sort + 1
+        samples["hashtag"] = [f"HT{i % self.scale.hashtags_per_pool + 1:02d}" for i in index]
+        samples["run_date"] = [FIRST_SORT_DATE + timedelta(days=int(s)) for s in sort]
+        if study == "g002":
+            samples["sort_id"] = [f"S{s % 100:02d}" for s in sort]
+            samples["sort_pool"] = [f"P{p:02d}" for p in samples["pool"]]
+        else:
+            samples["sort_id"] = [f"{chr(65 + s // 10 % 26)}{s % 10}" for s in sort]
+            samples["sort_pool"] = [f"P{p}" for p in samples["pool"]]
+        samples["probe_set"] = "eODGT8"
+        samples["sample_type"] = "PBMC"
+        samples["pubID"] = samples["ptid"]
+        return samples
+
+    @cached_property
+    def g002_samples(self) -> pd.DataFrame:
+        """Every sorted G002 sample, the enrolled participants at the visits of their group"""
+        enrollment = get_enrollment_index()
+        ptids = sorted(enrollment.get_ptids())
+        rows = []
+        for i in range(self.scale.samples):
+            ptid = ptids[i % len(ptids)]
+            group = enrollment.get_group_by_ptid(ptid)
+            visits = enrollment.get_timepoints_by_group(group)
+            # pre vaccination first, then every later visit in turn
+            visit_id = visits[(i // len(ptids)) % len(visits)]
+            weeks = enrollment.get_week_by_timepoint_and_group(group, visit_id)
+            rows.append({"ptid": ptid, "group": group, "weeks": weeks, "visit_id": visit_id})
+        return self._pooled(pd.DataFrame(rows), "g002")
+
+    @cached_property
+    def g003_samples(self) -> pd.DataFrame:
+        """Every sorted G003 sample, participants of each site at every visit"""
+        ptid_prefix2group = self.data.get_g003_ptid_prefix_2_group()
+        visit_id2week = self.data.get_g003_visit_id_2_week()
+        prefixes = sorted(ptid_prefix2group)
+        visits = list(visit_id2week)
+        participants = max(1, self.scale.samples // len(visits))
+        rows = []
+        for i in range(self.scale.samples):
+            participant = i % participants
+            prefix = prefixes[participant % len(prefixes)]
+            visit_id = visits[(i // participants) % len(visits)]
+            rows.append(
+                {
+                    "ptid": f"G003-{prefix}-{participant // len(prefixes) + 1:03d}",
+                    "group": ptid_prefix2group[prefix],
+                    "weeks": visit_id2week[visit_id],
+                    "visit_id": visit_id,
+                }
+            )
+        return self._pooled(pd.DataFrame(rows), "g003")
+
+    def samples(self, study: str) -> pd.DataFrame:
+        return self.g002_samples if study == "g002" else self.g003_samples
+
+    def cells(self, study: str) -> pd.DataFrame:
+        """Every recovered cell with its sample, barcode and the features of its receptor"""
+        return self._cells_g002 if study == "g002" else self._cells_g003
+
+    @cached_property
+    def _cells_g002(self) -> pd.DataFrame:
+        return self._draw_cells("g002")
+
+    @cached_property
+    def _cells_g003(self) -> pd.DataFrame:
+        return self._draw_cells("g003")
+
+    def _draw_cells(self, study: str) -> pd.DataFrame:
+        rng = self.rng(f"{study}-cells")
+        samples = self.samples(study)
+        counts = np.maximum(rng.poisson(self.scale.cells_per_sample, len(samples)), 1)
+        cells = samples.loc[np.repeat(samples.index, counts)].reset_index(names="sample")
+        n = len(cells)
+        cells["barcode"] = unique_barcodes(n)
+
+        # about 5% of the sorted cells are VRC01-class, IGHV1-2*02/*04 with a 5 amino acid light CDR3
+        vrc01 = rng.random(n) < 0.05
+        cells["v_call_heavy"] = np.where(
+            vrc01,
+            rng.choice(VRC01_HEAVY_V_CALLS, n),
+            rng.choice(HEAVY_V_CALLS, n),
+        )
+        cells["v_call_light"] = rng.choice(LIGHT_V_CALLS, n)
+        cells["cdr3_length_heavy"] = rng.integers(10, 21, n)
+        cells["cdr3_length_light"] = np.where(vrc01, 5, rng.integers(8, 12, n))
+        cells["c_call_heavy"] = rng.choice(list(C_CALLS), n, p=list(C_CALLS.values()))
+        cells["has_100bW"] = vrc01 & (rng.random(n) < 0.5)
+        # cells the pairing drops, a second light chain or an unproductive heavy chain
+        cells["extra_light"] = rng.random(n) < 0.08
+        cells["productive_heavy"] = rng.random(n) > 0.04
+        cells["cluster"] = rng.integers(0, max(1, n // 20), n)
+        return cells
+
+    def contigs(self, study: str) -> pd.DataFrame:
+        """Every contig of every cell annotated the way the AIRR step annotates filtered_contig.fasta"""
+        return self._contigs_g002 if study == "g002" else self._contigs_g003
+
+    @cached_property
+    def _contigs_g002(self) -> pd.DataFrame:
+        return self._draw_contigs("g002")
+
+    @cached_property
+    def _contigs_g003(self) -> pd.DataFrame:
+        return self._draw_contigs("g003")
+
+    def _draw_contigs(self, study: str) -> pd.DataFrame:
+        rng = self.rng(f"{study}-contigs")
+        cells = self.cells(study)
+        heavy = pd.DataFrame(
+            {
+                "cell": cells.index,
+                "contig": 1,
+                "locus": "IGH",
+                "productive": cells["productive_heavy"].to_numpy(),
+                "v_call": cells["v_call_heavy"].to_numpy(),
+                "d_call": rng.choice(D_CALLS, len(cells)),
+                "j_call": rng.choice(HEAVY_J_CALLS, len(cells)),
+                "c_call": cells["c_call_heavy"].to_numpy(),
+                "cdr3_length": cells["cdr3_length_heavy"].to_numpy(),
+            }
+        )
+        light_cells = np.concatenate([cells.index, cells.index[cells["extra_light"]]])
+        light_v_calls = np.concatenate(
+            [cells["v_call_light"].to_numpy(), rng.choice(LIGHT_V_CALLS, int(cells["extra_light"].sum()))]
+        )
+        light_locus = np.array([v_call[:3] for v_call in light_v_calls])
+        light = pd.DataFrame(
+            {
+                "cell": light_cells,
+                "contig": np.concatenate([np.full(len(cells), 2), np.full(len(light_cells) - len(cells), 3)]),
+                "locus": light_locus,
+                "productive": True,
+                "v_call": light_v_calls,
+                "d_call": "",
+                "j_call": [rng.choice(LIGHT_J_CALLS[locus]) for locus in light_locus],
+                "c_call": np.where(light_locus == "IGK", "IGKC*01", "IGLC2*01"),
+                "cdr3_length": np.concatenate(
+                    [
+                        cells["cdr3_length_light"].to_numpy(),
+                        rng.integers(8, 12, len(light_cells) - len(cells)),
+                    ]
+                ),
+            }
+        )
+        contigs = pd.concat([heavy, light]).sort_values(["cell", "contig"]).reset_index(drop=True)
+        n = len(contigs)
+        barcodes = cells["barcode"].to_numpy()[contigs["cell"]]
+        contigs.insert(0, "sequence_id", barcodes + "_contig_" + contigs["contig"].astype(str))
+        contigs.insert(1, "barcode", barcodes)
+        contigs["sequence"] = random_strings(rng, NUCLEOTIDES, rng.integers(360, 420, n))
+        contigs["complete_vdj"] = True
+        contigs["v_call_top"] = contigs["v_call"]
+        contigs["cdr1_aa"] = random_strings(rng, AMINO_ACIDS, np.full(n, 8))
+        contigs["cdr2_aa"] = random_strings(rng, AMINO_ACIDS, np.full(n, 8))
+        cdr3 = random_strings(rng, AMINO_ACIDS, contigs["cdr3_length"].to_numpy())
+        # a tryptophan at 100b, the sixth residue from the end of the heavy junction
+        with_100bw = (contigs["locus"] == "IGH").to_numpy() & cells["has_100bW"].to_numpy()[contigs["cell"]]
+        cdr3[with_100bw] = [s[:-5] + "W" + s[-4:] for s in cdr3[with_100bw]]
+        contigs["cdr3_aa"] = cdr3
+        contigs["junction_aa"] = np.char.add(np.char.add("C", cdr3.astype(str)), "W")
+        contigs["junction_aa_length"] = contigs["cdr3_length"] + 2
+        contigs["v_identity"] = np.round(rng.uniform(85, 100, n), 2)
+        contigs["mutations"] = self._mutations(rng, n)
+        return contigs.drop(columns=["cell", "contig", "cdr3_length"])
+
+    def _mutations(self, rng: np.random.Generator, n: int) -> list[list[str]]:
+        """Kabat numbered mutations, some of them the VRC01-class mutations the focus sets score"""
+        pool = list(self.data.get_cotrell_focus()["positive_set"])
+        residues = np.frombuffer(AMINO_ACIDS, dtype=np.uint8)
+        for position in KABAT_POSITIONS:
+            before, after = rng.choice(residues, 2, replace=False)
+            pool.append(f"{chr(before)}{position}{chr(after)}")
+        counts = rng.poisson(4, n)
+        drawn = np.array(pool)[rng.integers(0, len(pool), counts.sum())].tolist()
+        bounds = np.concatenate([[0], np.cumsum(counts)])
+        return [drawn[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+    def airr_table(self, study: str) -> pd.DataFrame:
+        """The unpaired AIRR table of every contig, the input of get_pairing"""
+        return self.contigs(study).drop(columns=["barcode"])
+
+    def paired_airr_table(self, study: str) -> pd.DataFrame:
+        """The paired and annotated AIRR table of every cell, like the combined AIRR output of the pipeline"""
+        contigs = self.contigs(study).copy()
+        contigs.insert(0, "cellhash", contigs["barcode"])
+        usable = contigs[contigs["productive"] & contigs["complete_vdj"]]
+        chains = usable.groupby("cellhash")["locus"].agg(lambda loci: "_".join(sorted(loci)))
+        paired_cells = chains[chains.isin(["IGH_IGK", "IGH_IGL"])].index
+        usable = usable[usable["cellhash"].isin(paired_cells)].drop(columns=["barcode"])
+        paired = usable.query("locus=='IGH'").merge(
+            usable.query("locus!='IGH'"), on="cellhash", how="inner", suffixes=("_heavy", "_light")
+        )
+        cells = self.cells(study).set_index("barcode")
+        meta = cells.loc[paired["cellhash"], ["ptid", "pubID", "group", "weeks", "visit_id", "probe_set"]]
+        meta = meta.assign(
+            sample_type=cells.loc[paired["cellhash"], "sample_type"].to_numpy(),
+            run_date=cells.loc[paired["cellhash"], "run_date"].astype(str).to_numpy(),
+            sort_pool=cells.loc[paired["cellhash"], "sort_pool"].to_numpy(),
+            hashtag=cells.loc[paired["cellhash"], "hashtag"].to_numpy(),
+            cluster=cells.loc[paired["cellhash"], "cluster"].to_numpy(),
+        ).reset_index(drop=True)
+        airr = pd.concat([meta, paired], axis=1)
+        airr.insert(
+            0,
+            "cellid",
+            airr[["pubID", "group", "weeks", "probe_set", "sort_pool", "cellhash"]].astype(str).agg("_".join, axis=1),
+        )
+        airr["HTO"] = airr["hashtag"]
+        airr["is_vrc01_class"] = airr["v_call_top_heavy"].str.contains(r"IGHV1-2\*0[24]") & (
+            airr["cdr3_aa_light"].str.len() == 5
+        )
+        airr["hcdr3_len"] = airr["cdr3_aa_heavy"].str.len()
+        airr["lcdr3_len"] = airr["cdr3_aa_light"].str.len()
+        airr["top_c_call"] = airr["c_call_heavy"].str[0:4].fillna("")
+        airr["is_centroid"] = ~airr.duplicated(["ptid", "cluster"])
+        return airr
+
+    def pool_frame(self, study: str, paths: TrialPaths) -> pd.DataFrame:
+        """One row per sample with its sequencing indexes and cellranger outputs, like the vdj and cso dataframes"""
+        samples = self.samples(study).copy()
+        pool_index = samples["sort"] * self.scale.pools_per_sort + samples["pool"] - 1
+        rows, columns = divmod(pool_index.to_numpy(), 12)
+        samples["vdj_index"] = [f"SI-TT-{chr(65 + r % 8)}{c + 1}" for r, c in zip(rows, columns)]
+        samples["feature_index"] = [f"SI-TN-{chr(65 + r % 8)}{c + 1}" for r, c in zip(rows, columns)]
+        samples["sorted_date"] = samples["run_date"].astype(str)
+        samples["run_date"] = samples["run_date"].astype(str)
+        run_dirs = [self._run_dir(study, paths, sort) for sort in samples["sort"]]
+        samples["run_dir_path"] = [str(run_dir) for run_dir in run_dirs]
+        # the Illumina folder a sort was sequenced to
+        samples["run_id"] = [
+            self._illumina_name(FIRST_SORT_DATE + timedelta(days=int(sort)), int(sort)) for sort in samples["sort"]
+        ]
+        samples["vdj_output"] = [
+            str(run_dir / "working_directory" / f"vdj_output_{i:04d}") for run_dir, i in zip(run_dirs, pool_index)
+        ]
+        samples["cso_output"] = [
+            str(run_dir / "working_directory" / f"cso_output_{i:04d}") for run_dir, i in zip(run_dirs, pool_index)
+        ]
+        if study == "g003":
+            samples = samples.rename(columns={"feature_index": "cso_index", "hashtag": "hto"})
+            samples["timepoint"] = samples["visit_id"]
+            samples["pool_number"] = samples["sort_pool"]
+        else:
+            samples["vdj_run_id"] = samples["run_id"]
+            samples["cso_run_id"] = samples["run_id"]
+        return samples
+
+    def _runs(self, study: str) -> int:
+        sorts = int(self.samples(study)["sort"].max()) + 1
+        return min(sorts, G002_MAX_RUNS if study == "g002" else G003_MAX_RUNS)
+
+    def _run_dir(self, study: str, paths: TrialPaths, sort: int) -> Path:
+        return paths.sequencing / f"run{sort % self._runs(study) + 1:04d}"
+
+    @staticmethod
+    def _illumina_name(run_date: date, sort: int) -> str:
+        return f"{(run_date + timedelta(days=1)):%y%m%d}_A00123_{sort + 1:04d}_AH{sort:06d}DSX"
+
+    def write_flow_g002(self, paths: TrialPaths) -> None:
+        """The Box tree of Sort_RunDate folders with a DV population summary per sample"""
+        rng = self.rng("g002-flow")
+        gates = self.data.get_pbmc_gates()
+        parents = gate_parents(gates)
+        for sort, sort_df in self.g002_samples.groupby("sort"):
+            run_date = sort_df["run_date"].iloc[0]
+            sort_dir = (
+                paths.flow / "Sorts" / f"Sort_RunDate{run_date:%y%m%d}_UploadDate{run_date + timedelta(days=7):%y%m%d}"
+            )
+            summary_dir = sort_dir / "ClinicalSamples" / "PopulationSummaryFilesFromDV"
+            summary_dir.mkdir(parents=True, exist_ok=True)
+            for sample in sort_df.itertuples():
+                # a sort stopped midway leaves more than one file subset to sum up
+                subsets = "ab" if rng.random() < 0.05 else "a"
+                for subset in subsets:
+                    name = "_".join(
+                        [
+                            "Sort",
+                            f"{run_date:%y%m%d}",
+                            sample.sort_id,
+                            sample.ptid,
+                            sample.visit_id,
+                            sample.probe_set,
+                            sample.sample_type,
+                            sample.hashtag,
+                            "DV",
+                            "Summary",
+                            "T1",
+                            sample.sort_pool,
+                            subset,
+                        ]
+                    )
+                    (summary_dir / f"{name}.csv").write_text(self._population_summary(rng, gates, parents, name))
+        logger.info(f"Wrote G002 flow of {len(self.g002_samples)} samples to {paths.flow}")
+
+    @staticmethod
+    def _population_summary(
+        rng: np.random.Generator, gates: list[dict[str, str]], parents: dict[str, str], name: str
+    ) -> str:
+        events = {"All Events": int(rng.integers(500_000, 2_000_000))}
+        lines = [
+            f"Experiment Name:,{name}",
+            "Tube Name:,T1",
+            "Record Date:,",
+            "",
+            "Population,Parent Name,#Events,%Parent,%Total",
+            f"All Events,,{events['All Events']},####,100.0",
+        ]
+        for gate in gates:
+            parent = parents[gate["gate"]]
+            count = int(rng.binomial(events[parent], rng.uniform(0.02, 0.9)))
+            events[gate["gate"]] = count
+            percent_parent = 100 * count / events[parent] if events[parent] else 0
+            percent_total = 100 * count / events["All Events"]
+            lines.append(f"{gate['gate']},{parent},{count},{percent_parent:.1f},{percent_total:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def write_flow_g003(self, paths: TrialPaths) -> None:
+        """The sort tree of Sort_RunDate folders with a DataStats workbook per sample"""
+        rng = self.rng("g003-flow")
+        gates = self.data.get_pbmc_gates_g003()
+        parents = gate_parents(gates)
+        for sort, sort_df in self.g003_samples.groupby("sort"):
+            run_date = sort_df["run_date"].iloc[0]
+            sort_dir = (
+                paths.flow / "Sorts" / f"Sort_RunDate{run_date:%y%m%d}_UploadDate{run_date + timedelta(days=7):%y%m%d}"
+            )
+            stats_dir = sort_dir / "ClinicalSamples" / "DataStats"
+            stats_dir.mkdir(parents=True, exist_ok=True)
+            for sample in sort_df.itertuples():
+                name = "_".join(
+                    [
+                        "Sort",
+                        f"{run_date:%y%m%d}",
+                        sample.sort_id,
+                        sample.ptid,
+                        sample.visit_id,
+                        sample.probe_set,
+                        sample.sample_type,
+                        "FlowJo",
+                        "Stats",
+                        "T1",
+                        f"{sample.sort_pool}a",
+                    ]
+                )
+                events = {"All Events": int(rng.integers(500_000, 2_000_000))}
+                rows = [
+                    {
+                        "Population": "All Events",
+                        "Gate Name": "All Events",
+                        "Gate Short Name": "",
+                        "Events Count": events["All Events"],
+                    }
+                ]
+                for gate in gates:
+                    count = int(rng.binomial(events[parents[gate["gate"]]], rng.uniform(0.02, 0.9)))
+                    events[gate["gate"]] = count
+                    rows.append(
+                        {
+                            "Population": gate["phenotype"].strip(),
+                            "Gate Name": gate["gate"],
+                            "Gate Short Name": gate["branch"],
+                            "Events Count": f"{count:,}",
+                        }
+                    )
+                pd.DataFrame(rows).to_excel(stats_dir / f"{name}.xlsx", index=False)
+        logger.info(f"Wrote G003 flow of {len(self.g003_samples)} samples to {paths.flow}")
+
+    def write_sequencing(self, study: str, paths: TrialPaths) -> pd.DataFrame:
+        """Run folders with an Illumina folder per sort and the manifest of their pools
+
+        Returns
+        -------
+        pd.DataFrame
+            The pool frame of the study, see pool_frame
+        """
+        frame = self.pool_frame(study, paths)
+        for run_dir, run_df in frame.groupby("run_dir_path"):
+            run_dir = Path(run_dir)
+            for run_id in run_df["run_id"].unique():
+                (run_dir / run_id).mkdir(parents=True, exist_ok=True)
+            if study == "g002":
+                pools = run_df.drop_duplicates(["sorted_date", "sort_pool"])
+                manifest = pd.DataFrame(
+                    {
+                        "pool_number": pools["pool"],
+                        "sorted_date": pd.to_datetime(pools["sorted_date"]).dt.strftime("%y%m%d"),
+                        "vdj_sequencing_replicate": 1,
+                        "cso_sequencing_replicate": 1,
+                        "vdj_library_replicate": 1,
+                        "cso_library_replicate": 1,
+                        "bio_replicate": 1,
+                        "vdj_index": pools["vdj_index"],
+                        "feature_index": pools["feature_index"],
+                        "vdj_run_id": pools["run_id"],
+                        "cso_run_id": pools["run_id"],
+                    }
+                )
+                manifest.to_csv(run_dir / "sample_manifest.csv", index=False)
+            else:
+                manifest = run_df.assign(
+                    sorted_date=pd.to_datetime(run_df["sorted_date"]).dt.strftime("%y%m%d"),
+                    cells=self.cells(study).groupby("sample").size().reindex(run_df.index).to_numpy(),
+                )[
+                    [
+                        "ptid",
+                        "timepoint",
+                        "sorted_date",
+                        "cells",
+                        "hto",
+                        "vdj_index",
+                        "cso_index",
+                        "pool_number",
+                        "run_id",
+                    ]
+                ]
+                manifest.to_csv(run_dir / "sequencing_manifest.csv", index=False)
+        logger.info(f"Wrote {frame['run_dir_path'].nunique()} {study} sequencing runs to {paths.sequencing}")
+        return frame
+
+    def write_cellranger_outs(self, study: str, frame: pd.DataFrame) -> None:
+        """The vdj contigs and the feature barcode matrix of every sort pool"""
+        rng = self.rng(f"{study}-cellranger")
+        cells = self.cells(study)
+        contigs = self.contigs(study)
+        hashtag = "hashtag" if study == "g002" else "hto"
+        pools = frame.groupby("vdj_output")
+        for vdj_output, pool_df in pools:
+            outs = Path(vdj_output) / "outs"
+            outs.mkdir(parents=True, exist_ok=True)
+            pool_cells = cells[cells["sample"].isin(pool_df.index)]
+            pool_contigs = contigs[contigs["barcode"].isin(pool_cells["barcode"])]
+            with open(outs / "filtered_contig.fasta", "w") as f:
+                f.writelines(f">{i}\n{s}\n" for i, s in zip(pool_contigs["sequence_id"], pool_contigs["sequence"]))
+            pd.DataFrame(
+                {
+                    "barcode": pool_contigs["barcode"],
+                    "is_cell": True,
+                    "contig_id": pool_contigs["sequence_id"],
+                    "high_confidence": True,
+                    "length": pool_contigs["sequence"].str.len(),
+                    "chain": pool_contigs["locus"],
+                    "v_gene": pool_contigs["v_call"].str.split("*").str.get(0),
+                    "d_gene": pool_contigs["d_call"].str.split("*").str.get(0),
+                    "j_gene": pool_contigs["j_call"].str.split("*").str.get(0),
+                    "c_gene": pool_contigs["c_call"].str.split("*").str.get(0),
+                    "full_length": pool_contigs["complete_vdj"],
+                    "productive": pool_contigs["productive"],
+                    "cdr3": pool_contigs["cdr3_aa"],
+                    "reads": rng.integers(500, 20_000, len(pool_contigs)),
+                    "umis": rng.integers(2, 60, len(pool_contigs)),
+                }
+            ).to_csv(outs / "filtered_contig_annotations.csv", index=False)
+
+            features = sorted(pool_df[hashtag].unique())
+            cso_outs = Path(pool_df["cso_output"].iloc[0]) / "outs" / "filtered_feature_bc_matrix"
+            cso_outs.mkdir(parents=True, exist_ok=True)
+            sample_hashtag = pool_df[hashtag]
+            dominant = np.searchsorted(features, sample_hashtag.loc[pool_cells["sample"]].to_numpy())
+            # empty droplets with too few counts and doublets without a dominant hashtag are dropped downstream
+            n_empty = max(1, len(pool_cells) // 20)
+            barcodes = np.concatenate(
+                [
+                    pool_cells["barcode"].to_numpy(),
+                    unique_barcodes(n_empty, offset=len(cells) + rng.integers(0, 4**12)),
+                ]
+            )
+            counts = rng.poisson(4, size=(len(features), len(barcodes)))
+            counts[dominant, np.arange(len(pool_cells))] += rng.poisson(600, len(pool_cells))
+            doublets = rng.random(len(pool_cells)) < 0.02
+            counts[(dominant[doublets] + 1) % len(features), np.flatnonzero(doublets)] += rng.poisson(
+                600, int(doublets.sum())
+            )
+            write_feature_matrix(cso_outs, features, barcodes, counts)
+
+    @staticmethod
+    def paths(out: str | Path) -> dict[str, TrialPaths]:
+        """Where the trial of each study is written under out, like the real mounts"""
+        out = Path(out).expanduser().absolute()
+        return {
+            "g002": TrialPaths(
+                flow=out / "g002/G002/sorting/G002",
+                sequencing=out / "g002/G002/sequencing/G002",
+                output=out / "g002/G002/output",
+            ),
+            "g003": TrialPaths(
+                flow=out / "g003_bucket/g003/g003/sorting/G003",
+                sequencing=out / "g003_bucket/g003/g003/sequencing/G003",
+                output=out / "g003_bucket/g003/g003/output",
+            ),
+        }
+
+    def write(self, out: str | Path, tables: bool = True) -> dict[str, TrialPaths]:
+        """Write the G002 and G003 trials under out
+
+        Parameters
+        ----------
+        out : str | Path
+            The trial is written to out/g002/G002 and out/g003_bucket/g003/g003 like the real mounts
+        tables : bool
+            Also write the vdj and cso dataframes and the AIRR tables as feather next to the trees
+
+        Returns
+        -------
+        dict[str, TrialPaths]
+            The paths of each study
+        """
+        out = Path(out).expanduser().absolute()
+        # the G002 Illumina folder names are checked to have exactly four parts separated by _
+        if "_" in str(out):
+            raise ValueError(f"{out} can't contain _, the G002 sequencing validation splits the whole path on it")
+        paths = self.paths(out)
+        self.write_flow_g002(paths["g002"])
+        self.write_flow_g003(paths["g003"])
+        for study, study_paths in paths.items():
+            frame = self.write_sequencing(study, study_paths)
+            self.write_cellranger_outs(study, frame)
+            study_paths.output.mkdir(parents=True, exist_ok=True)
+            if tables:
+                frame = frame.reset_index(drop=True)
+                frame.to_feather(study_paths.output / "vdj_demultiplex_output.feather")
+                frame.to_feather(study_paths.output / "cso_demultiplex_output.feather")
+                self.airr_table(study).to_feather(study_paths.output / "sadie_airr.feather")
+                self.paired_airr_table(study).to_feather(study_paths.output / "combined_airr.feather")
+        (out / "trial.json").write_text(json.dumps({"scale": asdict(self.scale), "seed": self.seed}, indent=True))
+        return paths
@@ -8,21 +8,31 @@ import click
 import pandas as pd
 from pandas.errors import PerformanceWarning
 
-from g00x.analysis.flow import count_current_samples
-from g00x.analysis.g003_report import g003_combine_seq_and_flow
-from g00x.analysis.report import combine_seq_and_flow
+from g00x.analysis.partitions import PartitionStore, default_partition_dir
+from g00x.benchmarks.suite import (
+    BENCHMARKS,
+    DEFAULT_RESULTS,
+    DEFAULT_WORKDIR,
+    compare,
+    run_suite,
+)
+from g00x.benchmarks.synthetic import SyntheticTrial, TrialScale
 from g00x.data import Data, PlotParameters
 from g00x.flow import g003_flow
 from g00x.flow.flow import parse_flow_data
-from g00x.sequencing.airr import run_airr
-from g00x.sequencing.g003_airr import g003_run_airr
-from g00x.sequencing.g003_tenX import g003_run_cso, g003_run_demultiplex, g003_run_vdj
-from g00x.sequencing.merge import merge_flow_and_sequencing
-from g00x.sequencing.tenX import run_cso, run_demultiplex, run_vdj
-from g00x.tools.path import cd, pathing, pd_expand_path, pd_replace_home_with_tilde
-from g00x.validations.flow_validation import ValidateG00X
-from g00x.validations.g003_flow_validation import validate_g003_sorting
+from g00x.sequencing.executors import EXECUTORS, get_executor
+from g00x.tools.job_queue import HANDLERS, JobQueue, Worker
+from g00x.tools.telemetry import summarize, telemetry
+from g00x.validations.flow_validation import ValidateG00X, collect_g00x_box
+from g00x.validations.g003_flow_validation import (
+    report_g003_sorting,
+    validate_g003_sorting,
+)
 from g00x.validations.g003_sequencing_validation import validate_g003_sequencing
+from g00x.validations.snapshot import ValidationReport, default_snapshot_path
+
+# The AIRR, 10X, merge, report and path modules pull in SADIE, scipy, seaborn and pandera, the commands that run them
+# import them so validate, status or count start without them.
 
 
 @click.group("g00x")
@@ -34,18 +44,183 @@ def g00x(ctx: click.Context, logging_level: str | int = 0) -> None:
     ctx.obj = {"data": Data(), "params": PlotParameters()}
 
 
+def setup_study(ctx: click.Context) -> None:
+    """Give the g002 and g003 commands their data, also when the installed g00x script runs them directly"""
+    obj = ctx.ensure_object(dict)
+    if "data" not in obj:
+        obj.update({"data": Data(), "params": PlotParameters()})
+
+
+@g00x.group("telemetry")
+def telemetry_group() -> None:
+    """Inspect the telemetry ledger"""
+    pass
+
+
+@telemetry_group.command("summary")
+@click.option(
+    "--ledger",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=None,
+    help="The ledger to summarize, defaults to the --telemetry-ledger of g00x",
+)
+@click.option("--run-id", default=None, help="Only summarize this run")
+@click.option("--last", "-n", type=int, default=None, help="Only summarize the last n runs")
+@click.option("--csv", "csv_path", type=click.Path(dir_okay=False, writable=True), help="Also write the summary to csv")
+def telemetry_summary(ledger: str | None, run_id: str | None, last: int | None, csv_path: str | None) -> None:
+    """Roll the recorded stages up per run and stage"""
+    ledger_path = Path(ledger) if ledger else telemetry.ledger
+    if ledger_path is None or not ledger_path.exists():
+        raise click.ClickException(f"No telemetry ledger at {ledger_path}")
+    summary = summarize(ledger_path, run_id)
+    if last is not None and not summary.empty:
+        run_ids = summary.index.get_level_values("run_id").unique()[-last:]
+        summary = summary[summary.index.get_level_values("run_id").isin(run_ids)]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        click.echo(summary.to_string())
+    if csv_path:
+        summary.to_csv(csv_path)
+
+
+@g00x.command("worker")
+@click.option(
+    "--queue",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="G00X_QUEUE",
+    required=True,
+    help="SQLite job queue on the shared filesystem to pull tasks from",
+)
+@click.option("--name", default=None, help="Name of the worker, by default host:pid")
+@click.option("--kind", "kinds", type=click.Choice(list(HANDLERS)), multiple=True, help="Only run these kinds of task")
+@click.option("--lease", type=float, default=300.0, show_default=True, help="Seconds a claimed task is leased for")
+@click.option("--heartbeat", type=float, default=60.0, show_default=True, help="Seconds between heartbeats")
+@click.option("--poll", type=float, default=5.0, show_default=True, help="Seconds between looks at an empty queue")
+@click.option("--retry-delay", type=float, default=30.0, show_default=True, help="Seconds before a retry, per attempt")
+@click.option("--max-tasks", type=int, default=None, help="Stop after running this many tasks")
+@click.option("--idle-timeout", type=float, default=None, help="Stop once the queue was empty for this many seconds")
+def worker(
+    queue: str,
+    name: str | None,
+    kinds: tuple[str, ...],
+    lease: float,
+    heartbeat: float,
+    poll: float,
+    retry_delay: float,
+    max_tasks: int | None,
+    idle_timeout: float | None,
+) -> None:
+    """Run the cellranger and SADIE tasks the pipeline submits to a job queue, start one per node"""
+    job_queue = JobQueue(queue)
+    ran = Worker(
+        job_queue,
+        name=name,
+        lease=lease,
+        heartbeat=heartbeat,
+        poll=poll,
+        retry_delay=retry_delay,
+        kinds=list(kinds) or None,
+    ).run(max_tasks=max_tasks, idle_timeout=idle_timeout)
+    click.echo(f"Ran {ran} tasks, the queue has {job_queue.counts()}")
+
+
+@g00x.group("benchmark")
+def benchmark_group() -> None:
+    """Generate synthetic trials and benchmark the pipeline on them"""
+    pass
+
+
+@benchmark_group.command("generate")
+@click.option(
+    "--out", "-o", type=click.Path(file_okay=False, dir_okay=True), required=True, help="Write the trial here"
+)
+@click.option("--scale", type=float, default=1.0, show_default=True, help="Multiple of the current trial size")
+@click.option("--cells-per-sample", type=int, default=100, show_default=True, help="Mean cells recovered per sample")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the synthetic trial")
+@click.option("--no-tables", is_flag=True, default=False, help="Don't write the vdj, cso and AIRR feather tables")
+def benchmark_generate(out: str, scale: float, cells_per_sample: int, seed: int, no_tables: bool) -> None:
+    """Write a synthetic G002 and G003 trial with Box trees, sequencing runs and cellranger outs"""
+    trial = SyntheticTrial(TrialScale(factor=scale, cells_per_sample=cells_per_sample), seed=seed)
+    try:
+        paths = trial.write(out, tables=not no_tables)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    for study, study_paths in paths.items():
+        click.echo(f"{study} flow: {study_paths.flow}")
+        click.echo(f"{study} sequencing: {study_paths.sequencing}")
+
+
+@benchmark_group.command("run")
+@click.option("--scale", type=float, multiple=True, default=[1.0], show_default=True, help="Trial sizes, repeatable")
+@click.option(
+    "--workdir",
+    type=click.Path(file_okay=False, dir_okay=True),
+    default=str(DEFAULT_WORKDIR),
+    show_default=True,
+    help="Where synthetic trials are written and reused from",
+)
+@click.option(
+    "--results",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True),
+    default=str(DEFAULT_RESULTS),
+    show_default=True,
+    help="JSON lines store the results are appended to",
+)
+@click.option("--repeat", type=int, default=3, show_default=True, help="Times each benchmark is run")
+@click.option("--benchmark", "-b", "benchmarks", multiple=True, type=click.Choice(list(BENCHMARKS)), help="Only these")
+@click.option("--seed", type=int, default=0, show_default=True, help="Seed of the synthetic trials")
+def benchmark_run(
+    scale: tuple[float, ...], workdir: str, results: str, repeat: int, benchmarks: tuple[str, ...], seed: int
+) -> None:
+    """Time the pipeline stages on synthetic trials, e.g. --scale 1 --scale 10 --scale 100"""
+    try:
+        summary = run_suite(
+            [TrialScale(factor=factor) for factor in scale],
+            workdir=workdir,
+            results=results,
+            benchmarks=list(benchmarks) or None,
+            repeat=repeat,
+            seed=seed,
+        )
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    columns = ["benchmark", "factor", "samples", "cells", "best", "median", "status"]
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        click.echo(summary[columns].to_string(index=False))
+    click.echo(f"Results appended to {results}")
+
+
+@benchmark_group.command("compare")
+@click.option(
+    "--results",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False),
+    default=str(DEFAULT_RESULTS),
+    show_default=True,
+    help="JSON lines store of benchmark results",
+)
+@click.option("--baseline", required=True, help="Commit to compare against")
+@click.option("--candidate", required=True, help="Commit compared")
+def benchmark_compare(results: str, baseline: str, candidate: str) -> None:
+    """Compare the median time of every benchmark on two commits"""
+    try:
+        comparison = compare(results, baseline, candidate)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    with pd.option_context("display.max_rows", None, "display.width", 200):
+        click.echo(comparison.to_string())
+
+
 @g00x.group("g002")
 @click.pass_context
 def g002(ctx: click.Context) -> None:
     """Run the G002 commands of G00x"""
-    pass
+    setup_study(ctx)
 
 
 @g00x.group("g003")
 @click.pass_context
 def g003(ctx: click.Context) -> None:
     """Run the G003 commands of G00x"""
-    pass
+    setup_study(ctx)
 
 
 @g002.group("box")
@@ -77,7 +252,30 @@ def validate(ctx: click.Context) -> None:
     default=None,
     help="The path to the celranger binary",
 )
-def pipeline(ctx: click.Context, cellranger_path: str | None) -> None:
+@click.option(
+    "--executor",
+    type=click.Choice(EXECUTORS),
+    envvar="G00X_CELLRANGER_EXECUTOR",
+    default="cellranger",
+    show_default=True,
+    help="Run cellranger, or simulate it to exercise the pipeline without cellranger, references or FASTQs",
+)
+@click.option(
+    "--cost-model",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON cost model of the simulated cellranger calls, see g00x.sequencing.executors.CostModel",
+)
+@click.option(
+    "--queue",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="G00X_QUEUE",
+    default=None,
+    help="SQLite job queue on a shared filesystem to submit cellranger and SADIE tasks to, run by `g00x worker`",
+)
+def pipeline(
+    ctx: click.Context, cellranger_path: str | None, executor: str, cost_model: str | None, queue: str | None
+) -> None:
     """Run the 10x pipeline including the SADIE AIRR output
 
     Parameters
@@ -85,10 +283,18 @@ def pipeline(ctx: click.Context, cellranger_path: str | None) -> None:
     cellranger_path : str | None
         Optionally describe where the cellranger binary is located. If not provided, it will be searched for in the path.
         If using Jordan's AMI, it is in /usr/local/bin/cellranger
+    executor : str
+        cellranger, or simulate to stand in for it
+    cost_model : str | None
+        How long simulated cellranger calls take
+    queue : str | None
+        Job queue the tasks are submitted to instead of run here, workers run the calls with the executor
     """
     data: Data = ctx.obj["data"]
     if cellranger_path:
         data.set_cellranger_path(cellranger_path)
+    ctx.obj["executor"] = get_executor(executor, cost_model, queue=queue)
+    ctx.obj["queue"] = JobQueue(queue) if queue else None
 
 
 @g003.group("pipeline")
@@ -99,7 +305,30 @@ def pipeline(ctx: click.Context, cellranger_path: str | None) -> None:
     default=None,
     help="The path to the celranger binary",
 )
-def g003_pipeline(ctx: click.Context, cellranger_path: str | None) -> None:
+@click.option(
+    "--executor",
+    type=click.Choice(EXECUTORS),
+    envvar="G00X_CELLRANGER_EXECUTOR",
+    default="cellranger",
+    show_default=True,
+    help="Run cellranger, or simulate it to exercise the pipeline without cellranger, references or FASTQs",
+)
+@click.option(
+    "--cost-model",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    help="JSON cost model of the simulated cellranger calls, see g00x.sequencing.executors.CostModel",
+)
+@click.option(
+    "--queue",
+    type=click.Path(dir_okay=False, writable=True),
+    envvar="G00X_QUEUE",
+    default=None,
+    help="SQLite job queue on a shared filesystem to submit cellranger and SADIE tasks to, run by `g00x worker`",
+)
+def g003_pipeline(
+    ctx: click.Context, cellranger_path: str | None, executor: str, cost_model: str | None, queue: str | None
+) -> None:
     """Run the 10x pipeline including the SADIE AIRR output
 
     Parameters
@@ -107,10 +336,18 @@ def g003_pipeline(ctx: click.Context, cellranger_path: str | None) -> None:
     cellranger_path : str | None
         Optionally describe where the cellranger binary is located. If not provided, it will be searched for in the path.
         If using Jordan's AMI, it is in /usr/local/bin/cellranger
+    executor : str
+        cellranger, or simulate to stand in for it
+    cost_model : str | None
+        How long simulated cellranger calls take
+    queue : str | None
+        Job queue the tasks are submitted to instead of run here, workers run the calls with the executor
     """
     data: Data = ctx.obj["data"]
     if cellranger_path:
         data.set_cellranger_path(cellranger_path)
+    ctx.obj["executor"] = get_executor(executor, cost_model, queue=queue)
+    ctx.obj["queue"] = JobQueue(queue) if queue else None
 
 
 @g002.group("analysis")
@@ -391,12 +628,50 @@ def box_status(ctx: click.Context, mnt: str) -> None:
 #####################
 # Validate Commands
 #####################
+def echo_validation_report(ctx: click.Context, validation_report: ValidationReport, report: str | None) -> None:
+    """Print the validation report, write it if asked and exit with an error if anything failed"""
+    if report:
+        json_path, text_path = validation_report.write(report)
+        click.echo(f"Writing to {json_path} and {text_path}")
+    if not validation_report.passed:
+        click.echo(validation_report.to_text(), err=True)
+        ctx.exit(1)
+    click.echo(
+        f"Schema validation passed \u2713 ({validation_report.files_checked} files, "
+        f"{validation_report.files_revalidated} revalidated)"
+    )
+
+
 @validate.command("flow")
 @click.pass_context
 @click.argument("folder", type=click.Path(exists=True), required=True, default=".")
 @click.option("--print_scheme", "-p", is_flag=True, default=False, help="Print scheme to stdout")
+@click.option(
+    "--report",
+    "-r",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write every validation error to REPORT.json and REPORT.txt",
+)
+@click.option(
+    "--snapshot",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Validation snapshot so only added or changed files are revalidated, defaults to ~/.cache/g00x/validation",
+)
+@click.option("--no-snapshot", is_flag=True, default=False, help="Revalidate the whole tree without a snapshot")
+@click.option("--workers", "-w", type=int, default=1, help="Number of workers to validate with")
 @click.help_option("--help", "-h", is_flag=True, help="Show this message and exit.")
-def validate_flow(ctx: click.Context, folder: Path, print_scheme: bool) -> None:
+@telemetry.command
+def validate_flow(
+    ctx: click.Context,
+    folder: Path,
+    print_scheme: bool,
+    report: str | None,
+    snapshot: str | None,
+    no_snapshot: bool,
+    workers: int,
+) -> None:
     """
     Validate the flow data from NIHBox
 
@@ -409,17 +684,47 @@ def validate_flow(ctx: click.Context, folder: Path, print_scheme: bool) -> None:
         print(validate_g00x)
         return
 
+    # collect every naming error in one pass before parsing
+    snapshot_path = None if no_snapshot else Path(snapshot) if snapshot else default_snapshot_path(folder)
+    validation = collect_g00x_box(Path(folder), snapshot_path, workers, capture=True)
+    echo_validation_report(ctx, validation.report, report)  # type: ignore
+
     data = ctx.obj["data"]
     # in validation, we will just run the parse flow data but just dump to the ether of the space-time contiuum
-    parse_flow_data(data, folder)
+    # it reuses the validation above rather than walking the tree again
+    parse_flow_data(data, folder, validation=validation)
 
 
 @g003_validate.command("flow")
 @click.pass_context
 @click.argument("folder", type=click.Path(exists=True), required=True, default=".")
 @click.option("--print_scheme", "-p", is_flag=True, default=False, help="Print scheme to stdout")
+@click.option(
+    "--report",
+    "-r",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Write every validation error to REPORT.json and REPORT.txt",
+)
+@click.option(
+    "--snapshot",
+    type=click.Path(dir_okay=False, writable=True),
+    default=None,
+    help="Validation snapshot so only added or changed files are revalidated, defaults to ~/.cache/g00x/validation",
+)
+@click.option("--no-snapshot", is_flag=True, default=False, help="Revalidate the whole tree without a snapshot")
+@click.option("--workers", "-w", type=int, default=1, help="Number of workers to validate with")
 @click.help_option("--help", "-h", is_flag=True, help="Show this message and exit.")
-def g003_validate_flow(ctx: click.Context, folder: Path, print_scheme: bool) -> None:
+@telemetry.command
+def g003_validate_flow(
+    ctx: click.Context,
+    folder: Path,
+    print_scheme: bool,
+    report: str | None,
+    snapshot: str | None,
+    no_snapshot: bool,
+    workers: int,
+) -> None:
     """
     Validate the G003 flow data
 
@@ -427,9 +732,8 @@ def g003_validate_flow(ctx: click.Context, folder: Path, print_scheme: bool) ->
         g00x validate flow /path/to/flow/G003
 
     """
-    data = ctx.obj["data"]
-    # in validation, we will just run the parse flow data but just dump to the ether of the space-time contiuum
-    validate_g003_sorting(folder)
+    snapshot_path = None if no_snapshot else Path(snapshot) if snapshot else default_snapshot_path(folder)
+    echo_validation_report(ctx, report_g003_sorting(Path(folder), snapshot_path, workers), report)
 
 
 @validate.command("merge")
@@ -456,6 +760,7 @@ def g003_validate_flow(ctx: click.Context, folder: Path, print_scheme: bool) ->
     default="merged_output",
     help="The output the merged flow and sequencing data",
 )
+@telemetry.command
 def merge(ctx: click.Context, flow_path: Path, sequencing_path: Path, out: Path) -> None:
     """Merge the sequencing and flow data into a single dataframe
 
@@ -463,10 +768,13 @@ def merge(ctx: click.Context, flow_path: Path, sequencing_path: Path, out: Path)
         g00x sequencing --flow-file output/flow_output.feather -s /path/to/sequencing
 
     """
+    from g00x.sequencing.merge import merge_flow_and_sequencing
+
     data = ctx.obj["data"]
 
     # Merge but throw to space time
     df = merge_flow_and_sequencing(data, flow_path, sequencing_path)
+    telemetry.annotate(task=str(sequencing_path), rows_out=len(df))
     click.echo("Merged flow and sequencing data")
     click.echo(f"Writting to {out}.feather/.csv.gz")
     df.to_csv(str(out) + ".csv")
@@ -497,6 +805,7 @@ def merge(ctx: click.Context, flow_path: Path, sequencing_path: Path, out: Path)
     default=".",
     help="The output directory for the merged sequencing manifest",
 )
+@telemetry.command
 def g003_merge(
     ctx: click.Context,
     sequencing_path: Path,
@@ -536,6 +845,7 @@ def g003_merge(
     required=True,
     default=".",
 )
+@telemetry.command
 def parse_flow(ctx: click.Context, out: Path, folder: Path) -> None:
     """Parse the flow into a flow dataframe
 
@@ -550,6 +860,7 @@ def parse_flow(ctx: click.Context, out: Path, folder: Path) -> None:
     # get the flow dataframe back
     data = ctx.obj["data"]
     flow_data = parse_flow_data(data, folder)
+    telemetry.annotate(task=str(folder), rows_out=len(flow_data))
     out = Path(out)
     output_feather = Path(out.parent / (out.stem + ".feather"))
     output_csv = Path(out.parent / (out.stem + ".csv"))
@@ -590,6 +901,7 @@ def parse_flow(ctx: click.Context, out: Path, folder: Path) -> None:
     show_default=True,
     help="Overwrite the demultiplex and run again",
 )
+@telemetry.command
 def demultiplex(
     ctx: click.Context,
     out: Path,
@@ -610,10 +922,14 @@ def demultiplex(
     sequencing_path : Path
         The path to the sequencing data. Needs to be passed if no merged dataframe
     """
+    from g00x.sequencing.merge import merge_flow_and_sequencing
+    from g00x.sequencing.tenX import run_demultiplex
+
     data = ctx.obj["data"]
     click.echo(f"Merging data with flow path {flow_path} and sequencing path {sequencing_path}")
     merged_dataframe: pd.DataFrame = merge_flow_and_sequencing(data, flow_path, sequencing_path)  # type: ignore
-    run_demultiplex(data, merged_dataframe, out, overwrite)
+    telemetry.annotate(task=str(sequencing_path), rows_in=len(merged_dataframe))
+    run_demultiplex(data, merged_dataframe, out, overwrite, executor=ctx.obj["executor"])
 
 
 @g003_pipeline.command("flow")
@@ -638,6 +954,7 @@ def demultiplex(
     required=True,
     default=".",
 )
+@telemetry.command
 def g003_parse_flow(ctx: click.Context, out: Path, flow_name: Path, folder: Path) -> None:
     """Parse the flow sorts into a flow dataframe
 
@@ -652,6 +969,8 @@ def g003_parse_flow(ctx: click.Context, out: Path, flow_name: Path, folder: Path
 
     """
     # get the flow dataframe back
+    from g00x.tools.path import pathing
+
     data = ctx.obj["data"]
     # legacy code
     ptid2pubid = {}  # data.get_g003_pubids_lookup()
@@ -667,11 +986,12 @@ def g003_parse_flow(ctx: click.Context, out: Path, flow_name: Path, folder: Path
     output_unmerged_feather = (out / (flow_name + "-unmerged")).with_suffix(".feather")
     output_unmerged_csv = (out / (flow_name + "-unmerged")).with_suffix(".csv")
 
-    validation = validate_g003_sorting(folder)
+    validation = validate_g003_sorting(folder, capture=True)
 
     flow_df = g003_flow.pull_flow_from_validation(
         validation=validation, ptid2pubid=ptid2pubid, ptid_prefix2group=ptid_prefix2group, visit_id2week=visit_id2week
     )
+    telemetry.annotate(task=str(folder), rows_out=len(flow_df))
     click.echo(f"Writing to {output_feather}")
     flow_df.to_feather(output_feather)
     click.echo(f"Writing to {output_csv}")
@@ -723,6 +1043,7 @@ def g003_parse_flow(ctx: click.Context, out: Path, flow_name: Path, folder: Path
     help="Demultiplex only this run. If not provided, all runs will be demultiplexed",
     multiple=False,
 )
+@telemetry.command
 def g003_demultiplex(
     ctx: click.Context,
     demultiplex_output: str,
@@ -751,6 +1072,9 @@ def g003_demultiplex(
 
     >>> g00x g003 pipeline demultiplex -s ./g003_bucket/g003/g003/sequencing/G003/ --run run0001 --run --run0003
     """
+    from g00x.sequencing.g003_tenX import g003_run_demultiplex
+    from g00x.tools.path import pathing, replace_home_with_tilde_columns
+
     data = ctx.obj["data"]
     out = pathing(out)
     if not out.exists():
@@ -761,9 +1085,12 @@ def g003_demultiplex(
         merged_dataframe = merged_dataframe[merged_dataframe["run_dir_path"].str.endswith(run)]
         demultiplex_output = run + "/" + demultiplex_output
 
-    demultiplexed_dataframe = g003_run_demultiplex(data, merged_dataframe, out, overwrite)
+    demultiplexed_dataframe = g003_run_demultiplex(data, merged_dataframe, out, overwrite, executor=ctx.obj["executor"])
+    telemetry.annotate(
+        task=run or str(sequencing_path), rows_in=len(merged_dataframe), rows_out=len(demultiplexed_dataframe)
+    )
 
-    demultiplexed_dataframe = demultiplexed_dataframe.applymap(pd_replace_home_with_tilde)
+    demultiplexed_dataframe = replace_home_with_tilde_columns(demultiplexed_dataframe)
 
     demultiplexed_dataframe.to_csv(out / f"{demultiplex_output}.csv")
     demultiplexed_dataframe.to_feather(out / f"{demultiplex_output}.feather")
@@ -792,6 +1119,7 @@ def g003_demultiplex(
     show_default=True,
     help="Overwrite the vdj files and run again",
 )
+@telemetry.command
 def vdj(
     ctx: click.Context,
     out: Path,
@@ -810,10 +1138,13 @@ def vdj(
     demultiplex_dataframe_path : Path
         The demultiplexed dataframe from the demultiplexed pipeline. If not provided, the flow and sequencing paths must be provided
     """
+    from g00x.sequencing.tenX import run_vdj
+
     data = ctx.obj["data"]
     demultiplex_dataframe = pd.read_feather(Path(demultiplex_dataframe_path))
     click.echo("Running VDJ pipeline")
-    run_vdj(data, demultiplex_dataframe, out, overwrite)
+    telemetry.annotate(task=str(demultiplex_dataframe_path), rows_in=len(demultiplex_dataframe))
+    run_vdj(data, demultiplex_dataframe, out, overwrite, executor=ctx.obj["executor"])
 
 
 @g003_pipeline.command("vdj")
@@ -847,6 +1178,7 @@ def vdj(
     show_default=True,
     help="Overwrite the vdj files and run again",
 )
+@telemetry.command
 def g003_vdj(
     ctx: click.Context,
     out: Path,
@@ -866,17 +1198,27 @@ def g003_vdj(
     demultiplex_dataframe_path : Path
         The demultiplexed dataframe from the demultiplexed pipeline. If not provided, the flow and sequencing paths must be provided
     """
+    from g00x.sequencing.g003_tenX import g003_run_vdj
+    from g00x.tools.path import (
+        expand_path_columns,
+        pathing,
+        replace_home_with_tilde_columns,
+    )
+
     data = ctx.obj["data"]
     out = pathing(out)
     if not out.exists():
         out.mkdir(out)
 
     demultiplex_dataframe = pd.read_feather(Path(demultiplex_dataframe_path))
-    demultiplex_dataframe = demultiplex_dataframe.applymap(pd_expand_path)
+    demultiplex_dataframe = expand_path_columns(demultiplex_dataframe)
 
     click.echo(f"Running VDJ pipeline in {out}")
-    demultiplexed_dataframe = g003_run_vdj(data, demultiplex_dataframe, out, overwrite)
-    demultiplexed_dataframe = demultiplexed_dataframe.applymap(pd_replace_home_with_tilde)
+    demultiplexed_dataframe = g003_run_vdj(data, demultiplex_dataframe, out, overwrite, executor=ctx.obj["executor"])
+    telemetry.annotate(
+        task=str(demultiplex_dataframe_path), rows_in=len(demultiplex_dataframe), rows_out=len(demultiplexed_dataframe)
+    )
+    demultiplexed_dataframe = replace_home_with_tilde_columns(demultiplexed_dataframe)
 
     demultiplexed_dataframe.to_csv(out / f"{vdj_frame_output}.csv")
     demultiplexed_dataframe.to_feather(out / f"{vdj_frame_output}.feather")
@@ -905,6 +1247,7 @@ def g003_vdj(
     show_default=True,
     help="Overwrite the cso files and run again",
 )
+@telemetry.command
 def cso(
     ctx: click.Context,
     out: Path,
@@ -925,10 +1268,13 @@ def cso(
     overwrite : bool
         Overwrite the cso files and run again
     """
+    from g00x.sequencing.tenX import run_cso
+
     data = ctx.obj["data"]
     click.echo("Reading Demultiplexed Dataframe")
     demultiplex_dataframe = pd.read_feather(demultiplex_dataframe_path)
-    run_cso(data, demultiplex_dataframe, out, overwrite)
+    telemetry.annotate(task=str(demultiplex_dataframe_path), rows_in=len(demultiplex_dataframe))
+    run_cso(data, demultiplex_dataframe, out, overwrite, executor=ctx.obj["executor"])
 
 
 @g003_pipeline.command("cso")
@@ -969,6 +1315,7 @@ def cso(
     show_default=True,
     help="Overwrite the cso files and run again",
 )
+@telemetry.command
 def g003_cso(
     ctx: click.Context,
     demultiplex_dataframe_path: Path,
@@ -991,6 +1338,13 @@ def g003_cso(
     overwrite : bool
         Overwrite the cso files and run again
     """
+    from g00x.sequencing.g003_tenX import g003_run_cso
+    from g00x.tools.path import (
+        expand_path_columns,
+        pathing,
+        replace_home_with_tilde_columns,
+    )
+
     data = ctx.obj["data"]
     out = pathing(out)
     if not out.exists():
@@ -998,10 +1352,15 @@ def g003_cso(
 
     click.echo("Reading Demultiplexed Dataframe")
     demultiplex_dataframe = pd.read_feather(demultiplex_dataframe_path)
-    demultiplex_dataframe = demultiplex_dataframe.applymap(pd_expand_path)
+    demultiplex_dataframe = expand_path_columns(demultiplex_dataframe)
 
-    demultiplexed_dataframe = g003_run_cso(data, demultiplex_dataframe, out, genome_reference, overwrite)
-    demultiplexed_dataframe = demultiplexed_dataframe.applymap(pd_replace_home_with_tilde)
+    demultiplexed_dataframe = g003_run_cso(
+        data, demultiplex_dataframe, out, genome_reference, overwrite, executor=ctx.obj["executor"]
+    )
+    telemetry.annotate(
+        task=str(demultiplex_dataframe_path), rows_in=len(demultiplex_dataframe), rows_out=len(demultiplexed_dataframe)
+    )
+    demultiplexed_dataframe = replace_home_with_tilde_columns(demultiplexed_dataframe)
 
     demultiplexed_dataframe.to_csv(out / f"{cso_frame_output}.csv")
     demultiplexed_dataframe.to_feather(out / f"{cso_frame_output}.feather")
@@ -1056,6 +1415,7 @@ def g003_cso(
     show_default=True,
     help="Overwrite the airr files and run again",
 )
+@telemetry.command
 def airr(
     ctx: click.Context,
     vdj_out: Path,
@@ -1080,11 +1440,14 @@ def airr(
     out : Path
         The output path for the combined airr dataframe
     """
+    from g00x.sequencing.airr import run_airr
+
     data = ctx.obj["data"]
     click.echo("Reading in vdj and cso dataframes")
     vdj_dataframe = pd.read_feather(vdj_out)
     cso_dataframe = pd.read_feather(cso_out)
     print(f"Running AIRR pipeline {cluster_n} {cluster_heavy_only}")
+    telemetry.annotate(task=str(vdj_out), rows_in=len(vdj_dataframe) + len(cso_dataframe))
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=FutureWarning)
         warnings.simplefilter("ignore", category=PerformanceWarning)
@@ -1097,6 +1460,7 @@ def airr(
             skip_mutation,
             cluster_n=cluster_n,
             cluster_heavy_only=cluster_heavy_only,
+            queue=ctx.obj.get("queue"),
         )
 
 
@@ -1144,6 +1508,7 @@ def airr(
     show_default=True,
     help="Overwrite the airr files and run again",
 )
+@telemetry.command
 def g003_airr(
     ctx: click.Context,
     vdj_out: Path,
@@ -1167,6 +1532,13 @@ def g003_airr(
     out : Path
         The output path for the combined airr dataframe
     """
+    from g00x.sequencing.g003_airr import g003_run_airr
+    from g00x.tools.path import (
+        expand_path_columns,
+        pathing,
+        replace_home_with_tilde_columns,
+    )
+
     data = ctx.obj["data"]
     out = pathing(out)
     if not out.exists():
@@ -1175,13 +1547,16 @@ def g003_airr(
         click.echo(f"{out / f'{airr_frame_output}.feather'} exists. Skipping.")
         return
     click.echo("Reading in vdj and cso dataframes")
-    vdj_dataframe = pd.read_feather(vdj_out).applymap(pd_expand_path)
-    cso_dataframe = pd.read_feather(cso_out).applymap(pd_expand_path)
+    vdj_dataframe = expand_path_columns(pd.read_feather(vdj_out))
+    cso_dataframe = expand_path_columns(pd.read_feather(cso_out))
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", category=FutureWarning)
         warnings.simplefilter("ignore", category=PerformanceWarning)
         combined_airr = g003_run_airr(data, vdj_dataframe, cso_dataframe, out, overwrite, skip_mutation)
-        combined_airr = combined_airr.applymap(pd_replace_home_with_tilde)
+        telemetry.annotate(
+            task=str(vdj_out), rows_in=len(vdj_dataframe) + len(cso_dataframe), rows_out=len(combined_airr)
+        )
+        combined_airr = replace_home_with_tilde_columns(combined_airr)
         combined_airr.to_csv(out / f"{airr_frame_output}.csv")
         combined_airr.to_feather(out / f"{airr_frame_output}.feather")
 
@@ -1214,6 +1589,7 @@ def g003_airr(
     type=click.Path(file_okay=True, dir_okay=False, writable=True),
     help="The output path to seq",
 )
+@telemetry.command
 def g003_merge_flow_and_airr(
     ctx: click.Context, out: Path, name: str, flow_path: Path, seq_manifest_path: Path
 ) -> None:
@@ -1234,6 +1610,8 @@ def g003_merge_flow_and_airr(
     # data = ctx.obj["g003_data"]
 
     # Input Paths
+    from g00x.tools.path import pathing
+
     out = pathing(out)
     flow_path = pathing(flow_path)
     seq_manifest_path = pathing(seq_manifest_path)
@@ -1263,6 +1641,7 @@ def g003_merge_flow_and_airr(
         right_on=["ptid", "timepoint", "sorted_date", "pool_number"],
         how="outer",
     )
+    telemetry.annotate(rows_in=len(flow_df) + len(seq_manifest_df), rows_out=len(flow_manifest))
     # Output Paths
     output_feather = (out / name).with_suffix(".feather")
     output_csv = (out / name).with_suffix(".csv")
@@ -1304,6 +1683,7 @@ def g003_merge_flow_and_airr(
     show_default=True,
     help="Overwrite the demultiplex and run again",
 )
+@telemetry.command
 def run_e2e(
     ctx: click.Context,
     flow_path: Path,
@@ -1326,9 +1706,12 @@ def run_e2e(
     overwrite : bool
         even if output files exist, overwrite them anyway
     """
+    from g00x.tools.path import cd, pathing
+
     data = ctx.obj["data"]
     flow_path = pathing(flow_path)
     sequencing_path = pathing(sequencing_path)
+    telemetry.annotate(task=str(sequencing_path))
 
     # Pop into output directory
     with cd(out):
@@ -1379,6 +1762,8 @@ def count(ctx: click.Context, flow_path: Path, output: Path) -> None:
     flow_path : Path
         The path to the flow data. e.g. flow output from the pipeline flow command
     """
+    from g00x.analysis.flow import count_current_samples
+
     data = ctx.obj["data"]
     click.echo(f"Counting samples in {flow_path}")
     flow_data = pd.read_feather(flow_path)
@@ -1386,6 +1771,13 @@ def count(ctx: click.Context, flow_path: Path, output: Path) -> None:
     click.echo(f"Counted samples written to {output}.png")
 
 
+def get_partition_store(output: Path, partition_cache: str | None, no_partition_cache: bool) -> PartitionStore | None:
+    """The report partition store for an output, or None to recompute everything"""
+    if no_partition_cache:
+        return None
+    return PartitionStore(Path(partition_cache) if partition_cache else default_partition_dir(output))
+
+
 @analysis.command("report")
 @click.pass_context
 @click.option(
@@ -1411,15 +1803,27 @@ def count(ctx: click.Context, flow_path: Path, output: Path) -> None:
     default=None,
     help="The path to the flow dataframe. From the flow pipeline. Give feather",
 )
+@click.option(
+    "--partition-cache",
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    default=None,
+    help="Saved (ptid, visit_id) partitions so only changed ones are recomputed, defaults to ~/.cache/g00x/report",
+)
+@click.option("--no-partition-cache", is_flag=True, default=False, help="Recompute every partition without a cache")
+@telemetry.command
 def generate_report(
     ctx: click.Context,
     output: Path,
     sequencing_dataframe_path: Path,
     flow_dataframe_path: Path,
+    partition_cache: str | None,
+    no_partition_cache: bool,
 ) -> None:
     """
     Generate a report of the flow and sequencing data. These will most likely be used to plot everything else
     """
+    from g00x.analysis.report import combine_seq_and_flow
+
     click.echo("Generating flow and sequencing report")
     data = ctx.obj["data"]
     sequencing_dataframe = pd.read_feather(sequencing_dataframe_path)
@@ -1435,7 +1839,11 @@ def generate_report(
         seq_and_flow_df,
         seq_and_flow_df_long_name,
         seq_and_flow_df_long_form,
-    ) = combine_seq_and_flow(data, sequencing_dataframe, flow_dataframe)
+    ) = combine_seq_and_flow(
+        data, sequencing_dataframe, flow_dataframe, get_partition_store(output, partition_cache, no_partition_cache)
+    )
+
+    telemetry.annotate(rows_in=len(sequencing_dataframe) + len(flow_dataframe), rows_out=len(seq_and_flow_df_long_form))
 
     # compact name pivot
     seq_and_flow_df.to_feather(str(output) + ".feather")
@@ -1485,16 +1893,33 @@ def generate_report(
     default=None,
     help="The path to the flow dataframe. From the flow pipeline. Give feather",
 )
+@click.option(
+    "--partition-cache",
+    type=click.Path(file_okay=False, dir_okay=True, writable=True),
+    default=None,
+    help="Saved (ptid, visit_id) partitions so only changed ones are recomputed, defaults to ~/.cache/g00x/report",
+)
+@click.option("--no-partition-cache", is_flag=True, default=False, help="Recompute every partition without a cache")
+@telemetry.command
 def g003_generate_report(
     ctx: click.Context,
     out: Path,
     report_output: Path,
     sequencing_dataframe_path: Path,
     flow_dataframe_path: Path,
+    partition_cache: str | None,
+    no_partition_cache: bool,
 ) -> None:
     """
     Generate a report of the flow and sequencing data. These will most likely be used to plot everything else
     """
+    from g00x.analysis.g003_report import g003_combine_seq_and_flow
+    from g00x.tools.path import (
+        expand_path_columns,
+        pathing,
+        replace_home_with_tilde_columns,
+    )
+
     click.echo("Generating flow and sequencing reports")
     data = ctx.obj["data"]
     out = pathing(out)
@@ -1505,7 +1930,7 @@ def g003_generate_report(
     flow_dataframe_path = pathing(flow_dataframe_path)
 
     sequencing_dataframe = pd.read_feather(sequencing_dataframe_path)
-    sequencing_dataframe = sequencing_dataframe.applymap(pd_expand_path)
+    sequencing_dataframe = expand_path_columns(sequencing_dataframe)
     sequencing_dataframe["sorted_date"] = sequencing_dataframe["sorted_date"].astype(str)
 
     # sequencing_dataframe["run_date"] = sequencing_dataframe["run_date"].astype(str)
@@ -1525,11 +1950,19 @@ def g003_generate_report(
         seq_and_flow_df_long_name,
         seq_and_flow_df_long_form,
         # seq_and_flow_df_long_calc,
-    ) = g003_combine_seq_and_flow(data, sequencing_dataframe, flow_dataframe)
-    seq_and_flow_df = seq_and_flow_df.applymap(pd_replace_home_with_tilde)
-    seq_and_flow_df_long_name = seq_and_flow_df_long_name.applymap(pd_replace_home_with_tilde)
-    seq_and_flow_df_long_form = seq_and_flow_df_long_form.applymap(pd_replace_home_with_tilde)
-    # seq_and_flow_df_long_calc = seq_and_flow_df_long_calc.applymap(pd_replace_home_with_tilde)
+    ) = g003_combine_seq_and_flow(
+        data,
+        sequencing_dataframe,
+        flow_dataframe,
+        get_partition_store(out / str(report_output), partition_cache, no_partition_cache),
+    )
+    exists_cache: dict[str, bool] = {}
+    seq_and_flow_df = replace_home_with_tilde_columns(seq_and_flow_df, exists_cache=exists_cache)
+    seq_and_flow_df_long_name = replace_home_with_tilde_columns(seq_and_flow_df_long_name, exists_cache=exists_cache)
+    seq_and_flow_df_long_form = replace_home_with_tilde_columns(seq_and_flow_df_long_form, exists_cache=exists_cache)
+    # seq_and_flow_df_long_calc = replace_home_with_tilde_columns(seq_and_flow_df_long_calc)
+
+    telemetry.annotate(rows_in=len(sequencing_dataframe) + len(flow_dataframe), rows_out=len(seq_and_flow_df_long_form))
 
     # compact name pivot
     seq_and_flow_df.to_feather(out / f"{report_output}.feather")
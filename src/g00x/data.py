@@ -3,10 +3,14 @@ import logging
 from dataclasses import dataclass
 from pathlib import Path
 from shutil import which
+from types import MappingProxyType
+from typing import Any, Mapping
 
 import pandas as pd
 from pydantic import BaseModel, validator
 
+from g00x.tools.registry import registry
+
 logger = logging.getLogger()
 
 
@@ -28,6 +32,24 @@ def find_bcl2fastq() -> str | None:
         raise FileNotFoundError("bcl2fastq not found in path. Please have bcl2fastq in path")
 
 
+def read_json(path: Path) -> Any:
+    return json.load(open(path, encoding="utf-8"))
+
+
+def read_g002_pubids_lookup(path: Path) -> dict[str, str]:
+    """From VISC, get the ptid mapped to pubids"""
+    # from visc
+    order_id = pd.read_excel(path)
+
+    # correct VISC by adding G002
+    # order_id["ptid"] = "G002" + order_id["ptid"].astype(str)
+    order_id["ptid"] = order_id["pubID"]
+
+    # turn into lookup map
+    lookup_ids = dict(zip(order_id["ptid"].to_list(), order_id["pubID"].to_list()))
+    return lookup_ids
+
+
 class DataPaths(BaseModel):
     data_base_path: Path = Path(__file__).parent / Path("data")
     g001_sequences: Path = data_base_path / Path("g001/mutational_analysis.feather")
@@ -37,6 +59,7 @@ class DataPaths(BaseModel):
     g003_pbmc_gates: Path = data_base_path / Path("pbmc_gates_g003.json")
     g002_frequency_measures: Path = data_base_path / Path("frequency_measures.json")
     g003_frequency_measures: Path = data_base_path / Path("frequency_measures_g003.json")
+    derived_measures: Path = data_base_path / Path("derived_measures.json")
     g002_pub_ids_path: Path = data_base_path / Path("g002_pubids.xlsx")
     # g003_pub_ids_path: Path = data_base_path / Path("g003/g003_pubids.xlsx")
     hto_gates: Path = data_base_path / Path("hto_gates.csv")
@@ -74,43 +97,67 @@ class Data:
 
     def get_g001_sequences(self) -> pd.DataFrame:
         """The  g001 sequnces that can be used compariatiely in this package"""
-        return (
-            pd.read_feather(self.data_paths.g001_sequences)
-            .query("Plate_Type_heavy=='Probe Specific'")
-            .reset_index(drop=True)
+        return registry.copy(
+            "g001_sequences",
+            self.data_paths.g001_sequences,
+            lambda p: pd.read_feather(p).query("Plate_Type_heavy=='Probe Specific'").reset_index(drop=True),
         )
 
     def get_g001_flow_and_seq(self) -> pd.DataFrame:
         "The g001 flow and sequence analysis that can be use compariteiely"
-        return pd.read_csv(self.data_paths.g001_flow_and_seq, index_col=0)
+        return registry.copy(
+            "g001_flow_and_seq", self.data_paths.g001_flow_and_seq, lambda p: pd.read_csv(p, index_col=0)
+        )
 
     def get_pbmc_gates(self) -> list[dict[str, str]]:
         """Get the gates for the PBMC sort for G002"""
-        return json.load(open(self.data_paths.g002_pbmc_gates))
+        return registry.copy("g002_pbmc_gates", self.data_paths.g002_pbmc_gates, read_json)
 
     def get_lfna_gates(self) -> list[dict[str, str]]:
         """Get the gates for the lfna sort for G002"""
-        return json.load(open(self.data_paths.g002_lfna_gates))
+        return registry.copy("g002_lfna_gates", self.data_paths.g002_lfna_gates, read_json)
 
     def get_pbmc_gates_g003(self) -> list[dict[str, str]]:
         """Get the gates for the PBMC sort for G003"""
-        return json.load(open(self.data_paths.g003_pbmc_gates))
+        return registry.copy("g003_pbmc_gates", self.data_paths.g003_pbmc_gates, read_json)
 
     def get_frequency_measures(self) -> list[dict[str, str]]:
         """The frequency measures that can be used in the flow package"""
-        return json.load(open(self.data_paths.g002_frequency_measures))
+        return registry.copy("g002_frequency_measures", self.data_paths.g002_frequency_measures, read_json)
 
     def get_frequency_measures_g003(self) -> list[dict[str, str]]:
         """The frequency measures that can be used in the flow package"""
-        return json.load(open(self.data_paths.g003_frequency_measures))
+        return registry.copy("g003_frequency_measures", self.data_paths.g003_frequency_measures, read_json)
+
+    def get_derived_measures(self) -> list[dict[str, str]]:
+        """Measures combined from other measures of the same sample, e.g. percent VRC01-class among IgG"""
+        return registry.copy("derived_measures", self.data_paths.derived_measures, read_json)
 
     def get_hto_gates(self) -> pd.DataFrame:
         """Get the HTO gates for the CSO part of the pipeline"""
-        return pd.read_csv(self.data_paths.hto_gates, index_col=0)
+        return registry.copy("hto_gates", self.data_paths.hto_gates, lambda p: pd.read_csv(p, index_col=0))
+
+    def get_hto_sequences(self) -> Mapping[str, str]:
+        """The read only hashtag to HTO sequence lookup, loaded once"""
+        return registry.load(
+            "hto_sequences",
+            self.data_paths.hto_gates,
+            lambda p: MappingProxyType(pd.read_csv(p, index_col=0)["seq"].to_dict()),
+        )
 
     def get_g003_hto_gates(self) -> pd.DataFrame:
         """Get the HTO gates for the G003 CSO part of the pipeline"""
-        return pd.read_csv(self.data_paths.g003_hto_gates).set_index("biolegend_name")
+        return registry.copy(
+            "g003_hto_gates", self.data_paths.g003_hto_gates, lambda p: pd.read_csv(p).set_index("biolegend_name")
+        )
+
+    def get_g003_hto_sequences(self) -> Mapping[str, str]:
+        """The read only G003 hto to HTO sequence lookup, loaded once"""
+        return registry.load(
+            "g003_hto_sequences",
+            self.data_paths.g003_hto_gates,
+            lambda p: MappingProxyType(pd.read_csv(p).set_index("biolegend_name")["seq"].to_dict()),
+        )
 
     def set_cellranger_path(self, path: str) -> None:
         """set path to cellranger if user specifies"""
@@ -155,16 +202,7 @@ class Data:
 
     def get_g002_pubids_lookup(self) -> dict[str, str]:
         """From VISC, get the ptid mapped to pubids"""
-        # from visc
-        order_id = pd.read_excel(self.data_paths.g002_pub_ids_path)
-
-        # correct VISC by adding G002
-        # order_id["ptid"] = "G002" + order_id["ptid"].astype(str)
-        order_id["ptid"] = order_id["pubID"]
-
-        # turn into lookup map
-        lookup_ids = dict(zip(order_id["ptid"].to_list(), order_id["pubID"].to_list()))
-        return lookup_ids
+        return registry.copy("g002_pubids_lookup", self.data_paths.g002_pub_ids_path, read_g002_pubids_lookup)
 
     # def get_g003_pubids_lookup(self) -> dict[str, str]:
     #     """From VISC, get the ptid mapped to pubids"""
@@ -181,19 +219,19 @@ class Data:
 
     def get_vh12_reference_airr_table(self) -> pd.DataFrame:
         """get the path to the reference airr table"""
-        return pd.read_feather(self.data_paths.vh12_reference_mabs_path)
+        return registry.copy("vh12_reference_mabs", self.data_paths.vh12_reference_mabs_path, pd.read_feather)
 
     def get_cotrell_focus(self) -> dict[str, list[str]]:
         """get the cotrell focus"""
-        return json.load(open(self.data_paths.cotrell_focus_path))
+        return registry.copy("cotrell_focus_path", self.data_paths.cotrell_focus_path, read_json)
 
     def get_personalized_vh12(self) -> pd.DataFrame:
         """get the personalized VH12"""
-        return pd.read_csv(self.data_paths.personalized_vh12)
+        return registry.copy("personalized_vh12", self.data_paths.personalized_vh12, pd.read_csv)
 
     def get_g003_personalized_vh12(self) -> pd.DataFrame:
         """get the personalized VH12"""
-        return pd.read_csv(self.data_paths.g003_personalized_vh12)
+        return registry.copy("g003_personalized_vh12", self.data_paths.g003_personalized_vh12, pd.read_csv)
 
     def get_long_name_sort_order(self) -> list[str]:
         return [
@@ -297,8 +335,8 @@ class Data:
 
     def get_g003_visit_id_2_week(self) -> dict[str, int]:
         """Get the visit id to week mapping"""
-        return json.load(open(self.data_paths.g003_visit_id_2_week, encoding="utf-8"))
+        return registry.copy("g003_visit_id_2_week", self.data_paths.g003_visit_id_2_week, read_json)
 
     def get_g003_ptid_prefix_2_group(self) -> dict[str, str]:
         """Get the ptid to group mapping"""
-        return json.load(open(self.data_paths.g003_ptid_prefix_2_group, encoding="utf-8"))
+        return registry.copy("g003_ptid_prefix_2_group", self.data_paths.g003_ptid_prefix_2_group, read_json)
@@ -1,7 +1,7 @@
 """ABV - always be validating"""
 import dataclasses
+import io
 import json
-from functools import cache
 from pathlib import Path
 from typing import Any
 
@@ -9,7 +9,8 @@ import numpy as np
 import pandas as pd
 
 from g00x.data import Data
-from g00x.validations.flow_validation import validate_g00x_box
+from g00x.tools.file_cache import file_cache
+from g00x.validations.flow_validation import ValidateG00X, validate_g00x_box
 
 # these are the unique indexable columns for each flow data file for a single Sorting experiment
 index_flow_cols: list[str] = [
@@ -145,15 +146,15 @@ def sum_up_file_subsets(sub_df: pd.DataFrame) -> pd.Series:
 
 def find_skip_rows(file: str | Path) -> int:
     """Find the number of rows to skip in a file until we get at longform data"""
-    for i, x in enumerate(open(file).readlines()):
+    for i, x in enumerate(io.StringIO(file_cache.read_text(file)).readlines()):
         if x.split(",")[0].lower() == "population":
             return i
     raise ValueError("No rows found that start with 'Population/population'")
 
 
-@cache
 def read_csv(file: Path | str, skiprows: int) -> pd.DataFrame:
-    return pd.read_csv(file, skiprows=skiprows)  # pyright: reportUnknownMemberType=false
+    """Read a population summary file through the file cache validation already filled"""
+    return file_cache.read_table(file, lambda f: pd.read_csv(f, skiprows=skiprows), "csv", skiprows)
 
 
 @dataclasses.dataclass
@@ -287,13 +288,15 @@ class SortPopulationQueries:
         return pd.concat(new_structure).reset_index(drop=True).astype({"file_path": str})
 
 
-def parse_flow_data(data: Data, folder: str | Path) -> pd.DataFrame:
+def parse_flow_data(data: Data, folder: str | Path, validation: ValidateG00X | None = None) -> pd.DataFrame:
     """Main parse function for flow data for g002
 
     Parameters
     ----------
     folder : str | Path
         The Box/G002 folder to parse
+    validation : ValidateG00X | None
+        A validation of the folder that captured its population summary files, the folder is validated if None
 
     Returns
     -------
@@ -304,7 +307,9 @@ def parse_flow_data(data: Data, folder: str | Path) -> pd.DataFrame:
         raise FileNotFoundError(f"Folder {folder} does not exist")
 
     # must revalidate the folder because it will have our folders parsed in a method
-    validation = validate_g00x_box(Path(folder))
+    # and have it keep the population summary files it found so we only read them once
+    if validation is None:
+        validation = validate_g00x_box(Path(folder), capture=True)
 
     # get all the clinical population sort files
     all_population_sort_files = validation.get_population_sort_files()
@@ -3,6 +3,7 @@ from typing import Any
 
 import pandas as pd
 
+from g00x.tools.file_cache import file_cache
 from g00x.validations.g003_flow_validation import ValidateG003
 
 
@@ -33,7 +34,10 @@ def pull_flow_from_validation(
 
     for model, file_path, root_folder in data_stats:
         # print(file_path)
-        data_stats_df = pd.read_excel(file_path) if file_path.suffix == ".xlsx" else pd.read_csv(file_path)
+        if file_path.suffix == ".xlsx":
+            data_stats_df = file_cache.read_table(file_path, pd.read_excel, "excel")
+        else:
+            data_stats_df = file_cache.read_table(file_path, pd.read_csv, "csv")
 
         home = "/" + "/".join(root_folder.parts[1:-5])  # type: ignore
         relative_file_path = file_path.relative_to(home)  # type: ignore
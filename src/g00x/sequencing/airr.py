@@ -1,4 +1,5 @@
 import csv
+import functools
 import gzip
 import logging
 import re
@@ -14,6 +15,7 @@ from sadie.cluster import Cluster
 from sadie.reference import Reference, References
 
 from g00x.data import Data
+from g00x.tools.job_queue import DONE, JobQueue, run_tasks
 
 logger = logging.getLogger("Airr")
 
@@ -417,6 +419,73 @@ def get_pairing(df: pd.DataFrame) -> pd.DataFrame:
     return paired
 
 
+@functools.lru_cache(maxsize=None)
+def get_airr_api() -> Airr:
+    """The SADIE annotator of this process, loading its references only on first call"""
+    return Airr("human", adaptable=True)
+
+
+def annotate_vdj_output(
+    airr_api: Airr | None, vdj_output: str | Path, overwrite: bool
+) -> tuple[Path, pd.DataFrame, Path, pd.DataFrame]:
+    """Annotate the filtered contigs of a vdj output with SADIE and pair them, reading them if that was done before
+
+    Parameters
+    ----------
+    airr_api : Airr | None
+        The SADIE annotator, the one of this process if None
+    vdj_output : str | Path
+        The cellranger vdj output
+    overwrite : bool
+        Annotate and pair again even if it was done before
+
+    Returns
+    -------
+    tuple[Path, pd.DataFrame, Path, pd.DataFrame]
+        Where the annotations are, the annotations, where the paired annotations are and the paired annotations
+    """
+    # lets use filtered even though it should not matter since our pairing algorighm essentially gets the same thing
+    contig_path = Path(str(vdj_output)) / Path("outs/filtered_contig.fasta")
+    # contig_path = Path(str(vdj_output)) / Path("outs/all_contig.fasta")
+    airr_out = Path(str(vdj_output)) / Path("outs/sadie_airr.feather")
+    paired_airr_out = Path(str(vdj_output)) / Path("outs/paired_sadie_airr.feather")
+    logging.info(f"VDJ path: {contig_path}")
+    if airr_out.exists() and not overwrite:
+        logger.info(f"{airr_out} exists\n")
+        airr_file = pd.read_feather(airr_out)
+    else:
+        if airr_out.exists():
+            logger.info(f"Overwriting {airr_out}\n")
+        airr_api = airr_api or get_airr_api()
+        airr_file = airr_api.run_fasta(contig_path)
+        airr_file.to_feather(airr_out)
+
+    if paired_airr_out.exists() and not overwrite:
+        logger.info(f"Skipping pairing because {paired_airr_out} exists\n")
+        paired_airr_file = pd.read_feather(paired_airr_out)
+    else:
+        if paired_airr_out.exists():
+            logger.info(f"pairing file {paired_airr_out} exists but overwrite was passed")
+        paired_airr_file = get_pairing(airr_file)
+        if paired_airr_file.empty:
+            paired_airr_file.reset_index().to_feather(paired_airr_out)
+        paired_airr_file.to_feather(paired_airr_out)
+    return airr_out, airr_file, paired_airr_out, paired_airr_file
+
+
+def run_sadie_airr_task(payload: dict[str, Any]) -> dict[str, Any]:
+    """Annotate and pair a vdj output on a worker, reusing its annotator across tasks"""
+    airr_out, airr_file, paired_airr_out, paired_airr_file = annotate_vdj_output(
+        None, payload["vdj_output"], payload["overwrite"]
+    )
+    return {
+        "sadie_airr_path": str(airr_out),
+        "paired_sadie_airr_path": str(paired_airr_out),
+        "contigs": len(airr_file),
+        "pairs": len(paired_airr_file),
+    }
+
+
 def run_airr(
     data: Data,
     vdj_dataframe: pd.DataFrame,
@@ -426,8 +495,12 @@ def run_airr(
     skip_mutation: bool,
     cluster_n: int = 5,
     cluster_heavy_only: bool = False,
+    queue: JobQueue | None = None,
 ) -> pd.DataFrame:
-    """Run AIRR on the vdj files and demultiplex them with the CSO files"""
+    """Run AIRR on the vdj files and demultiplex them with the CSO files
+
+    With a queue the vdj files are annotated by `g00x worker` processes pulling from it
+    """
     logger.info("Running AIRR")
     difference = vdj_dataframe.columns.symmetric_difference(cso_dataframe.columns)
     logger.info(f"Columns in vdj but not cso: {difference}")
@@ -458,43 +531,19 @@ def run_airr(
     logger.info("Removing LNFA from analysis")
     combined_df = combined_df.query("sample_type=='PBMC'").reset_index(drop=True)
 
-    airr_api = Airr("human", adaptable=True)
+    if queue is not None:
+        # annotate every vdj output on the workers, the loop below reads what they wrote
+        payloads = [{"vdj_output": str(g), "overwrite": overwrite} for g in combined_df["vdj_output"].unique()]
+        failed = [task for task in run_tasks(queue, "sadie_airr", payloads) if task.status != DONE]
+        if failed:
+            raise ValueError(f"SADIE AIRR failed on {[task.payload['vdj_output'] for task in failed]}")
+
+    airr_api = None if queue is not None else get_airr_api()
     complete_df = []
     for g, g_df in combined_df.groupby("vdj_output"):
-        # declare these files to see if they exist
-
-        # lets use filtered even though it should not matter since our pairing algorighm essentially gets the same thing
-        contig_path = Path(str(g)) / Path("outs/filtered_contig.fasta")
-        # contig_path = Path(str(g)) / Path("outs/all_contig.fasta")
-        airr_out = Path(str(g)) / Path("outs/sadie_airr.feather")
-        paired_airr_out = Path(str(g)) / Path("outs/paired_sadie_airr.feather")
-        logging.info(f"VDJ path: {contig_path}")
-        if airr_out.exists():
-            if overwrite:
-                logger.info(f"Overwriting {airr_out}\n")
-                airr_file = airr_api.run_fasta(contig_path)
-                airr_file.to_feather(airr_out)
-            else:
-                logger.info(f"{airr_out} exists\n")
-                airr_file = pd.read_feather(airr_out)
-
-        else:
-            airr_file = airr_api.run_fasta(contig_path)
-            airr_file.to_feather(airr_out)
-
-        if paired_airr_out.exists():
-            if overwrite:
-                logger.info(f"pairing file {paired_airr_out} exists but overwrite was passed")
-                paired_airr_file = get_pairing(airr_file)
-                paired_airr_file.to_feather(paired_airr_out)
-            else:
-                logger.info(f"Skipping pairing because {paired_airr_out} exists\n")
-                paired_airr_file = pd.read_feather(paired_airr_out)
-        else:
-            paired_airr_file = get_pairing(airr_file)
-            if paired_airr_file.empty:
-                paired_airr_file.reset_index().to_feather(paired_airr_out)
-            paired_airr_file.to_feather(paired_airr_out)
+        airr_out, airr_file, paired_airr_out, paired_airr_file = annotate_vdj_output(
+            airr_api, g, overwrite and queue is None
+        )
 
         # locate those in dataframe
         combined_df.loc[g_df.index, "sadie_airr_path"] = str(airr_out)
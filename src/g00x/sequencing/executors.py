@@ -0,0 +1,369 @@
+"""
+Executors the 10x pipeline runs its cellranger mkfastq, vdj and count calls through.
+
+The cellranger executor runs the real binary and is the default. The simulated executor checks the arguments the
+way cellranger would, waits as long as a cost model says the call takes and writes the outs the next stage reads,
+so scheduling, caching and resuming the pipeline can be exercised without cellranger, references or FASTQs.
+
+A stage submits all its calls before it waits for them. Both executors run a call as it is submitted, the queued
+executor puts it on a job queue instead for `g00x worker` processes on other nodes to run with either of them.
+"""
+import abc
+import gzip
+import json
+import logging
+import os
+import subprocess
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Sequence
+
+import numpy as np
+import pandas as pd
+
+from g00x.data import Data
+from g00x.tools.feature_matrix import unique_barcodes, write_feature_matrix
+from g00x.tools.job_queue import DONE, JobQueue, current_task
+
+logger = logging.getLogger("Executor")
+
+EXECUTORS = ["cellranger", "simulate"]
+
+# submitting a call can't hand out its exit code yet, wait turns what submit returned into one
+Submitted = Any
+
+# the flags every subcommand can't run without
+REQUIRED_FLAGS: dict[str, list[str]] = {
+    "mkfastq": ["--id", "--run", "--csv"],
+    "vdj": ["--id", "--sample", "--reference", "--fastqs"],
+    "count": ["--id", "--libraries", "--feature-ref", "--transcriptome"],
+}
+
+
+class CellrangerExecutor(abc.ABC):
+    """Runs a cellranger command in the current directory and returns its exit code"""
+
+    name = "base"
+    # submit runs the call to the end and returns its exit code
+    synchronous = True
+
+    @abc.abstractmethod
+    def program(self, data: Data) -> str:
+        """The cellranger binary commands are run with"""
+
+    @abc.abstractmethod
+    def transcriptome(self, data: Data, reference: str | Path | None = None) -> str:
+        """The transcriptome count is run against"""
+
+    @abc.abstractmethod
+    def run(self, command: Sequence[str | Path | None]) -> int:
+        """Run a command in the current directory and return its exit code"""
+
+    def submit(self, command: Sequence[str | Path | None], cwd: str | Path) -> Submitted:
+        """Start a command in cwd, by default running it to the end"""
+        current_dir = os.getcwd()
+        os.chdir(cwd)
+        try:
+            return self.run(command)
+        finally:
+            os.chdir(current_dir)
+
+    def wait(self, submitted: list[Submitted]) -> list[int]:
+        """The exit codes of the submitted commands once all of them finished"""
+        return list(submitted)
+
+
+class LocalCellranger(CellrangerExecutor):
+    """Runs the cellranger binary on this machine"""
+
+    name = "cellranger"
+
+    def program(self, data: Data) -> str:
+        return str(data.get_cellranger_path())
+
+    def transcriptome(self, data: Data, reference: str | Path | None = None) -> str:
+        return str(reference) if reference is not None else data.get_human_genome_ref()
+
+    def run(self, command: Sequence[str | Path | None]) -> int:
+        return subprocess.run([str(argument) for argument in command]).returncode
+
+
+@dataclass
+class CostModel:
+    """How long a simulated cellranger call takes
+
+    A call takes seconds + per_unit * units of its subcommand, e.g. mkfastq per sample in the sample sheet and
+    count per feature, times scale and a lognormal jitter. The defaults are about what the 10x runs take on a
+    48 core machine, so scale=1 is real time and the default scale turns hours into seconds.
+
+    Parameters
+    ----------
+    seconds : dict[str, float]
+        Fixed seconds of each subcommand
+    per_unit : dict[str, float]
+        Seconds per unit of work of each subcommand
+    scale : float
+        Multiplies every cost, 0 to not wait at all
+    jitter : float
+        Sigma of the lognormal noise on every cost
+    failure_rate : float
+        Fraction of calls that fail after they waited, without writing their outs
+    """
+
+    seconds: dict[str, float] = field(default_factory=lambda: {"mkfastq": 1800.0, "vdj": 3600.0, "count": 2400.0})
+    per_unit: dict[str, float] = field(default_factory=lambda: {"mkfastq": 60.0, "vdj": 0.0, "count": 120.0})
+    scale: float = 0.001
+    jitter: float = 0.1
+    failure_rate: float = 0.0
+
+    @classmethod
+    def from_json(cls, path: str | Path) -> "CostModel":
+        """Read a cost model, any field left out keeps its default"""
+        with open(path, encoding="utf-8") as f:
+            values = json.load(f)
+        model = cls()
+        for key, value in values.items():
+            if not hasattr(model, key):
+                raise ValueError(f"{key} is not a field of the cost model, choose from {list(model.__dict__)}")
+            if isinstance(value, dict):
+                getattr(model, key).update(value)
+            else:
+                setattr(model, key, value)
+        return model
+
+    def cost(self, subcommand: str, units: int, rng: np.random.Generator) -> float:
+        seconds = self.seconds.get(subcommand, 0.0) + self.per_unit.get(subcommand, 0.0) * units
+        return seconds * self.scale * float(rng.lognormal(0.0, self.jitter))
+
+
+class SimulatedCellranger(CellrangerExecutor):
+    """Stands in for cellranger, checking arguments, waiting per the cost model and writing minimal outs
+
+    Parameters
+    ----------
+    cost_model : CostModel | None
+        How long each call takes, by default the call takes a thousandth of the real time
+    seed : int
+        Seed of the jitter, failures and simulated counts
+    """
+
+    name = "simulate"
+
+    def __init__(self, cost_model: CostModel | None = None, seed: int = 0) -> None:
+        self.cost_model = cost_model or CostModel()
+        self.rng = np.random.default_rng(seed)
+        # every call made, for load tests to inspect
+        self.calls: list[dict[str, str | float | int]] = []
+
+    def program(self, data: Data) -> str:
+        return "cellranger"
+
+    def transcriptome(self, data: Data, reference: str | Path | None = None) -> str:
+        return str(reference or data.genome_reference or "refdata-gex-GRCh38-2020-A")
+
+    def run(self, command: Sequence[str | Path | None]) -> int:
+        arguments = [str(argument) for argument in command]
+        start = time.perf_counter()
+        try:
+            subcommand, flags = self.parse(arguments)
+            units = self.validate(subcommand, flags)
+        except (ValueError, OSError) as e:
+            logger.error(f"Simulated cellranger rejected {' '.join(arguments)}: {e}")
+            self.calls.append({"command": " ".join(arguments), "returncode": 1, "seconds": 0.0})
+            return 1
+        time.sleep(self.cost_model.cost(subcommand, units, self.rng))
+        returncode = 0
+        if self.rng.random() < self.cost_model.failure_rate:
+            logger.error(f"Simulated cellranger {subcommand} {flags['--id']} failed")
+            returncode = 1
+        else:
+            getattr(self, f"write_{subcommand}")(Path(flags["--id"]) / "outs", flags)
+        self.calls.append(
+            {
+                "command": " ".join(arguments),
+                "subcommand": subcommand,
+                "units": units,
+                "returncode": returncode,
+                "seconds": time.perf_counter() - start,
+            }
+        )
+        return returncode
+
+    @staticmethod
+    def parse(arguments: list[str]) -> tuple[str, dict[str, str]]:
+        """The subcommand and the --flag value and --flag=value pairs of a command"""
+        if len(arguments) < 2 or arguments[1] not in REQUIRED_FLAGS:
+            raise ValueError(f"subcommand must be one of {list(REQUIRED_FLAGS)}")
+        flags: dict[str, str] = {}
+        rest = iter(arguments[2:])
+        for argument in rest:
+            if not argument.startswith("--"):
+                raise ValueError(f"unexpected argument {argument}")
+            if "=" in argument:
+                flag, value = argument.split("=", 1)
+            else:
+                flag, value = argument, next(rest, "")
+            if not value:
+                raise ValueError(f"{flag} needs a value")
+            flags[flag] = value
+        return arguments[1], flags
+
+    @staticmethod
+    def validate(subcommand: str, flags: dict[str, str]) -> int:
+        """Check a call has what cellranger needs to start and return how many units of work it is"""
+        missing = [flag for flag in REQUIRED_FLAGS[subcommand] if flag not in flags]
+        if missing:
+            raise ValueError(f"{subcommand} is missing {missing}")
+        pipestance = Path(flags["--id"])
+        if pipestance.name != flags["--id"]:
+            raise ValueError(f"--id {flags['--id']} must be a name, not a path")
+        if (pipestance / "outs").exists():
+            raise ValueError(f"{pipestance} is a finished pipestance, remove it to run again")
+        if subcommand == "mkfastq":
+            if not Path(flags["--run"]).is_dir():
+                raise ValueError(f"--run {flags['--run']} is not a directory")
+            sample_sheet = pd.read_csv(flags["--csv"])
+            if not {"Lane", "Sample", "index"} <= set(sample_sheet.columns):
+                raise ValueError(f"--csv {flags['--csv']} needs the columns Lane, Sample and index")
+            return len(sample_sheet)
+        if subcommand == "vdj":
+            fastqs = Path(flags["--fastqs"])
+            if not any(fastqs.rglob(f"{flags['--sample']}_S*.fastq.gz")):
+                raise ValueError(f"no FASTQs of {flags['--sample']} in {fastqs}")
+            return 1
+        libraries = pd.read_csv(flags["--libraries"])
+        if not {"fastqs", "sample", "library_type"} <= set(libraries.columns):
+            raise ValueError(f"--libraries {flags['--libraries']} needs the columns fastqs, sample and library_type")
+        for library in libraries.itertuples():
+            if not any(Path(library.fastqs).rglob(f"{library.sample}_S*.fastq.gz")):
+                raise ValueError(f"no FASTQs of {library.sample} in {library.fastqs}")
+        features = pd.read_csv(flags["--feature-ref"])
+        if "id" not in features.columns or features.empty or features["id"].duplicated().any():
+            raise ValueError(f"--feature-ref {flags['--feature-ref']} needs unique feature ids")
+        return len(features)
+
+    def write_mkfastq(self, outs: Path, flags: dict[str, str]) -> None:
+        """An empty read pair per sample of the sample sheet in fastq_path"""
+        fastq_path = outs / "fastq_path"
+        fastq_path.mkdir(parents=True)
+        for number, sample in enumerate(pd.read_csv(flags["--csv"])["Sample"], start=1):
+            for read in ("R1", "R2"):
+                with gzip.open(fastq_path / f"{sample}_S{number}_L001_{read}_001.fastq.gz", "wt"):
+                    pass
+
+    def write_vdj(self, outs: Path, flags: dict[str, str]) -> None:
+        """The filtered contigs and their annotations, without a contig"""
+        outs.mkdir(parents=True)
+        (outs / "filtered_contig.fasta").write_text("")
+        columns = ["barcode", "is_cell", "contig_id", "high_confidence", "length", "chain", "v_gene", "d_gene"]
+        columns += ["j_gene", "c_gene", "full_length", "productive", "cdr3", "reads", "umis"]
+        pd.DataFrame(columns=columns).to_csv(outs / "filtered_contig_annotations.csv", index=False)
+
+    def write_count(self, outs: Path, flags: dict[str, str]) -> None:
+        """A feature barcode matrix of the features, each barcode dominated by one of them"""
+        features = pd.read_csv(flags["--feature-ref"])["id"].astype(str).tolist()
+        cells = 20 * len(features)
+        barcodes = unique_barcodes(cells, offset=int(self.rng.integers(0, 4**12)))
+        counts = self.rng.poisson(4, size=(len(features), cells))
+        counts[np.arange(cells) % len(features), np.arange(cells)] += self.rng.poisson(600, cells)
+        write_feature_matrix(outs / "filtered_feature_bc_matrix", features, barcodes, counts)
+
+
+class QueuedCellranger(CellrangerExecutor):
+    """Puts the calls on a job queue for workers to run with the executor called backend
+
+    The nodes share a filesystem, the binary and references are looked up the way the backend does on this node.
+
+    Parameters
+    ----------
+    queue : JobQueue
+        The queue the workers pull from
+    backend : str
+        The executor the workers run the calls with
+    cost_model : str | Path | None
+        JSON cost model of the simulator backend
+    max_attempts : int
+        Times a call is run before it counts as failed
+    poll : float
+        Seconds between looking whether the calls finished
+    seed : int
+        Seed of the simulator backend, every task and attempt runs it seeded with this, its task id and attempt
+    """
+
+    name = "queue"
+    synchronous = False
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        backend: str = "cellranger",
+        cost_model: str | Path | None = None,
+        max_attempts: int = 3,
+        poll: float = 5.0,
+        seed: int = 0,
+    ) -> None:
+        self.queue = queue
+        self.backend = backend
+        self.cost_model = str(Path(cost_model).absolute()) if cost_model else None
+        self.local = get_executor(backend, cost_model)
+        self.max_attempts = max_attempts
+        self.poll = poll
+        self.seed = seed
+
+    def program(self, data: Data) -> str:
+        return self.local.program(data)
+
+    def transcriptome(self, data: Data, reference: str | Path | None = None) -> str:
+        return self.local.transcriptome(data, reference)
+
+    def run(self, command: Sequence[str | Path | None]) -> int:
+        return self.wait([self.submit(command, os.getcwd())])[0]
+
+    def submit(self, command: Sequence[str | Path | None], cwd: str | Path) -> Submitted:
+        payload = {
+            "command": [str(argument) for argument in command],
+            "cwd": str(Path(cwd).absolute()),
+            "executor": self.backend,
+            "cost_model": self.cost_model,
+            "seed": self.seed,
+        }
+        return self.queue.submit("cellranger", payload, max_attempts=self.max_attempts)
+
+    def wait(self, submitted: list[Submitted]) -> list[int]:
+        returncodes = []
+        for task in self.queue.wait(submitted, poll=self.poll):
+            if task.status != DONE:
+                logger.error(f"cellranger task {task.id} failed after {task.attempts} attempts: {task.error}")
+            returncodes.append(task.result["returncode"] if task.status == DONE and task.result else 1)
+        return returncodes
+
+
+def run_cellranger_task(payload: dict[str, Any]) -> dict[str, Any]:
+    """Run a queued cellranger call, raising on a failed call so the queue retries it"""
+    task = current_task()
+    # a simulated call draws its failures anew for every task and attempt, so retries behave like reruns
+    seed = payload.get("seed", 0)
+    if task is not None:
+        seed = int(np.random.SeedSequence([seed, task.id, task.attempts]).generate_state(1)[0])
+    executor = get_executor(payload["executor"], payload.get("cost_model"), seed=seed)
+    returncode = executor.submit(payload["command"], payload["cwd"])
+    if returncode != 0:
+        raise RuntimeError(f"{' '.join(payload['command'])} exited with {returncode}")
+    return {"returncode": returncode}
+
+
+def get_executor(
+    name: str = "cellranger", cost_model: str | Path | None = None, seed: int = 0, queue: str | Path | None = None
+) -> CellrangerExecutor:
+    """The executor called name, the simulator with the cost model read from a json file if given
+
+    With a queue the calls are put on the job queue in that SQLite file for workers to run with the executor
+    """
+    if queue is not None:
+        return QueuedCellranger(JobQueue(queue), backend=name, cost_model=cost_model, seed=seed)
+    if name == "cellranger":
+        return LocalCellranger()
+    if name == "simulate":
+        return SimulatedCellranger(CostModel.from_json(cost_model) if cost_model else None, seed=seed)
+    raise ValueError(f"{name} is not one of {EXECUTORS}")
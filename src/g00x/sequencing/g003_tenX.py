@@ -1,8 +1,6 @@
 import hashlib
 import logging
-import os
 import shutil
-import subprocess
 import warnings
 from pathlib import Path
 from typing import Any
@@ -10,7 +8,9 @@ from typing import Any
 import pandas as pd
 
 from g00x.data import Data
+from g00x.sequencing.executors import CellrangerExecutor, LocalCellranger, Submitted
 from g00x.tools.path import cd, pathing
+from g00x.tools.telemetry import telemetry
 
 logger = logging.getLogger("G00x")
 
@@ -26,8 +26,10 @@ def g003_run_demultiplex(
     merged_dataframe: pd.DataFrame,
     out: Path,
     overwrite: bool = False,
+    executor: CellrangerExecutor | None = None,
 ) -> pd.DataFrame:
     logger.info("Begining Demultiplexing...")
+    executor = executor or LocalCellranger()
 
     # Remove RAMOS entries, which are only used as control to confirm vdj recovery efficiency?
     # NOTE: may not be needed after G002
@@ -56,7 +58,8 @@ def g003_run_demultiplex(
         )
     )
 
-    demux_cmd = []
+    submitted: list[Submitted] = []
+    pending: list[tuple[list, pd.Index, pd.Index, Path]] = []
     for run_path in all_run_dir_paths:
         working_dir = out / run_path.parent.stem
         demultiplexed_dir = working_dir / "demultiplexed"
@@ -134,51 +137,45 @@ def g003_run_demultiplex(
         logger.info(f"Writing sample sheet to {csv_output}")
         combined_csv.to_csv(csv_output, index=False)
 
-        # where are we before we start
-        logger.info(f"Saving dir {Path('.').absolute()}")
-        current_working_dir = Path(".").absolute()
-
-        # go to working dir
-        logger.info(f"Changing working directory to {demultiplexed_dir}")
-        os.chdir(demultiplexed_dir)
-
-        try:
-            demux_cmd = [
-                data.get_cellranger_path(),
-                "mkfastq",
-                "--csv",
-                csv_output,
-                "--run",
-                run_path,
-                "--id",
-                hash_output,
-                "--localcores=48",
-                "--uiport=40575",
-                "--jobmode=local",
-            ]
-            command = subprocess.run(demux_cmd)
-            if command.returncode != 0:
+        demux_cmd = [
+            executor.program(data),
+            "mkfastq",
+            "--csv",
+            csv_output,
+            "--run",
+            run_path,
+            "--id",
+            hash_output,
+            "--localcores=48",
+            "--uiport=40575",
+            "--jobmode=local",
+        ]
+        # mkfastq of every run is submitted before waiting on any
+        logger.info(f"Submitting mkfastq in {demultiplexed_dir}")
+        with telemetry.stage("cellranger mkfastq", task=str(demultiplexed_dir)):
+            submitted.append(executor.submit(demux_cmd, demultiplexed_dir))
+            # a local call already finished, so it fails the step before any other call is started
+            if executor.synchronous and submitted[-1] != 0:
+                logger.error(f"Failed to run {demux_cmd}")
                 raise ValueError(f"Demultiplexing failed with command {demux_cmd}")
-            vdj_indexes_to_update = vdj_run_id_dataframe.index
-            cso_indexes_to_update = cso_run_id_dataframe.index
-            merged_dataframe.loc[vdj_indexes_to_update, "vdj_fastq_dir"] = str(
-                hash_running_dir / Path("outs/fastq_path")
-            )
-            merged_dataframe.loc[vdj_indexes_to_update, "vdj_sample_name"] = (
-                "vdj-" + merged_dataframe.loc[vdj_indexes_to_update, "vdj_index"]
-            )
-            merged_dataframe.loc[cso_indexes_to_update, "cso_fastq_dir"] = str(
-                hash_running_dir / Path("outs/fastq_path")
-            )
-            merged_dataframe.loc[cso_indexes_to_update, "cso_sample_name"] = (
-                "cso-" + merged_dataframe.loc[cso_indexes_to_update, "cso_index"]
-            )
-        except Exception as e:
+        pending.append((demux_cmd, vdj_run_id_dataframe.index, cso_run_id_dataframe.index, hash_running_dir))
+
+    with telemetry.stage("cellranger mkfastq wait"):
+        returncodes = executor.wait(submitted)
+    for returncode, (demux_cmd, vdj_indexes_to_update, cso_indexes_to_update, hash_running_dir) in zip(
+        returncodes, pending
+    ):
+        if returncode != 0:
             logger.error(f"Failed to run {demux_cmd}")
-            raise e
-        finally:
-            os.chdir(current_working_dir)
-        logger.info(f"Saving merged dataframe to {demultiplexed_dir}")
+            raise ValueError(f"Demultiplexing failed with command {demux_cmd}")
+        merged_dataframe.loc[vdj_indexes_to_update, "vdj_fastq_dir"] = str(hash_running_dir / Path("outs/fastq_path"))
+        merged_dataframe.loc[vdj_indexes_to_update, "vdj_sample_name"] = (
+            "vdj-" + merged_dataframe.loc[vdj_indexes_to_update, "vdj_index"]
+        )
+        merged_dataframe.loc[cso_indexes_to_update, "cso_fastq_dir"] = str(hash_running_dir / Path("outs/fastq_path"))
+        merged_dataframe.loc[cso_indexes_to_update, "cso_sample_name"] = (
+            "cso-" + merged_dataframe.loc[cso_indexes_to_update, "cso_index"]
+        )
 
     return merged_dataframe
 
@@ -194,6 +191,7 @@ def g003_run_vdj(
     demux_dataframe: pd.DataFrame,
     out: Path,
     overwrite: bool = False,
+    executor: CellrangerExecutor | None = None,
 ) -> pd.DataFrame:
     """Run the VDJ 10x pipeline for G003
 
@@ -205,6 +203,8 @@ def g003_run_vdj(
         The demux dataframe from the demultiplex pipelien
     out : Path
         output to save the dataframe
+    executor : CellrangerExecutor | None
+        Runs the cellranger calls, by default the cellranger binary
     Returns
     -------
     pd.DataFrame
@@ -215,6 +215,7 @@ def g003_run_vdj(
         Non singletons in the dataframe
     """
     logger.info("Running VDJ")
+    executor = executor or LocalCellranger()
 
     # ensure that vdj_fastq_dir is not null
     if demux_dataframe["vdj_fastq_dir"].isnull().any():
@@ -227,6 +228,9 @@ def g003_run_vdj(
 
     groupby = demux_dataframe.groupby(["vdj_fastq_dir", "vdj_sample_name"])
     enumerate_groupby = enumerate(groupby)
+    # every call of the stage is submitted before waiting on any
+    submitted: list[Submitted] = []
+    pending: list[tuple[str, pd.Index, Path]] = []
     for numerator, (index, group_df) in enumerate_groupby:
         # first get the fastq path which will be first argument of gropuby index
         fastq_path = index[0]
@@ -254,10 +258,6 @@ def g003_run_vdj(
             working_dir.mkdir(parents=True)
             logger.info(f"Creating {working_dir}")
 
-        # log current direcotry
-        current_dir = os.getcwd()
-        logger.info(f"Current directory is {current_dir}")
-
         # the actual output will be in vdj_output_000N
         vdj_output = working_dir / f"vdj_output_{str(numerator).zfill(4)}"
 
@@ -268,34 +268,38 @@ def g003_run_vdj(
             logger.info(f"{vdj_output} already exists. Skipping and adding path to manifest.")
             demux_dataframe.loc[group_df.index, "vdj_output"] = str(vdj_output)
             continue
-        try:
-            logger.info(f"Changing directory to {working_dir}")
-            os.chdir(working_dir)
-            vdj_cmd = [
-                data.get_cellranger_path(),
-                "vdj",
-                "--id",
-                vdj_output.name,  # unique_name
-                "--sample",
-                sample_name,
-                "--reference",
-                data.get_vdj_path(),
-                "--fastqs",
-                fastq_path,
-                "--localcores=48",
-                "--uiport=40575",
-                "--jobmode=local",
-            ]
-            command_string = " ".join(vdj_cmd)
-            logger.info(f"Running {command_string}")
-            f = subprocess.run(vdj_cmd)
-            if f.returncode != 0:
+        vdj_cmd = [
+            executor.program(data),
+            "vdj",
+            "--id",
+            vdj_output.name,  # unique_name
+            "--sample",
+            sample_name,
+            "--reference",
+            data.get_vdj_path(),
+            "--fastqs",
+            fastq_path,
+            "--localcores=48",
+            "--uiport=40575",
+            "--jobmode=local",
+        ]
+        command_string = " ".join(map(str, vdj_cmd))
+        logger.info(f"Submitting {command_string}")
+        with telemetry.stage("cellranger vdj", task=str(vdj_output)):
+            submitted.append(executor.submit(vdj_cmd, working_dir))
+            # a local call already finished, so it fails the step before any other call is started
+            if executor.synchronous and submitted[-1] != 0:
                 logger.error(f"Failed to run {command_string}")
                 raise ValueError(f"Failed to run {command_string}")
-            demux_dataframe.loc[group_df.index, "vdj_output"] = str(vdj_output)
-        finally:
-            logger.info(f"changing directory back to {current_dir}")
-            os.chdir(current_dir)
+        pending.append((command_string, group_df.index, vdj_output))
+
+    with telemetry.stage("cellranger vdj wait"):
+        returncodes = executor.wait(submitted)
+    for returncode, (command_string, indexes, vdj_output) in zip(returncodes, pending):
+        if returncode != 0:
+            logger.error(f"Failed to run {command_string}")
+            raise ValueError(f"Failed to run {command_string}")
+        demux_dataframe.loc[indexes, "vdj_output"] = str(vdj_output)
     # if not Path(vdj_frame_output).parent.exists():
     #     Path(vdj_frame_output).parent.mkdir()
     #     logger.info(f"Created {Path(vdj_frame_output).parent}")
@@ -307,8 +311,7 @@ def g003_run_vdj(
 
 
 def get_hashtaglookup(data: Data, hto: str) -> str:
-    hashtag_lookup = data.get_g003_hto_gates()
-    hto_seq: str = hashtag_lookup.loc[hto, "seq"]  # type: ignore
+    hto_seq: str = data.get_g003_hto_sequences()[hto]
     return hto_seq
 
 
@@ -352,6 +355,7 @@ def g003_run_cso(
     out: Path,
     genome_reference: Path,
     overwrite: bool = False,
+    executor: CellrangerExecutor | None = None,
 ) -> pd.DataFrame:
     """Run the feature barcode 10x pipeline. It should be run after vdj, but that is your call bro.
 
@@ -363,6 +367,8 @@ def g003_run_cso(
         The demux dataframe from the demultiplex pipelien
     out : Path
         output to save the dataframe
+    executor : CellrangerExecutor | None
+        Runs the cellranger calls, by default the cellranger binary
     Returns
     -------
     pd.DataFrame
@@ -373,6 +379,7 @@ def g003_run_cso(
         Non singletons in the dataframe
     """
     logger.info("Running CSO")
+    executor = executor or LocalCellranger()
     # ensure that vdj_fastq_dir is not null
     if demux_dataframe["cso_fastq_dir"].isnull().any():
         raise ValueError("vdj_fastq_dir is null")
@@ -382,6 +389,9 @@ def g003_run_cso(
 
     groupby = demux_dataframe.groupby(["cso_fastq_dir", "cso_sample_name"])
     enumerate_groupby = enumerate(groupby)
+    # every call of the stage is submitted before waiting on any
+    submitted: list[Submitted] = []
+    pending: list[tuple[str, pd.Index, Path]] = []
     index: tuple[str, str]
     for numerator, (index, group_df) in enumerate_groupby:
         # first get the fastq path which will be first argument of gropuby index
@@ -405,10 +415,6 @@ def g003_run_cso(
             working_dir.mkdir(parents=True)
             logger.info(f"Creating {working_dir}")
 
-        # log current direcotry
-        current_dir = os.getcwd()
-        logger.info(f"Current directory is {current_dir}")
-
         # the actual output will be in vdj_output_000N
         cso_output = working_dir / f"cso_output_{str(numerator).zfill(4)}"
         if cso_output.exists() and overwrite:
@@ -418,40 +424,44 @@ def g003_run_cso(
             logger.info(f"{cso_output} already exists. Skipping and adding path to manifest.")
             demux_dataframe.loc[group_df.index, "cso_output"] = str(cso_output)
             continue
-        try:
-            logger.info(f"Changing directory to {working_dir}")
-            os.chdir(working_dir)
-            feature_df = get_feature_dataframe(data, group_df)
-            library_df = get_library_df(str(fastq_path), sample_name)
-            feature_csv_name = f"feature_frame_{str(numerator).zfill(4)}.csv"
-            library_csv_name = f"library_df_{str(numerator).zfill(4)}.csv"
-            feature_df.to_csv(feature_csv_name, index=False)
-            library_df.to_csv(library_csv_name, index=False)
-            cso_cmd: list[str] = [
-                str(data.get_cellranger_path()),
-                "count",
-                "--id",
-                cso_output.name,
-                "--feature-ref",
-                feature_csv_name,
-                "--libraries",
-                library_csv_name,
-                "--transcriptome",
-                str(genome_reference),
-                "--localcores=48",
-                "--uiport=40576",
-                "--jobmode=local",
-            ]
-            command_string: str = " ".join(cso_cmd)
-            logger.info(f"Running {command_string}")
-            print(command_string)
-            cso_process = subprocess.run(command_string, shell=True)
-            if cso_process.returncode != 0:
-                raise ValueError(f"CSO failed with return code {cso_process.returncode}")
-            demux_dataframe.loc[group_df.index, "cso_output"] = str(cso_output)
-        finally:
-            logger.info(f"changing directory back to {current_dir}")
-            os.chdir(current_dir)
+        feature_df = get_feature_dataframe(data, group_df)
+        library_df = get_library_df(str(fastq_path), sample_name)
+        feature_csv_name = f"feature_frame_{str(numerator).zfill(4)}.csv"
+        library_csv_name = f"library_df_{str(numerator).zfill(4)}.csv"
+        feature_df.to_csv(working_dir / feature_csv_name, index=False)
+        library_df.to_csv(working_dir / library_csv_name, index=False)
+        cso_cmd: list[str] = [
+            executor.program(data),
+            "count",
+            "--id",
+            cso_output.name,
+            "--feature-ref",
+            feature_csv_name,
+            "--libraries",
+            library_csv_name,
+            "--transcriptome",
+            executor.transcriptome(data, genome_reference),
+            "--localcores=48",
+            "--uiport=40576",
+            "--jobmode=local",
+        ]
+        command_string: str = " ".join(map(str, cso_cmd))
+        logger.info(f"Submitting {command_string}")
+        with telemetry.stage("cellranger count", task=str(cso_output)):
+            submitted.append(executor.submit(cso_cmd, working_dir))
+            # a local call already finished, so it fails the step before any other call is started
+            if executor.synchronous and submitted[-1] != 0:
+                logger.error(f"Failed to run {command_string}")
+                raise ValueError(f"CSO failed with return code {submitted[-1]}")
+        pending.append((command_string, group_df.index, cso_output))
+
+    with telemetry.stage("cellranger count wait"):
+        returncodes = executor.wait(submitted)
+    for returncode, (command_string, indexes, cso_output) in zip(returncodes, pending):
+        if returncode != 0:
+            logger.error(f"Failed to run {command_string}")
+            raise ValueError(f"CSO failed with return code {returncode}")
+        demux_dataframe.loc[indexes, "cso_output"] = str(cso_output)
     # logger.info(f"Saving cso dataframe to {Path(cso_frame_output).stem}")
     # demux_dataframe.to_feather(f"{Path(cso_frame_output).parent}/{Path(cso_frame_output).stem}.feather")
     return demux_dataframe
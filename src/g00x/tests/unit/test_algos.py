@@ -0,0 +1,110 @@
+from typing import get_args
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from g00x_figures.algos import (
+    QuantileMethod,
+    grouped_bootstrap,
+    grouped_geomean,
+    grouped_quantile,
+    top_n_percent_group,
+)
+
+
+@pytest.fixture
+def frame() -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    sizes = [1, 2, 3, 5, 8, 13, 40]
+    frame = pd.DataFrame(
+        {
+            "group": np.repeat(list("abcdefg"), sizes),
+            "visit": rng.integers(0, 2, size=sum(sizes)),
+            "value": rng.lognormal(size=sum(sizes)).round(1),
+        }
+    )
+    frame.loc[frame.sample(frac=0.1, random_state=0).index, "value"] = np.nan
+    # a group with only missing values and rows without a group
+    empty = pd.DataFrame({"group": ["h", "h", None], "visit": [0, 1, 0], "value": [np.nan, np.nan, 1.0]})
+    return pd.concat([frame, empty], ignore_index=True)
+
+
+# np.quantile of numpy 1.26 is off at the ends for some methods, the ends are checked against min and max instead
+@pytest.mark.parametrize("method", get_args(QuantileMethod))
+@pytest.mark.parametrize("q", [0.1, 0.25, 0.5, 0.9, 0.97])
+def test_grouped_quantile_matches_numpy(frame: pd.DataFrame, method: QuantileMethod, q: float) -> None:
+    expected = frame.groupby(["group", "visit"])["value"].apply(
+        lambda values: np.quantile(values.dropna(), q, method=method) if values.notna().any() else np.nan
+    )
+    pd.testing.assert_series_equal(grouped_quantile(frame, ["group", "visit"], "value", q, method), expected)
+
+
+@pytest.mark.parametrize("method", get_args(QuantileMethod))
+def test_grouped_quantile_ends(frame: pd.DataFrame, method: QuantileMethod) -> None:
+    grouped = frame.groupby("group")["value"]
+    pd.testing.assert_series_equal(grouped_quantile(frame, "group", "value", 0.0, method), grouped.min())
+    pd.testing.assert_series_equal(grouped_quantile(frame, "group", "value", 1.0, method), grouped.max())
+
+
+def test_empty_groups_and_unknown_method(frame: pd.DataFrame) -> None:
+    medians = grouped_quantile(frame, "group", "value")
+    assert list(medians.index) == list("abcdefgh")
+    assert np.isnan(medians["h"]) and medians.notna().sum() == 7
+    with pytest.raises(ValueError, match="not a valid quantile method"):
+        grouped_quantile(frame, "group", "value", method="mean")  # type: ignore
+
+
+def test_top_n_percent_group_is_the_midpoint_quantile(frame: pd.DataFrame) -> None:
+    expected = frame.groupby("group")["value"].quantile(0.9, interpolation="midpoint").reset_index()
+    pd.testing.assert_frame_equal(top_n_percent_group(frame, "group", "value"), expected)
+
+
+def test_grouped_geomean_leaves_out_values_past_the_limits(frame: pd.DataFrame) -> None:
+    kept = frame[(frame["value"] >= 0.5) & (frame["value"] < 3)]
+    expected = np.exp(np.log(kept["value"]).groupby(kept["group"]).mean())
+    pd.testing.assert_series_equal(grouped_geomean(frame, "group", "value", lower=0.5, upper=3), expected)
+
+
+@pytest.mark.parametrize("statistic", ["median", "quantile", "geomean"])
+def test_grouped_bootstrap_is_the_same_in_any_batches(frame: pd.DataFrame, statistic: str) -> None:
+    runs = [
+        grouped_bootstrap(frame, "group", "value", statistic, q=0.9, n_resamples=50, seed=1, batch_values=batch)
+        for batch in [1, 100, 10_000]
+    ]
+    for run in runs[1:]:
+        pd.testing.assert_frame_equal(run, runs[0])
+    filled = runs[0].dropna()
+    assert ((filled["ci_low"] <= filled["value"]) & (filled["value"] <= filled["ci_high"])).all()
+
+
+def test_grouped_bootstrap_estimates_are_the_grouped_statistics(frame: pd.DataFrame) -> None:
+    median = grouped_bootstrap(frame, ["group", "visit"], "value", n_resamples=20, seed=0)
+    pd.testing.assert_series_equal(median["value"], grouped_quantile(frame, ["group", "visit"], "value"))
+    quantile = grouped_bootstrap(frame, "group", "value", "quantile", q=0.25, method="hazen", n_resamples=20, seed=0)
+    pd.testing.assert_series_equal(quantile["value"], grouped_quantile(frame, "group", "value", 0.25, "hazen"))
+    geomean = grouped_bootstrap(frame, "group", "value", "geomean", n_resamples=20, seed=0)
+    pd.testing.assert_series_equal(geomean["value"].dropna(), grouped_geomean(frame, "group", "value"))
+
+
+@pytest.mark.parametrize("statistic", ["median", "geomean"])
+def test_grouped_bootstrap_of_empty_groups_is_nan(frame: pd.DataFrame, statistic: str) -> None:
+    result = grouped_bootstrap(frame, "group", "value", statistic, n_resamples=20, seed=0)
+    assert result.loc["h"].isna().all()
+    assert result.drop(index="h").notna().all().all()
+    with pytest.raises(ValueError, match="Unknown statistic"):
+        grouped_bootstrap(frame, "group", "value", "mean")  # type: ignore
+
+
+def test_group_medians_with_bootstrap_intervals(frame: pd.DataFrame) -> None:
+    pytest.importorskip("patchworklib")
+    from g00x_figures.mutations import get_group_median
+
+    seq = frame.dropna(subset=["group"]).rename(columns={"group": "pubID", "visit": "weeks"})
+    seq = seq.assign(trial="G002", pseudogroup=1)
+    medians = get_group_median(seq, "value")
+    intervals = get_group_median(seq, "value", bootstrap_ci=True)
+    assert intervals.columns.tolist() == medians.columns.tolist() + ["ci_low", "ci_high"]
+    pd.testing.assert_series_equal(intervals["value"], medians["value"])
+    filled = intervals.dropna()
+    assert ((filled["ci_low"] <= filled["value"]) & (filled["value"] <= filled["ci_high"])).all()
@@ -0,0 +1,61 @@
+import subprocess
+import sys
+import time
+
+# loaded by the figures and pipeline commands, none of them should be needed to start the CLI
+HEAVY_MODULES = {
+    "matplotlib",
+    "seaborn",
+    "patchworklib",
+    "logomaker",
+    "Levenshtein",
+    "pandera",
+    "g00x_figures.data",
+    "g00x_figures.qc",
+    "g00x_figures.spr",
+    "g00x_figures.features",
+}
+
+STARTUP = """
+import sys
+from click.testing import CliRunner
+from g00x_figures.cli import figures
+for args in (["--help"], ["S27", "--help"], ["flow-freq", "--help"]):
+    result = CliRunner().invoke(figures, args)
+    assert result.exit_code == 0, result.output
+print("\\n".join(sys.modules))
+"""
+
+CLIENT_STARTUP = """
+import sys
+from click.testing import CliRunner
+from g00x_client.cli import main
+for args in (["--help"], ["g002", "validate", "flow", "--help"], ["g003", "pipeline", "--help"]):
+    result = CliRunner().invoke(main, args)
+    assert result.exit_code == 0, result.output
+print("\\n".join(sys.modules))
+"""
+
+PIPELINE_MODULES = {"sadie", "scipy", "g00x.sequencing.airr", "g00x.sequencing.tenX", "g00x.tools.path"}
+
+
+def started(code: str) -> tuple[set[str], float]:
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    assert result.returncode == 0, result.stderr
+    return {module.split(".")[0] for module in result.stdout.split()} | set(result.stdout.split()), elapsed
+
+
+def test_figures_cli_starts_without_loading_figures() -> None:
+    loaded, elapsed = started(STARTUP)
+    assert not loaded & HEAVY_MODULES
+    # importing every figure module took several seconds
+    assert elapsed < 3
+
+
+def test_pipeline_cli_starts_without_sadie_or_plotting() -> None:
+    loaded, elapsed = started(CLIENT_STARTUP)
+    assert "g00x.cli" in loaded
+    assert not loaded & (HEAVY_MODULES | PIPELINE_MODULES)
+    assert elapsed < 3
@@ -0,0 +1,92 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pandera")
+
+from g00x_figures.data.cache import DatasetCache, frame_bytes  # noqa: E402
+
+
+def load(values: list[int]) -> pd.DataFrame:
+    return pd.DataFrame({"a": values})
+
+
+def test_edited_sources_code_and_arguments_miss(tmp_path: Path) -> None:
+    cache = DatasetCache(directory=None)
+    source = tmp_path / "source.csv"
+    source.write_text("a\n1\n")
+
+    def get(code: str = "v1", arguments: tuple = (("n", 1),)) -> pd.DataFrame:
+        return cache.get("get_a", code, [source], arguments, lambda: pd.read_csv(source))
+
+    assert get()["a"].tolist() == [1]
+    assert get()["a"].tolist() == [1]
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # a replaced file is loaded again even with the same mtime
+    source.write_text("a\n2\n")
+    os.utime(source, ns=(0, 0))
+    assert get()["a"].tolist() == [2]
+    get(code="v2")
+    get(arguments=(("n", 2),))
+    assert (cache.hits, cache.misses) == (1, 4)
+
+
+def test_lru_stays_within_max_bytes() -> None:
+    frame_size = frame_bytes(load([1, 2, 3]))
+    cache = DatasetCache(max_bytes=2 * frame_size, directory=None)
+    for name in ["first", "second"]:
+        cache.get(name, "v1", [], (), lambda: load([1, 2, 3]))
+    # using first makes second the least recently used, which the third frame pushes out
+    cache.get("first", "v1", [], (), lambda: load([1, 2, 3]))
+    cache.get("third", "v1", [], (), lambda: load([1, 2, 3]))
+    assert cache.current_bytes <= cache.max_bytes
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    cache.get("first", "v1", [], (), lambda: load([1, 2, 3]))
+    cache.get("second", "v1", [], (), lambda: load([1, 2, 3]))
+    assert (cache.hits, cache.misses) == (2, 4)
+    assert cache.current_bytes <= cache.max_bytes
+
+    # a frame larger than the whole cache isn't kept
+    cache.get("large", "v1", [], (), lambda: load(list(range(100))))
+    assert cache.current_bytes <= cache.max_bytes
+    cache.get("large", "v1", [], (), lambda: load(list(range(100))))
+    assert cache.misses == 6
+
+
+def test_returned_frames_mutate_independently() -> None:
+    cache = DatasetCache(directory=None)
+    first = cache.get("get_a", "v1", [], (), lambda: load([1, 2, 3]))
+    first["b"] = first["a"] * 2
+    first.loc[0, "a"] = 10
+    second = cache.get("get_a", "v1", [], (), lambda: load([1, 2, 3]))
+    assert second.columns.tolist() == ["a"]
+    assert second["a"].tolist() == [1, 2, 3]
+
+
+def test_disk_keeps_the_current_dataset_of_a_call_within_budget(tmp_path: Path) -> None:
+    pytest.importorskip("pyarrow")
+    cache = DatasetCache(directory=tmp_path)
+
+    def cached() -> list[str]:
+        return sorted(path.stem for path in tmp_path.glob("*.arrow"))
+
+    cache.get("get_a", "v1", [], (("n", 1),), lambda: load([1, 2, 3]))
+    cache.get("get_a", "v1", [], (("n", 2),), lambda: load([1, 2, 3]))
+    first = cached()
+    # an edited loader supersedes what the old one wrote for the same arguments
+    cache.get("get_a", "v2", [], (("n", 1),), lambda: load([1, 2, 3]))
+    assert len(cached()) == 2
+    assert cache.key("get_a", "v1", [], (("n", 1),)) not in cached()
+    assert cache.key("get_a", "v1", [], (("n", 2),)) in first and len(set(first) & set(cached())) == 1
+
+    # over the budget the least recently used files go first
+    size = (tmp_path / f"{cached()[0]}.arrow").stat().st_size
+    cache = DatasetCache(directory=tmp_path, max_disk_bytes=2 * size)
+    os.utime(tmp_path / f"{cache.key('get_a', 'v2', [], (('n', 1),))}.arrow", ns=(0, 0))
+    cache.get("get_b", "v1", [], (), lambda: load([1, 2, 3]))
+    assert cached() == sorted([cache.key("get_a", "v1", [], (("n", 2),)), cache.key("get_b", "v1", [], ())])
+    assert len(list(tmp_path.glob("*.json"))) == 2
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from g00x.analysis.derived_measures import DerivedMeasure, pivot_with_derived_measures
+from g00x.data import Data
+
+ROW_INDEX = ["run_purpose", "ptid", "weeks"]
+
+
+def make_combined_df() -> pd.DataFrame:
+    rng = np.random.default_rng(2)
+    names = [
+        ("percent_ep_among_igg", "Percent epitope-specific among IgG", "frequency"),
+        ("percent_IGHG_vrc01_class_sequences", "Percent of IGHG sequences that are VRC01-class", "sequence measure"),
+        ("percent_ep_among_igm", "Percent epitope-specific among IgM", "frequency"),
+        ("num_sequences", "Number of sequences", "sequence measure"),
+        ("B cells", "B cells", "count"),
+    ]
+    rows = [
+        {"run_purpose": "Sort", "ptid": ptid, "weeks": weeks, "short_name": sn, "long_name": ln, "value_type": vt}
+        for ptid in ["G002516", "G002517"]
+        for weeks in ["-5", "4"]
+        for sn, ln, vt in names
+    ]
+    combined_df = pd.DataFrame(rows)
+    combined_df["value"] = rng.uniform(0, 100, len(combined_df))
+    # a sample without sequencing
+    return combined_df.drop(index=1).reset_index(drop=True)
+
+
+def test_derived_measures_are_products_of_percents() -> None:
+    combined_df = make_combined_df()
+    combined_pivot, combined_pivot_long, long_df = pivot_with_derived_measures(
+        combined_df, ROW_INDEX, Data().get_derived_measures(), with_calculation=True
+    )
+    wide = combined_df.pivot(index=ROW_INDEX, columns="short_name", values="value")
+    expected = ((wide["percent_ep_among_igg"] / 100) * (wide["percent_IGHG_vrc01_class_sequences"] / 100)) * 100
+    result = combined_pivot.set_index(ROW_INDEX)["percent_vrc01_among_igg"]
+    pd.testing.assert_series_equal(result, expected, check_names=False)
+
+    # one pivot renamed gives the long name pivot
+    assert list(combined_pivot.columns[len(ROW_INDEX) :]) == sorted(combined_pivot.columns[len(ROW_INDEX) :])
+    long_result = combined_pivot_long.set_index(ROW_INDEX)["Percent of VRC01-class sequences among IgG"]
+    pd.testing.assert_series_equal(long_result, result, check_names=False)
+
+    # derived rows exist where either input exists, so igm has rows and iga, without inputs, has none
+    derived = long_df.query("short_name=='percent_vrc01_among_igm'")
+    assert len(derived) == 4 and derived["value"].isna().all()
+    assert long_df.query("short_name=='percent_vrc01_among_iga'").empty
+    assert derived["calculation"].iloc[0].startswith("Percent of VRC01-class sequences among IgM - ")
+    assert list(long_df["value_type"].cat.categories) == ["count", "sequence measure", "frequency"]
+
+
+def test_unknown_operation() -> None:
+    with pytest.raises(ValueError, match="unknown operation"):
+        DerivedMeasure("x", "y", "z", "Z", operation="difference")
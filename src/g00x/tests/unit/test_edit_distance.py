@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+Levenshtein = pytest.importorskip("Levenshtein")
+
+from g00x_figures.edit_distance import NearestReference, nearest_distance  # noqa: E402
+
+REFERENCES = ["QQYEF", "QQYDF", "QVYEF", "QQYNEF", "QEYEF", "QHYGF", "LQYEF"]
+
+
+def brute_force(queries: pd.Series, references: list[str]) -> pd.Series:
+    return queries.map(lambda query: min(Levenshtein.distance(query, reference) for reference in references))
+
+
+def test_nearest_distance_matches_brute_force() -> None:
+    rng = np.random.default_rng(0)
+    queries = pd.Series(
+        ["".join(rng.choice(list("QEYFDNLVHG"), size=rng.integers(1, 9))) for _ in range(200)] + REFERENCES,
+        index=np.arange(207) * 2,
+    )
+    expected = brute_force(queries, REFERENCES)
+    pd.testing.assert_series_equal(nearest_distance(queries, REFERENCES), expected)
+    # in processes, and served from the memo of the first call
+    pd.testing.assert_series_equal(NearestReference(REFERENCES).distances(queries, processes=2), expected)
+    pd.testing.assert_series_equal(nearest_distance(queries, list(reversed(REFERENCES))), expected)
+
+
+def test_missing_queries_stay_missing() -> None:
+    distances = nearest_distance(pd.Series(["QQYEF", None, "QQYEA"]), REFERENCES)
+    assert distances.iloc[0] == 0 and pd.isna(distances.iloc[1]) and distances.iloc[2] == 1
+
+
+def test_no_references() -> None:
+    with pytest.raises(ValueError, match="No reference sequences"):
+        NearestReference([])
@@ -0,0 +1,83 @@
+import gzip
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from g00x.benchmarks.synthetic import SyntheticTrial, TrialScale
+from g00x.data import Data
+from g00x.sequencing.executors import CostModel, SimulatedCellranger, get_executor
+
+
+def test_simulated_cellranger_checks_arguments_and_writes_outs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    simulator = SimulatedCellranger(CostModel(scale=0))
+    (tmp_path / "run").mkdir()
+    pd.DataFrame({"Lane": ["*", "*"], "Sample": ["vdj-SI-TT-A1", "cso-SI-TN-A1"], "index": ["A1", "A1"]}).to_csv(
+        tmp_path / "sample_sheet.csv", index=False
+    )
+    mkfastq = ["cellranger", "mkfastq", "--csv", "sample_sheet.csv", "--run", "run", "--id", "abc"]
+    assert simulator.run(mkfastq + ["--localcores=48"]) == 0
+    # a finished pipestance isn't run over
+    assert simulator.run(mkfastq) == 1
+    fastqs = tmp_path / "abc/outs/fastq_path"
+
+    vdj = ["cellranger", "vdj", "--id", "vdj_output_0000", "--reference", "ref", "--fastqs", str(fastqs)]
+    assert simulator.run(vdj + ["--sample", "vdj-SI-TT-B1"]) == 1
+    assert simulator.run(vdj + ["--sample", "vdj-SI-TT-A1"]) == 0
+    assert (tmp_path / "vdj_output_0000/outs/filtered_contig_annotations.csv").exists()
+
+    pd.DataFrame({"id": ["HT01", "HT02"], "name": ["a", "b"]}).to_csv("features.csv", index=False)
+    libraries = pd.DataFrame({"fastqs": [str(fastqs)], "sample": ["cso-SI-TN-A1"], "library_type": ["x"]})
+    libraries.to_csv("libraries.csv", index=False)
+    count = ["cellranger", "count", "--id", "cso_output_0000", "--libraries", "libraries.csv"]
+    assert simulator.run(count + ["--transcriptome", "ref"]) == 1
+    assert simulator.run(count + ["--transcriptome", "ref", "--feature-ref", "features.csv"]) == 0
+    matrix = tmp_path / "cso_output_0000/outs/filtered_feature_bc_matrix"
+    assert gzip.open(matrix / "features.tsv.gz", "rt").read().startswith("HT01\t")
+    assert gzip.open(matrix / "matrix.mtx.gz", "rt").readline().startswith("%%MatrixMarket")
+    assert [call["returncode"] for call in simulator.calls] == [0, 1, 1, 0, 1, 0]
+
+
+def test_simulated_failures_leave_no_outs(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.chdir(tmp_path)
+    cost_model = tmp_path / "cost.json"
+    cost_model.write_text('{"scale": 0, "failure_rate": 1.0, "seconds": {"vdj": 10}}')
+    simulator = get_executor("simulate", cost_model)
+    assert isinstance(simulator, SimulatedCellranger)
+    assert simulator.cost_model.seconds == {"mkfastq": 1800.0, "vdj": 10, "count": 2400.0}
+    (tmp_path / "run").mkdir()
+    pd.DataFrame({"Lane": ["*"], "Sample": ["vdj-SI-TT-A1"], "index": ["A1"]}).to_csv(
+        tmp_path / "sample_sheet.csv", index=False
+    )
+    assert simulator.run(["cellranger", "mkfastq", "--csv", "sample_sheet.csv", "--run", "run", "--id", "x"]) == 1
+    assert not (tmp_path / "x").exists()
+
+
+def test_tenx_pipeline_runs_on_the_simulator(tmp_path_factory: pytest.TempPathFactory) -> None:
+    # the pipeline saves its dataframes as feather
+    try:
+        import pyarrow.feather  # noqa: F401
+    except ImportError as e:
+        pytest.skip(f"feather isn't available: {e}")
+    from g00x.sequencing.tenX import run_cso, run_demultiplex, run_vdj
+
+    trial = SyntheticTrial(TrialScale(factor=0.05, cells_per_sample=5))
+    out = tmp_path_factory.mktemp("trial")
+    paths = trial.write(out, tables=False)
+    merged = trial.pool_frame("g002", paths["g002"]).drop(columns=["vdj_output", "cso_output"]).reset_index(drop=True)
+    simulator = SimulatedCellranger(CostModel(scale=0))
+    data = Data()
+    cwd = os.getcwd()
+    demultiplexed = run_demultiplex(data, merged, out / "output/demultiplex", False, executor=simulator)
+    vdj = run_vdj(data, demultiplexed, out / "output/vdj", False, executor=simulator)
+    cso = run_cso(data, vdj, out / "output/cso", False, executor=simulator)
+    assert os.getcwd() == cwd
+    assert cso["vdj_output"].notna().all() and cso["cso_output"].notna().all()
+    calls = len(simulator.calls)
+    assert calls == merged["run_id"].nunique() + 2 * merged.groupby(["run_dir_path", "vdj_index"]).ngroups
+
+    # finished outputs are picked up instead of run again
+    run_vdj(data, demultiplexed, out / "output/vdj", False, executor=simulator)
+    assert len(simulator.calls) == calls
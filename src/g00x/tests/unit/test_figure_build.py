@@ -0,0 +1,149 @@
+import importlib.util
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any
+
+import click
+import pandas as pd
+import pytest
+from click.testing import CliRunner
+
+from g00x_figures.build import (
+    PACKAGE,
+    data_inputs,
+    figure_code,
+    fingerprint,
+    record,
+    saved_outputs,
+    up_to_date,
+)
+from g00x_figures.cli import figures
+
+# a Data module with a helper its getter calls and a DataPaths, like g00x_figures.data.data
+DATA_MODULE = """
+from pathlib import Path
+
+
+def scale(values):
+    return [float(value) * FACTOR for value in values]
+
+
+class DataPaths:
+    def __init__(self, directory):
+        self.titers = directory / "TITERS"
+
+
+class Data:
+    def __init__(self, directory):
+        self.paths = DataPaths(directory)
+
+    def get_titers(self):
+        return scale(self.paths.titers.read_text().split())
+
+    def get_scaled_titers(self):
+        return self.get_titers()
+"""
+
+OPTIONS = {"fig": "fig2", "is_main": True, "use_geomean": False, "median_scale": 1e9, "bootstrap_ci": False, "seed": 0}
+
+
+def test_record_and_up_to_date(tmp_path: Path) -> None:
+    stamp = tmp_path / "metrics" / "figure.fingerprint.json"
+    image, metrics = tmp_path / "figure.png", tmp_path / "metrics" / "figure.csv"
+    assert not up_to_date(stamp, "a")
+
+    image.write_text("png")
+    record(stamp, "a", [image, metrics])
+    # a recorded output that is missing renders the figure again
+    assert not up_to_date(stamp, "a")
+    metrics.write_text("csv")
+    assert up_to_date(stamp, "a")
+    assert not up_to_date(stamp, "b")
+
+    # nothing saved is never up to date
+    record(stamp, "a", [])
+    assert not up_to_date(stamp, "a")
+
+
+def test_saved_outputs_are_only_what_was_saved(tmp_path: Path) -> None:
+    pytest.importorskip("matplotlib")
+    from matplotlib.figure import Figure
+
+    # written by a figure rendered next to this one
+    (tmp_path / "other.csv").write_text("csv")
+    frame = pd.DataFrame({"a": [1]})
+    with saved_outputs() as outputs:
+        frame.to_csv(tmp_path / "figure.csv", index=False)
+        frame.to_csv(index=False)
+        Figure().savefig(fname=str(tmp_path / "figure.png"))
+    assert sorted(outputs) == [tmp_path / "figure.csv", tmp_path / "figure.png"]
+
+    frame.to_csv(tmp_path / "after.csv")
+    assert len(outputs) == 2
+
+
+def figure(data: Any) -> Any:
+    return data.get_scaled_titers()
+
+
+def load_data(tmp_path: Path, name: str, factor: str = "2", titers: str = "titers.csv") -> Any:
+    path = tmp_path / f"{name}.py"
+    path.write_text(DATA_MODULE.replace("FACTOR", factor).replace("TITERS", titers))
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)  # type: ignore
+    # inspect finds the source of the module's classes through sys.modules
+    sys.modules[name] = module
+    spec.loader.exec_module(module)  # type: ignore
+    return module.Data(tmp_path)
+
+
+def figure_fingerprint(data: Any, **options: Any) -> str:
+    ctx = click.Context(click.Command("figure"), info_name="figure")
+    ctx.obj = {**OPTIONS, "metrics_only": False, "data": data, **options}
+    return fingerprint(ctx, figure)
+
+
+def test_figure_code_follows_imports() -> None:
+    def command() -> None:
+        from g00x_figures.data import Data  # noqa: F401
+        from g00x_figures.edit_distance import nearest_distance  # noqa: F401
+
+    files = figure_code(command)
+    assert PACKAGE / "edit_distance.py" in files
+    # through g00x_figures.data and the modules it imports
+    assert {PACKAGE / "data/__init__.py", PACKAGE / "data/data.py", PACKAGE / "data/cache.py"} <= set(files)
+
+
+def test_data_inputs_follow_getters(tmp_path: Path) -> None:
+    data = load_data(tmp_path, "inputs_data")
+    assert data_inputs(data, ["data.get_scaled_titers()"]) == (["get_scaled_titers", "get_titers"], ["titers"])
+    assert data_inputs(data, ["data.paths"]) == ([], [])
+
+
+def test_fingerprint_changes_with_code_data_and_options(tmp_path: Path) -> None:
+    (tmp_path / "titers.csv").write_text("1 2 3")
+    (tmp_path / "copy.csv").write_text("1 2 3")
+    digest = figure_fingerprint(load_data(tmp_path, "data_a"))
+    # the same Data module and files
+    assert figure_fingerprint(load_data(tmp_path, "data_b")) == digest
+
+    # a module-level helper the getters call
+    assert figure_fingerprint(load_data(tmp_path, "data_c", factor="3")) != digest
+    # DataPaths, even to a file with the same content
+    assert figure_fingerprint(load_data(tmp_path, "data_d", titers="copy.csv")) != digest
+    assert figure_fingerprint(load_data(tmp_path, "data_e"), fig="fig3") != digest
+
+    (tmp_path / "titers.csv").write_text("1 2 30")
+    assert figure_fingerprint(load_data(tmp_path, "data_f")) != digest
+
+
+def test_figure_wrappers_pass_on_the_build_modes(monkeypatch: pytest.MonkeyPatch) -> None:
+    runs = []
+    monkeypatch.setattr(subprocess, "run", lambda cmd, **kwargs: runs.append((cmd, kwargs["env"])))
+    result = CliRunner().invoke(figures, ["--metrics-only", "--force", "--seed", "7", "--bootstrap-ci", "fig3"])
+    assert result.exit_code == 0, result.output
+    [(cmd, env)] = runs
+    assert cmd == "g00x plot -m --fig fig3 prime-mut --aa --method nearest"
+    assert env["G00X_FIGURES_METRICS_ONLY"] == env["G00X_FIGURES_FORCE"] == env["G00X_FIGURES_BOOTSTRAP_CI"] == "1"
+    assert env["G00X_FIGURES_SEED"] == "7"
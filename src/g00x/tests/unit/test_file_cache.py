@@ -0,0 +1,28 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+
+from g00x.tools.file_cache import FileCache
+
+
+def test_file_cache_evicts_and_invalidates(tmp_path: Path) -> None:
+    cache = FileCache(max_bytes=6)
+    first, second = tmp_path / "first.csv", tmp_path / "second.csv"
+    first.write_text("a\n1\n")
+    second.write_text("b\n2\n")
+
+    assert cache.read_bytes(first) == b"a\n1\n"
+    assert cache.read_bytes(first) == b"a\n1\n"
+    assert cache.hits == 1
+
+    # the second file pushes the first one out of the 6 byte budget
+    cache.read_bytes(second)
+    assert cache.current_bytes == 4
+    cache.read_bytes(first)
+    assert cache.hits == 1
+
+    # a changed file is read again instead of served stale
+    first.write_text("a\n3\n")
+    os.utime(first, ns=(0, 0))
+    assert cache.read_table(first, pd.read_csv, "csv")["a"].tolist() == [3]
@@ -52,3 +52,4 @@ def test_flow_cli(fixture_setup: GeneralFixture) -> None:
     path = fixture_setup.get_valid_box_data_structure()
     result = click_runner.invoke(g00x, ["g002", "validate", "flow", str(path)])
     assert result.exit_code == 0
+
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from g00x.analysis.gate_expressions import GateExpressionEngine, GateSum
+
+DATA = Path(__file__).parents[2] / "data"
+SORT_INDEX = ["run_purpose", "ptid", "weeks", "value_type"]
+
+
+def query_frequency_df(flow_df, count_measures, frequency_measures, run_purposes) -> pd.DataFrame:
+    """The frequency dataframe as it was built before, one query per gate"""
+    new_dfs = []
+    for q in run_purposes:
+        sub_df = flow_df.query(f"run_purpose=='{q}'")
+        for count in count_measures:
+            gate_count = sub_df.query(f"gate=='{count['gate']}'").set_index(SORT_INDEX)["value"].reset_index()
+            gate_count = gate_count.assign(
+                value_type="count",
+                short_name=count["easy_name"],
+                long_name=count["easy_name"],
+                pbmc_gate_expression=count["gate"],
+            )
+            new_dfs.append(gate_count)
+        for freq in frequency_measures:
+            num = sub_df.query(f"gate=='{freq['numerator']}'").set_index(SORT_INDEX)["value"]
+            denom = sub_df.query(f"gate=='{freq['denominator']}'").set_index(SORT_INDEX)["value"]
+            freq_df = ((num / denom) * 100).reset_index()
+            freq_df = freq_df.assign(
+                value_type="frequency",
+                short_name=freq["axis_name"],
+                long_name=freq["long_name"],
+                pbmc_gate_expression=f"{freq['numerator']}/{freq['denominator']}",
+            )
+            new_dfs.append(freq_df)
+    return pd.concat(new_dfs).reset_index(drop=True)
+
+
+def make_flow_df(gates: list[str]) -> pd.DataFrame:
+    rng = np.random.default_rng(0)
+    rows = [
+        {"run_purpose": purpose, "ptid": ptid, "weeks": weeks, "value_type": "count", "gate": gate}
+        for purpose in ["Sort", "PreS", "Other"]
+        for ptid in ["G002516", "G002517"]
+        for weeks in ["-5", "4"]
+        for gate in gates
+    ]
+    flow_df = pd.DataFrame(rows)
+    flow_df["value"] = rng.integers(0, 1000, len(flow_df))
+    # one sample is missing a gate
+    return flow_df.drop(index=3).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("suffix", ["", "_g003"])
+def test_engine_matches_query_per_gate(suffix: str) -> None:
+    count_measures = json.load(open(DATA / f"pbmc_gates{suffix}.json"))
+    frequency_measures = json.load(open(DATA / f"frequency_measures{suffix}.json"))
+    flow_df = make_flow_df(list(dict.fromkeys(c["gate"] for c in count_measures)))
+    run_purposes = ["PreS", "Sort"]
+
+    engine = GateExpressionEngine(count_measures, frequency_measures)
+    result = engine.frequency_df(flow_df, SORT_INDEX, run_purposes)
+    expected = query_frequency_df(flow_df, count_measures, frequency_measures, run_purposes)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_engine_sums_gates() -> None:
+    flow_df = make_flow_df(["P1", "P2", "P3"])
+    engine = GateExpressionEngine([], [{"numerator": "P1+P2", "denominator": "P3", "axis_name": "x", "long_name": "x"}])
+    result = engine.frequency_df(flow_df, SORT_INDEX, ["Sort"]).set_index(SORT_INDEX[1:3])["value"]
+    by_gate = flow_df.query("run_purpose=='Sort'").pivot(index=SORT_INDEX[1:3], columns="gate", values="value")
+    expected = (by_gate["P1"] + by_gate["P2"]) / by_gate["P3"] * 100
+    pd.testing.assert_series_equal(result.sort_index(), expected.sort_index(), check_names=False)
+    assert GateSum.parse("P1 + P2").gates == ("P1", "P2")
+    with pytest.raises(ValueError):
+        GateSum.parse("P1+")
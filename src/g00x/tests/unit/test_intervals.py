@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("matplotlib")
+stats = pytest.importorskip("scipy.stats")
+
+from g00x_figures.intervals import (  # noqa: E402
+    binomial_interval,
+    group_positions,
+    proportion_summary,
+)
+
+Z = stats.norm.ppf(0.975)
+SUCCESSES = [0, 1, 3, 7, 10, 25, 50]
+COUNTS = [10, 10, 10, 10, 10, 60, 50]
+
+
+@pytest.mark.parametrize("method, scipy_method", [("wilson", "wilson"), ("clopper-pearson", "exact")])
+def test_binomial_interval_matches_scipy(method: str, scipy_method: str) -> None:
+    low, high = binomial_interval(SUCCESSES, COUNTS, method=method, z=Z)
+    for k, n, lower, upper in zip(SUCCESSES, COUNTS, low, high):
+        expected = stats.binomtest(k, n).proportion_ci(confidence_level=0.95, method=scipy_method)
+        assert lower == pytest.approx(expected.low, abs=1e-9)
+        assert upper == pytest.approx(expected.high, abs=1e-9)
+
+
+def test_agresti_coull_interval() -> None:
+    low, high = binomial_interval(SUCCESSES, COUNTS, method="agresti-coull", z=Z)
+    for k, n, lower, upper in zip(SUCCESSES, COUNTS, low, high):
+        n_adjusted = n + Z**2
+        p = (k + Z**2 / 2) / n_adjusted
+        half = Z * np.sqrt(p * (1 - p) / n_adjusted)
+        assert lower == pytest.approx(max(p - half, 0)) and upper == pytest.approx(min(p + half, 1))
+
+
+def test_groups_without_trials_get_nan() -> None:
+    for method in ["wilson", "clopper-pearson", "agresti-coull"]:
+        low, high = binomial_interval([0, 1], [0, 2], method=method)
+        assert np.isnan(low[0]) and np.isnan(high[0])
+        assert 0 <= low[1] <= 0.5 <= high[1] <= 1
+    with pytest.raises(ValueError, match="Unknown interval method"):
+        binomial_interval([1], [2], method="wald")
+
+
+def test_proportion_summary_and_positions() -> None:
+    data = pd.DataFrame(
+        {
+            "week": [1, 1, 1, 2, 2, 2, 2],
+            "group": ["a", "a", "b", "a", "b", "b", "b"],
+            "responder": [1, 0, 1, 1, 0, 1, np.nan],
+        }
+    )
+    summary = proportion_summary(data, "week", "responder", hue="group")
+    assert summary["count"].tolist() == [2, 1, 1, 2]
+    assert summary["proportion"].tolist() == [0.5, 1.0, 1.0, 0.5]
+    low, high = binomial_interval(summary["sum"], summary["count"])
+    np.testing.assert_allclose(summary["ci_low"], low)
+    np.testing.assert_allclose(summary["yerr_high"], high - summary["proportion"])
+
+    positions = group_positions(data, summary, "week", hue="group", dodge=0.2)
+    np.testing.assert_allclose(positions, [-0.1, 0.1, 0.9, 1.1])
+    np.testing.assert_allclose(group_positions(data, summary, "week", order=[2, 1]), [1, 1, 0, 0])
@@ -0,0 +1,107 @@
+import multiprocessing
+import time
+from pathlib import Path
+
+import pandas as pd
+from click.testing import CliRunner
+
+from g00x.sequencing.executors import QueuedCellranger
+from g00x.tools.job_queue import DONE, FAILED, QUEUED, JobQueue, Worker
+from g00x_client.cli import main
+
+
+def test_leases_heartbeats_and_retries(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite")
+    task_id = queue.submit("cellranger", {"command": []}, max_attempts=2)
+    first = queue.claim("a", lease=0.1)
+    assert first is not None and first.id == task_id and first.attempts == 1
+    assert queue.claim("b", lease=60) is None
+    assert queue.heartbeat(task_id, "a", lease=0.1)
+
+    # a stops heartbeating and b takes over
+    time.sleep(0.2)
+    second = queue.claim("b", lease=60)
+    assert second is not None and second.attempts == 2
+    assert not queue.heartbeat(task_id, "a", lease=60)
+    assert not queue.complete(task_id, "a", {"returncode": 0})
+
+    assert queue.fail(task_id, "b", "boom") == FAILED
+    assert queue.get([task_id])[0].error == "boom"
+    assert queue.claim("b", lease=60) is None
+
+    retried = queue.submit("cellranger", {"command": []}, max_attempts=2)
+    assert queue.claim("a", lease=60).id == retried  # type: ignore
+    assert queue.fail(retried, "a", "boom", retry_delay=60) == QUEUED
+    # not before the retry delay is up
+    assert queue.claim("a", lease=60) is None
+
+
+def _work(path: Path) -> None:
+    Worker(JobQueue(path), lease=5, heartbeat=0.5, poll=0.05, retry_delay=0).run(idle_timeout=1)
+
+
+def test_workers_run_queued_cellranger_calls(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite")
+    executor = QueuedCellranger(queue, backend="simulate", max_attempts=2, poll=0.05)
+    submitted = []
+    for run in range(6):
+        run_dir = tmp_path / f"run{run}"
+        (run_dir / "bcl").mkdir(parents=True)
+        pd.DataFrame({"Lane": ["*"], "Sample": [f"vdj-SI-TT-A{run}"], "index": ["A1"]}).to_csv(
+            run_dir / "sample_sheet.csv", index=False
+        )
+        command = ["cellranger", "mkfastq", "--csv", "sample_sheet.csv", "--run", "bcl", "--id", "demux"]
+        submitted.append(executor.submit(command, run_dir))
+    # missing its sample sheet, it fails on every attempt
+    submitted.append(executor.submit(["cellranger", "mkfastq", "--id", "x"], tmp_path))
+
+    workers = [multiprocessing.Process(target=_work, args=(queue.path,)) for _ in range(3)]
+    for process in workers:
+        process.start()
+    returncodes = executor.wait(submitted)
+    for process in workers:
+        process.join()
+
+    assert returncodes == [0] * 6 + [1]
+    assert all((tmp_path / f"run{run}/demux/outs/fastq_path").is_dir() for run in range(6))
+    assert queue.counts() == {DONE: 6, FAILED: 1}
+    assert queue.get(submitted[-1:])[0].attempts == 2
+
+
+def test_retried_simulated_calls_draw_new_failures(tmp_path: Path) -> None:
+    cost_model = tmp_path / "cost_model.json"
+    cost_model.write_text('{"scale": 0, "failure_rate": 0.5}')
+    queue = JobQueue(tmp_path / "queue.sqlite")
+    executor = QueuedCellranger(queue, backend="simulate", cost_model=cost_model, max_attempts=20, poll=0.05)
+    submitted = []
+    for run in range(6):
+        run_dir = tmp_path / f"run{run}"
+        (run_dir / "bcl").mkdir(parents=True)
+        pd.DataFrame({"Lane": ["*"], "Sample": [f"vdj-SI-TT-A{run}"], "index": ["A1"]}).to_csv(
+            run_dir / "sample_sheet.csv", index=False
+        )
+        command = ["cellranger", "mkfastq", "--csv", "sample_sheet.csv", "--run", "bcl", "--id", "demux"]
+        submitted.append(executor.submit(command, run_dir))
+
+    Worker(queue, lease=5, heartbeat=0.5, poll=0.05, retry_delay=0).run(idle_timeout=0.5)
+    tasks = queue.get(submitted)
+    # every call is drawn anew on a retry, with the same seed they would fail the same way every attempt
+    assert all(task.status == DONE for task in tasks)
+    assert len({task.attempts for task in tasks}) > 1
+
+
+def test_installed_cli_runs_the_worker(tmp_path: Path) -> None:
+    queue = JobQueue(tmp_path / "queue.sqlite")
+    run_dir = tmp_path / "run"
+    (run_dir / "bcl").mkdir(parents=True)
+    pd.DataFrame({"Lane": ["*"], "Sample": ["vdj-SI-TT-A1"], "index": ["A1"]}).to_csv(
+        run_dir / "sample_sheet.csv", index=False
+    )
+    command = ["cellranger", "mkfastq", "--csv", "sample_sheet.csv", "--run", "bcl", "--id", "demux"]
+    submitted = QueuedCellranger(queue, backend="simulate", poll=0.05).submit(command, run_dir)
+
+    args = ["worker", "--queue", str(queue.path), "--poll", "0.05", "--heartbeat", "0.5", "--max-tasks", "1"]
+    result = CliRunner().invoke(main, ["--telemetry-ledger", "", *args])
+    assert result.exit_code == 0, result.output
+    assert "Ran 1 tasks" in result.output
+    assert queue.get([submitted])[0].status == DONE
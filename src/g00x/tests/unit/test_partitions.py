@@ -0,0 +1,76 @@
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from g00x.analysis import partitions
+from g00x.analysis.partitions import PartitionStore, frame_fingerprint
+from g00x.analysis.report import (
+    calculate_sequence_frequency_dataframe,
+    get_top_c_alleles,
+)
+
+
+def make_sequence_df() -> pd.DataFrame:
+    rows = [
+        {"ptid": ptid, "visit_id": visit_id, "top_c_call": top_c_call, "is_vrc01_class": i % 3 == 0}
+        for i, (ptid, visit_id, top_c_call) in enumerate(
+            (ptid, visit_id, top_c_call)
+            for ptid in ["G002516", "G002517"]
+            for visit_id in ["V091", "V201"]
+            for top_c_call in ["IGHM", "IGHG", "IGHA"]
+        )
+    ]
+    sequence_df = pd.DataFrame(rows).assign(
+        run_date="2022-01-01", pubID="P1", group=1, weeks="4", probe_set="eODGT8", sample_type="PBMC"
+    )
+    sequence_df["c_call_heavy"] = sequence_df["top_c_call"] + "*01"
+    return sequence_df
+
+
+def test_only_changed_partitions_are_recomputed(tmp_path: Path) -> None:
+    store = PartitionStore(tmp_path / "partitions")
+    calls: list[pd.DataFrame] = []
+
+    def calculate(partition: pd.DataFrame) -> pd.DataFrame:
+        calls.append(partition)
+        return calculate_sequence_frequency_dataframe(partition, list_of_alleles=alleles)
+
+    sequence_df = make_sequence_df()
+    alleles = get_top_c_alleles(sequence_df).unique().tolist()
+    first = pd.concat(store.run("sequence", calculate, sequence_df)).reset_index(drop=True)
+    assert len(calls) == 4
+
+    # the same rows reuse every saved partition
+    second = pd.concat(store.run("sequence", calculate, sequence_df)).reset_index(drop=True)
+    assert len(calls) == 4
+    pd.testing.assert_frame_equal(first, second)
+
+    # a changed sequence only recomputes its partition
+    sequence_df.loc[0, "is_vrc01_class"] = False
+    store.run("sequence", calculate, sequence_df)
+    assert len(calls) == 5
+    assert calls[-1][["ptid", "visit_id"]].drop_duplicates().values.tolist() == [["G002516", "V091"]]
+
+    # the partitioned report is the report of the whole dataframe, partition by partition
+    whole = calculate_sequence_frequency_dataframe(make_sequence_df())
+    columns = ["ptid", "visit_id", "short_name"]
+    pd.testing.assert_frame_equal(
+        first.sort_values(columns).reset_index(drop=True),
+        whole.sort_values(columns).reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_fingerprint_covers_context_and_unhashable_cells() -> None:
+    df = pd.DataFrame({"sort_pool": [["P01"], ["P01", "P02"]], "value": [1, 2]})
+    assert frame_fingerprint(df) == frame_fingerprint(df.copy())
+    assert frame_fingerprint(df) != frame_fingerprint(df, context="measures")
+    assert frame_fingerprint(df) != frame_fingerprint(df.assign(value=[1, 3]))
+
+
+def test_fingerprint_covers_report_code(monkeypatch: pytest.MonkeyPatch) -> None:
+    df = pd.DataFrame({"value": [1, 2]})
+    before = frame_fingerprint(df)
+    monkeypatch.setattr(partitions, "report_code_fingerprint", lambda: "edited report")
+    assert frame_fingerprint(df) != before
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from g00x.tools.path import (
+    expand_path_columns,
+    get_path_columns,
+    pd_expand_path,
+    pd_replace_home_with_tilde,
+    replace_home_with_tilde_columns,
+)
+
+
+def test_path_columns_match_applymap(tmp_path: Path, monkeypatch) -> None:
+    monkeypatch.setenv("HOME", str(tmp_path))
+    (tmp_path / "runs" / "run1").mkdir(parents=True)
+    df = pd.DataFrame(
+        {
+            "run_dir_path": ["~/runs/run1", "~/runs/run1", "~/runs/missing", np.nan],
+            "vdj_output": [str(tmp_path / "runs"), None, "/not/a/dir", str(tmp_path / "runs")],
+            "ptid": ["G003001", "G003002", "~/runs/run1", "G003004"],
+            "count": [1, 2, 3, 4],
+        }
+    )
+    assert get_path_columns(df) == ["run_dir_path", "vdj_output"]
+
+    expanded = expand_path_columns(df)
+    expected = df.copy()
+    for column in get_path_columns(df):
+        expected[column] = df[column].map(pd_expand_path)
+    pd.testing.assert_frame_equal(expanded, expected)
+    # columns that aren't paths are left alone
+    assert expanded["ptid"].tolist() == df["ptid"].tolist()
+
+    exists_cache: dict[str, bool] = {}
+    replaced = replace_home_with_tilde_columns(expanded, exists_cache=exists_cache)
+    assert replaced["run_dir_path"].tolist()[:3] == ["~/runs/run1", "~/runs/run1", "~/runs/missing"]
+    assert replaced["vdj_output"].tolist()[0] == pd_replace_home_with_tilde(str(tmp_path / "runs"))
+    # every unique path is checked once
+    assert len(exists_cache) == 4
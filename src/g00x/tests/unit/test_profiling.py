@@ -0,0 +1,49 @@
+from pathlib import Path
+
+import click
+from click.testing import CliRunner
+
+from g00x.tools.profiling import profile_options, start_profiling
+from g00x_client.cli import main
+
+
+@click.group("g00x")
+@profile_options
+@click.pass_context
+def group(ctx: click.Context, profile: str | None, profile_dir: str, profile_top: int) -> None:
+    start_profiling(ctx, profile, profile_dir, profile_top)
+
+
+@group.command("work")
+def work() -> None:
+    rows = [list(range(100)) for _ in range(1000)]
+    click.echo(sum(map(sum, rows)))
+
+
+def test_profile_wraps_the_invoked_subcommand(tmp_path: Path) -> None:
+    result = CliRunner().invoke(
+        group, ["--profile", "both", "--profile-dir", str(tmp_path), "--profile-top", "5", "work"]
+    )
+    assert result.exit_code == 0, result.output
+    assert result.output.startswith("4950000\n")
+    # the hotspot table is printed after the subcommand
+    assert "ncalls" in result.output and "allocation sites of g00x work" in result.output
+    assert sorted(path.suffix for path in tmp_path.iterdir()) == [".prof", ".txt"]
+    assert all(path.name.startswith("g00x-work-") for path in tmp_path.iterdir())
+
+
+def test_no_profile_writes_nothing(tmp_path: Path) -> None:
+    result = CliRunner().invoke(group, ["--profile-dir", str(tmp_path), "work"])
+    assert result.exit_code == 0
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_installed_cli_profiles_its_commands(tmp_path: Path) -> None:
+    profiles = tmp_path / "profiles"
+    args = ["--telemetry-ledger", "", "--profile", "cprofile", "--profile-dir", str(profiles)]
+    args += ["worker", "--queue", str(tmp_path / "queue.sqlite"), "--max-tasks", "0"]
+    result = CliRunner().invoke(main, args, prog_name="g00x")
+    assert result.exit_code == 0, result.output
+    assert "cProfile hotspots of g00x worker" in result.output
+    assert [path.suffix for path in profiles.iterdir()] == [".prof"]
+    assert all(path.name.startswith("g00x-worker-") for path in profiles.iterdir())
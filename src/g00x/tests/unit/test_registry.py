@@ -0,0 +1,38 @@
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from g00x.data import Data
+from g00x.tools.registry import ResourceRegistry
+
+
+def test_registry_loads_once_and_reloads_changed_files(tmp_path: Path) -> None:
+    registry = ResourceRegistry()
+    csv = tmp_path / "gates.csv"
+    csv.write_text("hashtag,seq\nHT01,AAAA\n")
+
+    first = registry.copy("gates", csv, pd.read_csv)
+    first.loc[0, "seq"] = "CCCC"
+    second = registry.copy("gates", csv, pd.read_csv)
+    assert registry.loads == 1
+    # copies don't share changes
+    assert second.loc[0, "seq"] == "AAAA"
+
+    csv.write_text("hashtag,seq\nHT01,GGGG\nHT02,TTTT\n")
+    os.utime(csv, ns=(0, 10**9))
+    assert registry.load("gates", csv, pd.read_csv)["seq"].tolist() == ["GGGG", "TTTT"]
+    assert registry.loads == 2
+
+
+def test_data_hto_sequences_are_read_only() -> None:
+    data = Data()
+    hto_sequences = data.get_hto_sequences()
+    assert hto_sequences is data.get_hto_sequences()
+    assert hto_sequences["HT01"] == data.get_hto_gates().loc["HT01", "seq"]
+    with pytest.raises(TypeError):
+        hto_sequences["HT01"] = "AAAA"  # type: ignore
+    # json getters hand out copies
+    data.get_pbmc_gates().clear()
+    assert data.get_pbmc_gates()
@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+
+from g00x.analysis.report import calculate_sequence_frequency_dataframe
+from g00x.analysis.sequence_measures import vrc01_class_measures
+
+GB_COLUMNS = ["run_purpose", "run_date", "pubID", "ptid", "group", "weeks", "visit_id", "probe_set", "sample_type"]
+
+
+def make_sequence_df(n: int = 400) -> pd.DataFrame:
+    rng = np.random.default_rng(1)
+    sequence_df = pd.DataFrame(
+        {
+            "run_date": "2022-01-01",
+            "pubID": "P1",
+            "ptid": rng.choice(["G002516", "G002517", "G002518"], n),
+            "group": 1,
+            "weeks": rng.choice(["-5", "4"], n),
+            "visit_id": "V091",
+            "probe_set": "eODGT8",
+            "sample_type": "PBMC",
+            "top_c_call": rng.choice(["IGHM", "IGHG", "IGHA"], n),
+            "c_call_heavy": rng.choice(["IGHM*01,IGHM*02", "IGHG1*01", "IGHA1*01", None], n),
+            "is_vrc01_class": rng.choice([True, False, None], n, p=[0.3, 0.6, 0.1]),
+        }
+    )
+    # a sample without any VRC01-class sequence
+    sequence_df.loc[sequence_df["ptid"] == "G002518", "is_vrc01_class"] = False
+    return sequence_df
+
+
+def value_counts_measures(sequence_df: pd.DataFrame, column: str, categories: list) -> pd.DataFrame:
+    """The measures as they were built before, one value_counts per sample and category"""
+    collect_series = []
+    for g, g_df in sequence_df.groupby(GB_COLUMNS):
+        for normalize in [False, True]:
+            for category in categories:
+                break_down = (
+                    g_df.query(f"{column}=='{category}'")["is_vrc01_class"]
+                    .value_counts(normalize=normalize)
+                    .reindex([True, False])
+                    .fillna(0)
+                )
+                prefix, long_prefix = ("percent", "Percent") if normalize else ("num", "Number")
+                series = pd.Series(dict(zip(GB_COLUMNS, g)))
+                series["short_name"] = f"{prefix}_{category}_vrc01_class_sequences"
+                series["long_name"] = f"{long_prefix} of {category} sequences that are VRC01-class"
+                series["value"] = break_down[True] * (100 if normalize else 1)
+                series["value_type"] = "sequence measure"
+                series["pbmc_gate_expression"] = ""
+                collect_series.append(series)
+    return pd.DataFrame(collect_series).reset_index(drop=True)
+
+
+def test_measures_match_value_counts_per_category() -> None:
+    sequence_df = make_sequence_df().assign(run_purpose="Sort")
+    categories = ["IGHM", "IGHG", "IGHA", "IGHD"]
+    result = vrc01_class_measures(sequence_df, GB_COLUMNS, "top_c_call", categories)
+    expected = value_counts_measures(sequence_df, "top_c_call", categories)
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_sequence_frequency_dataframe() -> None:
+    remade = calculate_sequence_frequency_dataframe(make_sequence_df())
+    by_name = remade.query("ptid=='G002518' and weeks=='4'").set_index("short_name")["value"]
+    assert by_name["num_igdneg_vrc01_class_sequences"] == 0
+    assert by_name["percent_IGHD_vrc01_class_sequences"] == 0
+    assert by_name["num_None_vrc01_class_sequences"] == 0
+
+    sample = remade.query("ptid=='G002516' and weeks=='-5'").set_index("short_name")["value"]
+    isotypes = sample[[f"num_{isotype}_vrc01_class_sequences" for isotype in ["IGHM", "IGHG", "IGHA", "IGHD"]]]
+    assert isotypes.sum() == sample["num_igdneg_vrc01_class_sequences"]
+    assert sample["num_sequences"] == len(make_sequence_df().query("ptid=='G002516' and weeks=='-5'"))
@@ -0,0 +1,108 @@
+import gzip
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from g00x.analysis.report import combine_seq_and_flow
+from g00x.benchmarks.suite import compare, run_suite
+from g00x.benchmarks.synthetic import SyntheticTrial, TrialScale
+from g00x.data import Data
+from g00x.flow.flow import parse_flow_data
+from g00x.flow.g003_flow import pull_flow_from_validation
+from g00x.tools.telemetry import telemetry
+from g00x.validations.g003_flow_validation import validate_g003_sorting
+from g00x.validations.g003_sequencing_validation import validate_g003_sequencing
+from g00x.validations.sequencing_validation import validate_sequencing
+from g00x_client.cli import main
+
+
+@pytest.fixture(scope="module")
+def trial() -> SyntheticTrial:
+    return SyntheticTrial(TrialScale(factor=0.1, cells_per_sample=20), seed=1)
+
+
+@pytest.fixture(scope="module")
+def paths(trial: SyntheticTrial, tmp_path_factory: pytest.TempPathFactory) -> dict:
+    # tmp_path names a test with _, which the G002 Illumina folder validation doesn't allow
+    return trial.write(tmp_path_factory.mktemp("synthetic"), tables=False)
+
+
+def test_synthetic_trial_passes_validation_and_parsing(trial: SyntheticTrial, paths: dict) -> None:
+    data = Data()
+    flow = parse_flow_data(data, paths["g002"].flow)
+    assert set(flow["ptid"]) == set(trial.g002_samples["ptid"])
+    assert flow["value"].notna().all()
+
+    validation = validate_g003_sorting(paths["g003"].flow, capture=True)
+    g003_flow = pull_flow_from_validation(
+        validation, {}, data.get_g003_ptid_prefix_2_group(), data.get_g003_visit_id_2_week()
+    )
+    assert set(g003_flow["ptid"]) == set(trial.g003_samples["ptid"])
+
+    assert validate_sequencing(paths["g002"].sequencing)["pool_number"].nunique() <= trial.scale.pools_per_sort
+    assert len(validate_g003_sequencing(paths["g003"].sequencing)) == trial.scale.samples
+
+    frame = trial.pool_frame("g002", paths["g002"])
+    for cso_output in frame["cso_output"].unique():
+        features = gzip.open(Path(cso_output) / "outs/filtered_feature_bc_matrix/features.tsv.gz", "rt").read()
+        assert features.count("Antibody Capture") == (frame["cso_output"] == cso_output).sum()
+    for vdj_output in frame["vdj_output"].unique():
+        assert (Path(vdj_output) / "outs/filtered_contig.fasta").exists()
+
+
+def test_synthetic_airr_tables_are_consistent(trial: SyntheticTrial, paths: dict) -> None:
+    # the same seed draws the same trial
+    assert SyntheticTrial(trial.scale, seed=1).contigs("g002").equals(trial.contigs("g002"))
+    contigs = trial.contigs("g002")
+    assert contigs["sequence_id"].is_unique
+
+    airr = trial.paired_airr_table("g002")
+    assert airr["cellid"].is_unique
+    assert (airr["locus_heavy"] == "IGH").all() and airr["locus_light"].isin(["IGK", "IGL"]).all()
+    # cells with a second light chain or an unproductive heavy chain aren't paired
+    assert len(airr) < len(trial.cells("g002"))
+
+    _, long_name, _ = combine_seq_and_flow(Data(), airr, parse_flow_data(Data(), paths["g002"].flow))
+    assert len(long_name) == trial.scale.samples
+
+
+def test_benchmark_suite_records_and_compares(tmp_path_factory: pytest.TempPathFactory) -> None:
+    workdir = tmp_path_factory.mktemp("trials")
+    results = workdir / "results.jsonl"
+    summary = run_suite(
+        [TrialScale(factor=0.05, cells_per_sample=10)],
+        workdir=workdir,
+        results=results,
+        benchmarks=["validate_g002_flow", "validate_g003_sequencing"],
+        repeat=2,
+    )
+    assert (summary["status"] == "ok").all()
+    assert summary["seconds"].map(len).tolist() == [2, 2]
+    commit = summary["commit"].iloc[0]
+    if commit is not None:
+        comparison = compare(results, commit, commit)
+        assert (comparison["speedup"] == 1).all()
+
+
+def test_installed_cli_generates_a_trial(tmp_path_factory: pytest.TempPathFactory) -> None:
+    out = tmp_path_factory.mktemp("cli") / "trial"
+    args = ["benchmark", "generate", "--out", str(out), "--scale", "0.05", "--cells-per-sample", "10", "--no-tables"]
+    result = CliRunner().invoke(main, ["--telemetry-ledger", "", *args])
+    assert result.exit_code == 0, result.output
+    assert "g002 flow:" in result.output and "g003 sequencing:" in result.output
+    assert any(out.iterdir())
+
+
+def test_installed_cli_records_telemetry(paths: dict, tmp_path: Path) -> None:
+    click_runner = CliRunner()
+    ledger = tmp_path / "telemetry.jsonl"
+    args = ["--telemetry-ledger", str(ledger), "g002", "validate", "flow", "--no-snapshot", str(paths["g002"].flow)]
+    result = click_runner.invoke(main, args, prog_name="g00x")
+    assert result.exit_code == 0, result.output
+    run_id = telemetry.run_id
+
+    result = click_runner.invoke(main, ["--telemetry-ledger", str(ledger), "telemetry", "summary"], prog_name="g00x")
+    assert result.exit_code == 0, result.output
+    assert run_id in result.output
+    assert "g00x g002 validate flow" in result.output
@@ -0,0 +1,66 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from g00x.tools.telemetry import Telemetry, summarize
+
+
+def test_stages_are_written_to_the_ledger_and_summarized(tmp_path: Path) -> None:
+    ledger = tmp_path / "telemetry.jsonl"
+    telemetry = Telemetry()
+    telemetry.configure(ledger, run_id="run1")
+
+    with telemetry.stage("g00x g003 pipeline vdj"):
+        telemetry.annotate(rows_in=10, rows_out=8)
+        for task in ["vdj_output_0001", "vdj_output_0002"]:
+            with telemetry.stage("cellranger vdj", task=task):
+                subprocess.run([sys.executable, "-c", "sum(range(10**6))"], check=True)
+    with pytest.raises(ValueError):
+        with telemetry.stage("cellranger count", task="cso_output_0001"):
+            raise ValueError("cellranger failed")
+
+    records = [json.loads(line) for line in ledger.read_text().splitlines()]
+    # inner stages are written as they end
+    assert [record["stage"] for record in records] == [
+        "cellranger vdj",
+        "cellranger vdj",
+        "g00x g003 pipeline vdj",
+        "cellranger count",
+    ]
+    assert records[0]["parent"] == "g00x g003 pipeline vdj"
+    assert records[0]["children"]["user_seconds"] + records[0]["children"]["system_seconds"] > 0
+    assert records[0]["process_peak_rss_bytes"] > 0
+    assert 0 <= records[0]["peak_rss_growth_bytes"] <= records[0]["process_peak_rss_bytes"]
+    assert records[-1]["status"] == "failed"
+
+    telemetry.configure(ledger, run_id="run2")
+    with telemetry.stage("g00x g003 pipeline vdj"):
+        pass
+
+    summary = summarize(ledger, run_id="run1")
+    assert summary.loc[("run1", "cellranger vdj"), "tasks"] == 2
+    assert summary.loc[("run1", "g00x g003 pipeline vdj"), "rows_out"] == 8
+    assert summary.loc[("run1", "cellranger count"), "failed"] == 1
+    assert summarize(ledger).index.get_level_values("run_id").unique().tolist() == ["run1", "run2"]
+
+
+def test_no_ledger_records_nothing(tmp_path: Path) -> None:
+    telemetry = Telemetry()
+    with telemetry.stage("g00x g002 pipeline flow") as record:
+        telemetry.annotate(rows_out=3)
+    assert record.rows_out == 3
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_stages_below_an_earlier_peak_record_no_growth() -> None:
+    telemetry = Telemetry()
+    with telemetry.stage("load") as load:
+        buffer = bytearray(64 * 2**20)
+    del buffer
+    with telemetry.stage("report") as report:
+        pass
+    assert report.process_peak_rss_bytes >= load.process_peak_rss_bytes
+    assert report.peak_rss_growth_bytes == 0
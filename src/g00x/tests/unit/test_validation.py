@@ -0,0 +1,78 @@
+from pathlib import Path
+
+import pytest
+
+from g00x.validations import snapshot as snapshot_module
+from g00x.validations.flow_validation import (
+    collect_g00x_box,
+    report_g00x_box,
+    validate_g00x_box,
+)
+
+CLINICAL_SUMMARY = "Sort_220101_S01_G002516_V091_eODGT8_PBMC_HT01_DV_Summary_T1_P01_a.csv"
+CLINICAL_SCREENSHOT = "Sort_220101_S01_G002516_V091_eODGT8_PBMC_HT01_DV_Capture_T1_P01_a.png"
+
+
+def make_box(tmp_path: Path, file_names: list[str], screenshots: list[str] = []) -> Path:
+    """Make a minimal G002 box tree with clinical population summary files and screenshots"""
+    root = tmp_path / "G002"
+    clinical_dir = root / "Sorts" / "Sort_RunDate220101_UploadDate220102" / "ClinicalSamples"
+    for folder, names in [("PopulationSummaryFilesFromDV", file_names), ("ScreenshotsFromDV", screenshots)]:
+        (clinical_dir / folder).mkdir(parents=True)
+        for file_name in names:
+            (clinical_dir / folder / file_name).write_text("Population,Parent Name,#Events\n")
+    return root
+
+
+def test_bulk_validation_builds_population_models(tmp_path: Path) -> None:
+    validation = validate_g00x_box(make_box(tmp_path, [CLINICAL_SUMMARY]))
+    population_files = validation.get_population_sort_files().data
+    assert len(population_files) == 1
+    model = population_files[0].data
+    assert model.group == 1
+    assert model.weeks == "-5"
+    assert str(model.run_date) == "2022-01-01"
+
+
+def test_bulk_validation_raises_model_error(tmp_path: Path) -> None:
+    bad_visit = CLINICAL_SUMMARY.replace("V091", "V999")
+    with pytest.raises(ValueError, match="Visit ID must be one of the following"):
+        validate_g00x_box(make_box(tmp_path, [CLINICAL_SUMMARY, bad_visit]))
+
+
+def test_report_collects_every_error_and_reuses_snapshot(tmp_path: Path) -> None:
+    bad_visit = CLINICAL_SCREENSHOT.replace("V091", "V999")
+    bad_subset = CLINICAL_SCREENSHOT.replace("_a.png", "_z.png")
+    root = make_box(tmp_path, [CLINICAL_SUMMARY], [CLINICAL_SCREENSHOT, bad_visit, bad_subset])
+    snapshot_path = tmp_path / "snapshot.json"
+
+    report = report_g00x_box(root, snapshot_path)
+    assert len(report.issues) == 2
+    assert report.files_revalidated == 4
+    report.write(tmp_path / "report")
+    assert (tmp_path / "report.json").exists() and (tmp_path / "report.txt").exists()
+
+    # only the population summary file, which we always need a model for, is validated again
+    report = report_g00x_box(root, snapshot_path)
+    assert len(report.issues) == 2
+    assert report.files_revalidated == 1
+
+
+def test_collected_validation_keeps_population_files(tmp_path: Path) -> None:
+    root = make_box(tmp_path, [CLINICAL_SUMMARY], [CLINICAL_SCREENSHOT])
+    validation = collect_g00x_box(root, tmp_path / "snapshot.json", capture=True)
+    assert validation.report is not None and validation.report.passed
+    assert len(validation.get_population_sort_files().data) == 1
+
+
+def test_snapshot_is_dropped_when_validator_code_changes(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    root = make_box(tmp_path, [CLINICAL_SUMMARY], [CLINICAL_SCREENSHOT])
+    snapshot_path = tmp_path / "snapshot.json"
+    validator = tmp_path / "validator.py"
+    validator.write_text("CHECKS = 1\n")
+    monkeypatch.setattr(snapshot_module, "validator_sources", lambda: [validator])
+    assert report_g00x_box(root, snapshot_path).files_revalidated == 2
+    assert report_g00x_box(root, snapshot_path).files_revalidated == 1
+
+    validator.write_text("CHECKS = 2\n")
+    assert report_g00x_box(root, snapshot_path).files_revalidated == 2
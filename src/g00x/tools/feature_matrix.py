@@ -0,0 +1,34 @@
+"""
+Barcodes and feature barcode matrices in the formats cellranger writes them, for the outs of simulated runs.
+"""
+import gzip
+from pathlib import Path
+
+import numpy as np
+
+NUCLEOTIDES = b"ACGT"
+
+
+def unique_barcodes(n: int, offset: int = 0) -> np.ndarray:
+    """n distinct 10x barcodes, scattered over the barcode space by an odd multiplier modulo 4**16"""
+    index = (np.arange(offset, offset + n, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(4**16)
+    digits = ((index[:, None] >> (np.uint64(2) * np.arange(16, dtype=np.uint64))) & np.uint64(3)).astype(np.uint8)
+    codes = np.frombuffer(NUCLEOTIDES, dtype=np.uint8)[digits]
+    return np.char.add(codes.view("S16").ravel().astype(str), "-1")
+
+
+def write_feature_matrix(directory: Path, features: list[str], barcodes: np.ndarray, counts: np.ndarray) -> None:
+    """A gzipped Matrix Market feature barcode matrix, features x barcodes, like the one cellranger count writes"""
+    directory.mkdir(parents=True, exist_ok=True)
+    rows, columns = np.nonzero(counts)
+    lines = [
+        "%%MatrixMarket matrix coordinate integer general",
+        f"{counts.shape[0]} {counts.shape[1]} {len(rows)}",
+    ]
+    lines += [f"{r + 1} {c + 1} {v}" for r, c, v in zip(rows, columns, counts[rows, columns])]
+    with gzip.open(directory / "matrix.mtx.gz", "wt") as f:
+        f.write("\n".join(lines) + "\n")
+    with gzip.open(directory / "features.tsv.gz", "wt") as f:
+        f.writelines(f"{feature}\t{feature}\tAntibody Capture\n" for feature in features)
+    with gzip.open(directory / "barcodes.tsv.gz", "wt") as f:
+        f.writelines(f"{barcode}\n" for barcode in barcodes)
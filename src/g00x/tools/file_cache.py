@@ -0,0 +1,113 @@
+"""
+In-process, size-bounded LRU of file contents shared between validation and parsing.
+
+Entries are keyed by path, mtime and size, so a file changed on disk is never served stale. Both the
+raw bytes and tables parsed from them can be cached; parsed tables are shared, so callers must not
+mutate them in place.
+"""
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Hashable
+
+import pandas as pd
+
+logger = logging.getLogger("FileCache")
+
+DEFAULT_MAX_BYTES = 512 * 2**20
+
+
+class FileCache:
+    """A least recently used cache of file bytes and parsed tables bounded by total size in bytes"""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[Hashable, ...], tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str | Path, *extra: Hashable) -> tuple[Hashable, ...]:
+        stat = os.stat(path)
+        return (str(Path(path).absolute()), stat.st_mtime_ns, stat.st_size, *extra)
+
+    def get(self, key: tuple[Hashable, ...]) -> Any | None:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return self._entries[key][0]
+
+    def put(self, key: tuple[Hashable, ...], value: Any, nbytes: int) -> None:
+        """Add an entry, evicting the least recently used ones to stay under max_bytes"""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (value, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_bytes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def read_bytes(self, path: str | Path) -> bytes:
+        """Read a file through the cache"""
+        key = self.key(path, "bytes")
+        content = self.get(key)
+        if content is None:
+            content = Path(path).read_bytes()
+            self.put(key, content, len(content))
+        return content
+
+    def read_text(self, path: str | Path) -> str:
+        """Read a file through the cache as text with universal newlines, like open(path).read()"""
+        return io.StringIO(self.read_bytes(path).decode(), newline=None).read()
+
+    def read_table(
+        self, path: str | Path, reader: Callable[[io.BytesIO], pd.DataFrame], *reader_key: Hashable
+    ) -> pd.DataFrame:
+        """Parse a file through the cache
+
+        Parameters
+        ----------
+        path : str | Path
+            File to parse
+        reader : Callable
+            Parses the file bytes into a dataframe, e.g. lambda f: pd.read_csv(f, skiprows=4)
+        reader_key : Hashable
+            Identifies how reader parses the file so different parses are cached separately
+        """
+        key = self.key(path, "table", *reader_key)
+        table = self.get(key)
+        if table is None:
+            table = reader(io.BytesIO(self.read_bytes(path)))
+            self.put(key, table, int(table.memory_usage(deep=True).sum()))
+        return table
+
+    def prefetch(self, paths: list[Path], workers: int = 1) -> None:
+        """Read files into the cache, concurrently since on network mounts reads are mostly waiting"""
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self.read_bytes, paths))
+        else:
+            for path in paths:
+                self.read_bytes(path)
+        logger.debug(f"File cache holds {self.current_bytes} bytes after prefetching {len(paths)} files")
+
+
+# the process wide cache used by validation and parsing
+file_cache = FileCache()
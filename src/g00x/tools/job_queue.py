@@ -0,0 +1,378 @@
+"""
+A job queue the pipeline stages submit tasks to and `g00x worker` processes on several nodes pull from.
+
+The queue is a SQLite database on the filesystem the nodes share, so it needs no service to run. A worker leases
+the task it claims and heartbeats to keep the lease; a task whose lease runs out, e.g. its worker was killed, goes
+back on the queue. A task that raises is retried until it used up its attempts and is failed after that. SQLite
+relies on the locks of the filesystem, which NFS mounts don't always honor, keep the database on one that does.
+"""
+import importlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+logger = logging.getLogger("JobQueue")
+
+# kind -> module:function of the handler, imported by the worker that runs the task
+HANDLERS: dict[str, str] = {
+    "cellranger": "g00x.sequencing.executors:run_cellranger_task",
+    "sadie_airr": "g00x.sequencing.airr:run_sadie_airr_task",
+}
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    available REAL NOT NULL,
+    lease_expires REAL,
+    heartbeat REAL,
+    result TEXT,
+    error TEXT,
+    submitted REAL NOT NULL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, available);
+"""
+
+
+@dataclass
+class Task:
+    """A task as it is in the queue"""
+
+    id: int
+    kind: str
+    payload: dict[str, Any]
+    status: str
+    attempts: int
+    max_attempts: int
+    worker: str | None
+    result: dict[str, Any] | None
+    error: str | None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "Task":
+        return cls(
+            id=row["id"],
+            kind=row["kind"],
+            payload=json.loads(row["payload"]),
+            status=row["status"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            worker=row["worker"],
+            result=json.loads(row["result"]) if row["result"] else None,
+            error=row["error"],
+        )
+
+
+class JobQueue:
+    """Tasks in a SQLite database shared by the nodes
+
+    Parameters
+    ----------
+    path : str | Path
+        The database, created with its parent directory if it doesn't exist
+    timeout : float
+        Seconds to wait for another process to release the database
+    """
+
+    def __init__(self, path: str | Path, timeout: float = 60.0) -> None:
+        self.path = Path(path).expanduser().absolute()
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        connection = self.connect()
+        try:
+            connection.executescript(_SCHEMA)
+        finally:
+            connection.close()
+
+    def connect(self) -> sqlite3.Connection:
+        # connections aren't shared between threads, a heartbeat runs next to its task
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        return connection
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self.connect()
+        try:
+            # take the write lock up front so two workers can't claim the same task
+            connection.execute("BEGIN IMMEDIATE")
+            yield connection
+            connection.execute("COMMIT")
+        except BaseException:
+            if connection.in_transaction:
+                connection.execute("ROLLBACK")
+            raise
+        finally:
+            connection.close()
+
+    def submit(self, kind: str, payload: dict[str, Any], max_attempts: int = 3) -> int:
+        """Put a task on the queue and return its id"""
+        if kind not in HANDLERS:
+            raise ValueError(f"{kind} is not a task kind, choose from {list(HANDLERS)}")
+        now = time.time()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "INSERT INTO tasks (kind, payload, status, max_attempts, available, submitted) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(payload), QUEUED, max_attempts, now, now),
+            )
+        task_id = int(cursor.lastrowid)  # type: ignore
+        logger.debug(f"Submitted {kind} task {task_id}")
+        return task_id
+
+    @staticmethod
+    def _expire(connection: sqlite3.Connection, now: float) -> None:
+        """Put tasks whose worker stopped heartbeating back on the queue, or fail them if out of attempts"""
+        connection.execute(
+            f"""
+            UPDATE tasks SET
+                status = CASE WHEN attempts >= max_attempts THEN '{FAILED}' ELSE '{QUEUED}' END,
+                error = 'lease of ' || worker || ' expired',
+                finished = CASE WHEN attempts >= max_attempts THEN ? ELSE NULL END,
+                worker = NULL,
+                available = ?
+            WHERE status = '{RUNNING}' AND lease_expires < ?
+            """,
+            (now, now, now),
+        )
+
+    def claim(self, worker: str, lease: float, kinds: list[str] | None = None) -> Task | None:
+        """Lease the oldest available task to worker, None if there is none"""
+        now = time.time()
+        kinds = kinds or list(HANDLERS)
+        with self.transaction() as connection:
+            self._expire(connection, now)
+            row = connection.execute(
+                f"SELECT id FROM tasks WHERE status = ? AND available <= ? AND kind IN ({','.join('?' * len(kinds))}) "
+                "ORDER BY id LIMIT 1",
+                (QUEUED, now, *kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            connection.execute(
+                "UPDATE tasks SET status = ?, worker = ?, attempts = attempts + 1, lease_expires = ?, heartbeat = ? "
+                "WHERE id = ?",
+                (RUNNING, worker, now + lease, now, row["id"]),
+            )
+            claimed = connection.execute("SELECT * FROM tasks WHERE id = ?", (row["id"],)).fetchone()
+        return Task.from_row(claimed)
+
+    def heartbeat(self, task_id: int, worker: str, lease: float) -> bool:
+        """Extend the lease, False if the worker lost it"""
+        now = time.time()
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET lease_expires = ?, heartbeat = ? WHERE id = ? AND worker = ? AND status = ?",
+                (now + lease, now, task_id, worker, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: int, worker: str, result: dict[str, Any]) -> bool:
+        """Record the result, False if the worker lost the lease and the task is another worker's"""
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                "UPDATE tasks SET status = ?, result = ?, error = NULL, finished = ? "
+                "WHERE id = ? AND worker = ? AND status = ?",
+                (DONE, json.dumps(result), time.time(), task_id, worker, RUNNING),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, task_id: int, worker: str, error: str, retry_delay: float = 0.0) -> str | None:
+        """Retry the task after retry_delay times its attempts, or fail it once they are used up
+
+        Returns the status it got, None if the worker lost the lease
+        """
+        now = time.time()
+        with self.transaction() as connection:
+            row = connection.execute(
+                "SELECT attempts, max_attempts FROM tasks WHERE id = ? AND worker = ? AND status = ?",
+                (task_id, worker, RUNNING),
+            ).fetchone()
+            if row is None:
+                return None
+            status = FAILED if row["attempts"] >= row["max_attempts"] else QUEUED
+            connection.execute(
+                "UPDATE tasks SET status = ?, error = ?, worker = NULL, available = ?, finished = ? WHERE id = ?",
+                (
+                    status,
+                    error,
+                    now + retry_delay * row["attempts"],
+                    now if status == FAILED else None,
+                    task_id,
+                ),
+            )
+        return status
+
+    def get(self, task_ids: list[int]) -> list[Task]:
+        """The tasks in the order of their ids, expiring lost leases first"""
+        with self.transaction() as connection:
+            self._expire(connection, time.time())
+            rows = connection.execute(
+                f"SELECT * FROM tasks WHERE id IN ({','.join('?' * len(task_ids))})", task_ids
+            ).fetchall()
+        tasks = {row["id"]: Task.from_row(row) for row in rows}
+        return [tasks[task_id] for task_id in task_ids]
+
+    def wait(self, task_ids: list[int], poll: float = 5.0, timeout: float | None = None) -> list[Task]:
+        """Block until every task is done or failed
+
+        Raises
+        ------
+        TimeoutError
+            If the tasks haven't finished within timeout seconds, e.g. because no worker is running
+        """
+        start = time.monotonic()
+        while True:
+            tasks = self.get(task_ids) if task_ids else []
+            if all(task.status in (DONE, FAILED) for task in tasks):
+                return tasks
+            if timeout is not None and time.monotonic() - start > timeout:
+                pending = [task.id for task in tasks if task.status not in (DONE, FAILED)]
+                raise TimeoutError(f"Tasks {pending} didn't finish in {timeout} seconds, are workers running?")
+            time.sleep(poll)
+
+    def counts(self) -> dict[str, int]:
+        """Number of tasks in each status"""
+        with self.transaction() as connection:
+            self._expire(connection, time.time())
+            rows = connection.execute("SELECT status, COUNT(*) AS n FROM tasks GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+
+_running = threading.local()
+
+
+def current_task() -> Task | None:
+    """The task a worker is running in this thread, for handlers that depend on its id or attempt"""
+    return getattr(_running, "task", None)
+
+
+def get_handler(kind: str) -> Callable[[dict[str, Any]], dict[str, Any]]:
+    """Import the handler of a task kind"""
+    module, function = HANDLERS[kind].split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+def run_tasks(
+    queue: JobQueue, kind: str, payloads: list[dict[str, Any]], max_attempts: int = 3, poll: float = 5.0
+) -> list[Task]:
+    """Submit a task per payload and wait for all of them, in the order of the payloads"""
+    task_ids = [queue.submit(kind, payload, max_attempts=max_attempts) for payload in payloads]
+    logger.info(f"Submitted {len(task_ids)} {kind} tasks to {queue.path}, waiting for workers")
+    return queue.wait(task_ids, poll=poll)
+
+
+class Worker:
+    """Pulls tasks from the queue and runs them until stopped
+
+    Parameters
+    ----------
+    queue : JobQueue
+        The queue to pull from
+    name : str | None
+        Unique name of the worker, by default host:pid
+    lease : float
+        Seconds a task is leased for, a task whose worker doesn't heartbeat within it is run again
+    heartbeat : float
+        Seconds between heartbeats, well under the lease
+    poll : float
+        Seconds to wait before looking again when the queue is empty
+    retry_delay : float
+        Seconds before a failed task is retried, times its attempts
+    kinds : list[str] | None
+        Only run these kinds of task, by default all
+    """
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        name: str | None = None,
+        lease: float = 300.0,
+        heartbeat: float = 60.0,
+        poll: float = 5.0,
+        retry_delay: float = 30.0,
+        kinds: list[str] | None = None,
+    ) -> None:
+        if heartbeat >= lease:
+            raise ValueError(f"heartbeat {heartbeat} must be shorter than the lease {lease}")
+        self.queue = queue
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease
+        self.heartbeat = heartbeat
+        self.poll = poll
+        self.retry_delay = retry_delay
+        self.kinds = kinds
+
+    def _heartbeat(self, task: Task, stop: threading.Event) -> None:
+        while not stop.wait(self.heartbeat):
+            if not self.queue.heartbeat(task.id, self.name, self.lease):
+                logger.warning(f"{self.name} lost the lease of task {task.id}")
+                return
+
+    def execute(self, task: Task) -> bool:
+        """Run a claimed task, heartbeating while it runs, and record how it went"""
+        logger.info(f"{self.name} running {task.kind} task {task.id}, attempt {task.attempts}/{task.max_attempts}")
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(task, stop), daemon=True)
+        heartbeat.start()
+        _running.task = task
+        try:
+            result = get_handler(task.kind)(task.payload)
+        except Exception as e:
+            error = "".join(traceback.format_exception_only(type(e), e)).strip()
+            status = self.queue.fail(task.id, self.name, error, retry_delay=self.retry_delay)
+            logger.error(f"{task.kind} task {task.id} failed: {error}, it is now {status}")
+            return False
+        finally:
+            _running.task = None
+            stop.set()
+            heartbeat.join()
+        if not self.queue.complete(task.id, self.name, result):
+            logger.warning(f"{self.name} finished task {task.id} after losing its lease, dropping the result")
+            return False
+        return True
+
+    def run(self, max_tasks: int | None = None, idle_timeout: float | None = None) -> int:
+        """Pull and run tasks, returning how many ran
+
+        Parameters
+        ----------
+        max_tasks : int | None
+            Stop after this many tasks, by default never
+        idle_timeout : float | None
+            Stop once the queue had nothing to run for this many seconds, by default never
+        """
+        logger.info(f"Worker {self.name} pulling from {self.queue.path}")
+        ran = 0
+        idle_since = time.monotonic()
+        while max_tasks is None or ran < max_tasks:
+            task = self.queue.claim(self.name, self.lease, self.kinds)
+            if task is None:
+                if idle_timeout is not None and time.monotonic() - idle_since > idle_timeout:
+                    break
+                time.sleep(self.poll)
+                continue
+            self.execute(task)
+            ran += 1
+            idle_since = time.monotonic()
+        logger.info(f"Worker {self.name} stopping after {ran} tasks")
+        return ran
@@ -1,7 +1,9 @@
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable
 
+import numpy as np
+import pandas as pd
 from pandera.typing import DataFrame, Index, Series
 
 
@@ -98,3 +100,124 @@ def pd_expand_path(x: Series[Any]) -> Series[Any]:
     except ValueError:
         return x
     return x
+
+
+# columns holding paths, by name or by name suffix, the only columns path normalization touches
+PATH_COLUMNS: tuple[str, ...] = ("path", "run_dir", "file_path")
+PATH_COLUMN_SUFFIXES: tuple[str, ...] = ("_path", "_dir", "_output", "_folder")
+
+
+def get_path_columns(df: pd.DataFrame) -> list[str]:
+    """The declared path columns of a dataframe"""
+    return [c for c in df.columns if isinstance(c, str) and (c in PATH_COLUMNS or c.endswith(PATH_COLUMN_SUFFIXES))]
+
+
+def _absolute(x: Path | str) -> Path:
+    """Expands a path with the same rules as pathing without checking it exists"""
+    path = Path(x)
+    if str(path)[0] == "~":
+        path = path.expanduser()
+    if str(path)[0] == ".":
+        return path.resolve()
+    return path.absolute()
+
+
+def _cached_exists(exists_cache: dict[str, bool] | None) -> Callable[[Path], bool]:
+    """An existence check that stats each path at most once per cache"""
+    cache = {} if exists_cache is None else exists_cache
+
+    def exists(path: Path) -> bool:
+        key = str(path)
+        if key not in cache:
+            cache[key] = path.exists()
+        return cache[key]
+
+    return exists
+
+
+def _map_unique(df: pd.DataFrame, columns: list[str] | None, convert: Callable[[Any], Any]) -> pd.DataFrame:
+    """Convert every value of the path columns, once per unique value"""
+    df = df.copy()
+    for column in get_path_columns(df) if columns is None else columns:
+        if df[column].dtype.kind not in "OSU":
+            continue
+        try:
+            codes, uniques = pd.factorize(df[column])
+        except TypeError:
+            # unhashable cells
+            df[column] = df[column].map(convert)
+            continue
+        converted = np.empty(len(uniques) + 1, dtype=object)
+        converted[:-1] = [convert(x) for x in uniques]
+        # missing values have code -1 and are kept as they are
+        values = converted[codes]
+        values[codes == -1] = df[column].to_numpy()[codes == -1]
+        df[column] = values
+    return df
+
+
+def expand_path_columns(
+    df: pd.DataFrame, columns: list[str] | None = None, exists_cache: dict[str, bool] | None = None
+) -> pd.DataFrame:
+    """Expands ~ and relative paths of existing files in the path columns, like applymap(pd_expand_path)
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to expand paths in, it is not changed
+    columns : list[str] | None
+        The columns to expand, by default the declared path columns
+    exists_cache : dict[str, bool] | None
+        Existence of paths already checked, shared between calls to save stat calls
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of df with expanded paths
+    """
+    exists = _cached_exists(exists_cache)
+
+    def expand(x: Any) -> Any:
+        if not isinstance(x, (Path, str)) or len(str(x)) > 256 or not str(x):
+            return x
+        path = _absolute(x)
+        return str(path) if exists(path) else x
+
+    return _map_unique(df, columns, expand)
+
+
+def replace_home_with_tilde_columns(
+    df: pd.DataFrame, columns: list[str] | None = None, exists_cache: dict[str, bool] | None = None
+) -> pd.DataFrame:
+    """Replaces the home directory with ~ for existing files in the path columns, like
+    applymap(pd_replace_home_with_tilde)
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        The dataframe to replace paths in, it is not changed
+    columns : list[str] | None
+        The columns to replace paths in, by default the declared path columns
+    exists_cache : dict[str, bool] | None
+        Existence of paths already checked, shared between calls to save stat calls
+
+    Returns
+    -------
+    pd.DataFrame
+        A copy of df with paths relative to ~
+    """
+    exists = _cached_exists(exists_cache)
+    home = Path.home()
+
+    def replace(x: Any) -> Any:
+        if not isinstance(x, (Path, str)) or len(str(x)) > 256 or not str(x):
+            return x
+        path = _absolute(x)
+        if not exists(path):
+            return x
+        try:
+            return str("~" / path.relative_to(home))
+        except ValueError:
+            return x
+
+    return _map_unique(df, columns, replace)
@@ -0,0 +1,150 @@
+"""
+Opt-in profiling of a CLI invocation with cProfile, tracemalloc or both.
+
+A command group starts a Profiler in its callback and stops it when its context closes, so the profile covers
+the invoked subcommand. Profiles are written to a directory and a short hotspot table is printed at exit.
+"""
+import cProfile
+import io
+import logging
+import pstats
+import re
+import time
+import tracemalloc
+from pathlib import Path
+
+import click
+
+logger = logging.getLogger("Profiling")
+
+PROFILE_MODES = ["cprofile", "tracemalloc", "both"]
+
+
+class Profiler:
+    """Profiles everything between start and stop
+
+    Parameters
+    ----------
+    mode : str
+        cprofile, tracemalloc or both
+    outdir : Path
+        Directory the .prof file and the allocation snapshot are written to
+    top : int
+        Number of functions and allocation sites in the hotspot table and the snapshot
+    """
+
+    def __init__(self, mode: str, outdir: Path, top: int = 20) -> None:
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"{mode} is not one of {PROFILE_MODES}")
+        self.mode = mode
+        self.outdir = Path(outdir)
+        self.top = top
+        self._profile: cProfile.Profile | None = None
+        self._started_tracemalloc = False
+
+    @property
+    def cprofile(self) -> bool:
+        return self.mode in ("cprofile", "both")
+
+    @property
+    def tracemalloc(self) -> bool:
+        return self.mode in ("tracemalloc", "both")
+
+    def start(self) -> None:
+        if self.tracemalloc and not tracemalloc.is_tracing():
+            tracemalloc.start(25)
+            self._started_tracemalloc = True
+        if self.cprofile:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop(self, name: str) -> list[Path]:
+        """Stop profiling, write the profiles named after the command and print the hotspots
+
+        Returns
+        -------
+        list[Path]
+            The files written
+        """
+        stem = f"{re.sub(r'[^A-Za-z0-9_.-]+', '-', name).strip('-') or 'g00x'}-{time.strftime('%Y%m%d-%H%M%S')}"
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        written = []
+        if self._profile is not None:
+            self._profile.disable()
+            prof = self.outdir / f"{stem}.prof"
+            self._profile.dump_stats(prof)
+            written.append(prof)
+            stream = io.StringIO()
+            pstats.Stats(self._profile, stream=stream).sort_stats("cumulative").print_stats(self.top)
+            click.echo(f"cProfile hotspots of {name}, by cumulative time:", err=True)
+            click.echo(_trim_pstats(stream.getvalue()), err=True)
+            self._profile = None
+        if self.tracemalloc and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                ]
+            )
+            current, peak = tracemalloc.get_traced_memory()
+            if self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+            statistics = snapshot.statistics("lineno")[: self.top]
+            lines = [f"current {current / 2**20:.1f} MiB, peak {peak / 2**20:.1f} MiB"]
+            lines += [str(statistic) for statistic in statistics]
+            allocations = self.outdir / f"{stem}.tracemalloc.txt"
+            allocations.write_text("\n".join(lines) + "\n")
+            written.append(allocations)
+            click.echo(f"tracemalloc top {len(statistics)} allocation sites of {name}:", err=True)
+            click.echo("\n".join(lines[: min(len(lines), 11)]), err=True)
+        for path in written:
+            click.echo(f"Profile written to {path}", err=True)
+        return written
+
+
+def _trim_pstats(report: str) -> str:
+    """The table of a pstats report without its header of file names and totals"""
+    lines = report.splitlines()
+    for i, line in enumerate(lines):
+        if line.lstrip().startswith("ncalls"):
+            return "\n".join(lines[i:]).rstrip()
+    return report.rstrip()
+
+
+def profile_options(func):
+    """The --profile, --profile-dir and --profile-top options of a command group"""
+    func = click.option(
+        "--profile-top", type=int, default=20, show_default=True, help="Rows in the hotspot table and snapshot"
+    )(func)
+    func = click.option(
+        "--profile-dir",
+        type=click.Path(file_okay=False, dir_okay=True, writable=True),
+        default="profiles",
+        show_default=True,
+        help="Directory the .prof files and allocation snapshots are written to",
+    )(func)
+    func = click.option(
+        "--profile",
+        type=click.Choice(PROFILE_MODES),
+        default=None,
+        help="Profile the invoked subcommand with cProfile, tracemalloc or both",
+    )(func)
+    return func
+
+
+def start_profiling(ctx: click.Context, mode: str | None, outdir: str | Path, top: int = 20) -> Profiler | None:
+    """Profile the rest of a group invocation, stopping when the group's context closes"""
+    if mode is None:
+        return None
+    profiler = Profiler(mode, Path(outdir), top)
+    profiler.start()
+
+    def stop() -> None:
+        name = ctx.command_path
+        if ctx.invoked_subcommand:
+            name = f"{name} {ctx.invoked_subcommand}"
+        profiler.stop(name)
+
+    ctx.call_on_close(stop)
+    return profiler
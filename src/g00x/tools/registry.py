@@ -0,0 +1,66 @@
+"""
+Process wide registry of reference data, each resource loaded once and reloaded when its file changes.
+
+Resources are kept as loaded, so anything handed out directly must not be mutated. g00x.data.Data hands
+out copies from its getters and read only lookups, e.g. a MappingProxyType, from its indexed getters.
+"""
+import copy
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, TypeVar
+
+import pandas as pd
+
+logger = logging.getLogger("ResourceRegistry")
+
+T = TypeVar("T")
+
+
+class ResourceRegistry:
+    """Lazily loaded resources keyed by name, invalidated by the mtime and size of their file"""
+
+    def __init__(self) -> None:
+        self.loads = 0
+        self._entries: dict[str, tuple[str, tuple[int, int], Any]] = {}
+        self._lock = threading.RLock()
+
+    def load(self, name: str, path: str | Path, loader: Callable[[Path], T]) -> T:
+        """The resource as loaded, loading it if it is new or its file changed
+
+        Parameters
+        ----------
+        name : str
+            Unique name of the resource, a file can back several resources
+        path : str | Path
+            The file the resource is loaded from
+        loader : Callable[[Path], T]
+            Loads the resource from the file
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == str(path) and entry[1] == version:
+                return entry[2]
+            logger.debug(f"Loading {name} from {path}")
+            value = loader(Path(path))
+            self.loads += 1
+            self._entries[name] = (str(path), version, value)
+            return value
+
+    def copy(self, name: str, path: str | Path, loader: Callable[[Path], T]) -> T:
+        """A copy of the resource the caller is free to change"""
+        value = self.load(name, path, loader)
+        if isinstance(value, (pd.DataFrame, pd.Series)):
+            return value.copy()  # type: ignore
+        return copy.deepcopy(value)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# the registry every Data instance shares
+registry = ResourceRegistry()
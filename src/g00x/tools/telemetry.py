@@ -0,0 +1,222 @@
+"""
+Structured telemetry of pipeline stages written as JSON lines to a ledger for capacity planning.
+
+Every stage records wall and CPU time, how far it raised the peak RSS of the process, the rusage of the
+subprocesses it waited on, e.g. cellranger, and optionally rows in and out. Records of one CLI invocation share a run id so a
+ledger can be rolled up per run with `g00x telemetry summary`.
+"""
+import functools
+import json
+import logging
+import resource
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Callable, Iterator, TypeVar
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger("Telemetry")
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+DEFAULT_LEDGER = Path("~/.cache/g00x/telemetry.jsonl")
+
+
+def _maxrss_bytes(usage: resource.struct_rusage) -> int:
+    # linux reports kilobytes, macos bytes
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+
+def _io_counters() -> dict[str, int]:
+    """Bytes this process read and wrote, empty where /proc isn't available"""
+    try:
+        lines = Path("/proc/self/io").read_text().splitlines()
+    except OSError:
+        return {}
+    counters = dict(line.split(": ") for line in lines)
+    return {"read": int(counters["rchar"]), "written": int(counters["wchar"])}
+
+
+@dataclass
+class StageRecord:
+    """One stage of a run, e.g. a pipeline command or a cellranger call for a vdj output"""
+
+    run_id: str
+    stage: str
+    task: str | None = None
+    parent: str | None = None
+    started: float = 0.0
+    ended: float = 0.0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    # the peak of the process so far, which a stage inherits from the stages before it
+    process_peak_rss_bytes: int = 0
+    # how far the stage raised that peak, 0 for a stage that stayed below an earlier peak
+    peak_rss_growth_bytes: int = 0
+    rows_in: int | None = None
+    rows_out: int | None = None
+    bytes_read: int | None = None
+    bytes_written: int | None = None
+    children: dict[str, float] = field(default_factory=dict)
+    status: str = "ok"
+
+
+class Telemetry:
+    """Writes stage records of the current run to a JSON lines ledger, or nowhere if there is no ledger"""
+
+    def __init__(self, ledger: Path | None = None) -> None:
+        self.ledger = ledger
+        self.run_id = uuid.uuid4().hex[:12]
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure(self, ledger: str | Path | None, run_id: str | None = None) -> None:
+        """Start a new run writing to ledger"""
+        self.ledger = Path(ledger).expanduser() if ledger else None
+        self.run_id = run_id or uuid.uuid4().hex[:12]
+
+    @property
+    def _stack(self) -> list[StageRecord]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def current(self) -> StageRecord | None:
+        return self._stack[-1] if self._stack else None
+
+    def annotate(self, **values: Any) -> None:
+        """Set fields of the innermost running stage, e.g. rows_in and rows_out"""
+        record = self.current()
+        if record is not None:
+            for key, value in values.items():
+                setattr(record, key, value)
+
+    @contextmanager
+    def stage(self, name: str, task: str | None = None) -> Iterator[StageRecord]:
+        """Measure a stage and write its record when it ends, also when it fails"""
+        parent = self.current()
+        record = StageRecord(run_id=self.run_id, stage=name, task=task, parent=parent.stage if parent else None)
+        self_usage = resource.getrusage(resource.RUSAGE_SELF)
+        children_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        io = _io_counters()
+        record.started = time.time()
+        wall_start = time.perf_counter()
+        self._stack.append(record)
+        try:
+            yield record
+        except BaseException:
+            record.status = "failed"
+            raise
+        finally:
+            self._stack.pop()
+            record.ended = time.time()
+            record.wall_seconds = time.perf_counter() - wall_start
+            usage = resource.getrusage(resource.RUSAGE_SELF)
+            record.cpu_seconds = (usage.ru_utime - self_usage.ru_utime) + (usage.ru_stime - self_usage.ru_stime)
+            record.process_peak_rss_bytes = _maxrss_bytes(usage)
+            record.peak_rss_growth_bytes = max(0, record.process_peak_rss_bytes - _maxrss_bytes(self_usage))
+            usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+            record.children = {
+                "user_seconds": usage.ru_utime - children_usage.ru_utime,
+                "system_seconds": usage.ru_stime - children_usage.ru_stime,
+                # the peak of the largest child waited on so far, not only of this stage
+                "peak_rss_bytes": _maxrss_bytes(usage),
+                "blocks_in": usage.ru_inblock - children_usage.ru_inblock,
+                "blocks_out": usage.ru_oublock - children_usage.ru_oublock,
+            }
+            if io:
+                io_end = _io_counters()
+                record.bytes_read = io_end["read"] - io["read"]
+                record.bytes_written = io_end["written"] - io["written"]
+            self.write(record)
+
+    def write(self, record: StageRecord) -> None:
+        if self.ledger is None:
+            return
+        try:
+            self.ledger.parent.mkdir(parents=True, exist_ok=True)
+            with self._lock, open(self.ledger, "a", encoding="utf-8") as f:
+                f.write(json.dumps(asdict(record)) + "\n")
+        except OSError as e:
+            # telemetry must never break the pipeline
+            logger.warning(f"Could not write telemetry to {self.ledger}: {e}")
+
+    def command(self, func: F) -> F:
+        """Decorate a click command so each invocation, including through ctx.invoke, is a stage"""
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            import click
+
+            context = click.get_current_context(silent=True)
+            name = context.command_path if context is not None else func.__name__
+            with self.stage(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore
+
+
+def read_ledger(ledger: str | Path) -> "pd.DataFrame":
+    """Every record of a ledger, skipping lines that can't be read"""
+    # pandas is only needed to read a ledger, recording to one starts with the CLI
+    import pandas as pd
+
+    records = []
+    with open(Path(ledger).expanduser(), encoding="utf-8") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+    return pd.json_normalize(records)
+
+
+def summarize(ledger: str | Path, run_id: str | None = None) -> "pd.DataFrame":
+    """Roll a ledger up per run and stage
+
+    Parameters
+    ----------
+    ledger : str | Path
+        The JSON lines ledger
+    run_id : str | None
+        Only summarize this run, by default every run
+
+    Returns
+    -------
+    pd.DataFrame
+        Per run and stage the number of tasks, time, peak memory, rows and bytes, runs in the order they started
+    """
+    import pandas as pd
+
+    records = read_ledger(ledger)
+    if records.empty:
+        return records
+    if run_id is not None:
+        records = records[records["run_id"] == run_id]
+    records["children_cpu_seconds"] = records["children.user_seconds"] + records["children.system_seconds"]
+    summary = records.groupby(["run_id", "stage"], sort=False).agg(
+        started=("started", "min"),
+        tasks=("stage", "size"),
+        failed=("status", lambda s: int((s == "failed").sum())),
+        wall_seconds=("wall_seconds", "sum"),
+        cpu_seconds=("cpu_seconds", "sum"),
+        children_cpu_seconds=("children_cpu_seconds", "sum"),
+        process_peak_rss_mb=("process_peak_rss_bytes", lambda s: s.max() / 2**20),
+        peak_rss_growth_mb=("peak_rss_growth_bytes", lambda s: s.max() / 2**20),
+        rows_in=("rows_in", "sum"),
+        rows_out=("rows_out", "sum"),
+        mb_read=("bytes_read", lambda s: s.sum() / 2**20),
+        mb_written=("bytes_written", lambda s: s.sum() / 2**20),
+    )
+    summary["started"] = pd.to_datetime(summary["started"], unit="s").dt.floor("s")
+    return summary.sort_values("started", kind="stable").round(2)
+
+
+# the telemetry of this process, configured by the g00x entry point
+telemetry = Telemetry()
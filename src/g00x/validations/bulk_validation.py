@@ -0,0 +1,366 @@
+"""
+Bulk validation of file naming schemes.
+
+Walking a Box tree queues every file against the pydantic model it should satisfy. The queued
+filenames are then tokenized into one DataFrame per model and each field is checked with
+precompiled regexes and vectorized lookups. Pydantic models are only built for the rows that fail
+those checks, so the error raised is still the human readable ModelError from the models, and for
+the few rows whose model has to be kept (population summary files, DataStats).
+"""
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Literal, get_args, get_origin
+
+import pandas as pd
+from pydantic import BaseModel
+
+from g00x.tools.file_cache import file_cache
+from g00x.validations.models.g00x import get_enrollment_index
+from g00x.validations.snapshot import ValidationIssue, ValidationSnapshot
+
+logger = logging.getLogger("BulkValidation")
+
+# A check takes the tokenized names for one model and returns a mask of valid rows and the values
+# the pydantic validators would have assigned to the model (e.g. parsed dates, group and weeks)
+FieldCheck = Callable[[pd.DataFrame], tuple[pd.Series, dict[str, pd.Series]]]
+
+
+def fullmatch_check(field_name: str, pattern: str) -> FieldCheck:
+    """Check a field with re.fullmatch like the custom validators in the models"""
+    compiled = re.compile(pattern)
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        return tokens[field_name].str.fullmatch(compiled).fillna(False).astype(bool), {}
+
+    return check
+
+
+def match_check(field_name: str, pattern: str) -> FieldCheck:
+    """Check a field with re.match like pydantic does for Field(regex=...)"""
+    compiled = re.compile(pattern)
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        return tokens[field_name].str.match(compiled).fillna(False).astype(bool), {}
+
+    return check
+
+
+def choices_check(field_name: str, choices: list[Any]) -> FieldCheck:
+    """Check a field is one of the Literal choices"""
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        return tokens[field_name].isin(choices), {}
+
+    return check
+
+
+def date_check(field_name: str, formats: tuple[tuple[str, str], ...] = ((r"\d{6}", "%y%m%d"),)) -> FieldCheck:
+    """Parse a date field for every row, trying each (digits pattern, strptime format) in order"""
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        parsed = pd.Series(pd.NaT, index=tokens.index, dtype="datetime64[ns]")
+        for pattern, date_format in formats:
+            todo = parsed.isna() & tokens[field_name].str.fullmatch(pattern).fillna(False).astype(bool)
+            if todo.any():
+                parsed[todo] = pd.to_datetime(tokens.loc[todo, field_name], format=date_format, errors="coerce")
+        valid = parsed.notna()
+        return valid, {field_name: parsed.dt.date.where(valid, None)}
+
+    return check
+
+
+def ptid_check(field_name: str) -> FieldCheck:
+    """Check the ptid is enrolled"""
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        return tokens[field_name].isin(list(get_enrollment_index().ptid2group)), {}
+
+    return check
+
+
+def visit_check(field_name: str, assign_group_and_weeks: bool) -> FieldCheck:
+    """Check the visit id belongs to the group of the enrolled ptid and look up its week"""
+
+    def check(tokens: pd.DataFrame) -> tuple[pd.Series, dict[str, pd.Series]]:
+        enrollment = get_enrollment_index()
+        group = tokens["ptid"].map(enrollment.ptid2group)
+        visit2week = pd.Series(
+            {
+                (group_id, visit_id): week
+                for group_id, lookup in enrollment.group2visit2week.items()
+                for visit_id, week in lookup.items()
+            },
+            dtype=object,
+        )
+        keys = pd.MultiIndex.from_arrays([group, tokens[field_name]])
+        valid = pd.Series(keys.isin(visit2week.index), index=tokens.index)
+        if not assign_group_and_weeks:
+            return valid, {}
+        weeks = pd.Series(visit2week.reindex(keys).to_numpy(), index=tokens.index)
+        return valid, {"group": group.astype(object), "weeks": weeks}
+
+    return check
+
+
+HASHTAGS_HT15 = [f"HT{i:02d}" for i in range(1, 16)] + ["NA"]
+HASHTAGS_HT10 = [f"HT{i:02d}" for i in range(1, 11)] + ["NA"]
+
+# Vectorized equivalents of the custom validators in the models, keyed by validator qualname so a
+# validator with the same name but different rules (validate_hashtag) is compiled correctly.
+# Group and weeks are assigned by validate_visit_id and only kept by models that always validate them.
+VALIDATOR_CHECKS: dict[str, Callable[[str, type[BaseModel]], FieldCheck | None]] = {
+    "validate_sort_id": lambda f, m: fullmatch_check(f, r"^[a-zA-Z0-9]{3}$"),
+    "validate_file_subset": lambda f, m: fullmatch_check(f, "[a-j]"),
+    "validate_sample_tube": lambda f, m: fullmatch_check(f, "T[1-9]"),
+    "validate_sort_pool": lambda f, m: fullmatch_check(f, "(P[0-9]{2}|NA)"),
+    "validate_sample_id": lambda f, m: fullmatch_check(f, "[a-zA-Z]{2,}"),
+    "validate_sorter_id_run_id": lambda f, m: fullmatch_check(f, "S[0-9][A-Z][0-9]{2}"),
+    "validate_experimenter_initials": lambda f, m: fullmatch_check(f, "[A-Z]{2}"),
+    "ClinicalSharedFileFieldsModel.validate_hashtag": lambda f, m: choices_check(f, HASHTAGS_HT15),
+    "ControlSharedFileFieldsModel.validate_hashtag": lambda f, m: choices_check(f, HASHTAGS_HT10),
+    "validate_trial_id_site_id_donor_id": lambda f, m: ptid_check(f),
+    "validate_visit_id": lambda f, m: visit_check(f, assign_group_and_weeks=m.__fields__["group"].validate_always),
+    "extract_date": lambda f, m: date_check(f),
+    # population summary file paths come from the walk itself so they always exist
+    "validate_file_path": lambda f, m: None,
+    "validate_group": lambda f, m: None,
+    "validate_weeks": lambda f, m: None,
+}
+
+# Vectorized equivalents of pre root validators
+ROOT_VALIDATOR_CHECKS: dict[str, Callable[[type[BaseModel]], FieldCheck]] = {
+    "extract_dates": lambda m: date_check("run_date", ((r"\d{6}", "%y%m%d"), (r"\d{6}|\d{8}", "%Y%m%d"))),
+}
+
+
+class CompiledFilenameModel:
+    """A pydantic filename model compiled into vectorized checks over tokenized names.
+
+    If a model has a validator we don't know how to vectorize, every row is sent down the pydantic
+    path so the result is never less strict than the model itself.
+    """
+
+    def __init__(self, pydantic_model: type[BaseModel]) -> None:
+        self.pydantic_model = pydantic_model
+        self.fields: list[str] = [name for name, f in pydantic_model.__fields__.items() if f.required]
+        self.checks: list[FieldCheck] = []
+        self.vectorizable = True
+
+        for root_validator in pydantic_model.__pre_root_validators__:
+            root_check = ROOT_VALIDATOR_CHECKS.get(root_validator.__name__)
+            if root_check is None:
+                self.vectorizable = False
+                continue
+            self.checks.append(root_check(pydantic_model))
+
+        for name, model_field in pydantic_model.__fields__.items():
+            checked = False
+            for validator_name, class_validator in model_field.class_validators.items():
+                compile_check = VALIDATOR_CHECKS.get(
+                    class_validator.func.__qualname__, VALIDATOR_CHECKS.get(validator_name)
+                )
+                if compile_check is None:
+                    self.vectorizable = False
+                    continue
+                check = compile_check(name, pydantic_model)
+                if check is not None:
+                    self.checks.append(check)
+                checked = True
+            if not model_field.required or checked:
+                continue
+            if get_origin(model_field.outer_type_) is Literal:
+                self.checks.append(choices_check(name, list(get_args(model_field.outer_type_))))
+            elif getattr(model_field.field_info, "regex", None):
+                self.checks.append(match_check(name, model_field.field_info.regex))
+
+    def validate(self, naming_parts: list[list[str]]) -> tuple[pd.Series, pd.DataFrame]:
+        """Validate all names at once
+
+        Returns
+        -------
+        tuple[pd.Series, pd.DataFrame]
+            The mask of rows that passed and the field values a model would have been built with
+        """
+        tokens = pd.DataFrame(naming_parts, dtype=object)
+        valid = pd.Series([len(parts) == len(self.fields) for parts in naming_parts], index=tokens.index, dtype=bool)
+        tokens = tokens.reindex(columns=range(len(self.fields))).fillna("")
+        tokens.columns = self.fields
+        if not self.vectorizable:
+            return pd.Series(False, index=tokens.index), tokens
+        values = tokens.copy()
+        for check in self.checks:
+            mask, derived = check(tokens)
+            valid &= mask
+            for name, derived_values in derived.items():
+                values[name] = derived_values
+        return valid, values
+
+
+def model_error(
+    validator_cls: type, pydantic_model: type[BaseModel], path: Path, naming_parts: list[str]
+) -> str | None:
+    """Run the pydantic path for one file in a worker process and return its error message, if any"""
+    try:
+        validator_cls().get_model(pydantic_model, path, naming_parts)
+    except ValueError as e:
+        return str(e)
+    return None
+
+
+@dataclass
+class QueuedFile:
+    pydantic_model: type[BaseModel]
+    path: Path
+    naming_parts: list[str]
+    on_valid: Callable[[Any], None] | None = None
+
+
+@dataclass
+class BulkFilenameValidator:
+    """Queue files during a folder walk and validate them per model in one pass.
+
+    Parameters
+    ----------
+    get_model : Callable
+        The per file model builder of the validator, used on the error path so the raised error is
+        exactly the one the validator has always raised.
+    normalize : Callable
+        Adjusts the naming parts before they are tokenized, e.g. the G003 presort padding.
+    snapshot : ValidationSnapshot | None
+        Results of the previous run; unchanged files are not validated again.
+    workers : int
+        Number of processes for the pydantic error path and threads for stat calls.
+    capture : bool
+        Read the files we keep a model for into the shared file cache, so parsing them afterwards
+        doesn't go back to the filesystem.
+    """
+
+    get_model: Callable[[Any, Path, list[str]], Any]
+    normalize: Callable[[list[str]], list[str]] = lambda naming_parts: naming_parts
+    snapshot: ValidationSnapshot | None = None
+    workers: int = 1
+    capture: bool = False
+    queued: list[QueuedFile] = field(default_factory=list)
+    compiled: dict[type[BaseModel], CompiledFilenameModel] = field(default_factory=dict)
+    revalidated: int = 0
+
+    def add(
+        self,
+        pydantic_model: type[BaseModel],
+        path: Path,
+        naming_parts: list[str],
+        on_valid: Callable[[Any], None] | None = None,
+    ) -> None:
+        """Queue a file; on_valid is called with its model once validation passes"""
+        self.queued.append(QueuedFile(pydantic_model, path, naming_parts, on_valid))
+
+    def construct(self, pydantic_model: type[BaseModel], path: Path, values: dict[str, Any]) -> BaseModel:
+        """Build a model without re-running validation from values the checks already produced"""
+        values = {k: v for k, v in values.items() if not (k in ("group", "weeks") and pd.isna(v))}
+        if "group" in values:
+            values["group"] = int(values["group"])
+        if "file_path" in pydantic_model.__fields__:
+            values["file_path"] = str(path)
+        model = pydantic_model.construct(**values)
+        if "group" in model.__dict__ and "visit_id" in model.__dict__:
+            # validate_visit_id assigns group and weeks before visit_id itself, keep the same field order
+            ordered: dict[str, Any] = {}
+            for name, value in model.__dict__.items():
+                if name == "visit_id":
+                    ordered["group"] = model.__dict__["group"]
+                    ordered["weeks"] = model.__dict__["weeks"]
+                if name not in ("group", "weeks"):
+                    ordered[name] = value
+            object.__setattr__(model, "__dict__", ordered)
+        return model
+
+    def collect_errors(self, failed: list[int]) -> dict[int, str | None]:
+        """Run the pydantic path for every failed file, returning error messages instead of raising"""
+        if self.workers > 1 and len(failed) > 1:
+            validator_cls = type(self.get_model.__self__)  # type: ignore
+            queued = [self.queued[i] for i in failed]
+            with ProcessPoolExecutor(max_workers=self.workers) as executor:
+                errors = executor.map(
+                    model_error,
+                    [validator_cls] * len(queued),
+                    [q.pydantic_model for q in queued],
+                    [q.path for q in queued],
+                    [q.naming_parts for q in queued],
+                    chunksize=max(1, len(queued) // (self.workers * 4)),
+                )
+                return dict(zip(failed, errors))
+        results: dict[int, str | None] = {}
+        for i in failed:
+            queued = self.queued[i]
+            try:
+                self.get_model(queued.pydantic_model, queued.path, queued.naming_parts)
+                results[i] = None
+            except ValueError as e:
+                results[i] = str(e)
+        return results
+
+    def validate(self, collect: bool = False) -> list[ValidationIssue]:
+        """Validate everything queued.
+
+        Raises the first queued filename error in walk order, unless collect is set, in which case
+        every error is returned and files that failed are left out of on_valid. Errors in the
+        structure of the tree are raised by the walk itself, before any queued filename is checked,
+        so they come first even when a file walked earlier has a bad name.
+        """
+        models: dict[int, Any] = {}
+        failed: list[int] = []
+        errors: dict[int, str | None] = {}
+
+        stats = self.snapshot.stat([q.path for q in self.queued], self.workers) if self.snapshot else []
+        by_model: dict[type[BaseModel], list[int]] = {}
+        for i, queued in enumerate(self.queued):
+            # files we need a model for are always validated, it costs next to nothing in bulk
+            entry = self.snapshot.lookup(queued.path, stats[i]) if self.snapshot else None
+            if entry is not None and queued.on_valid is None and (entry.error is None or collect):
+                errors[i] = entry.error
+                continue
+            by_model.setdefault(queued.pydantic_model, []).append(i)
+        self.revalidated = sum(len(indexes) for indexes in by_model.values())
+
+        for pydantic_model, indexes in by_model.items():
+            compiled = self.compiled.setdefault(pydantic_model, CompiledFilenameModel(pydantic_model))
+            valid, values = compiled.validate([self.normalize(self.queued[i].naming_parts) for i in indexes])
+            logger.debug(f"{pydantic_model.__name__}: {int(valid.sum())}/{len(indexes)} passed bulk validation")
+            keep = [self.queued[i].on_valid is not None for i in indexes]
+            records = values[valid.to_numpy() & pd.Series(keep).to_numpy()].to_dict("index")
+            for row, i in enumerate(indexes):
+                if not valid.iat[row]:
+                    failed.append(i)
+                    continue
+                errors[i] = None
+                if keep[row]:
+                    models[i] = self.construct(pydantic_model, self.queued[i].path, records[row])
+
+        # pydantic is the authority on anything the vectorized checks rejected
+        if collect:
+            errors.update(self.collect_errors(failed))
+            for i in failed:
+                queued = self.queued[i]
+                if errors[i] is None and queued.on_valid is not None:
+                    models[i] = self.get_model(queued.pydantic_model, queued.path, queued.naming_parts)
+        else:
+            for i in sorted(failed):
+                queued = self.queued[i]
+                models[i] = self.get_model(queued.pydantic_model, queued.path, queued.naming_parts)
+                errors[i] = None
+
+        if self.snapshot is not None:
+            for i, queued in enumerate(self.queued):
+                self.snapshot.record(queued.path, stats[i], errors[i])
+
+        kept = [i for i, queued in enumerate(self.queued) if queued.on_valid is not None and i in models]
+        if self.capture:
+            file_cache.prefetch([self.queued[i].path for i in kept], self.workers)
+        for i in kept:
+            self.queued[i].on_valid(models[i])  # type: ignore
+        issues = [ValidationIssue(str(q.path), errors[i]) for i, q in enumerate(self.queued) if errors[i]]
+        self.queued.clear()
+        return issues
@@ -6,6 +6,7 @@ from glob import glob
 from pathlib import Path
 from typing import Any
 
+from g00x.validations.bulk_validation import BulkFilenameValidator
 from g00x.validations.models.g00x import (
     ClinicalDataFilesModel,
     ClinicalPopulationSummaryFilesModel,
@@ -31,14 +32,28 @@ from g00x.validations.models.g00x import (
     SortModel,
     XMLModel,
 )
+from g00x.validations.snapshot import (
+    ValidationIssue,
+    ValidationReport,
+    ValidationSnapshot,
+)
 
 logger = logging.getLogger("FlowValidation")
 
 
 class ValidateG00X:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        collect_errors: bool = False,
+        snapshot: ValidationSnapshot | None = None,
+        workers: int = 1,
+        capture: bool = False,
+    ) -> None:
         self.population_files: list[PopulationSortFile | PreScreenPopulationSortFile] = []
         self.prescreen_population_files: list[PreScreenPopulationSortFile | PopulationSortFile] = []
+        self.collect_errors = collect_errors
+        self.report: ValidationReport | None = None
+        self.bulk = BulkFilenameValidator(get_model=self.get_model, snapshot=snapshot, workers=workers, capture=capture)
 
     def get_model(
         self, pydantic_model: Any, path: Path, naming_parts: list[str]
@@ -105,163 +120,193 @@ class ValidateG00X:
         """
         if not Path(root_folder).exists():
             raise ValueError(f"Folder {root_folder} does not exist")
+        report = ValidationReport(root_folder=str(root_folder))
+        seen: set[str] = set()
         for path_str in glob(f"{root_folder}/**", recursive=True):
             path = Path(path_str)
             parts = path.relative_to(Path(root_folder).parent).parts
             naming_parts = path.stem.split("_") + [path.suffix]
             logger.debug(f"checking path: {parts}")
             logger.debug(f"naming parts:{ path}, {naming_parts}")
-            match parts:
-                # G00X
-                case [g00x]:
-                    G00XModel(name=g00x)
-                # G00X -> Prescreens
-                case [g00x, "Prescreens"]:
-                    continue
-                # G00X -> Prescreens -> Prescreen
-                case [g00x, "Prescreens", prescreen]:
-                    PrescreenModel(name=prescreen)
-                # G00X -> Prescreens -> Prescreen -> .xml ; xmlFile only
-                case [g00x, "Prescreens", prescreen, file] if file.endswith(".xml"):
-                    self.get_model(XMLModel, path, naming_parts)
-                # G00X -> Prescreens -> Prescreen -> .xlsx ; FlowManifest only
-                case [g00x, "Prescreens", prescreen, file] if file.endswith(".xlsx"):
-                    # could be flags, counts or  manifest
-                    self.get_model(FlowExtrasModel, path, naming_parts)
-                # G00X -> Prescreens -> Prescreen -> DataFiles
-                case [g00x, "Prescreens", prescreen, "DataFilesFromDV"]:
-                    continue
-                # G00X -> Prescreens -> Prescreen -> PopulationSummaryFilesFromDV
-                case [g00x, "Prescreens", prescreen, "PopulationSummaryFilesFromDV"]:
-                    continue
-                # G00X -> Prescreens -> Prescreen -> ScreenshotsFromDV
-                case [g00x, "Prescreens", prescreen, "ScreenshotsFromDV"]:
-                    continue
-                # G00X -> Prescreens -> Prescreen -> DataFiles -> .fcs
-                case [g00x, "Prescreens", prescreen, "DataFilesFromDV", _]:
-                    self.get_model(PrescreenDataFilesModel, path, naming_parts)
-                # G00X -> Prescreens -> Prescreen -> PopulationSummary -> .csv
-                case [g00x, "Prescreens", prescreen, "PopulationSummaryFilesFromDV", _]:
-                    model = self.get_model(PrescreenPopulationSummaryFilesModel, path, naming_parts)
-                    self.prescreen_population_files.append(PreScreenPopulationSortFile(data=model, file_path=path))
-                # G00X -> Prescreens -> Prescreen -> Screenshots -> .png
-                case [g00x, "Prescreens", prescreen, "ScreenshotsFromDV", _]:
-                    self.get_model(PrescreenScreenshotsModel, path, naming_parts)
-                # G00X -> Sorts
-                case [g00x, "Sorts"]:
-                    continue
-                # G00X -> Sorts -> Sort
-                case [g00x, "Sorts", sort]:
-                    SortModel(name=sort)
-                # G00X -> Sorts -> Sort -> .xlsx
-                case [g00x, "Sorts", sort, sort_file] if Path(sort_file).suffix == ".xlsx":
-                    self.get_model(FlowExtrasModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples
-                case [g00x, "Sorts", sort, "ClinicalSamples"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles
-                case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> PopulationSummaryFilesFromDV
-                case [g00x, "Sorts", sort, "ClinicalSamples", "PopulationSummaryFilesFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsFromDV
-                case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReportsFromDV
-                case [g00x, "Sorts", sort, "ClinicalSamples", "SortReportsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> .xml
-                case [g00x, "Sorts", sort, "ClinicalSamples", file] if file.endswith(".xml"):
-                    self.get_model(XMLModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> .xlsx (internal manifest)
-                case [g00x, "Sorts", sort, "ClinicalSamples", file] if file.endswith(".xlsx"):
-                    self.get_model(FlowExtrasModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles ->.fcs
-                case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromDV", _]:
-                    self.get_model(ClinicalDataFilesModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> PopulationSummary -> .csv
-                case [g00x, "Sorts", sort, "ClinicalSamples", "PopulationSummaryFilesFromDV", _]:
-                    model = self.get_model(ClinicalPopulationSummaryFilesModel, path, naming_parts)
-                    self.population_files.append(PopulationSortFile(data=model, file_path=path))
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> Screenshots -> .png
-                case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsFromDV", _]:
-                    self.get_model(ClinicalScreenshotsModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReports -> .csv | .pdf
-                case [g00x, "Sorts", sort, "ClinicalSamples", "SortReportsFromDV", _]:
-                    self.get_model(ClinicalSortReportsModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples
-                case [g00x, "Sorts", sort, "ControlSamples"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ControlSamples -> DataFiles
-                case [g00x, "Sorts", sort, "ControlSamples", "DataFilesFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ControlSamples -> PopulationSummaryFilesFromDV
-                case [g00x, "Sorts", sort, "ControlSamples", "PopulationSummaryFilesFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ControlSamples -> ScreenshotsFromDV
-                case [g00x, "Sorts", sort, "ControlSamples", "ScreenshotsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ControlSamples -> SortReportsFromDV
-                case [g00x, "Sorts", sort, "ControlSamples", "SortReportsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> ControlSamples -> .xml
-                case [g00x, "Sorts", sort, "ControlSamples", file] if file.endswith(".xml"):
-                    self.get_model(XMLModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples -> .xlsx (internal manifest)
-                case [g00x, "Sorts", sort, "ControlSamples", file] if file.endswith(".xlsx"):
-                    self.get_model(FlowExtrasModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples -> DataFiles ->.fcs
-                case [g00x, "Sorts", sort, "ControlSamples", "DataFilesFromDV", _]:
-                    self.get_model(ControlDataFilesModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples -> PopulationSummary -> .csv
-                case [g00x, "Sorts", sort, "ControlSamples", "PopulationSummaryFilesFromDV", _]:
-                    model = self.get_model(ControlPopulationSummaryFilesModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples -> Screenshots -> .png
-                case [g00x, "Sorts", sort, "ControlSamples", "ScreenshotsFromDV", _]:
-                    self.get_model(ControlScreenshotsModel, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ControlSamples -> SortReports -> .csv | .pdf
-                case [g00x, "Sorts", sort, "ControlSamples", "SortReportsFromDV", _]:
-                    self.get_model(ControlSortReportsModel, path, naming_parts)
+            seen.add(str(path))
+            try:
+                match parts:
+                    # G00X
+                    case [g00x]:
+                        G00XModel(name=g00x)
+                    # G00X -> Prescreens
+                    case [g00x, "Prescreens"]:
+                        continue
+                    # G00X -> Prescreens -> Prescreen
+                    case [g00x, "Prescreens", prescreen]:
+                        PrescreenModel(name=prescreen)
+                    # G00X -> Prescreens -> Prescreen -> .xml ; xmlFile only
+                    case [g00x, "Prescreens", prescreen, file] if file.endswith(".xml"):
+                        self.bulk.add(XMLModel, path, naming_parts)
+                    # G00X -> Prescreens -> Prescreen -> .xlsx ; FlowManifest only
+                    case [g00x, "Prescreens", prescreen, file] if file.endswith(".xlsx"):
+                        # could be flags, counts or  manifest
+                        self.bulk.add(FlowExtrasModel, path, naming_parts)
+                    # G00X -> Prescreens -> Prescreen -> DataFiles
+                    case [g00x, "Prescreens", prescreen, "DataFilesFromDV"]:
+                        continue
+                    # G00X -> Prescreens -> Prescreen -> PopulationSummaryFilesFromDV
+                    case [g00x, "Prescreens", prescreen, "PopulationSummaryFilesFromDV"]:
+                        continue
+                    # G00X -> Prescreens -> Prescreen -> ScreenshotsFromDV
+                    case [g00x, "Prescreens", prescreen, "ScreenshotsFromDV"]:
+                        continue
+                    # G00X -> Prescreens -> Prescreen -> DataFiles -> .fcs
+                    case [g00x, "Prescreens", prescreen, "DataFilesFromDV", _]:
+                        self.bulk.add(PrescreenDataFilesModel, path, naming_parts)
+                    # G00X -> Prescreens -> Prescreen -> PopulationSummary -> .csv
+                    case [g00x, "Prescreens", prescreen, "PopulationSummaryFilesFromDV", _]:
+                        self.bulk.add(
+                            PrescreenPopulationSummaryFilesModel,
+                            path,
+                            naming_parts,
+                            on_valid=lambda model, path=path: self.prescreen_population_files.append(
+                                PreScreenPopulationSortFile(data=model, file_path=path)
+                            ),
+                        )
+                    # G00X -> Prescreens -> Prescreen -> Screenshots -> .png
+                    case [g00x, "Prescreens", prescreen, "ScreenshotsFromDV", _]:
+                        self.bulk.add(PrescreenScreenshotsModel, path, naming_parts)
+                    # G00X -> Sorts
+                    case [g00x, "Sorts"]:
+                        continue
+                    # G00X -> Sorts -> Sort
+                    case [g00x, "Sorts", sort]:
+                        SortModel(name=sort)
+                    # G00X -> Sorts -> Sort -> .xlsx
+                    case [g00x, "Sorts", sort, sort_file] if Path(sort_file).suffix == ".xlsx":
+                        self.bulk.add(FlowExtrasModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples
+                    case [g00x, "Sorts", sort, "ClinicalSamples"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> PopulationSummaryFilesFromDV
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "PopulationSummaryFilesFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsFromDV
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReportsFromDV
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "SortReportsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> .xml
+                    case [g00x, "Sorts", sort, "ClinicalSamples", file] if file.endswith(".xml"):
+                        self.bulk.add(XMLModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> .xlsx (internal manifest)
+                    case [g00x, "Sorts", sort, "ClinicalSamples", file] if file.endswith(".xlsx"):
+                        self.bulk.add(FlowExtrasModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles ->.fcs
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromDV", _]:
+                        self.bulk.add(ClinicalDataFilesModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> PopulationSummary -> .csv
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "PopulationSummaryFilesFromDV", _]:
+                        self.bulk.add(
+                            ClinicalPopulationSummaryFilesModel,
+                            path,
+                            naming_parts,
+                            on_valid=lambda model, path=path: self.population_files.append(
+                                PopulationSortFile(data=model, file_path=path)
+                            ),
+                        )
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> Screenshots -> .png
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsFromDV", _]:
+                        self.bulk.add(ClinicalScreenshotsModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReports -> .csv | .pdf
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "SortReportsFromDV", _]:
+                        self.bulk.add(ClinicalSortReportsModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples
+                    case [g00x, "Sorts", sort, "ControlSamples"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ControlSamples -> DataFiles
+                    case [g00x, "Sorts", sort, "ControlSamples", "DataFilesFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ControlSamples -> PopulationSummaryFilesFromDV
+                    case [g00x, "Sorts", sort, "ControlSamples", "PopulationSummaryFilesFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ControlSamples -> ScreenshotsFromDV
+                    case [g00x, "Sorts", sort, "ControlSamples", "ScreenshotsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ControlSamples -> SortReportsFromDV
+                    case [g00x, "Sorts", sort, "ControlSamples", "SortReportsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> ControlSamples -> .xml
+                    case [g00x, "Sorts", sort, "ControlSamples", file] if file.endswith(".xml"):
+                        self.bulk.add(XMLModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples -> .xlsx (internal manifest)
+                    case [g00x, "Sorts", sort, "ControlSamples", file] if file.endswith(".xlsx"):
+                        self.bulk.add(FlowExtrasModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples -> DataFiles ->.fcs
+                    case [g00x, "Sorts", sort, "ControlSamples", "DataFilesFromDV", _]:
+                        self.bulk.add(ControlDataFilesModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples -> PopulationSummary -> .csv
+                    case [g00x, "Sorts", sort, "ControlSamples", "PopulationSummaryFilesFromDV", _]:
+                        self.bulk.add(ControlPopulationSummaryFilesModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples -> Screenshots -> .png
+                    case [g00x, "Sorts", sort, "ControlSamples", "ScreenshotsFromDV", _]:
+                        self.bulk.add(ControlScreenshotsModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ControlSamples -> SortReports -> .csv | .pdf
+                    case [g00x, "Sorts", sort, "ControlSamples", "SortReportsFromDV", _]:
+                        self.bulk.add(ControlSortReportsModel, path, naming_parts)
+
+                    # G00X -> Sorts -> Sort -> PackingSamples
+                    case [g00x, "Sorts", sort, "PackingSamples"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> PackingSamples -> PopulationSummaryFilesFromDV
+                    case [g00x, "Sorts", sort, "PackingSamples", "PopulationSummaryFilesFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> PackingSamples -> ScreenshotsFromDV
+                    case [g00x, "Sorts", sort, "PackingSamples", "ScreenshotsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> PackingSamples -> SortReportsFromDV
+                    case [g00x, "Sorts", sort, "PackingSamples", "SortReportsFromDV"]:
+                        continue
+                    # G00X -> Sorts -> Sort -> PackingSamples -> DataFilesFromDV
+                    case [g00x, "Sorts", sort, "PackingSamples", "DataFilesFromDV"]:
+                        continue
 
-                # G00X -> Sorts -> Sort -> PackingSamples
-                case [g00x, "Sorts", sort, "PackingSamples"]:
-                    continue
-                # G00X -> Sorts -> Sort -> PackingSamples -> PopulationSummaryFilesFromDV
-                case [g00x, "Sorts", sort, "PackingSamples", "PopulationSummaryFilesFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> PackingSamples -> ScreenshotsFromDV
-                case [g00x, "Sorts", sort, "PackingSamples", "ScreenshotsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> PackingSamples -> SortReportsFromDV
-                case [g00x, "Sorts", sort, "PackingSamples", "SortReportsFromDV"]:
-                    continue
-                # G00X -> Sorts -> Sort -> PackingSamples -> DataFilesFromDV
-                case [g00x, "Sorts", sort, "PackingSamples", "DataFilesFromDV"]:
-                    continue
+                    # G00X -> Sorts -> Sort -> PackingSamples -> SortReports -> .csv | .pdf
+                    case [g00x, "Sorts", sort, "PackingSamples", "SortReportsFromDV", _]:
+                        self.bulk.add(PackingSortReportsModel, path, naming_parts)
 
-                # G00X -> Sorts -> Sort -> PackingSamples -> SortReports -> .csv | .pdf
-                case [g00x, "Sorts", sort, "PackingSamples", "SortReportsFromDV", _]:
-                    self.get_model(PackingSortReportsModel, path, naming_parts)
+                    case [g00x, "Sorts", sort, "PackingSamples", "PopulationSummaryFilesFromDV", _]:
+                        self.bulk.add(PackingPopulationSummaryFilesModel, path, naming_parts)
 
-                case [g00x, "Sorts", sort, "PackingSamples", "PopulationSummaryFilesFromDV", _]:
-                    model = self.get_model(PackingPopulationSummaryFilesModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> PackingSamples -> .xml
+                    case [g00x, "Sorts", sort, "PackingSamples", file] if file.endswith(".xml"):
+                        self.bulk.add(XMLModel, path, naming_parts)
 
-                # G00X -> Sorts -> Sort -> PackingSamples -> .xml
-                case [g00x, "Sorts", sort, "PackingSamples", file] if file.endswith(".xml"):
-                    self.get_model(XMLModel, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> PackingSamples -> ScreenshotsFromDV -> .png
+                    case [g00x, "Sorts", sort, "PackingSamples", "ScreenshotsFromDV", _]:
+                        self.bulk.add(PackingScreenshotsModel, path, naming_parts)
 
-                # G00X -> Sorts -> Sort -> PackingSamples -> ScreenshotsFromDV -> .png
-                case [g00x, "Sorts", sort, "PackingSamples", "ScreenshotsFromDV", _]:
-                    self.get_model(PackingScreenshotsModel, path, naming_parts)
+                    # ignore readme or docs or fail
+                    case [g00x, "Sorts", sort, "PackingSamples", "DataFilesFromDV", _]:
+                        self.bulk.add(PackingDataFilesModel, path, naming_parts)
+                    case _:
+                        if naming_parts[-1] in [".docx", ".pdf", ".doc", ".md", ".txt"]:
+                            continue
+                        raise ValueError(f"{path} does not match any known scheme pattern")
+            except ValueError as e:
+                if not self.collect_errors:
+                    raise
+                report.issues.append(ValidationIssue(str(path), str(e)))
 
-                # ignore readme or docs or fail
-                case [g00x, "Sorts", sort, "PackingSamples", "DataFilesFromDV", _]:
-                    self.get_model(PackingDataFilesModel, path, naming_parts)
-                case _:
-                    if naming_parts[-1] in [".docx", ".pdf", ".doc", ".md", ".txt"]:
-                        continue
-                    raise ValueError(f"{path} does not match any known scheme pattern")
+        # every file name queued above is validated together
+        report.issues += self.bulk.validate(collect=self.collect_errors)
+        report.issues.sort(key=lambda issue: issue.path)
+        report.files_checked = len(seen)
+        report.files_revalidated = self.bulk.revalidated
+        self.report = report
+        if self.bulk.snapshot is not None:
+            self.bulk.snapshot.prune(seen)
+            self.bulk.snapshot.save()
 
     def get_population_sort_files(self) -> PopulationSortFiles:
         """Get the population sort files as combined dataframe"""
@@ -273,19 +318,50 @@ class ValidateG00X:
 
 
 # This is the main function that will be called by the CLI
-def validate_g00x_box(folder: Path) -> ValidateG00X:
+def validate_g00x_box(folder: Path, capture: bool = False) -> ValidateG00X:
     """Validate the folder structure of a G00X from Box.
 
     Parameters
     ----------
     folder : Path
         Path to the G00X folder
-    debug : bool
-        The debug flag
-    print_scheme : bool
-        The print scheme flag
+    capture : bool
+        Read the population summary files into the shared file cache for parsing
     """
-    validate_g00x = ValidateG00X()
+    validate_g00x = ValidateG00X(capture=capture)
     validate_g00x.validate_scheme(root_folder=str(folder))
     print("Schema validation passed \u2713")
     return validate_g00x
+
+
+def collect_g00x_box(
+    folder: Path, snapshot_path: Path | None = None, workers: int = 1, capture: bool = False
+) -> ValidateG00X:
+    """Validate the folder structure of a G00X from Box, collecting every error instead of stopping at the first.
+
+    Parameters
+    ----------
+    folder : Path
+        Path to the G00X folder
+    snapshot_path : Path | None
+        Validation snapshot from previous runs; only added or changed files are revalidated
+    workers : int
+        Number of workers for stat calls and the pydantic error path
+    capture : bool
+        Read the population summary files into the shared file cache for parsing
+
+    Returns
+    -------
+    ValidateG00X
+        The validation, with its report and the population summary files that passed
+    """
+    snapshot = ValidationSnapshot.load(snapshot_path) if snapshot_path else None
+    validate_g00x = ValidateG00X(collect_errors=True, snapshot=snapshot, workers=workers, capture=capture)
+    validate_g00x.validate_scheme(root_folder=str(folder))
+    assert validate_g00x.report is not None
+    return validate_g00x
+
+
+def report_g00x_box(folder: Path, snapshot_path: Path | None = None, workers: int = 1) -> ValidationReport:
+    """Validation report of the folder structure of a G00X from Box, see collect_g00x_box"""
+    return collect_g00x_box(folder, snapshot_path, workers).report  # type: ignore
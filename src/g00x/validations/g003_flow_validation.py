@@ -6,7 +6,13 @@ from glob import glob
 from pathlib import Path
 from typing import Any
 
+from g00x.validations.bulk_validation import BulkFilenameValidator
 from g00x.validations.models import g003 as models
+from g00x.validations.snapshot import (
+    ValidationIssue,
+    ValidationReport,
+    ValidationSnapshot,
+)
 
 # from pydantic import BaseModel
 
@@ -17,9 +23,31 @@ logger = logging.getLogger("G003 Validation for Folder Structure")
 class ValidateG003:
     """Perform validation of G00X folder structure and file naming scheme."""
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        collect_errors: bool = False,
+        snapshot: ValidationSnapshot | None = None,
+        workers: int = 1,
+        capture: bool = False,
+    ) -> None:
         self.models = models
         self.data_stats: list[tuple[models.Fields, Path, Path]] = []
+        self.collect_errors = collect_errors
+        self.report: ValidationReport | None = None
+        self.bulk = BulkFilenameValidator(
+            get_model=self.get_model,
+            normalize=self.normalize_naming_parts,
+            snapshot=snapshot,
+            workers=workers,
+            capture=capture,
+        )
+
+    @staticmethod
+    def normalize_naming_parts(naming_parts: list[str]) -> list[str]:
+        """Presorts always suffix and removes the need for sample tube field"""
+        if len(naming_parts) > 1 and naming_parts[-2].lower() in ["control", "presort"]:
+            return naming_parts[:-2] + ["na"] + naming_parts[-2:]
+        return naming_parts
 
     def get_model(self, pydantic_model: Any, path: Path, naming_parts: list[str]) -> Any:
         """
@@ -39,9 +67,7 @@ class ValidateG003:
         """
         field_num = len([i for i in pydantic_model.__fields__.values() if i.required])
 
-        # Presorts always suffix and removes the need for sample tube field
-        if naming_parts[-2].lower() in ["control", "presort"]:
-            naming_parts = naming_parts[:-2] + ["na"] + naming_parts[-2:]
+        naming_parts = self.normalize_naming_parts(naming_parts)
 
         if len(naming_parts) < field_num:
             raise ValueError(f"file {path.stem} has missing parts in its name")
@@ -67,6 +93,8 @@ class ValidateG003:
         """
         if not Path(root_folder).exists():
             raise ValueError(f"Folder {root_folder} does not exist")
+        report = ValidationReport(root_folder=str(root_folder))
+        seen: set[str] = set()
         for path_str in glob(f"{root_folder}/**", recursive=True):
             path = Path(path_str)
             parts = path.relative_to(Path(root_folder).parent).parts
@@ -75,58 +103,101 @@ class ValidateG003:
             logger.debug(f"checking path: {parts}")
             logger.debug(f"naming parts:{ path}, {naming_parts}")
 
-            match parts:
-                # G00X
-                case [g00x]:
-                    self.models.G00X(name=g00x)
-                case [g00x, "Presorts", *_]:  # ignore presorts for validation; manual view only
-                    continue
-                # G00X -> Sorts -> Sort
-                case [g00x, "Sorts", sort]:
-                    self.models.Sort(name=sort)
-                # All static directorys will be indirectly validated by the below cases
-                case [*_] if path.is_dir():
-                    continue
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFilesFromFlowJo -> .wsp
-                case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromFlowJo", _]:
-                    self.get_model(self.models.DataFilesFromFlowJo, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles -> .fcs
-                case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromMelody", _]:
-                    continue  # ingore this folder, its not important to validate.
-                    self.get_model(self.models.DataFilesFromMelody, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> DataStats -> .xlsx
-                case [g00x, "Sorts", sort, "ClinicalSamples", "DataStats", _]:
-                    model = self.get_model(self.models.DataStats, path, naming_parts)
-                    self.data_stats.append((model, Path(path_str), Path(root_folder)))
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsCounts -> .jpg
-                case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsCounts", _]:
-                    self.get_model(self.models.ScreenshotsCounts, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsCountsFullImage -> .jpg
-                case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsCountsFullImage", _]:
-                    self.get_model(self.models.ScreenshotsCounts, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsMelodyStats -> .jpg
-                case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsMelodyStats", _]:
-                    self.get_model(self.models.ScreenShotsMelodyStats, path, naming_parts)
-                # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReports -> .pdf
-                case [g00x, "Sorts", sort, "ClinicalSamples", "SortReports", _]:
-                    self.get_model(self.models.SortReports, path, naming_parts)
-                # ignore readme or docs or fail
-                case _:
-                    if naming_parts[-1] in [".docx", ".pdf", ".doc", ".md", ".txt"]:
+            seen.add(str(path))
+            try:
+                match parts:
+                    # G00X
+                    case [g00x]:
+                        self.models.G00X(name=g00x)
+                    case [g00x, "Presorts", *_]:  # ignore presorts for validation; manual view only
+                        continue
+                    # G00X -> Sorts -> Sort
+                    case [g00x, "Sorts", sort]:
+                        self.models.Sort(name=sort)
+                    # All static directorys will be indirectly validated by the below cases
+                    case [*_] if path.is_dir():
                         continue
-                    raise ValueError(f"{path} does not match any known scheme pattern")
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFilesFromFlowJo -> .wsp
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromFlowJo", _]:
+                        self.bulk.add(self.models.DataFilesFromFlowJo, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> DataFiles -> .fcs
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "DataFilesFromMelody", _]:
+                        continue  # ingore this folder, its not important to validate.
+                        self.bulk.add(self.models.DataFilesFromMelody, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> DataStats -> .xlsx
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "DataStats", _]:
+                        self.bulk.add(
+                            self.models.DataStats,
+                            path,
+                            naming_parts,
+                            on_valid=lambda model, path_str=path_str: self.data_stats.append(
+                                (model, Path(path_str), Path(root_folder))
+                            ),
+                        )
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsCounts -> .jpg
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsCounts", _]:
+                        self.bulk.add(self.models.ScreenshotsCounts, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsCountsFullImage -> .jpg
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsCountsFullImage", _]:
+                        self.bulk.add(self.models.ScreenshotsCounts, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> ScreenshotsMelodyStats -> .jpg
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "ScreenshotsMelodyStats", _]:
+                        self.bulk.add(self.models.ScreenShotsMelodyStats, path, naming_parts)
+                    # G00X -> Sorts -> Sort -> ClinicalSamples -> SortReports -> .pdf
+                    case [g00x, "Sorts", sort, "ClinicalSamples", "SortReports", _]:
+                        self.bulk.add(self.models.SortReports, path, naming_parts)
+                    # ignore readme or docs or fail
+                    case _:
+                        if naming_parts[-1] in [".docx", ".pdf", ".doc", ".md", ".txt"]:
+                            continue
+                        raise ValueError(f"{path} does not match any known scheme pattern")
+            except ValueError as e:
+                if not self.collect_errors:
+                    raise
+                report.issues.append(ValidationIssue(str(path), str(e)))
+
+        # every file name queued above is validated together
+        report.issues += self.bulk.validate(collect=self.collect_errors)
+        report.issues.sort(key=lambda issue: issue.path)
+        report.files_checked = len(seen)
+        report.files_revalidated = self.bulk.revalidated
+        self.report = report
+        if self.bulk.snapshot is not None:
+            self.bulk.snapshot.prune(seen)
+            self.bulk.snapshot.save()
 
 
 # This is the main function that will be called by the CLI
-def validate_g003_sorting(folder: Path) -> ValidateG003:
+def validate_g003_sorting(folder: Path, capture: bool = False) -> ValidateG003:
     """Validate the folder structure of a G00X from Box.
 
     Parameters
     ----------
     folder : Path
         Path to the G00X folder
+    capture : bool
+        Read the DataStats files into the shared file cache for parsing
     """
-    validate = ValidateG003()
+    validate = ValidateG003(capture=capture)
     validate.validate_scheme(root_folder=str(folder))
     print("Schema validation passed \u2713")
     return validate
+
+
+def report_g003_sorting(folder: Path, snapshot_path: Path | None = None, workers: int = 1) -> ValidationReport:
+    """Validate the folder structure of a G003 sort folder, collecting every error instead of stopping at the first.
+
+    Parameters
+    ----------
+    folder : Path
+        Path to the G00X folder
+    snapshot_path : Path | None
+        Validation snapshot from previous runs; only added or changed files are revalidated
+    workers : int
+        Number of workers for stat calls and the pydantic error path
+    """
+    snapshot = ValidationSnapshot.load(snapshot_path) if snapshot_path else None
+    validate = ValidateG003(collect_errors=True, snapshot=snapshot, workers=workers)
+    validate.validate_scheme(root_folder=str(folder))
+    assert validate.report is not None
+    return validate.report
@@ -1,8 +1,11 @@
 import json
 import re
+from dataclasses import dataclass
 from datetime import date, datetime
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Literal, Optional
+from types import MappingProxyType
+from typing import Any, Literal, Mapping, Optional
 
 import pandas as pd
 from pydantic import BaseModel, Field, root_validator, validator
@@ -42,9 +45,15 @@ class VisitIDs:
 
 
 class ParticipantIDs:
+    file_path: Path = Path(__file__).parent.parent / Path("data/enrollment.json")
+
     def __init__(self) -> None:
-        self.file_path: Path = Path(__file__).parent.parent / Path("data/enrollment.json")
-        self.enrollment_data: list[dict[str, int | str]] = json.load(open(self.file_path))
+        self.enrollment_data: list[dict[str, int | str]] = self.read_enrollment_data()
+
+    @classmethod
+    def read_enrollment_data(cls) -> list[dict[str, int | str]]:
+        with open(cls.file_path, encoding="utf-8") as f:
+            return json.load(f)
 
     def get_enrollment_data(self) -> list[dict[str, int | str]]:
         return self.enrollment_data
@@ -62,6 +71,48 @@ class ParticipantIDs:
         raise ValueError(f"Participant {ptid} not found in enrollment data.")
 
 
+@dataclass(frozen=True)
+class EnrollmentIndex:
+    """Immutable ptid -> group and group -> visit_id -> week lookups.
+
+    Built once per process by `get_enrollment_index` so validating every file in a
+    Box tree is a pair of dict lookups instead of re-reading the enrollment file.
+    """
+
+    ptid2group: Mapping[str, int]
+    group2visit2week: Mapping[int, Mapping[str, str]]
+
+    def is_ptid_in_enrollment(self, ptid: str) -> bool:
+        return ptid in self.ptid2group
+
+    def get_ptids(self) -> list[str]:
+        return list(self.ptid2group)
+
+    def get_group_by_ptid(self, ptid: str) -> int:
+        try:
+            return self.ptid2group[ptid]
+        except KeyError:
+            raise ValueError(f"Participant {ptid} not found in enrollment data.") from None
+
+    def get_timepoints_by_group(self, group: int) -> list[str]:
+        return list(self.group2visit2week[group])
+
+    def get_week_by_timepoint_and_group(self, group: int, timepoint: str) -> str:
+        return self.group2visit2week[group][timepoint]
+
+
+@lru_cache(maxsize=None)
+def get_enrollment_index() -> EnrollmentIndex:
+    """Get the process-wide G002 enrollment index, reading enrollment.json only on first call"""
+    enrollment_data = ParticipantIDs.read_enrollment_data()
+    return EnrollmentIndex(
+        ptid2group=MappingProxyType({str(pt["ptid"]): int(pt["group"]) for pt in enrollment_data}),
+        group2visit2week=MappingProxyType(
+            {group: MappingProxyType(dict(lookup)) for group, lookup in VisitIDs.group_week_lookup.items()}
+        ),
+    )
+
+
 class ModelError(ValueError):
     def __init__(self, accepted: str, given: str) -> None:
         self.accepted = accepted
@@ -98,11 +149,11 @@ class PrescreenSharedFileFieldsModel(BaseModel):
     @validator("ptid", pre=True)
     def validate_trial_id_site_id_donor_id(cls, v: str) -> str:
         """Validate the ptid from the enrollment file."""
-        participant_ids_instance = ParticipantIDs()
-        if participant_ids_instance.is_ptid_in_enrollment(v):
+        enrollment = get_enrollment_index()
+        if enrollment.is_ptid_in_enrollment(v):
             return v
         else:
-            raise ModelError(given=v, accepted=",".join(map(str, participant_ids_instance.get_ptids())))
+            raise ModelError(given=v, accepted=",".join(enrollment.get_ptids()))
 
     @validator("visit_id", pre=True)
     def validate_visit_id(cls, v: str, values: dict[str, int | str]) -> str:
@@ -116,11 +167,12 @@ class PrescreenSharedFileFieldsModel(BaseModel):
         if "ptid" not in values:
             raise ValueError("ptid must be validated before visit_id")
         ptid = values["ptid"]
-        associated_group = int(ParticipantIDs().get_group_by_ptid(ptid))
+        enrollment = get_enrollment_index()
+        associated_group = enrollment.get_group_by_ptid(ptid)
         values["group"] = associated_group
-        timepoints_for_group = VisitIDs().get_timepoints_by_group(associated_group)
+        timepoints_for_group = enrollment.get_timepoints_by_group(associated_group)
         if v in timepoints_for_group:
-            values["weeks"] = VisitIDs().get_week_by_timepoint_and_group(associated_group, v)
+            values["weeks"] = enrollment.get_week_by_timepoint_and_group(associated_group, v)
             return v
         raise ModelError(
             given=v,
@@ -184,11 +236,11 @@ class ClinicalSharedFileFieldsModel(BaseModel):
     @validator("ptid", pre=True)
     def validate_trial_id_site_id_donor_id(cls, v: str) -> str:
         """Validate the ptid from the enrollment file."""
-        participant_ids_instance = ParticipantIDs()
-        if participant_ids_instance.is_ptid_in_enrollment(v):
+        enrollment = get_enrollment_index()
+        if enrollment.is_ptid_in_enrollment(v):
             return v
         else:
-            raise ModelError(given=v, accepted=",".join(map(str, participant_ids_instance.get_ptids())))
+            raise ModelError(given=v, accepted=",".join(enrollment.get_ptids()))
 
     @validator("visit_id", pre=True)
     def validate_visit_id(cls, v: str, values: dict[str, int | str]) -> str:
@@ -202,11 +254,12 @@ class ClinicalSharedFileFieldsModel(BaseModel):
         if "ptid" not in values:
             raise ModelError(given=v, accepted="ptid does not exist")
         ptid = values["ptid"]
-        associated_group = int(ParticipantIDs().get_group_by_ptid(ptid))
+        enrollment = get_enrollment_index()
+        associated_group = enrollment.get_group_by_ptid(ptid)
         values["group"] = associated_group
-        timepoints_for_group = VisitIDs().get_timepoints_by_group(associated_group)
+        timepoints_for_group = enrollment.get_timepoints_by_group(associated_group)
         if v in timepoints_for_group:
-            values["weeks"] = VisitIDs().get_week_by_timepoint_and_group(associated_group, v)
+            values["weeks"] = enrollment.get_week_by_timepoint_and_group(associated_group, v)
             return v
         raise ModelError(
             given=v,
@@ -0,0 +1,151 @@
+"""
+Persisted validation results for incremental tree validation and the aggregated error report.
+
+A snapshot remembers (size, mtime, error) for every file name validated in a tree, so the next run
+only revalidates files that were added or changed since. The snapshot is thrown away whenever the
+enrollment data, the validator code or the snapshot layout changes, since any of them can change what is valid.
+"""
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from g00x.validations.models.g00x import ParticipantIDs
+
+logger = logging.getLogger("ValidationSnapshot")
+
+SNAPSHOT_VERSION = 1
+
+
+def default_snapshot_path(root_folder: str | Path) -> Path:
+    """Where the snapshot for a tree lives unless the user gives one; outside the tree so Box is untouched"""
+    root = str(Path(root_folder).expanduser().absolute())
+    digest = hashlib.sha1(root.encode()).hexdigest()[:12]
+    return Path("~/.cache/g00x/validation").expanduser() / f"{Path(root).name}-{digest}.json"
+
+
+def validator_sources() -> list[Path]:
+    """Source files of the validators: the tree walks, the bulk checks and the naming models"""
+    package = Path(__file__).parent
+    walks = [package / name for name in ("bulk_validation.py", "flow_validation.py", "g003_flow_validation.py")]
+    return walks + sorted((package / "models").glob("*.py"))
+
+
+def validation_fingerprint() -> str:
+    """Fingerprint of everything besides the file name that decides if a name is valid"""
+    digest = hashlib.sha1(Path(ParticipantIDs.file_path).read_bytes() + str(SNAPSHOT_VERSION).encode())
+    for source in validator_sources():
+        digest.update(f"{source.name}:{hashlib.sha1(source.read_bytes()).hexdigest()}".encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class SnapshotEntry:
+    size: int
+    mtime_ns: int
+    error: str | None = None
+
+
+@dataclass
+class ValidationSnapshot:
+    """Validation result of every file keyed by path, persisted as json between runs"""
+
+    path: Path | None = None
+    fingerprint: str = field(default_factory=validation_fingerprint)
+    entries: dict[str, SnapshotEntry] = field(default_factory=dict)
+
+    @staticmethod
+    def load(path: str | Path) -> "ValidationSnapshot":
+        """Load a snapshot, starting fresh if it is missing, unreadable or stale"""
+        path = Path(path)
+        snapshot = ValidationSnapshot(path=path)
+        if not path.exists():
+            return snapshot
+        try:
+            saved = json.load(open(path, encoding="utf-8"))
+        except (OSError, ValueError):
+            logger.warning(f"Ignoring unreadable validation snapshot {path}")
+            return snapshot
+        if saved.get("fingerprint") != snapshot.fingerprint:
+            logger.info("Enrollment or validation rules changed, revalidating the whole tree")
+            return snapshot
+        snapshot.entries = {k: SnapshotEntry(**v) for k, v in saved["entries"].items()}
+        return snapshot
+
+    def save(self) -> None:
+        """Write the snapshot atomically so an interrupted run never leaves a corrupt file"""
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"fingerprint": self.fingerprint, "entries": {k: asdict(v) for k, v in self.entries.items()}},
+                f,
+            )
+        os.replace(tmp_path, self.path)
+
+    def stat(self, paths: list[Path], workers: int = 1) -> list[os.stat_result]:
+        """Stat every path, concurrently since on network mounts each stat is a round trip"""
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                return list(executor.map(os.stat, paths))
+        return [os.stat(p) for p in paths]
+
+    def lookup(self, path: Path, stat: os.stat_result) -> SnapshotEntry | None:
+        """The saved entry if the file is unchanged since it was validated"""
+        entry = self.entries.get(str(path))
+        if entry is not None and entry.size == stat.st_size and entry.mtime_ns == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def record(self, path: Path, stat: os.stat_result, error: str | None) -> None:
+        self.entries[str(path)] = SnapshotEntry(size=stat.st_size, mtime_ns=stat.st_mtime_ns, error=error)
+
+    def prune(self, seen: set[str]) -> None:
+        """Forget files that no longer exist in the tree"""
+        self.entries = {k: v for k, v in self.entries.items() if k in seen}
+
+
+@dataclass
+class ValidationIssue:
+    path: str
+    error: str
+
+
+@dataclass
+class ValidationReport:
+    """Every error found in a tree, instead of just the first"""
+
+    root_folder: str
+    files_checked: int = 0
+    files_revalidated: int = 0
+    issues: list[ValidationIssue] = field(default_factory=list)
+
+    @property
+    def passed(self) -> bool:
+        return not self.issues
+
+    def to_json(self, file_name: str | Path) -> None:
+        """Dump to json"""
+        json.dump(asdict(self), open(file_name, "w", encoding="utf-8"), indent=True)
+
+    def to_text(self) -> str:
+        lines = [
+            f"Validated {self.root_folder}: {self.files_checked} files, {self.files_revalidated} revalidated",
+            f"{len(self.issues)} errors",
+        ]
+        for issue in self.issues:
+            lines.append(f"{issue.path}\n{issue.error}")
+        return "\n".join(lines)
+
+    def write(self, prefix: str | Path) -> tuple[Path, Path]:
+        """Write the report next to each other as .json and .txt"""
+        json_path = Path(f"{prefix}.json")
+        text_path = Path(f"{prefix}.txt")
+        self.to_json(json_path)
+        text_path.write_text(self.to_text() + "\n", encoding="utf-8")
+        return json_path, text_path
@@ -1,14 +1,44 @@
 import click
 
-from g00x.cli import g002, g003
+from g00x.tools.lazy import LazyGroup
+from g00x.tools.profiling import profile_options, start_profiling
+from g00x.tools.telemetry import DEFAULT_LEDGER, telemetry
 from g00x_figures.cli import figures
 from VISC_codebase.cli import comparison_tables
 
 
-@click.group()
-def main():
+# g00x.cli and the pandas stack behind it are only imported once one of its commands runs
+@click.group(
+    cls=LazyGroup,
+    lazy_subcommands={
+        "benchmark": "g00x.cli:benchmark_group",
+        "g002": "g00x.cli:g002",
+        "g003": "g00x.cli:g003",
+        "telemetry": "g00x.cli:telemetry_group",
+        "worker": "g00x.cli:worker",
+    },
+    lazy_help={
+        "benchmark": "Generate synthetic trials and benchmark the pipeline on them",
+        "g002": "Run the G002 commands of G00x",
+        "g003": "Run the G003 commands of G00x",
+        "telemetry": "Inspect the telemetry ledger",
+        "worker": "Run the cellranger and SADIE tasks the pipeline submits to a job queue",
+    },
+)
+@click.option(
+    "--telemetry-ledger",
+    type=click.Path(file_okay=True, dir_okay=False, writable=True),
+    envvar="G00X_TELEMETRY",
+    default=str(DEFAULT_LEDGER),
+    show_default=True,
+    help="JSON lines ledger the stages of this run are recorded to, empty to record nothing",
+)
+@profile_options
+@click.pass_context
+def main(ctx: click.Context, telemetry_ledger: str, profile: str | None, profile_dir: str, profile_top: int):
     """Run All scripts."""
-    pass
+    telemetry.configure(telemetry_ledger)
+    start_profiling(ctx, profile, profile_dir, profile_top)
 
 
 # Supplementary Comparison Tables
@@ -17,9 +47,6 @@ figures.add_command(comparison_tables, name="comparison-tables")
 # hardcode paths to internal VISC data; will have to rely on PDF already generated
 # Main Figures
 main.add_command(figures, name="plot")
-# Pipeline
-main.add_command(g002, name="g002")
-main.add_command(g003, name="g003")
 
 if __name__ == "__main__":
     # Run the CLI
@@ -1,5 +1,251 @@
+from typing import Literal, get_args
+
+import numpy as np
 import pandas as pd
 
+QuantileMethod = Literal[
+    "inverted_cdf",
+    "averaged_inverted_cdf",
+    "closest_observation",
+    "interpolated_inverted_cdf",
+    "hazen",
+    "weibull",
+    "linear",
+    "median_unbiased",
+    "normal_unbiased",
+    "lower",
+    "higher",
+    "midpoint",
+    "nearest",
+]
+
+# alpha and beta of the Hyndman & Fan continuous methods
+_PLOTTING_POSITIONS = {
+    "interpolated_inverted_cdf": (0, 1),
+    "hazen": (0.5, 0.5),
+    "weibull": (0, 0),
+    "median_unbiased": (1 / 3, 1 / 3),
+    "normal_unbiased": (3 / 8, 3 / 8),
+}
+# resampled values drawn at once by grouped_bootstrap, with their indices about 160 MB
+BOOTSTRAP_BATCH_VALUES = 10_000_000
+
+
+def _index_to_boundaries(index: np.ndarray, take_previous: np.ndarray) -> np.ndarray:
+    previous = np.floor(index)
+    return np.maximum(np.where(take_previous, previous, previous + 1), 0)
+
+
+def _quantile_index(n: np.ndarray, q: float, method: QuantileMethod) -> tuple[np.ndarray, np.ndarray]:
+    """Virtual index of the quantile in each sorted group and the weight of the next value, as np.quantile does"""
+    if method == "linear":
+        index = (n - 1) * q
+    elif method in _PLOTTING_POSITIONS:
+        alpha, beta = _PLOTTING_POSITIONS[method]
+        index = n * q + (alpha + q * (1 - alpha - beta)) - 1
+    elif method == "averaged_inverted_cdf":
+        index = n * q - 1
+    elif method == "midpoint":
+        index = 0.5 * (np.floor((n - 1) * q) + np.ceil((n - 1) * q))
+    elif method == "lower":
+        index = np.floor((n - 1) * q)
+    elif method == "higher":
+        index = np.ceil((n - 1) * q)
+    elif method == "nearest":
+        index = np.around((n - 1) * q)
+    elif method == "inverted_cdf":
+        index = n * q - 1
+        index = _index_to_boundaries(index, index % 1 == 0)
+    elif method == "closest_observation":
+        index = n * q - 1.5
+        index = _index_to_boundaries(index, (index % 1 == 0) & (np.floor(index) % 2 == 0))
+    else:
+        raise ValueError(f"{method!r} is not a valid quantile method, use one of {get_args(QuantileMethod)}")
+    gamma = index - np.floor(index)
+    if method == "averaged_inverted_cdf":
+        gamma = np.where(gamma == 0, 0.5, 1.0)
+    elif method == "midpoint":
+        gamma = np.where(index % 1 == 0, 0.0, 0.5)
+    return index, gamma
+
+
+def _grouped_sorted(
+    df: pd.DataFrame, group: list[str] | str, col: str
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, pd.Index]:
+    """Values of every group sorted within it, with the start and size of each group and the group keys"""
+    grouped = df.groupby(group, sort=True)
+    keys = grouped.size().index
+    # rows of missing keys aren't in a group, their code is NaN
+    codes = grouped.ngroup().to_numpy(dtype=float)
+    values = df[col].to_numpy(dtype=float)
+    kept = ~np.isnan(codes) & ~np.isnan(values)
+    codes, values = codes[kept].astype(np.intp), values[kept]
+    order = np.lexsort((values, codes))
+    sizes = np.bincount(codes, minlength=len(keys))
+    starts = np.cumsum(sizes) - sizes
+    return values[order], starts, sizes, keys
+
+
+def _sorted_quantile(
+    values: np.ndarray, starts: np.ndarray, sizes: np.ndarray, q: float, method: QuantileMethod
+) -> np.ndarray:
+    """Quantile of every group of values sorted within their groups along the last axis, NaN for empty groups"""
+    index, gamma = _quantile_index(sizes.astype(float), q, method)
+    last = np.maximum(sizes - 1, 0)
+    # past either end both neighbours are the end value
+    previous = np.clip(np.floor(index), 0, last).astype(np.intp)
+    following = np.clip(np.floor(index) + 1, 0, last).astype(np.intp)
+    empty = sizes == 0
+    padded = np.concatenate([values, np.full(values.shape[:-1] + (1,), np.nan)], axis=-1)
+    below = padded[..., np.where(empty, values.shape[-1], starts + previous)]
+    above = padded[..., np.where(empty, values.shape[-1], starts + following)]
+    difference = above - below
+    return np.where(gamma >= 0.5, above - difference * (1 - gamma), below + difference * gamma)
+
+
+def grouped_quantile(
+    df: pd.DataFrame, group: list[str] | str, col: str, q: float = 0.5, method: QuantileMethod = "linear"
+) -> pd.Series:
+    """Quantile of a column in every group, in one sort of the whole column rather than a function call per group
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe
+    group : list[str] | str
+        Group column(s)
+    col : str
+        Column name; should be a numeric column, missing values are left out
+    q : float, optional
+        Quantile, by default 0.5
+    method : QuantileMethod, optional
+        Any of the np.quantile methods, by default linear
+
+    Returns
+    -------
+    pd.Series
+        Quantile of each group, indexed by the groups like groupby(group)[col] and NaN for groups without values
+    """
+    values, starts, sizes, keys = _grouped_sorted(df, group, col)
+    return pd.Series(_sorted_quantile(values, starts, sizes, q, method), index=keys, name=col)
+
+
+def grouped_median(df: pd.DataFrame, group: list[str] | str, col: str) -> pd.Series:
+    """Median of a column in every group, see grouped_quantile"""
+    return grouped_quantile(df, group, col, q=0.5)
+
+
+def grouped_geomean(
+    df: pd.DataFrame, group: list[str] | str, col: str, lower: float | None = None, upper: float | None = None
+) -> pd.Series:
+    """Geometric mean of a column in every group, of the values within the limits
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe
+    group : list[str] | str
+        Group column(s)
+    col : str
+        Column name; should be a positive numeric column
+    lower : float | None, optional
+        Values below are left out, by default None
+    upper : float | None, optional
+        Values at or above are left out, like the KDs past the binding limit, by default None
+
+    Returns
+    -------
+    pd.Series
+        Geometric mean of each group with values in the limits, indexed by the groups like groupby(group)[col]
+    """
+    values = df[col]
+    kept = values.notna()
+    if lower is not None:
+        kept &= values >= lower
+    if upper is not None:
+        kept &= values < upper
+    with np.errstate(divide="ignore"):
+        logs = df[kept].assign(**{col: lambda d: np.log(d[col].astype(float))})
+    return np.exp(logs.groupby(group)[col].mean())
+
+
+def grouped_bootstrap(
+    df: pd.DataFrame,
+    group: list[str] | str,
+    col: str,
+    statistic: Literal["median", "quantile", "geomean"] = "median",
+    q: float = 0.5,
+    method: QuantileMethod = "linear",
+    n_resamples: int = 1000,
+    confidence: float = 0.95,
+    seed: int | None = None,
+    batch_values: int = BOOTSTRAP_BATCH_VALUES,
+) -> pd.DataFrame:
+    """Percentile bootstrap interval of a statistic of a column in every group
+
+    All groups are resampled together: each resample draws, for every group, as many positions in its block of the
+    sorted values as it has values, as one integer array. Resamples are drawn in batches of at most batch_values values.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Dataframe
+    group : list[str] | str
+        Group column(s)
+    col : str
+        Column name; should be a numeric column, missing values are left out
+    statistic : Literal["median", "quantile", "geomean"], optional
+        Statistic of each group, by default median
+    q : float, optional
+        Quantile, for the quantile statistic, by default 0.5
+    method : QuantileMethod, optional
+        Any of the np.quantile methods, for the quantile statistic, by default linear
+    n_resamples : int, optional
+        Bootstrap resamples, by default 1000
+    confidence : float, optional
+        Confidence level of the interval, by default 0.95
+    seed : int | None, optional
+        Seed of the resampling, None draws one from np.random, which the figure commands seed, by default None
+    batch_values : int, optional
+        Most values resampled at once, by default BOOTSTRAP_BATCH_VALUES
+
+    Returns
+    -------
+    pd.DataFrame
+        The statistic of each group as col, with ci_low and ci_high, indexed by the groups like groupby(group)[col]
+    """
+    if statistic not in ("median", "quantile", "geomean"):
+        raise ValueError(f"Unknown statistic {statistic!r}, use median, quantile or geomean")
+    if statistic == "median":
+        q, method = 0.5, "linear"
+    values, starts, sizes, keys = _grouped_sorted(df, group, col)
+    if statistic == "geomean":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.log(values)
+    filled = sizes > 0
+
+    def estimate(sample: np.ndarray) -> np.ndarray:
+        if statistic != "geomean":
+            return _sorted_quantile(sample, starts, sizes, q, method)
+        means = np.full(sample.shape[:-1] + sizes.shape, np.nan)
+        if filled.any():
+            means[..., filled] = np.add.reduceat(sample, starts[filled], axis=-1) / sizes[filled]
+        return np.exp(means)
+
+    rng = np.random.default_rng(np.random.randint(0, 2**31 - 1) if seed is None else seed)
+    owner = np.repeat(np.arange(len(sizes)), sizes)
+    batch = max(1, batch_values // max(len(values), 1))
+    resampled = []
+    for begin in range(0, n_resamples, batch):
+        picks = starts[owner] + rng.integers(0, sizes[owner], size=(min(batch, n_resamples - begin), len(values)))
+        if statistic != "geomean":
+            # values are sorted within their groups, so sorting the positions sorts each resample
+            picks.sort(axis=-1)
+        resampled.append(estimate(values[picks]))
+    tail = (1 - confidence) / 2
+    low, high = np.quantile(np.concatenate(resampled), [tail, 1 - tail], axis=0)
+    return pd.DataFrame({col: estimate(values), "ci_low": low, "ci_high": high}, index=keys)
+
 
 def top_n_percent(df: pd.DataFrame, col: str, percent: float = 0.9) -> pd.Series:
     """Qunatile of a column.
@@ -40,4 +286,4 @@ def top_n_percent_group(df: pd.DataFrame, group: list[str] | str, col: str, perc
     pd.DataFrame
         Dataframe with the quantile value
     """
-    return df.groupby(group).apply(lambda x: top_n_percent(x, col=col, percent=percent)).reset_index()
+    return grouped_quantile(df, group, col, q=percent, method="midpoint").reset_index()
@@ -1,75 +1,13 @@
 """This is our main entry point"""
-import functools
 import logging
-import math
 import subprocess
 from pathlib import Path
 
 import click
-import matplotlib.pyplot as plt
-import numpy as np
-import patchworklib as pw
-import seaborn as sns
-from matplotlib import ticker as mtick
-from matplotlib.patches import Patch
-
-from g00x_figures.alleles import plot_allele_table, plot_allele_table_group4
-from g00x_figures.box_and_scatter.flow_frequencies import (  # plot_flow_frequencies,
-    MinorSymLogLocator,
-    adjust_boxplot,
-    plot_boost_frequences,
-    plot_cp_frequency,
-    plot_group_4_responders,
-    plot_pre_post_frequency,
-    plot_response_summary,
-)
-from g00x_figures.counts import FlowCytometryPlot
-from g00x_figures.data import Data, Transforms
-from g00x_figures.features import (  # plot_key_mutations_boost,
-    plot_has_100b,
-    plot_has_100b_boost,
-    plot_isotype_data,
-    plot_isotype_data_pseudogroups,
-    plot_key_mutations,
-    plot_light_chain_dist,
-    plot_light_chain_dist_boost,
-    plot_light_chain_usage,
-    plot_light_chain_usage_boost,
-    plot_qe_on_light_chain,
-    plot_qe_on_light_chain_boost,
-    plot_seq_logos_nonvrc01_class,
-    plot_seq_logos_vrc01_class,
-)
-from g00x_figures.flow_frequencies import plot_flow_frequencies
-from g00x_figures.misc import (
-    plot_methodology_comparision,
-    plot_methodology_comparision2,
-)
-from g00x_figures.mutations import (
-    plot_key_mutations_boost,
-    plot_somatic_mutation_aa_frequencies,
-    plot_somatic_mutation_aa_frequencies_boost,
-    plot_somatic_mutation_nt_frequencies,
-    plot_v_mutations,
-    run_90_percentile_hc_residues,
-)
-from g00x_figures.plot_helpers.font import apply_global_font_settings
-from g00x_figures.plots import Plot
-from g00x_figures.polyclonality import (
-    plot_boost_clonality,
-    plot_multi_find_clonality,
-    plot_polyclonality,
-)
-from g00x_figures.properties import spr_properties
-from g00x_figures.qc import plot_qc
-from g00x_figures.responders import run_percent_igg_responders
-from g00x_figures.spr import (
-    plot_core_spr,
-    plot_core_spr_kon_off,
-    plot_shm_spr,
-    plot_spr_core_candidates,
-    plot_spr_prime,
-)
+
+from g00x_figures.build import build_options, jobs_option, render
+
+# Figure modules and the plotting libraries are imported by the commands that use them, see g00x_figures.cli
 
 
 @click.group(invoke_without_command=True)
@@ -106,6 +44,18 @@ from g00x_figures.spr import (
     help="Scale factor for median values",
     default=1e9,
 )
+@click.option(
+    "--force",
+    is_flag=True,
+    envvar="G00X_FIGURES_FORCE",
+    help="Render figures even if their code and data haven't changed since they were last rendered",
+)
+@click.option(
+    "--metrics-only",
+    is_flag=True,
+    envvar="G00X_FIGURES_METRICS_ONLY",
+    help="Only write the metric CSVs, don't render the images",
+)
 def cli(
     ctx: click.Context,
     outdir: Path,
@@ -113,8 +63,12 @@ def cli(
     is_main: bool,
     use_geomean,
     median_scale,
+    force: bool,
+    metrics_only: bool,
 ) -> None:
     """Plot figures."""
+    from g00x_figures.data import Data, Transforms
+
     ctx.obj = {}
     ctx.obj = {
         "data": Data(),
@@ -142,6 +96,8 @@ def cli(
     ctx.obj["is_main"] = is_main
     ctx.obj["use_geomean"] = use_geomean
     ctx.obj["median_scale"] = median_scale
+    ctx.obj["force"] = force
+    ctx.obj["metrics_only"] = metrics_only
 
     for key in ["fig", "img_outdir", "metric_outdir"]:
         value = ctx.obj[key]
@@ -153,6 +109,8 @@ def cli(
 @click.pass_context
 def fig2(ctx: click.Context) -> None:
     """Flow frequencies."""
+    from g00x_figures.flow_frequencies import plot_flow_frequencies
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -174,6 +132,8 @@ def fig2(ctx: click.Context) -> None:
 @cli.command("fig8")
 @click.pass_context
 def fig8(ctx: click.Context, *args, **kwargs) -> None:
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_cp_frequency
+
     breakpoint()
     data = ctx.obj["data"]
     img_outdir = ctx.obj["img_outdir"]
@@ -202,6 +162,10 @@ def fig8(ctx: click.Context, *args, **kwargs) -> None:
     help="Do not plot panel E",
 )
 def prime_mutations(ctx: click.Context, aa: bool, method: str, no_panel_e: bool) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.mutations import plot_v_mutations, run_90_percentile_hc_residues
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -240,6 +204,8 @@ def prime_mutations(ctx: click.Context, aa: bool, method: str, no_panel_e: bool)
 @click.pass_context
 def boost_freq(ctx: click.Context) -> None:
     """Figure 4."""
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_boost_frequences
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -258,6 +224,10 @@ def boost_freq(ctx: click.Context) -> None:
     default="nearest",
 )
 def fig5(ctx: click.Context, method: str) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.mutations import plot_key_mutations_boost, plot_v_mutations
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     is_main = ctx.obj["is_main"]
@@ -296,6 +266,8 @@ def light_chain_quality_control(ctx: click.Context) -> None:
 @click.pass_context
 def methodology_comparison(ctx: click.Context) -> None:
     """Methodology comparison btw G001 (Sanger) and G002/G003 (10X)"""
+    from g00x_figures.misc import plot_methodology_comparision
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -310,6 +282,8 @@ def methodology_comparison(ctx: click.Context) -> None:
 @click.pass_context
 def methodology_comparison(ctx: click.Context) -> None:
     """Methodology comparison btw G001 (Sanger) and G002/G003 (10X)"""
+    from g00x_figures.misc import plot_methodology_comparision2
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -326,6 +300,8 @@ def methodology_comparison(ctx: click.Context) -> None:
 @click.pass_context
 def boost_clonality(ctx: click.Context) -> None:
     """Plot boost clonality for supplementary figure 29."""
+    from g00x_figures.polyclonality import plot_boost_clonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -368,6 +344,8 @@ def boost_clonality(ctx: click.Context) -> None:
     is_flag=True,
 )
 def num_bcr_clusters(ctx: click.Context, use_last_week: bool) -> None:
+    from g00x_figures.polyclonality import plot_multi_find_clonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -389,6 +367,8 @@ def num_bcr_clusters(ctx: click.Context, use_last_week: bool) -> None:
     is_flag=True,
 )
 def hierarchical_clustering_and_polyclonality(ctx: click.Context, use_last_week: bool) -> None:
+    from g00x_figures.polyclonality import plot_polyclonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -410,6 +390,10 @@ def hierarchical_clustering_and_polyclonality(ctx: click.Context, use_last_week:
 @cli.command("b-count-spr-g00x-eOD")
 @click.pass_context
 def s28(ctx: click.Context) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.spr import plot_spr_prime
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -435,6 +419,10 @@ def s28(ctx: click.Context) -> None:
 @cli.command("b-count-spr-g00x-core")
 @click.pass_context
 def s33(ctx: click.Context) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.spr import plot_spr_prime
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -463,6 +451,8 @@ def s33(ctx: click.Context) -> None:
 @cli.command("fig7")
 @click.pass_context
 def fig7(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -481,6 +471,8 @@ def fig7(ctx: click.Context) -> None:
 @click.pass_context
 def fig38(ctx: click.Context) -> None:
     """Figure 7."""
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -509,6 +501,13 @@ def fig38(ctx: click.Context) -> None:
 @click.pass_context
 def sup31(ctx: click.Context) -> None:
     """Figure 1."""
+    from g00x_figures.features import (
+        plot_has_100b_boost,
+        plot_light_chain_dist_boost,
+        plot_light_chain_usage_boost,
+        plot_qe_on_light_chain_boost,
+    )
+
     logging.info("Figure S31")
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
@@ -544,6 +543,8 @@ def sup31(ctx: click.Context) -> None:
 @cli.command("fig8")
 @click.pass_context
 def fig8(ctx: click.Context) -> None:
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_cp_frequency
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -556,6 +557,8 @@ def fig8(ctx: click.Context) -> None:
 @cli.command("spr-boost")
 @click.pass_context
 def spr_boost(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -586,6 +589,8 @@ def save(img, dfs, img_outpath, metric_outdir):
 @cli.command("b-count-flow-g002")
 @click.pass_context
 def s20(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
@@ -610,6 +615,8 @@ def s20(ctx: click.Context) -> None:
 @cli.command("b-count-boost-g002")
 @click.pass_context
 def s31(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     flow_cytometry_plot.columns = {
         "B cells": "B cells",
@@ -640,6 +647,8 @@ def s31(ctx: click.Context) -> None:
 @cli.command("b-count-flow-g003")
 @click.pass_context
 def s21(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     flow_cytometry_plot.columns = {
         "IgD- B cells": "IgD$^{-}$ B cells",
@@ -677,6 +686,8 @@ def s21(ctx: click.Context) -> None:
 @cli.command("s-freq-seq-g002")
 @click.pass_context
 def s22(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -690,6 +701,8 @@ def s22(ctx: click.Context) -> None:
 @cli.command("s-freq-seq-g003")
 @click.pass_context
 def s23(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -703,6 +716,8 @@ def s23(ctx: click.Context) -> None:
 @cli.command("b-count-spr-g002")
 @click.pass_context
 def s28(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -722,6 +737,8 @@ def s28(ctx: click.Context) -> None:
 @cli.command("b-freq-prepost-g002")
 @click.pass_context
 def s32(ctx: click.Context) -> None:
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_pre_post_frequency
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -735,6 +752,8 @@ def s32(ctx: click.Context) -> None:
 @cli.command("s-freq-boost-g002")
 @click.pass_context
 def s34(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data_pseudogroups
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -748,6 +767,8 @@ def s34(ctx: click.Context) -> None:
 @cli.command("b-shm-spr-g002")
 @click.pass_context
 def s40(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_shm_spr
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -761,6 +782,8 @@ def s40(ctx: click.Context) -> None:
 @cli.command("s-properties-spr-g002")
 @click.pass_context
 def s41(ctx: click.Context) -> None:
+    from g00x_figures.properties import spr_properties
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -774,6 +797,8 @@ def s41(ctx: click.Context) -> None:
 @cli.command("b-kon-koff-spr-g28v2-g002")
 @click.pass_context
 def s42(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr_kon_off
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -792,6 +817,8 @@ def s42(ctx: click.Context) -> None:
 @cli.command("b-kon-koff-spr-N276-g002")
 @click.pass_context
 def s45(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr_kon_off
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -810,6 +837,8 @@ def s45(ctx: click.Context) -> None:
 @cli.command("b-freq-spr-g002-nonvrc01")
 @click.pass_context
 def sup51(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -838,6 +867,8 @@ def sup51(ctx: click.Context) -> None:
 @cli.command("S24")
 @click.pass_context
 def s24(ctx: click.Context) -> None:
+    from g00x_figures.responders import run_percent_igg_responders
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -851,6 +882,8 @@ def s24(ctx: click.Context) -> None:
 @cli.command("S27")
 @click.pass_context
 def s27(ctx: click.Context) -> None:
+    from g00x_figures.qc import plot_qc
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -875,7 +908,8 @@ def plot_test(ctx: click.Context) -> None:
 
 @cli.command("main")
 @click.pass_context
-def plot_main(ctx: click.Context) -> None:
+@jobs_option
+def plot_main(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot -m --fig fig2 flow-freq",
@@ -886,13 +920,13 @@ def plot_main(ctx: click.Context) -> None:
         "g00x plot -m --fig fig6 -g -s 1 spr-boost",
         "g00x plot -m --fig fig7 fig8",
     ]
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
 
 
 @cli.command("supp")
 @click.pass_context
-def plot_sup(ctx: click.Context) -> None:
+@jobs_option
+def plot_sup(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot --fig S19 methodology2",
@@ -920,25 +954,25 @@ def plot_sup(ctx: click.Context) -> None:
         "g00x plot --fig S51 -g -s 1 b-freq-spr-g002-nonvrc01",
     ]
     assert len(set([c.split(" ")[-1] for c in commands])) == len(commands)
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
 
 
 @cli.command("quant")
 @click.pass_context
-def plot_sup(ctx: click.Context) -> None:
+@jobs_option
+def plot_sup(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot -m --fig fig3 prime-mut --aa --method nearest",
         "g00x plot -m --fig fig5 boost-mut-aa --method nearest",
     ]
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
 
 
 @cli.command("spr")
 @click.pass_context
-def plot_sup(ctx: click.Context) -> None:
+@jobs_option
+def plot_sup(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot -m --fig fig6 -g -s 1 spr-boost",
@@ -951,5 +985,4 @@ def plot_sup(ctx: click.Context) -> None:
         "g00x plot --fig S51 -g -s 1 b-freq-spr-g002-nonvrc01",
     ]
     assert len(set([c.split(" ")[-1] for c in commands])) == len(commands)
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
@@ -0,0 +1,303 @@
+"""
+Renders the figures of the aggregate plot commands, one after another or several at a time.
+
+Every figure runs as its own `g00x plot` process. With more than one job the datasets are loaded once beforehand into
+the Arrow files of the dataset cache and every worker reads them from there rather than loading the raw data
+again. Each figure command seeds the RNG itself, so a figure comes out the same whichever worker renders it and
+whatever ran before it.
+
+Builds are incremental. A figure's fingerprint covers its options, the code of its command and of the g00x_figures
+modules it imports, the module of Data if that code calls its getters and the content of the files those getters
+read. It is recorded with the outputs of the figure in the metrics directory, and a figure whose fingerprint and
+outputs are unchanged isn't rendered again unless forced.
+
+With metrics only, figures are still built but savefig doesn't rasterize or write anything, only the metric CSVs come
+out, headless.
+"""
+import hashlib
+import inspect
+import json
+import logging
+import os
+import re
+import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import click
+
+logger = logging.getLogger("FigureBuild")
+
+PACKAGE = Path(__file__).parent
+# the module of Data is fingerprinted whole whenever a figure calls a getter, the cache only stores what it returns
+GETTER_FILES = {PACKAGE / "data/data.py", PACKAGE / "data/cache.py"}
+IMPORT = re.compile(r"^\s*from\s+(g00x_figures[\w.]*|\.+[\w.]*)\s+import\s+(\([^)]*\)|[^\n]+)", re.M)
+CALL = re.compile(r"\.(\w+)\(")
+PATH_FIELD = re.compile(r"self\.paths\.(\w+)")
+
+
+def snapshot_datasets() -> Path:
+    """Write the datasets of every Data getter to the cache directory the workers will read
+
+    Returns
+    -------
+    Path
+        The directory of the Arrow files
+    """
+    from g00x_figures.data import Data
+    from g00x_figures.data.cache import datasets, warm
+
+    if datasets.directory is None:
+        datasets.configure(directory=tempfile.mkdtemp(prefix="g00x_figures_datasets_"))
+    loaded = warm(Data())
+    logger.info(f"{len(loaded)} datasets in {datasets.directory}")
+    return datasets.directory  # type: ignore
+
+
+def render(
+    commands: list[str],
+    jobs: int = 1,
+    force: bool = False,
+    metrics_only: bool = False,
+    seed: int | None = None,
+    bootstrap_ci: bool = False,
+) -> None:
+    """Run figure commands, in parallel when jobs is more than 1
+
+    Parameters
+    ----------
+    commands : list[str]
+        Shell commands, each renders one figure
+    jobs : int
+        Figures rendered at the same time
+    force : bool
+        Render figures that are up to date too
+    metrics_only : bool
+        Only write the metric CSVs of the figures
+    seed : int | None
+        Seed every figure starts from, by default that of the figure commands
+    bootstrap_ci : bool
+        Add bootstrap confidence intervals to the figures that have them
+    """
+    env = dict(os.environ)
+    if force:
+        env["G00X_FIGURES_FORCE"] = "1"
+    if metrics_only:
+        env["G00X_FIGURES_METRICS_ONLY"] = "1"
+    if seed is not None:
+        env["G00X_FIGURES_SEED"] = str(seed)
+    if bootstrap_ci:
+        env["G00X_FIGURES_BOOTSTRAP_CI"] = "1"
+    if jobs <= 1:
+        for cmd in commands:
+            subprocess.run(cmd, shell=True, check=True, env=env)
+        return
+
+    env["G00X_FIGURES_CACHE"] = str(snapshot_datasets())
+
+    def run(cmd: str) -> int:
+        logger.info(f"Rendering: {cmd}")
+        return subprocess.run(cmd, shell=True, env=env).returncode
+
+    # the work is in the child processes, threads are enough to keep jobs of them going
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        returncodes = list(pool.map(run, commands))
+    failed = [cmd for cmd, returncode in zip(commands, returncodes) if returncode != 0]
+    if failed:
+        raise click.ClickException("Failed to render:\n" + "\n".join(failed))
+
+
+def build_options(obj: dict[str, Any]) -> dict[str, Any]:
+    """The options of render a plot invocation passes on to the figure processes it starts"""
+    return {key: obj[key] for key in ("force", "metrics_only", "seed", "bootstrap_ci") if key in obj}
+
+
+def _module_files(module: str, package: Path) -> list[Path]:
+    if module.startswith("."):
+        level = len(module) - len(module.lstrip("."))
+        base = package.parents[level - 2] if level > 1 else package
+        parts = module.lstrip(".").split(".") if module.lstrip(".") else []
+    else:
+        base, parts = PACKAGE, module.split(".")[1:]
+    path = base.joinpath(*parts)
+    return [candidate for candidate in (path.with_suffix(".py"), path / "__init__.py") if candidate.exists()][:1]
+
+
+def figure_code(callback: Callable[..., Any]) -> list[Path]:
+    """The g00x_figures modules a figure command imports, directly or through the modules it imports
+
+    Parameters
+    ----------
+    callback : Callable[..., Any]
+        The function of the command
+
+    Returns
+    -------
+    list[Path]
+        Source files of the modules
+    """
+    pending = [(inspect.getsource(callback), PACKAGE)]
+    files: set[Path] = set()
+    while pending:
+        source, package = pending.pop()
+        for module, names in IMPORT.findall(source):
+            found = _module_files(module, package)
+            # from a package import its modules
+            for name in re.findall(r"\w+", names):
+                found += _module_files(f"{module}.{name}" if module.strip(".") else f"{module}{name}", package)
+            for path in found:
+                if path not in files:
+                    files.add(path)
+                    pending.append((path.read_text(), path.parent))
+    return sorted(files)
+
+
+def data_inputs(data: Any, sources: list[str]) -> tuple[list[str], list[str]]:
+    """The Data getters called in the sources and the DataPaths fields they read, following getters that call others
+
+    Parameters
+    ----------
+    data : Any
+        The Data instance
+    sources : list[str]
+        Source code of the figure
+
+    Returns
+    -------
+    tuple[list[str], list[str]]
+        Getters and path fields
+    """
+    methods = {name for name, _ in inspect.getmembers(type(data), inspect.isfunction) if not name.startswith("_")}
+    pending = [name for source in sources for name in CALL.findall(source) if name in methods]
+    getters: set[str] = set()
+    fields: set[str] = set()
+    while pending:
+        name = pending.pop()
+        if name in getters:
+            continue
+        getters.add(name)
+        source = inspect.getsource(getattr(type(data), name))
+        fields.update(PATH_FIELD.findall(source))
+        pending += [called for called in CALL.findall(source) if called in methods]
+    return sorted(getters), sorted(fields)
+
+
+def fingerprint(ctx: click.Context, callback: Callable[..., Any]) -> str:
+    """Hash of everything a figure command's output depends on
+
+    Parameters
+    ----------
+    ctx : click.Context
+        Context of the figure command, after its plot options are set up
+    callback : Callable[..., Any]
+        The function of the command
+    """
+    from g00x_figures.data.cache import datasets
+
+    data = ctx.obj["data"]
+    options = {
+        key: ctx.obj[key]
+        for key in ("fig", "is_main", "use_geomean", "median_scale", "bootstrap_ci", "seed", "metrics_only")
+    }
+    digest = hashlib.sha256(json.dumps([ctx.info_name, ctx.params, options], sort_keys=True, default=str).encode())
+    digest.update(inspect.getsource(callback).encode())
+    code = [path for path in figure_code(callback) if path not in GETTER_FILES]
+    for path in code:
+        digest.update(f"{path.relative_to(PACKAGE)}:{hashlib.sha256(path.read_bytes()).hexdigest()}".encode())
+    getters, fields = data_inputs(data, [inspect.getsource(callback)] + [path.read_text() for path in code])
+    # all of it, as the dataset cache keys a getter, so the helpers getters call and DataPaths are covered too
+    if getters:
+        module = Path(inspect.getsourcefile(type(data)))  # type: ignore
+        digest.update(f"Data:{hashlib.sha256(module.read_bytes()).hexdigest()}".encode())
+    for field in fields:
+        path = Path(getattr(data.paths, field))
+        # directories are only a base other fields are joined to
+        if not path.is_dir():
+            digest.update(f"{field}:{datasets.file_hash(path) if path.exists() else 'missing'}".encode())
+    return digest.hexdigest()
+
+
+def up_to_date(stamp: Path, digest: str) -> bool:
+    """Whether the figure was rendered with this fingerprint and its outputs are all still there"""
+    if not stamp.exists():
+        return False
+    recorded = json.loads(stamp.read_text())
+    return (
+        recorded["fingerprint"] == digest
+        and bool(recorded["outputs"])
+        and all(Path(output).exists() for output in recorded["outputs"])
+    )
+
+
+def record(stamp: Path, digest: str, outputs: list[Path]) -> None:
+    """Write the fingerprint with the files the figure saved"""
+    stamp.parent.mkdir(parents=True, exist_ok=True)
+    stamp.write_text(json.dumps({"fingerprint": digest, "outputs": sorted({str(path) for path in outputs})}, indent=2))
+
+
+@contextmanager
+def saved_outputs() -> Iterator[list[Path]]:
+    """Collect the files a figure saves, its images through savefig and its metrics through to_csv and to_excel
+
+    Only what this process writes is collected, not what figures rendered next to it in a parallel build write.
+    """
+    import pandas as pd
+    from matplotlib.figure import Figure
+
+    outputs: list[Path] = []
+    # the methods and the name of their path argument
+    originals = [
+        (Figure, "savefig", "fname"),
+        (pd.DataFrame, "to_csv", "path_or_buf"),
+        (pd.DataFrame, "to_excel", "excel_writer"),
+    ]
+
+    def collecting(save: Callable[..., Any], argument: str) -> Callable[..., Any]:
+        def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+            result = save(self, *args, **kwargs)
+            path = args[0] if args else kwargs.get(argument)
+            # buffers, writers and to_csv() into a string aren't files
+            if isinstance(path, (str, os.PathLike)):
+                outputs.append(Path(path).absolute())
+            return result
+
+        return wrapper
+
+    saves = [getattr(owner, name) for owner, name, _ in originals]
+    for (owner, name, argument), save in zip(originals, saves):
+        setattr(owner, name, collecting(save, argument))
+    try:
+        yield outputs
+    finally:
+        for (owner, name, _), save in zip(originals, saves):
+            setattr(owner, name, save)
+
+
+@contextmanager
+def without_images() -> Iterator[None]:
+    """Make savefig a no-op, for matplotlib figures and the patchworklib bricks that save through them"""
+    from matplotlib.figure import Figure
+
+    savefig = Figure.savefig
+
+    def skip(self: Figure, fname: Any, *args: Any, **kwargs: Any) -> None:
+        logger.info(f"Metrics only, not rendering {fname}")
+
+    Figure.savefig = skip  # type: ignore
+    try:
+        yield
+    finally:
+        Figure.savefig = savefig  # type: ignore
+
+
+jobs_option = click.option(
+    "--jobs",
+    "-j",
+    type=int,
+    default=1,
+    show_default=True,
+    help="Figures rendered at the same time, each in its own process",
+)
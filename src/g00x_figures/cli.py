@@ -1,76 +1,28 @@
 """This is our main entry point"""
-import functools
 import logging
-import math
+import random
 import subprocess
+from contextlib import nullcontext
 from pathlib import Path
+from typing import Any
 
 import click
-import matplotlib.pyplot as plt
-import numpy as np
-import patchworklib as pw
-import seaborn as sns
-from matplotlib import ticker as mtick
-from matplotlib.patches import Patch
-
-from g00x_figures.alleles import plot_allele_table, plot_allele_table_group4
-from g00x_figures.box_and_scatter.flow_frequencies import (
-    MinorSymLogLocator,
-    adjust_boxplot,
-    plot_boost_frequences,
-    plot_cp_frequency,
-    plot_group_4_responders,
-    plot_pre_post_frequency,
-    plot_response_summary,
-)
-from g00x_figures.counts import FlowCytometryPlot
-from g00x_figures.data import Data, Transforms
-from g00x_figures.features import (
-    plot_has_100b,
-    plot_has_100b_boost,
-    plot_isotype_data,
-    plot_isotype_data_pseudogroups,
-    plot_key_mutations,
-    plot_light_chain_dist,
-    plot_light_chain_dist_boost,
-    plot_light_chain_usage,
-    plot_light_chain_usage_boost,
-    plot_qe_on_light_chain,
-    plot_qe_on_light_chain_boost,
-    plot_seq_logos_nonvrc01_class,
-    plot_seq_logos_vrc01_class,
-)
-from g00x_figures.flow_frequencies import plot_flow_frequencies
-from g00x_figures.misc import (
-    plot_methodology_comparision,
-    plot_methodology_comparision2,
-)
-from g00x_figures.mutations import (
-    plot_key_mutations_boost,
-    plot_somatic_mutation_aa_frequencies,
-    plot_somatic_mutation_aa_frequencies_boost,
-    plot_somatic_mutation_nt_frequencies,
-    plot_v_mutations,
-    run_90_percentile_hc_residues,
-)
-from g00x_figures.plot_helpers.font import apply_global_font_settings
-from g00x_figures.plots import Plot
-from g00x_figures.polyclonality import (
-    plot_boost_clonality,
-    plot_multi_find_clonality,
-    plot_polyclonality,
-)
-from g00x_figures.properties import spr_properties
-from g00x_figures.qc import plot_qc
-from g00x_figures.responders import run_percent_igg_responders
-from g00x_figures.spr import (
-    plot_core_spr,
-    plot_core_spr_kon_off,
-    plot_shm_spr,
-    plot_spr_core_candidates,
-    plot_spr_prime,
+
+from g00x.tools.profiling import profile_options, start_profiling
+from g00x_figures.build import (
+    build_options,
+    fingerprint,
+    jobs_option,
+    record,
+    render,
+    saved_outputs,
+    up_to_date,
+    without_images,
 )
 
+# Figure modules, matplotlib, seaborn and patchworklib are imported by the commands that use them, so the CLI starts
+# without loading them and --help or a subcommand only pays for what it runs.
+
 # @click.group()
 # @click.pass_context
 # def cli(ctx):
@@ -91,7 +43,85 @@ from g00x_figures.spr import (
 #     root_logger.setLevel(logging.INFO)
 
 
-@click.group("plot", invoke_without_command=True)
+def setup_figures(ctx: click.Context) -> None:
+    """Style the plots and resolve the output directories from the plot options, once, before the first figure"""
+    if "data" in ctx.obj:
+        return
+    if ctx.obj["metrics_only"]:
+        import matplotlib
+
+        # before pyplot is imported, nothing is shown or needs a display
+        matplotlib.use("Agg")
+    import seaborn as sns
+
+    from g00x_figures.data import Data, Transforms
+
+    sns.set_context("paper", font_scale=1.2)  # type: ignore
+    sns.set_style("ticks")
+    sns.set_style({"font.family": "Arial"})
+    outdir, fig, is_main = ctx.obj["outdir"], ctx.obj["fig"], ctx.obj["is_main"]
+    ctx.obj.update(
+        {
+            "data": Data(),
+            "transforms": Transforms(),
+            "output": Path(__file__).parent.parent.parent,
+        }
+    )
+
+    data = ctx.obj["data"]
+    ctx.obj["outdir"] = Path(outdir) if outdir else data.paths.figure_outdir
+    # ctx.obj["outdir"] = (
+    #     Path(__file__).parent.parent.parent / "G00X-plots-test"
+    # )  # outdir if outdir else data.paths.figure_outdir
+
+    if is_main:
+        dest = "Main"
+    else:
+        dest = "Sup"
+
+    # IMG default to file specific: /figN/ not needed for most figures
+    ctx.obj["img_outdir"] = ctx.obj["outdir"] / f"{dest}"
+    # METRIC default to folder specific
+    ctx.obj["metric_outdir"] = ctx.obj["outdir"] / f"{dest}-Metrics/{fig}"
+    if fig is not None:
+        ctx.obj["img_outdir"].mkdir(parents=True, exist_ok=True)
+        ctx.obj["metric_outdir"].mkdir(parents=True, exist_ok=True)
+
+    for key in ["fig", "img_outdir", "metric_outdir"]:
+        value = ctx.obj[key]
+        if fig is not None:
+            logging.info(f"{key}: {value}")
+
+
+class FigureCommand(click.Command):
+    """A figure command, sets up plotting and data when it runs, not when the CLI starts or shows --help"""
+
+    def invoke(self, ctx: click.Context) -> Any:
+        setup_figures(ctx)
+        stamp = ctx.obj["metric_outdir"] / f"{ctx.info_name}.fingerprint.json"
+        digest = fingerprint(ctx, self.callback)  # type: ignore
+        if not ctx.obj["force"] and up_to_date(stamp, digest):
+            logging.info(f"{ctx.obj['fig']} {ctx.info_name} is up to date, --force to render it again")
+            return None
+        # seeded for each figure rather than once per process, a figure renders the same alone, after others or in a
+        # parallel build
+        import numpy as np
+
+        random.seed(ctx.obj["seed"])
+        np.random.seed(ctx.obj["seed"])
+        # outside without_images, so images it skips aren't counted as saved
+        with saved_outputs() as outputs, without_images() if ctx.obj["metrics_only"] else nullcontext():
+            result = super().invoke(ctx)
+        record(stamp, digest, outputs)
+        return result
+
+
+class FigureGroup(click.Group):
+    # fig2 to fig7, main and sup-figures only shell out to other commands, they're plain click.Commands
+    command_class = FigureCommand
+
+
+@click.group("plot", cls=FigureGroup, invoke_without_command=True)
 @click.pass_context
 @click.option(
     "--outdir",
@@ -126,6 +156,33 @@ from g00x_figures.spr import (
     help="Scale factor for median values",
     default=1e9,
 )
+@click.option(
+    "--bootstrap-ci",
+    is_flag=True,
+    envvar="G00X_FIGURES_BOOTSTRAP_CI",
+    help="Add bootstrap 95% confidence intervals to the SPR tables and the per participant mutation medians",
+)
+@click.option(
+    "--seed",
+    type=int,
+    default=1000,
+    envvar="G00X_FIGURES_SEED",
+    show_default=True,
+    help="Seed of the RNG every figure starts from",
+)
+@click.option(
+    "--force",
+    is_flag=True,
+    envvar="G00X_FIGURES_FORCE",
+    help="Render figures even if their code and data haven't changed since they were last rendered",
+)
+@click.option(
+    "--metrics-only",
+    is_flag=True,
+    envvar="G00X_FIGURES_METRICS_ONLY",
+    help="Only write the metric CSVs, don't render the images",
+)
+@profile_options
 def figures(
     ctx: click.Context,
     outdir: Path,
@@ -133,49 +190,30 @@ def figures(
     is_main: bool,
     use_geomean,
     median_scale,
+    bootstrap_ci: bool,
+    seed: int,
+    force: bool,
+    metrics_only: bool,
+    profile: str | None,
+    profile_dir: str,
+    profile_top: int,
 ) -> None:
     """Plot figures."""
-    sns.set_context("paper", font_scale=1.2)  # type: ignore
-    sns.set_style("ticks")
-    sns.set_style({"font.family": "Arial"})
-    np.random.seed(1000)
-    ctx.obj = {}
-    ctx.obj = {
-        "data": Data(),
-        "transforms": Transforms(),
-        "output": Path(__file__).parent.parent.parent,
-    }
+    start_profiling(ctx, profile, profile_dir, profile_top)
     root_logger = logging.getLogger()
     root_logger.setLevel(logging.INFO)
-
-    data = ctx.obj["data"]
-    ctx.obj["data"] = outdir if outdir else data.paths.figure_outdir
-    # ctx.obj["outdir"] = (
-    #     Path(__file__).parent.parent.parent / "G00X-plots-test"
-    # )  # outdir if outdir else data.paths.figure_outdir
-
-    if is_main:
-        dest = "Main"
-    else:
-        dest = "Sup"
-
-    # IMG default to file specific: /figN/ not needed for most figures
-    ctx.obj["img_outdir"] = ctx.obj["outdir"] / f"{dest}"
-    # METRIC default to folder specific
-    ctx.obj["metric_outdir"] = ctx.obj["outdir"] / f"{dest}-Metrics/{fig}"
-    if fig is not None:
-        ctx.obj["img_outdir"].mkdir(parents=True, exist_ok=True)
-        ctx.obj["metric_outdir"].mkdir(parents=True, exist_ok=True)
-
-    ctx.obj["fig"] = fig
-    ctx.obj["is_main"] = is_main
-    ctx.obj["use_geomean"] = use_geomean
-    ctx.obj["median_scale"] = median_scale
-
-    for key in ["fig", "img_outdir", "metric_outdir"]:
-        value = ctx.obj[key]
-        if fig is not None:
-            logging.info(f"{key}: {value}")
+    # the group runs before click parses the subcommand, anything slow waits for setup_figures
+    ctx.obj = {
+        "outdir": outdir,
+        "fig": fig,
+        "is_main": is_main,
+        "use_geomean": use_geomean,
+        "median_scale": median_scale,
+        "bootstrap_ci": bootstrap_ci,
+        "seed": seed,
+        "force": force,
+        "metrics_only": metrics_only,
+    }
 
 
 @figures.command("test")
@@ -202,6 +240,8 @@ def plot_test(ctx: click.Context, *args, **kwargs) -> None:
 @click.pass_context
 def flow_freq(ctx: click.Context) -> None:
     """Flow frequencies."""
+    from g00x_figures.flow_frequencies import plot_flow_frequencies
+
     fig = ctx.obj["fig"]
     data = ctx.obj["data"]
     img_outdir = ctx.obj["img_outdir"] / f"{fig}"
@@ -218,11 +258,11 @@ def flow_freq(ctx: click.Context) -> None:
     )
 
 
-@figures.command("fig2")
+@figures.command("fig2", cls=click.Command)
 @click.pass_context
 def fig2(ctx: click.Context) -> None:
     """Figure 2: Flow frequencies."""
-    subprocess.run("g00x plot -m --fig fig2 flow-freq", shell=True, check=True)
+    render(["g00x plot -m --fig fig2 flow-freq"], 1, **build_options(ctx.obj))
 
 
 @figures.command("prime-mut")
@@ -244,6 +284,10 @@ def fig2(ctx: click.Context) -> None:
     help="Do not plot panel E",
 )
 def prime_mutations(ctx: click.Context, aa: bool, method: str, no_panel_e: bool) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.mutations import plot_v_mutations, run_90_percentile_hc_residues
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -263,6 +307,7 @@ def prime_mutations(ctx: click.Context, aa: bool, method: str, no_panel_e: bool)
         src_type="prime",
         seq_type="aa" if aa else "nt",
         mectric_outdir=metric_outdir,
+        bootstrap_ci=ctx.obj["bootstrap_ci"],
     )
     c1 = pw.stack([g1, g3], operator="/", margin=0)
     c2 = pw.stack([g2, g4], operator="/", margin=0)
@@ -280,16 +325,18 @@ def prime_mutations(ctx: click.Context, aa: bool, method: str, no_panel_e: bool)
     g.savefig(img_outdir / f"{fig}.png", dpi=700)
 
 
-@figures.command("fig3")
+@figures.command("fig3", cls=click.Command)
 @click.pass_context
 def fig3(ctx: click.Context) -> None:
-    subprocess.run("g00x plot -m --fig fig3 prime-mut --aa --method nearest", shell=True, check=True)
+    render(["g00x plot -m --fig fig3 prime-mut --aa --method nearest"], 1, **build_options(ctx.obj))
 
 
 @figures.command("boost-freq")
 @click.pass_context
 def boost_freq(ctx: click.Context) -> None:
     """Figure 4."""
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_boost_frequences
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -299,10 +346,10 @@ def boost_freq(ctx: click.Context) -> None:
     plot_boost_frequences(data=data, outpath=outpath, fig_num=fig)
 
 
-@figures.command("fig4")
+@figures.command("fig4", cls=click.Command)
 @click.pass_context
 def fig4(ctx: click.Context) -> None:
-    subprocess.run("g00x plot -m --fig fig4 boost-freq", shell=True, check=True)
+    render(["g00x plot -m --fig fig4 boost-freq"], 1, **build_options(ctx.obj))
 
 
 @figures.command("boost-mut-aa")
@@ -314,6 +361,10 @@ def fig4(ctx: click.Context) -> None:
     default="nearest",
 )
 def boost_mut_aa(ctx: click.Context, method: str) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.mutations import plot_key_mutations_boost, plot_v_mutations
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     is_main = ctx.obj["is_main"]
@@ -333,6 +384,7 @@ def boost_mut_aa(ctx: click.Context, method: str) -> None:
         src_type="boost",
         seq_type="aa",
         mectric_outdir=metric_outdir,
+        bootstrap_ci=ctx.obj["bootstrap_ci"],
     )
     g5, g6, g7, g8 = plot_key_mutations_boost(data=data, metric_outdir=metric_outdir, method=method)
     g = (pw.stack([g1, g3], operator="/", margin=0) | pw.stack([g2, g4], operator="/", margin=0)) / (
@@ -341,15 +393,17 @@ def boost_mut_aa(ctx: click.Context, method: str) -> None:
     g.savefig(img_outdir / f"{fig}.png", dpi=700)
 
 
-@figures.command("fig5")
+@figures.command("fig5", cls=click.Command)
 @click.pass_context
 def fig5(ctx: click.Context) -> None:
-    subprocess.run("g00x plot -m --fig fig5 boost-mut-aa --method nearest", shell=True, check=True)
+    render(["g00x plot -m --fig fig5 boost-mut-aa --method nearest"], 1, **build_options(ctx.obj))
 
 
 @figures.command("spr-boost")
 @click.pass_context
 def spr_boost(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -364,18 +418,21 @@ def spr_boost(ctx: click.Context) -> None:
         metric_outdir=metric_outdir,
         use_geomean=ctx.obj["use_geomean"],
         median_scale=ctx.obj["median_scale"],
+        bootstrap_ci=ctx.obj["bootstrap_ci"],
     )
 
 
-@figures.command("fig6")
+@figures.command("fig6", cls=click.Command)
 @click.pass_context
 def fig6(ctx: click.Context) -> None:
-    subprocess.run("g00x plot -m --fig fig6 -g -s 1 spr-boost", shell=True, check=True)
+    render(["g00x plot -m --fig fig6 -g -s 1 spr-boost"], 1, **build_options(ctx.obj))
 
 
 @figures.command("cp-freq")
 @click.pass_context
 def cp_freq(ctx: click.Context) -> None:
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_cp_frequency
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -388,15 +445,16 @@ def cp_freq(ctx: click.Context) -> None:
     plot_cp_frequency(data, img_outpath=img_outpath, metric_outdir=metric_outdir)
 
 
-@figures.command("fig7")
+@figures.command("fig7", cls=click.Command)
 @click.pass_context
 def fig7(ctx: click.Context) -> None:
-    subprocess.run("g00x plot -m --fig fig7 cp-freq", shell=True, check=True)
+    render(["g00x plot -m --fig fig7 cp-freq"], 1, **build_options(ctx.obj))
 
 
-@figures.command("main")
+@figures.command("main", cls=click.Command)
 @click.pass_context
-def plot_main(ctx: click.Context) -> None:
+@jobs_option
+def plot_main(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot -m --fig fig2 flow-freq",
@@ -406,8 +464,7 @@ def plot_main(ctx: click.Context) -> None:
         "g00x plot -m --fig fig6 -g -s 1 spr-boost",
         "g00x plot -m --fig fig7 cp-freq",
     ]
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
 
 
 ### Supplementary Figures ###
@@ -415,6 +472,10 @@ def plot_main(ctx: click.Context) -> None:
 
 def save(img, dfs, img_outpath, metric_outdir):
     img.savefig(img_outpath, dpi=700)
+    save_metrics(dfs, metric_outdir)
+
+
+def save_metrics(dfs, metric_outdir):
     key_list = ["trial", "pseudogroup", "weeks", "pubID"]
     for df in dfs:
         name = df.name
@@ -429,6 +490,8 @@ def save(img, dfs, img_outpath, metric_outdir):
 @click.pass_context
 def methodology_comparison(ctx: click.Context) -> None:
     """Methodology comparison btw G001 (Sanger) and G002/G003 (10X)"""
+    from g00x_figures.misc import plot_methodology_comparision2
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -444,6 +507,8 @@ def methodology_comparison(ctx: click.Context) -> None:
 @figures.command("b-count-flow-g002")
 @click.pass_context
 def s20(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
@@ -451,9 +516,13 @@ def s20(ctx: click.Context) -> None:
     img_outdir = ctx.obj["img_outdir"]
     img_outpath = img_outdir / f"{fig}.png"
     metric_outdir = ctx.obj["metric_outdir"]
+    df = data.get_g002_flow_and_seq_prime()
+    if ctx.obj["metrics_only"]:
+        save_metrics(flow_cytometry_plot.metrics(x="group", df=df), metric_outdir)
+        return
     img, dfs = flow_cytometry_plot.create_plot(
         x="group",
-        df=data.get_g002_flow_and_seq_prime(),
+        df=df,
         palette={
             -5: "#9567BD",
             4: "#17BFD0",
@@ -468,6 +537,8 @@ def s20(ctx: click.Context) -> None:
 @figures.command("b-count-flow-g003")
 @click.pass_context
 def s21(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     flow_cytometry_plot.columns = {
         "IgD- B cells": "IgD$^{-}$ B cells",
@@ -481,9 +552,13 @@ def s21(ctx: click.Context) -> None:
     img_outdir = ctx.obj["img_outdir"]
     img_outpath = img_outdir / f"{fig}.png"
     metric_outdir = ctx.obj["metric_outdir"]
+    df = data.get_g003_flow_and_seq_prime()
+    if ctx.obj["metrics_only"]:
+        save_metrics(flow_cytometry_plot.metrics(x="weeks", df=df), metric_outdir)
+        return
     img, dfs = flow_cytometry_plot.create_plot(
         x="weeks",
-        df=data.get_g003_flow_and_seq_prime(),
+        df=df,
         palette={
             -5: "#9567BD",
             8: "#17BFD0",
@@ -505,6 +580,8 @@ def s21(ctx: click.Context) -> None:
 @figures.command("s-freq-seq-g002")
 @click.pass_context
 def s22(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -518,6 +595,8 @@ def s22(ctx: click.Context) -> None:
 @figures.command("s-freq-seq-g003")
 @click.pass_context
 def s23(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -531,6 +610,8 @@ def s23(ctx: click.Context) -> None:
 @figures.command("S24")
 @click.pass_context
 def s24(ctx: click.Context) -> None:
+    from g00x_figures.responders import run_percent_igg_responders
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -544,6 +625,8 @@ def s24(ctx: click.Context) -> None:
 @figures.command("S27")
 @click.pass_context
 def s27(ctx: click.Context) -> None:
+    from g00x_figures.qc import plot_qc
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -557,6 +640,10 @@ def s27(ctx: click.Context) -> None:
 @figures.command("b-count-spr-g00x-eOD")
 @click.pass_context
 def s28(ctx: click.Context) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.spr import plot_spr_prime
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -588,6 +675,8 @@ def s28(ctx: click.Context) -> None:
     is_flag=True,
 )
 def num_bcr_clusters(ctx: click.Context, use_last_week: bool) -> None:
+    from g00x_figures.polyclonality import plot_multi_find_clonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -611,6 +700,8 @@ def num_bcr_clusters(ctx: click.Context, use_last_week: bool) -> None:
     is_flag=True,
 )
 def hierarchical_clustering_and_polyclonality(ctx: click.Context, use_last_week: bool) -> None:
+    from g00x_figures.polyclonality import plot_polyclonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -633,6 +724,8 @@ def hierarchical_clustering_and_polyclonality(ctx: click.Context, use_last_week:
 @figures.command("b-count-boost-g002")
 @click.pass_context
 def s31(ctx: click.Context) -> None:
+    from g00x_figures.counts import FlowCytometryPlot
+
     flow_cytometry_plot = FlowCytometryPlot()
     flow_cytometry_plot.columns = {
         "B cells": "B cells",
@@ -647,9 +740,13 @@ def s31(ctx: click.Context) -> None:
     img_outdir = ctx.obj["img_outdir"]
     img_outpath = img_outdir / f"{fig}.png"
     metric_outdir = ctx.obj["metric_outdir"]
+    df = data.get_g002_flow_and_seq_boost()
+    if ctx.obj["metrics_only"]:
+        save_metrics(flow_cytometry_plot.metrics(x="group", df=df), metric_outdir)
+        return
     img, dfs = flow_cytometry_plot.create_plot(
         x="group",
-        df=data.get_g002_flow_and_seq_boost(),
+        df=df,
         palette={
             -5: "#9567BD",
             4: "#17BFD0",
@@ -664,6 +761,8 @@ def s31(ctx: click.Context) -> None:
 @figures.command("b-freq-prepost-g002")
 @click.pass_context
 def s32(ctx: click.Context) -> None:
+    from g00x_figures.box_and_scatter.flow_frequencies import plot_pre_post_frequency
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     outdir = ctx.obj["outdir"]
@@ -677,6 +776,10 @@ def s32(ctx: click.Context) -> None:
 @figures.command("b-count-spr-g00x-core")
 @click.pass_context
 def s33(ctx: click.Context) -> None:
+    import patchworklib as pw
+
+    from g00x_figures.spr import plot_spr_prime
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -705,6 +808,8 @@ def s33(ctx: click.Context) -> None:
 @figures.command("s-freq-boost-g002")
 @click.pass_context
 def s34(ctx: click.Context) -> None:
+    from g00x_figures.features import plot_isotype_data_pseudogroups
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -719,6 +824,8 @@ def s34(ctx: click.Context) -> None:
 @click.pass_context
 def boost_clonality(ctx: click.Context) -> None:
     """Plot boost clonality for supplementary figure 29."""
+    from g00x_figures.polyclonality import plot_boost_clonality
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -756,6 +863,8 @@ def boost_clonality(ctx: click.Context) -> None:
 @figures.command("b-shm-spr-g002")
 @click.pass_context
 def s40(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_shm_spr
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -769,6 +878,8 @@ def s40(ctx: click.Context) -> None:
 @figures.command("s-properties-spr-g002")
 @click.pass_context
 def s41(ctx: click.Context) -> None:
+    from g00x_figures.properties import spr_properties
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -783,6 +894,8 @@ def s41(ctx: click.Context) -> None:
 @figures.command("b-kon-koff-spr-g28v2-g002")
 @click.pass_context
 def s42(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr_kon_off
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -803,6 +916,8 @@ def s42(ctx: click.Context) -> None:
 @figures.command("b-kon-koff-spr-N276-g002")
 @click.pass_context
 def s45(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_core_spr_kon_off
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -824,6 +939,8 @@ def s45(ctx: click.Context) -> None:
 @click.pass_context
 def fig38(ctx: click.Context) -> None:
     """Figure 7."""
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -852,6 +969,8 @@ def fig38(ctx: click.Context) -> None:
 @figures.command("S47")
 @click.pass_context
 def S47(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -870,6 +989,8 @@ def S47(ctx: click.Context) -> None:
 @figures.command("b-freq-spr-g002-nonvrc01")
 @click.pass_context
 def sup51(ctx: click.Context) -> None:
+    from g00x_figures.spr import plot_spr_core_candidates
+
     data = ctx.obj["data"]
     fig = ctx.obj["fig"]
     # outdir = ctx.obj["outdir"]
@@ -896,9 +1017,10 @@ def sup51(ctx: click.Context) -> None:
     )
 
 
-@figures.command("sup-figures")
+@figures.command("sup-figures", cls=click.Command)
 @click.pass_context
-def plot_sup(ctx: click.Context) -> None:
+@jobs_option
+def plot_sup(ctx: click.Context, jobs: int) -> None:
     """Plot all figures."""
     commands = [
         "g00x plot --fig S19 methodology2",
@@ -926,5 +1048,4 @@ def plot_sup(ctx: click.Context) -> None:
         "g00x plot --fig S51 -g -s 1 b-freq-spr-g002-nonvrc01",
     ]
     # assert len(set([c.split(" ")[-1] for c in commands])) == len(commands)
-    for cmd in commands:
-        subprocess.run(cmd, shell=True, check=True)
+    render(commands, jobs, **build_options(ctx.obj))
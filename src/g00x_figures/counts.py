@@ -74,6 +74,17 @@ class FlowCytometryPlot:
             ax.set_xlabel("")
             ax.set_xticklabels([])
 
+    def metrics(self, x: str, df: pd.DataFrame) -> list[pd.DataFrame]:
+        """The frame of every panel, by row of columns then week, without drawing anything"""
+        dfs = []
+        for i, col in enumerate(self.columns):
+            for j, week in enumerate(sorted(df.weeks.unique())):
+                _df = df.query(f"weeks=={week}")
+                _df.name = f"i{i}_j{j}_wk{week}"
+                _df.key = [x, col]
+                dfs.append(_df)
+        return dfs
+
     def create_plot(self, x: str, df: pd.DataFrame, palette: dict):
         """Create the main plot"""
         fig, ax = plt.subplots(
@@ -84,13 +95,11 @@ class FlowCytometryPlot:
             sharey="row",
         )
 
-        dfs = []
+        dfs = self.metrics(x, df)
+        weeks = sorted(df.weeks.unique())
         for i, (col, col_label) in enumerate(self.columns.items()):
-            for j, week in enumerate(sorted(df.weeks.unique())):
-                _df = df.query(f"weeks=={week}")
-                _df.name = f"i{i}_j{j}_wk{week}"
-                _df.key = [x, col]
-                dfs.append(_df)
+            for j, week in enumerate(weeks):
+                _df = dfs[i * len(weeks) + j]
                 # Create strip plot
                 self.plot.plot_stripbox(
                     df=_df,
@@ -0,0 +1,347 @@
+"""
+Memoized datasets of g00x_figures.data.Data, loaded once per process and persisted across processes.
+
+A getter decorated with `dataset` is keyed by its name, arguments, the content hash of the data files it reads and
+the hash of the module that defines it, so an edited loader or a replaced file is never served stale. Results live
+in an in-memory LRU bounded in bytes and are written to uncompressed Arrow files on disk that a later run, or the
+workers of a parallel figure build, read instead of running the loader again. Each process converts the file into
+frames of its own, they aren't shared between processes. Writing a dataset removes the files of the same getter and
+arguments it supersedes, and the least recently used files once the directory is over its byte budget. Every caller
+gets its own frame: a shallow view when pandas copy on write is enabled, otherwise a copy, so the figures can keep
+adding columns to what a getter returns.
+
+G00X_FIGURES_CACHE sets the Arrow directory, empty to not cache on disk, G00X_FIGURES_CACHE_BYTES the memory and
+G00X_FIGURES_CACHE_DISK_BYTES the disk.
+"""
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Hashable, TypeVar
+
+import pandas as pd
+
+logger = logging.getLogger("DatasetCache")
+
+F = TypeVar("F", bound=Callable[..., pd.DataFrame])
+
+DEFAULT_MAX_BYTES = 4 * 2**30
+DEFAULT_MAX_DISK_BYTES = 16 * 2**30
+DEFAULT_DIRECTORY = Path("~/.cache/g00x_figures/datasets")
+
+
+def copy_on_write() -> bool:
+    """Whether pandas copy on write is on, pandas 1.5 has the option, older pandas doesn't"""
+    try:
+        return bool(pd.get_option("mode.copy_on_write"))
+    except KeyError:
+        return False
+
+
+def frame_bytes(frame: pd.DataFrame) -> int:
+    return int(frame.memory_usage(deep=True).sum())
+
+
+class DatasetCache:
+    """Loaded datasets in memory, least recently used evicted first, and in Arrow files on disk
+
+    Parameters
+    ----------
+    max_bytes : int
+        Memory the frames held may take up
+    directory : str | Path | None
+        Where the Arrow files are written, None to only keep frames in memory
+    max_disk_bytes : int
+        Disk the Arrow files may take up
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        directory: str | Path | None = DEFAULT_DIRECTORY,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.directory = Path(directory).expanduser() if directory else None
+        self.max_disk_bytes = max_disk_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[pd.DataFrame, int]] = OrderedDict()
+        self._hashes: dict[tuple[str, int, int], str] = {}
+        self._lock = threading.RLock()
+
+    def configure(
+        self,
+        max_bytes: int | None = None,
+        directory: str | Path | None = DEFAULT_DIRECTORY,
+        max_disk_bytes: int | None = None,
+    ) -> None:
+        with self._lock:
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if max_disk_bytes is not None:
+                self.max_disk_bytes = max_disk_bytes
+            self.directory = Path(directory).expanduser() if directory else None
+            self._evict()
+
+    def file_hash(self, path: str | Path) -> str:
+        """sha256 of the file, hashed again only when its mtime or size changes"""
+        stat = os.stat(path)
+        version = (str(Path(path).absolute()), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            if version not in self._hashes:
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for block in iter(lambda: f.read(2**20), b""):
+                        digest.update(block)
+                self._hashes[version] = digest.hexdigest()
+            return self._hashes[version]
+
+    def key(self, name: str, code: str, sources: list[Path], arguments: tuple[Hashable, ...]) -> str:
+        parts = [name, code, repr(arguments)]
+        parts += [f"{path}:{self.file_hash(path) if Path(path).exists() else 'missing'}" for path in sources]
+        return hashlib.sha256("\n".join(parts).encode()).hexdigest()[:32]
+
+    def view(self, frame: pd.DataFrame) -> pd.DataFrame:
+        return frame.copy(deep=not copy_on_write())
+
+    def get(
+        self,
+        name: str,
+        code: str,
+        sources: list[Path],
+        arguments: tuple[Hashable, ...],
+        load: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        """The dataset from memory, disk or load, in that order
+
+        Parameters
+        ----------
+        name : str
+            Name of the getter
+        code : str
+            Version of the code that loads it
+        sources : list[Path]
+            Data files the getter reads
+        arguments : tuple[Hashable, ...]
+            Arguments of the call
+        load : Callable[[], pd.DataFrame]
+            Runs the getter
+        """
+        key = self.key(name, code, sources, arguments)
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self.view(self._entries[key][0])
+        frame = self.read(key)
+        if frame is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            logger.debug(f"Loading {name}{arguments}")
+            frame = load()
+            self.write(key, name, arguments, frame)
+        self.put(key, frame)
+        return self.view(frame)
+
+    def put(self, key: str, frame: pd.DataFrame) -> None:
+        nbytes = frame_bytes(frame)
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (frame, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def _evict(self) -> None:
+        while self.current_bytes > self.max_bytes:
+            _, (_, evicted_bytes) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_bytes
+
+    def read(self, key: str) -> pd.DataFrame | None:
+        if self.directory is None or not (self.directory / f"{key}.arrow").exists():
+            return None
+        try:
+            from pyarrow import feather
+
+            # mapped rather than read into a buffer first, to_pandas copies the columns into the frame
+            frame = feather.read_table(self.directory / f"{key}.arrow", memory_map=True).to_pandas()
+            meta = json.loads((self.directory / f"{key}.json").read_text())
+        except (ImportError, OSError, ValueError) as e:
+            logger.warning(f"Can't read the cached dataset {key}: {e}")
+            return None
+        try:
+            # the mtime orders the files when pruning, reading one makes it the most recently used
+            os.utime(self.directory / f"{key}.arrow")
+        except OSError:
+            pass
+        # arrow gives lists back as arrays
+        for column in meta["list_columns"]:
+            frame[column] = frame[column].map(lambda value: list(value) if value is not None else value)
+        return frame
+
+    def write(self, key: str, name: str, arguments: tuple[Hashable, ...], frame: pd.DataFrame) -> None:
+        if self.directory is None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{key}.arrow"
+        try:
+            import pyarrow as pa
+            from pyarrow import feather
+
+            list_columns = [
+                column
+                for column in frame.columns
+                if frame[column].dtype == object and frame[column].map(lambda value: isinstance(value, list)).any()
+            ]
+            # write next to it and move it in place, a concurrent reader never sees half a file
+            table = pa.Table.from_pandas(frame)
+            feather.write_feather(table, path.with_suffix(f".{os.getpid()}.tmp"), compression="uncompressed")
+        except ImportError as e:
+            logger.warning(f"Not caching datasets on disk: {e}")
+            self.directory = None
+            return
+        except Exception as e:
+            # object columns with mixed types Arrow can't store
+            logger.debug(f"Not caching {name} on disk: {e}")
+            path.with_suffix(f".{os.getpid()}.tmp").unlink(missing_ok=True)
+            return
+        meta = {"name": name, "arguments": repr(arguments), "list_columns": list_columns}
+        (self.directory / f"{key}.json").write_text(json.dumps(meta))
+        os.replace(path.with_suffix(f".{os.getpid()}.tmp"), path)
+        self.prune(key, name, repr(arguments))
+
+    def prune(self, key: str, name: str, arguments: str) -> None:
+        """Remove the files the dataset of key supersedes, then the least recently used ones over the disk budget
+
+        Parameters
+        ----------
+        key : str
+            The dataset just written, it is kept
+        name : str
+            Name of its getter
+        arguments : str
+            Arguments of its call, a dataset of the same getter and arguments under another key is stale
+        """
+        if self.directory is None:
+            return
+        kept = []
+        for meta_path in self.directory.glob("*.json"):
+            try:
+                meta = json.loads(meta_path.read_text())
+                stat = meta_path.with_suffix(".arrow").stat()
+            except (OSError, ValueError):
+                continue
+            if meta_path.stem != key and meta.get("name") == name and meta.get("arguments") == arguments:
+                self._remove(meta_path.stem)
+            else:
+                kept.append((stat.st_mtime, stat.st_size, meta_path.stem))
+        total = sum(size for _, size, _ in kept)
+        for _, size, other in sorted(kept):
+            if total <= self.max_disk_bytes:
+                break
+            if other != key:
+                self._remove(other)
+                total -= size
+
+    def _remove(self, key: str) -> None:
+        if self.directory is None:
+            return
+        logger.debug(f"Removing the cached dataset {key}")
+        for suffix in (".arrow", ".json"):
+            (self.directory / f"{key}{suffix}").unlink(missing_ok=True)
+
+    def clear(self, disk: bool = False) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            if disk and self.directory is not None and self.directory.exists():
+                for path in self.directory.glob("*.arrow"):
+                    path.unlink()
+                for path in self.directory.glob("*.json"):
+                    path.unlink()
+
+
+# the cache every Data instance shares
+datasets = DatasetCache(
+    max_bytes=int(os.environ.get("G00X_FIGURES_CACHE_BYTES", DEFAULT_MAX_BYTES)),
+    directory=os.environ.get("G00X_FIGURES_CACHE", str(DEFAULT_DIRECTORY)),
+    max_disk_bytes=int(os.environ.get("G00X_FIGURES_CACHE_DISK_BYTES", DEFAULT_MAX_DISK_BYTES)),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def _module_hash(function: Callable[..., Any]) -> str:
+    return hashlib.sha256(inspect.getsource(inspect.getmodule(function)).encode()).hexdigest()  # type: ignore
+
+
+def dataset(*sources: str) -> Callable[[F], F]:
+    """Memoize a Data getter in the dataset cache
+
+    Parameters
+    ----------
+    sources : str
+        Names of the DataPaths fields the getter reads, directly or through other getters
+    """
+
+    def decorate(function: F) -> F:
+        @functools.wraps(function)
+        def wrapper(self: Any, *args: Hashable, **kwargs: Hashable) -> pd.DataFrame:
+            bound = inspect.signature(function).bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            arguments = tuple(sorted((k, v) for k, v in bound.arguments.items() if k != "self"))
+            paths = [Path(getattr(self.paths, source)) for source in sources]
+            return datasets.get(
+                function.__qualname__,
+                _module_hash(function),
+                paths,
+                arguments,
+                lambda: function(self, *args, **kwargs),
+            )
+
+        wrapper.sources = sources  # type: ignore
+        return wrapper  # type: ignore
+
+    return decorate
+
+
+def warm(data: Any) -> list[str]:
+    """Load every dataset getter of data that takes no arguments, so they are on disk before workers start
+
+    Parameters
+    ----------
+    data : Any
+        The Data instance
+
+    Returns
+    -------
+    list[str]
+        The getters that loaded
+    """
+    loaded = []
+    for name, getter in inspect.getmembers(type(data), lambda member: hasattr(member, "sources")):
+        required = [
+            parameter
+            for parameter in list(inspect.signature(getter).parameters.values())[1:]
+            if parameter.default is inspect.Parameter.empty
+        ]
+        if required:
+            continue
+        try:
+            getattr(data, name)()
+        except Exception as e:
+            # the figure that needs it fails with the same error
+            logger.warning(f"Can't load {name}: {e}")
+            continue
+        loaded.append(name)
+    return loaded
@@ -1,7 +1,7 @@
 import re
 import warnings
 from ast import literal_eval
-from functools import cache
+from functools import cached_property
 from pathlib import Path
 from typing import Any
 
@@ -10,6 +10,8 @@ import pandas as pd
 from pandera.typing import Series
 from pydantic import BaseModel, validator
 
+from g00x_figures.data.cache import dataset
+
 
 def get_fraction_eq(s: Series[Any], col: str, eq: Any, name: str) -> Series[float]:
     l = len(s[s[col] == eq])  # type: ignore
@@ -235,8 +237,10 @@ class Data:
         "PubID_046",
     ]
 
-    def __init__(self):
-        self.paths = DataPaths()
+    @cached_property
+    def paths(self) -> DataPaths:
+        """Data files, checked to exist the first time one is needed rather than when Data is made"""
+        return DataPaths()
 
     # Warning: will be deprecated and will eventually map pubID to pubID
     # with col PTID being named PTID with values of pubID
@@ -292,6 +296,7 @@ class Data:
         df = df
         return df
 
+    @dataset("g001_sequences")
     def get_g001_sequences_prime(self, allow_week_10: bool = False) -> pd.DataFrame:
         """Get G001 Sequences for prime"""
         df = pd.read_feather(self.paths.g001_sequences)
@@ -326,6 +331,7 @@ class Data:
         df["PTID"] = df["pubID"]
         return df
 
+    @dataset("g001_flow_and_seq")
     def get_g001_flow_and_seq_prime(self, allow_week_10: bool = False) -> pd.DataFrame:
         """Get G001 Flow and Seq Summary for prime"""
         flow_and_seq = pd.read_csv(self.paths.g001_flow_and_seq)
@@ -368,6 +374,7 @@ class Data:
         # )
         return flow_and_seq
 
+    @dataset("g002_flow_and_seq")
     def get_filtered_g002_flow_and_seq(self) -> pd.DataFrame:
         # df = pd.read_feather(self.paths.g002_flow_and_seq)
         df = pd.read_csv(self.paths.g002_flow_and_seq)
@@ -391,6 +398,7 @@ class Data:
         df = df.drop(indexes)
         return df
 
+    @dataset("g002_sequences")
     def get_filtered_g002_sequences(self) -> pd.DataFrame:
         df = pd.read_feather(self.paths.g002_sequences)
 
@@ -455,6 +463,7 @@ class Data:
 
         return df
 
+    @dataset("g002_cluster_prime_nowk24", "g002_cluster_prime", "g002_sequences")
     def get_g002_sequences_prime(
         self,
         use_cluster_file: bool = False,
@@ -491,7 +500,7 @@ class Data:
         df = df.query("probe_set=='eODGT8'").reset_index(drop=True)
         return df
 
-    @cache
+    @dataset("g001_sequences", "g002_sequences", "g003_sequences", "g003_flow_and_seq")
     def get_g00x_sequences_prime(self) -> pd.DataFrame:
         g001_seq = self.get_g001_sequences_prime(allow_week_10=True)
         g001_seq["weeks"] = g001_seq["weeks"].astype(int)
@@ -596,6 +605,7 @@ class Data:
         # df = df.query("probe_set=='eODGT8'").reset_index(drop=True)
         return df
 
+    @dataset("g003_cluster_prime_nowk21", "g003_cluster_prime", "g003_sequences", "g003_flow_and_seq")
     def get_g003_sequences_prime(
         self,
         use_cluster_file: bool = False,
@@ -658,6 +668,7 @@ class Data:
         # df = df.query("probe_set=='eODGT8'").reset_index(drop=True)
         return df
 
+    @dataset("g002_flow_and_seq")
     def get_g002_flow_and_seq_prime(self) -> pd.DataFrame:
         """Get G002 Flow and Seq Summary for the prime"""
         flow_and_seq = self.get_filtered_g002_flow_and_seq()
@@ -684,6 +695,7 @@ class Data:
         flow_and_seq = calculate_resonse(flow_and_seq)
         return flow_and_seq
 
+    @dataset("g003_flow_and_seq")
     def get_g003_flow_and_seq_prime(self) -> pd.DataFrame:
         """Get G003 Flow and Seq Summary for the prime"""
         flow_and_seq = pd.read_feather(self.paths.g003_flow_and_seq)
@@ -902,6 +914,7 @@ class Data:
         #     how="left",
         # )
 
+    @dataset("g002_cluster", "g002_sequences")
     def get_g002_sequences_boost(self, use_cluster_file: bool = False, use_filtered: bool = True) -> pd.DataFrame:
         if use_cluster_file:
             sequences = pd.read_feather(self.paths.g002_cluster)
@@ -1247,6 +1260,7 @@ class Data:
         df = pd.read_csv(self.paths.g002_spr_tests)
         return df
 
+    @dataset("g002_spr")
     def get_g002_spr_df_eod_to_core(self) -> pd.DataFrame:
         g002_df = pd.read_feather(self.paths.g002_spr)
         g002_df["is_vrc01_class"] = g002_df.is_vrc01_class.astype(bool)
@@ -1262,6 +1276,7 @@ class Data:
 
         return g002_df
 
+    @dataset("g002_spr")
     def get_g002_spr_df_boost(self) -> pd.DataFrame:
         """Get G002 SPR Dataframe"""
         g002_df = pd.read_feather(self.paths.g002_spr)
@@ -1346,6 +1361,7 @@ class Data:
         g002_df["num_hcdr2_mutations"] = g002_df["cottrell_focused_v_common_heavy_positive"].apply(find_hcdr2_sets)
         return g002_df
 
+    @dataset("g003_spr")
     def get_g003_spr_df_prime(self) -> pd.DataFrame:
         """Get G002 SPR Dataframe"""
         g003_timepoint_to_week_mapping = {
@@ -1384,6 +1400,7 @@ class Data:
         # df = df.sort_values("Chi2").groupby(["Ligand", "Analyte"]).head(1)
         return df
 
+    @dataset("g002_spr")
     def get_g002_spr_df_prime(self) -> pd.DataFrame:
         """Get G002 SPR Dataframe"""
         df = pd.read_feather(self.paths.g002_spr)
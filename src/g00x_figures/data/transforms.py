@@ -1,10 +1,11 @@
+from functools import cached_property
+
 import pandas as pd
 
 from .data import Data
 
 
 class Transforms:
-    data = Data()
     colors = ["#91FCC0", "#2078B4", "#E377C2", "#9567BD", "#17BFD0", "#FF7F0F", "#BDBD23", "white"]
     minimum_set = [
         "12A12",
@@ -28,9 +29,18 @@ class Transforms:
         "VRC-PG19",
     ]
 
-    def __init__(self) -> None:
-        self.g00x_seq_prime_igg_df = self.data.get_g00x_seq_prime_igg_df()
-        self.dekosky_vh12_df = self.data.get_dekosky_vh12()
+    # loaded the first time a transform needs them, making a Transforms doesn't read any data
+    @cached_property
+    def data(self) -> Data:
+        return Data()
+
+    @cached_property
+    def g00x_seq_prime_igg_df(self) -> pd.DataFrame:
+        return self.data.get_g00x_seq_prime_igg_df()
+
+    @cached_property
+    def dekosky_vh12_df(self) -> pd.DataFrame:
+        return self.data.get_dekosky_vh12()
 
     def get_g00x_seq_prime_igg_vrc01_class_pivot_trial_light_value_counts_df(
         self, light_genes: list[str] | None = None, normalize: bool = True
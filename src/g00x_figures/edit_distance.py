@@ -0,0 +1,122 @@
+"""
+Edit distance from sequences to their nearest reference, for the distance of LCDR3s to the known VRC01-class LCDR3s.
+
+Queries are deduplicated and every distance is memoized for the process, so the figures that compare the same
+sequences to the same bnAbs compute each pair once. References are bucketed by length and searched from the lengths
+closest to the query out: the length difference is a lower bound of the distance, so once the best distance found is
+at most the difference of the next bucket the search stops, and within a bucket Levenshtein is told to give up past
+the best distance so far.
+"""
+import functools
+import logging
+import multiprocessing
+import os
+from typing import Iterable, Sequence
+
+import pandas as pd
+from Levenshtein import distance
+
+logger = logging.getLogger("EditDistance")
+
+# unique queries a batch needs before it's split over processes, below that starting them takes longer
+PARALLEL_MIN_QUERIES = 20_000
+
+
+def _nearest(buckets: dict[int, list[str]], query: str) -> int:
+    best = None
+    for gap, references in sorted(
+        ((abs(length - len(query)), references) for length, references in buckets.items()), key=lambda b: b[0]
+    ):
+        if best is not None and best <= gap:
+            break
+        for reference in references:
+            # past best - 1 it can't improve, Levenshtein stops and returns best
+            found = distance(query, reference, score_cutoff=None if best is None else best - 1)
+            if best is None or found < best:
+                best = found
+                if best == gap:
+                    break
+    return best  # type: ignore
+
+
+def _nearest_all(buckets: dict[int, list[str]], queries: list[str]) -> list[int]:
+    return [_nearest(buckets, query) for query in queries]
+
+
+class NearestReference:
+    """Smallest edit distance of sequences to any of a set of references
+
+    Parameters
+    ----------
+    references : Iterable[str]
+        Reference sequences, duplicates are dropped
+    """
+
+    def __init__(self, references: Iterable[str]) -> None:
+        unique = sorted(set(references))
+        if not unique:
+            raise ValueError("No reference sequences to compare to")
+        self.buckets: dict[int, list[str]] = {}
+        for reference in unique:
+            self.buckets.setdefault(len(reference), []).append(reference)
+        self.memo: dict[str, int] = {}
+
+    def nearest(self, query: str) -> int:
+        if query not in self.memo:
+            self.memo[query] = _nearest(self.buckets, query)
+        return self.memo[query]
+
+    def distances(self, queries: pd.Series, processes: int | None = None) -> pd.Series:
+        """Distance of every query to its nearest reference
+
+        Parameters
+        ----------
+        queries : pd.Series
+            Sequences, missing values stay missing
+        processes : int | None
+            Processes to compute new distances with, None for all cores once there are enough queries
+
+        Returns
+        -------
+        pd.Series
+            Distances, on the index of queries
+        """
+        unseen = [query for query in pd.unique(queries.dropna()) if query not in self.memo]
+        if processes is None:
+            processes = (os.cpu_count() or 1) if len(unseen) >= PARALLEL_MIN_QUERIES else 1
+        if processes > 1 and len(unseen) > 1:
+            chunks = [unseen[i::processes] for i in range(processes)]
+            logger.info(f"Comparing {len(unseen)} sequences to their nearest reference on {processes} processes")
+            with multiprocessing.Pool(processes) as pool:
+                results = pool.starmap(_nearest_all, [(self.buckets, chunk) for chunk in chunks])
+            for chunk, found in zip(chunks, results):
+                self.memo.update(zip(chunk, found))
+        else:
+            for query in unseen:
+                self.nearest(query)
+        return queries.map(self.memo)
+
+
+@functools.lru_cache(maxsize=None)
+def _engine(references: tuple[str, ...]) -> NearestReference:
+    return NearestReference(references)
+
+
+def nearest_distance(queries: pd.Series, references: Sequence[str], processes: int | None = None) -> pd.Series:
+    """Edit distance of every query to its nearest reference, memoized across calls with the same references
+
+    Parameters
+    ----------
+    queries : pd.Series
+        Sequences, such as cdr3_aa_light
+    references : Sequence[str]
+        Reference sequences, such as the LCDR3s of the VRC01-class bnAbs
+    processes : int | None
+        Processes to compute new distances with, None for all cores once there are enough queries
+
+    Returns
+    -------
+    pd.Series
+        Distances, on the index of queries
+    """
+    return _engine(tuple(sorted(set(references)))).distances(queries, processes)
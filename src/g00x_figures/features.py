@@ -4,13 +4,14 @@ import logomaker
 import numpy as np
 import pandas as pd
 import seaborn as sns
-from Levenshtein import distance
 from matplotlib import pyplot as plt
 from matplotlib import ticker as mtick
 from matplotlib.patches import Patch
 
+from g00x_figures.algos import grouped_quantile
 from g00x_figures.box_and_scatter.flow_frequencies import adjust_boxplot
 from g00x_figures.data import Data
+from g00x_figures.edit_distance import nearest_distance
 from g00x_figures.plot_helpers.font import apply_global_font_settings
 
 minimum_set = [
@@ -764,9 +765,6 @@ def plot_light_chain_dist_boost(data: Data, outpath: str) -> tuple[pd.DataFrame,
     vrc01_ref_airr_kappa_seqs = vrc01_ref_airr.query("locus_light == 'IGK'")["cdr3_aa_light"].to_list()
     vrc01_ref_airr_lambda_seqs = vrc01_ref_airr.query("locus_light == 'IGL'")["cdr3_aa_light"].to_list()
 
-    def find_lowest_len(x, ref) -> int:
-        return min(list(map(lambda y: distance(x, y), ref)))
-
     def report_lcdr3(df: pd.DataFrame):
         b = df["distance_to_known_lcdr3"].value_counts().sort_index()
         c = (b / b.sum()).cumsum()
@@ -792,11 +790,11 @@ def plot_light_chain_dist_boost(data: Data, outpath: str) -> tuple[pd.DataFrame,
 
     class_df_kappa = combined.query("locus_light == 'IGK'").query("is_vrc01_class").copy()
     class_df_lambda = combined.query("locus_light == 'IGL'").query("is_vrc01_class").copy()
-    class_df_kappa["distance_to_known_lcdr3_kappa"] = class_df_kappa["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_kappa_seqs)
+    class_df_kappa["distance_to_known_lcdr3_kappa"] = nearest_distance(
+        class_df_kappa["cdr3_aa_light"], vrc01_ref_airr_kappa_seqs
     )
-    class_df_lambda["distance_to_known_lcdr3_lambda"] = class_df_lambda["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_lambda_seqs)
+    class_df_lambda["distance_to_known_lcdr3_lambda"] = nearest_distance(
+        class_df_lambda["cdr3_aa_light"], vrc01_ref_airr_lambda_seqs
     )
     combined_df = pd.concat([class_df_kappa, class_df_lambda]).reset_index(drop=True)
     combined_df["distance_to_known_lcdr3"] = combined_df[
@@ -970,9 +968,6 @@ def plot_light_chain_dist(data: Data, outpath: str) -> None:
     vrc01_ref_airr_kappa_seqs = vrc01_ref_airr.query("locus_light == 'IGK'")["cdr3_aa_light"].to_list()
     vrc01_ref_airr_lambda_seqs = vrc01_ref_airr.query("locus_light == 'IGL'")["cdr3_aa_light"].to_list()
 
-    def find_lowest_len(x, ref) -> int:
-        return min(list(map(lambda y: distance(x, y), ref)))
-
     def report_lcdr3(df: pd.DataFrame):
         b = df["distance_to_known_lcdr3"].value_counts().sort_index()
         c = (b / b.sum()).cumsum()
@@ -1007,11 +1002,11 @@ def plot_light_chain_dist(data: Data, outpath: str) -> None:
                 combined.query("locus_light == 'IGL'").query("is_vrc01_class==False").query("has_5_len").copy()
             )
 
-        class_df_kappa["distance_to_known_lcdr3_kappa"] = class_df_kappa["cdr3_aa_light"].apply(
-            lambda x: find_lowest_len(x, vrc01_ref_airr_kappa_seqs)
+        class_df_kappa["distance_to_known_lcdr3_kappa"] = nearest_distance(
+            class_df_kappa["cdr3_aa_light"], vrc01_ref_airr_kappa_seqs
         )
-        class_df_lambda["distance_to_known_lcdr3_lambda"] = class_df_lambda["cdr3_aa_light"].apply(
-            lambda x: find_lowest_len(x, vrc01_ref_airr_lambda_seqs)
+        class_df_lambda["distance_to_known_lcdr3_lambda"] = nearest_distance(
+            class_df_lambda["cdr3_aa_light"], vrc01_ref_airr_lambda_seqs
         )
         combined_df = pd.concat([class_df_kappa, class_df_lambda]).reset_index(drop=True)
         combined_df["distance_to_known_lcdr3"] = combined_df[
@@ -1064,11 +1059,11 @@ def plot_light_chain_dist(data: Data, outpath: str) -> None:
 
     class_df_kappa = oas_5_len.query("locus == 'IGK'").copy()
     class_df_lambda = oas_5_len.query("locus == 'IGL'").copy()
-    class_df_kappa["distance_to_known_lcdr3_kappa"] = class_df_kappa["cdr3_aa"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_kappa_seqs)
+    class_df_kappa["distance_to_known_lcdr3_kappa"] = nearest_distance(
+        class_df_kappa["cdr3_aa"], vrc01_ref_airr_kappa_seqs
     )
-    class_df_lambda["distance_to_known_lcdr3_lambda"] = class_df_lambda["cdr3_aa"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_lambda_seqs)
+    class_df_lambda["distance_to_known_lcdr3_lambda"] = nearest_distance(
+        class_df_lambda["cdr3_aa"], vrc01_ref_airr_lambda_seqs
     )
     combined_df = pd.concat([class_df_kappa, class_df_lambda]).reset_index(drop=True)
     combined_df["distance_to_known_lcdr3"] = combined_df[
@@ -1493,16 +1488,16 @@ def plot_key_mutations(data: Data, outpath: str) -> None:
     palette = data.get_trial_palette()
     vrc01_seqs = vrc01_seqs[vrc01_seqs["sequence_id"].isin(minimum_set)].copy()
 
-    def _get_top_n_percet(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        return pd.Series(
-            {"residues": df["cottrell_focused_v_common_score"].quantile(percent, interpolation="midpoint")}
-        )
-
     combined = pd.concat([g001_seqs, g002_seqs]).reset_index(drop=True).query("is_vrc01_class")
     combined["weeks"] = combined["weeks"].astype(int)
     combined = combined.query("weeks > 0")
-    plottable = combined.groupby(["pubID", "trial", "weeks"]).apply(_get_top_n_percet).reset_index()
+    plottable = (
+        grouped_quantile(
+            combined, ["pubID", "trial", "weeks"], "cottrell_focused_v_common_score", q=0.9, method="midpoint"
+        )
+        .rename("residues")
+        .reset_index()
+    )
 
     figure, axes = plt.subplots(
         1,
@@ -1608,26 +1603,17 @@ def plot_key_mutations_boost(data: Data, outpath: str) -> None:
     palette = data.get_week_palette()
     vrc01_seqs = vrc01_seqs[vrc01_seqs["sequence_id"].isin(minimum_set)].copy()
 
-    def _get_top_n_percet_cottrell(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        return pd.Series(
-            {"residues": df["cottrell_focused_v_common_score"].quantile(percent, interpolation="midpoint")}
-        )
-
-    def _get_top_n_percet_hcdr2(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        return pd.Series({"residues": df["num_hcdr2_mutations"].quantile(percent, interpolation="midpoint")})
-
+    boost = g002_seqs.query("pseudogroup!=1")
     plottable = (
-        g002_seqs.query("pseudogroup!=1")
-        .groupby(["pubID", "weeks", "pseudogroup"])
-        .apply(_get_top_n_percet_cottrell)
+        grouped_quantile(
+            boost, ["pubID", "weeks", "pseudogroup"], "cottrell_focused_v_common_score", q=0.9, method="midpoint"
+        )
+        .rename("residues")
         .reset_index()
     )
     plottable_hcdr2 = (
-        g002_seqs.query("pseudogroup!=1")
-        .groupby(["pubID", "weeks", "pseudogroup"])
-        .apply(_get_top_n_percet_hcdr2)
+        grouped_quantile(boost, ["pubID", "weeks", "pseudogroup"], "num_hcdr2_mutations", q=0.9, method="midpoint")
+        .rename("residues")
         .reset_index()
     )
 
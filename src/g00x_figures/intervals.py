@@ -0,0 +1,171 @@
+"""
+Confidence intervals of binomial proportions, for every group of a figure at once.
+
+Intervals are computed in closed form from the success and trial counts of each group as arrays, and error bars are
+drawn at the positions the groups are plotted at, worked out from their x and hue levels the way seaborn lays out a
+pointplot, rather than by matching plotted values back to the summary.
+"""
+from typing import Iterable
+
+import numpy as np
+import pandas as pd
+from matplotlib import pyplot as plt
+from scipy.stats import beta, norm
+
+METHODS = ("wilson", "clopper-pearson", "agresti-coull")
+
+
+def binomial_interval(
+    successes: Iterable[float], counts: Iterable[float], method: str = "wilson", z: float = 1.96
+) -> tuple[np.ndarray, np.ndarray]:
+    """Confidence interval of the proportion of successes of every group
+
+    Parameters
+    ----------
+    successes : Iterable[float]
+        Successes of each group
+    counts : Iterable[float]
+        Trials of each group, groups without any get NaN bounds
+    method : str, optional
+        One of wilson, clopper-pearson or agresti-coull, by default wilson
+    z : float, optional
+        Standard normal quantile of the confidence level, by default 1.96 for 95%
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Lower and upper bounds
+    """
+    k = np.asarray(successes, dtype=float)
+    n = np.asarray(counts, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if method == "wilson":
+            p = k / n
+            denominator = 1 + z**2 / n
+            centre = (p + z**2 / (2 * n)) / denominator
+            half = z * np.sqrt(p * (1 - p) / n + z**2 / (4 * n**2)) / denominator
+            low, high = centre - half, centre + half
+        elif method == "agresti-coull":
+            n_adjusted = n + z**2
+            p = (k + z**2 / 2) / n_adjusted
+            half = z * np.sqrt(p * (1 - p) / n_adjusted)
+            low, high = np.clip(p - half, 0, 1), np.clip(p + half, 0, 1)
+        elif method == "clopper-pearson":
+            alpha = 2 * norm.sf(z)
+            low = np.where(k > 0, beta.ppf(alpha / 2, k, n - k + 1), 0.0)
+            high = np.where(k < n, beta.ppf(1 - alpha / 2, k + 1, n - k), 1.0)
+        else:
+            raise ValueError(f"Unknown interval method {method}, expected one of {', '.join(METHODS)}")
+    empty = ~(n > 0)
+    return np.where(empty, np.nan, low), np.where(empty, np.nan, high)
+
+
+def proportion_summary(
+    data: pd.DataFrame, x: str, y: str, hue: str | None = None, method: str = "wilson", z: float = 1.96
+) -> pd.DataFrame:
+    """Proportion of a 0/1 column with its confidence interval for every x (and hue) group
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        Long dataframe
+    x : str
+        Column of the x groups
+    y : str
+        Column of 0/1 or boolean outcomes, missing values are left out
+    hue : str | None, optional
+        Column of the hue groups, by default None
+    method : str, optional
+        Interval method, see binomial_interval
+    z : float, optional
+        Standard normal quantile of the confidence level, by default 1.96 for 95%
+
+    Returns
+    -------
+    pd.DataFrame
+        Groups with count, sum, proportion, ci_low, ci_high, yerr_low and yerr_high
+    """
+    group_cols = [x] if hue is None else [x, hue]
+    summary = data.groupby(group_cols, observed=True)[y].agg(["count", "sum"]).reset_index()
+    summary["proportion"] = summary["sum"] / summary["count"]
+    summary["ci_low"], summary["ci_high"] = binomial_interval(summary["sum"], summary["count"], method=method, z=z)
+    summary["yerr_low"] = summary["proportion"] - summary["ci_low"]
+    summary["yerr_high"] = summary["ci_high"] - summary["proportion"]
+    return summary
+
+
+def _levels(values: pd.Series, order: Iterable | None) -> list:
+    # the level order seaborn plots categories in
+    if order is not None:
+        return list(order)
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return list(values.cat.categories)
+    levels = list(pd.unique(values.dropna()))
+    return sorted(levels) if pd.api.types.is_numeric_dtype(values) else levels
+
+
+def group_positions(
+    data: pd.DataFrame,
+    summary: pd.DataFrame,
+    x: str,
+    hue: str | None = None,
+    order: Iterable | None = None,
+    hue_order: Iterable | None = None,
+    dodge: float | bool = False,
+) -> np.ndarray:
+    """x position of every summary group on a categorical axis, offset by hue level like a dodged pointplot
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The dataframe the figure was plotted from, for the default level orders
+    summary : pd.DataFrame
+        Groups from proportion_summary
+    x, hue : str
+        Columns of the x and hue groups
+    order, hue_order : Iterable | None, optional
+        Level orders the figure was plotted with
+    dodge : float | bool, optional
+        Dodge the figure was plotted with
+
+    Returns
+    -------
+    np.ndarray
+        Positions, NaN for groups not on the axis
+    """
+    x_levels = _levels(data[x], order)
+    positions = summary[x].map(pd.Series(range(len(x_levels)), index=x_levels)).to_numpy(dtype=float)
+    if hue is None:
+        return positions
+    hue_levels = _levels(data[hue], hue_order)
+    if dodge is True:
+        dodge = 0.025 * len(hue_levels)
+    offsets = np.linspace(0, dodge or 0, len(hue_levels))
+    offsets -= offsets.mean()
+    return positions + summary[hue].map(pd.Series(offsets, index=hue_levels)).to_numpy(dtype=float)
+
+
+def draw_errorbars(
+    ax: plt.Axes, summary: pd.DataFrame, positions: np.ndarray, capsize: float = 5, color: str = "black"
+) -> None:
+    """Draw the confidence interval of every group as one set of error bars
+
+    Parameters
+    ----------
+    ax : plt.Axes
+        Axes to draw on
+    summary : pd.DataFrame
+        Groups from proportion_summary
+    positions : np.ndarray
+        x position of each group, from group_positions
+    """
+    shown = ~np.isnan(positions) & summary["proportion"].notna().to_numpy()
+    rows = summary[shown]
+    ax.errorbar(
+        x=positions[shown],
+        y=rows["proportion"],
+        yerr=np.vstack([rows["yerr_low"], rows["yerr_high"]]),
+        fmt="none",
+        capsize=capsize,
+        color=color,
+    )
@@ -12,6 +12,7 @@ import seaborn as sns
 from matplotlib import pyplot as plt
 from matplotlib.patches import Patch
 
+from g00x_figures.algos import grouped_bootstrap, grouped_quantile
 from g00x_figures.box_and_scatter.flow_frequencies import adjust_boxplot
 from g00x_figures.data import Data
 from g00x_figures.plot_helpers.font import apply_global_font_settings
@@ -417,8 +418,12 @@ def plot_somatic_mutation_aa_frequencies_boost(data: Data, outpath: Path) -> Non
     figure.savefig(str(outpath) + ".png", dpi=300)
 
 
-def get_group_median(seq: pd.DataFrame, metric: str) -> pd.DataFrame:
-    seq_group_median = seq.groupby(["pubID", "trial", "pseudogroup", "weeks"])[metric].median().reset_index()
+def get_group_median(seq: pd.DataFrame, metric: str, bootstrap_ci: bool = False) -> pd.DataFrame:
+    group = ["pubID", "trial", "pseudogroup", "weeks"]
+    if bootstrap_ci:
+        # with ci_low and ci_high columns of the percentile bootstrap of each median
+        return grouped_bootstrap(seq, group, metric).reset_index()
+    seq_group_median = seq.groupby(group)[metric].median().reset_index()
     return seq_group_median
 
 
@@ -560,6 +565,7 @@ def plot_v_mutation(
     is_vrc01_class: bool = True,
     is_ighg: bool = True,
     use_median: bool = True,
+    bootstrap_ci: bool = False,
     use_xticks: bool = True,
     week_xticks: Tuple[str, ...] = ("4", "8", "10", "16", "24/21"),
     psuedogroup_xticks: Tuple[str, ...] = (
@@ -599,7 +605,7 @@ def plot_v_mutation(
 
     # Use the median value each group instead of all points
     if use_median:
-        df = get_group_median(df, y)
+        df = get_group_median(df, y, bootstrap_ci)
 
     if plot_type == "stripbox":
         plot_stripbox(ax=ax, df=df, x=x, y=y, hue=hue, pallete=pallete)
@@ -657,7 +663,8 @@ def plot_v_mutation(
     # unsync trials weeks
     df.loc[(df["trial"] == "G002") & (df["weeks"] == 21), "weeks"] = 24
 
-    return df[["pubID", "trial", "pseudogroup", "weeks"] + [y]]
+    intervals = [column for column in ("ci_low", "ci_high") if column in df.columns]
+    return df[["pubID", "trial", "pseudogroup", "weeks"] + [y] + intervals]
 
 
 def plot_v_mutations(
@@ -665,6 +672,7 @@ def plot_v_mutations(
     src_type: Literal["prime", "boost"],
     seq_type: Literal["aa", "nt"],
     mectric_outdir: Path,
+    bootstrap_ci: bool = False,
 ):
     apply_global_font_settings()
     figsize = (4, 3)
@@ -702,6 +710,7 @@ def plot_v_mutations(
         ylabel=r"$\mathregular{V_H}$" + " gene\n% mutation " + f"({seq_type})",
         data_src=src_type,
         plot_type="stripbox",
+        bootstrap_ci=bootstrap_ci,
         use_legend=False,
         use_xticks=False,
         legend_pallete=legend_pallete,
@@ -736,6 +745,7 @@ def plot_v_mutations(
         ylabel=r"$\mathregular{V_{K/L}}$" + " gene\n% mutation " + f"({seq_type})",
         data_src=src_type,
         plot_type="stripbox",
+        bootstrap_ci=bootstrap_ci,
         use_legend=False,
         use_xticks=False,
         legend_pallete=legend_pallete,
@@ -860,52 +870,19 @@ def plot_key_mutations_boost(
     palette = data.get_week_palette()
     vrc01_seqs = vrc01_seqs[vrc01_seqs["sequence_id"].isin(minimum_set)].copy()
 
-    def _get_top_n_percet_cottrell(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        return pd.Series(
-            {"residues": df["cottrell_focused_v_common_score"].quantile(percent, interpolation="midpoint")}
-        )
-
-    def _get_top_n_percet_hcdr2(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        return pd.Series({"residues": df["num_hcdr2_mutations"].quantile(percent, interpolation="midpoint")})
-
-    # plottable = (
-    #     g002_seqs.query("pseudogroup!=2")
-    #     .groupby(["pubID", "weeks", "pseudogroup"])
-    #     .apply(_get_top_n_percet_cottrell)
-    #     .reset_index()
-    # )
-    plottable = (
-        g002_seqs.query("pseudogroup!=2")
-        .groupby(["pubID", "weeks", "pseudogroup"])["cottrell_focused_v_common_score"]
-        .apply(
-            lambda x: np.quantile(
-                x,
-                0.9,
-                method=method,
-            )
-        )
-        .reset_index()
-    )
+    boost = g002_seqs.query("pseudogroup!=2")
+    plottable = grouped_quantile(
+        boost, ["pubID", "weeks", "pseudogroup"], "cottrell_focused_v_common_score", q=0.9, method=method
+    ).reset_index()
     plottable["residues"] = plottable["cottrell_focused_v_common_score"]
 
     ylabel = "90th percentile\nnumber of key VRC01-class\nHC residues"
     yname = ylabel.replace("\n", "_").replace(" ", "_")
     data.populate_psname(plottable).to_csv(metric_outdir / f"figE_{yname}.csv", index=False)
     print(metric_outdir / f"figE_{yname}.csv")
-    plottable_hcdr2 = (
-        g002_seqs.query("pseudogroup!=2")
-        .groupby(["pubID", "weeks", "pseudogroup"])["num_hcdr2_mutations"]
-        .apply(
-            lambda x: np.quantile(
-                x,
-                0.9,
-                method=method,
-            )
-        )
-        .reset_index()
-    )
+    plottable_hcdr2 = grouped_quantile(
+        boost, ["pubID", "weeks", "pseudogroup"], "num_hcdr2_mutations", q=0.9, method=method
+    ).reset_index()
     plottable_hcdr2["residues"] = plottable_hcdr2["num_hcdr2_mutations"]
 
     ylabel = "90th percentile\nnumber of key VRC01-class\nHCDR2 residues"
@@ -1117,19 +1094,6 @@ def run_90_percentile_hc_residues(
 ):
     apply_global_font_settings()
 
-    def _get_top_n_percet(df, percent=0.9):
-        """Groupby funciton to get qunatile of key residues"""
-        # TODO: Why have we always used midpoint?
-        return pd.Series(
-            {
-                "residues": df["cottrell_focused_v_common_score"].quantile(
-                    # method="median unbiased",
-                    q=percent,
-                    interpolation="midpoint",
-                )
-            }
-        )
-
     minimum_set = [
         "12A12",
         "12A21",
@@ -1171,17 +1135,9 @@ def run_90_percentile_hc_residues(
     combined = combined.query("weeks > 0")
 
     # Top 90th percentile of key residues
-    plottable = (
-        combined.groupby(metric_base_cols)["cottrell_focused_v_common_score"]
-        .apply(
-            lambda x: np.quantile(
-                x,
-                0.9,
-                method=method,
-            )
-        )
-        .reset_index()
-    )
+    plottable = grouped_quantile(
+        combined, metric_base_cols, "cottrell_focused_v_common_score", q=0.9, method=method
+    ).reset_index()
     plottable["residues"] = plottable["cottrell_focused_v_common_score"]
 
     ylabel = "90th percentile number of key VRC01-class HC residues".replace(" ", "_")
@@ -15,8 +15,8 @@ import seaborn as sns
 from matplotlib import pyplot as plt
 from matplotlib import ticker as mtick
 from matplotlib.patches import Patch
-from scipy.stats import gmean
 
+from g00x_figures.algos import grouped_bootstrap, grouped_geomean
 from g00x_figures.data import Data, Transforms
 
 
@@ -540,6 +540,7 @@ class Plot:
         add_binder_median: bool = False,
         median_name: str | None = None,
         sci_notation: bool = False,
+        bootstrap_ci: bool = False,
     ):
         def get_stats(df, kd_lookup="KD_fix"):
             """Get table stats, counts, median and donors represented"""
@@ -664,8 +665,7 @@ class Plot:
                 skip = True
                 # breakpoint()
             _geomean = (
-                df.groupby(groupby)
-                .KD_fix_lim.agg(gmean)
+                grouped_geomean(df, groupby, "KD_fix_lim", upper=lim)
                 .apply(scale_median, median_scale=median_scale, fr=True, skip=skip, catch_zero=True)
                 .to_frame("Binder geomean $\mathregular{K_D}$" + f" ({scale_name})")
             ).fillna(gt_median)
@@ -682,6 +682,22 @@ class Plot:
         else:
             metrics = [n_abs_tested, n_participants, median_kd_um]
 
+        if bootstrap_ci:
+
+            def format_ci(ci: pd.DataFrame, **kwargs: Any) -> pd.Series:
+                return ci["ci_low"].apply(scale_median, **kwargs) + "-" + ci["ci_high"].apply(scale_median, **kwargs)
+
+            # percentile bootstrap intervals of the medians, and of the binder geomeans when they're shown
+            median_ci = format_ci(grouped_bootstrap(spr_df, groupby, KD_fix), median_scale=median_scale)
+            metrics = metrics + [median_ci.to_frame(f"Median 95% CI ({scale_name})")]
+            if geomean and not skip:
+                geomean_ci = format_ci(
+                    grouped_bootstrap(df, groupby, "KD_fix_lim", statistic="geomean"),
+                    median_scale=median_scale,
+                    fr=True,
+                )
+                metrics = metrics + [geomean_ci.to_frame(f"Binder geomean 95% CI ({scale_name})")]
+
         if add_binder_median:
             metrics = metrics + [binder_median_kd_um]
 
@@ -732,6 +748,7 @@ class Plot:
         loc: str = "bottom",
         pad: int = 5,
         sci_notation: bool = False,
+        bootstrap_ci: bool = False,
     ) -> tuple[plt.Axes, pd.DataFrame]:
         df = spr_df.copy()
         # df.fillna(lim, inplace=True)
@@ -746,6 +763,7 @@ class Plot:
             add_binder_median=add_binder_median,
             median_name=median_name,
             sci_notation=sci_notation,
+            bootstrap_ci=bootstrap_ci,
         )
         # from IPython import embed
 
@@ -778,12 +796,8 @@ class Plot:
             # from IPython import embed
 
             # embed()
-            try:
-                for r in result:
-                    df[r] = [" ", " ", " ", " "]
-            except:
-                for r in result:
-                    df[r] = [" ", " ", " ", " ", " "]
+            for r in result:
+                df[r] = [" "] * len(df)
             df = df.sort_index(axis=1, level=[0, 1])
         # breakpoint()
         # df = df.applymap(lambda x: f"{x:>{pad}}")
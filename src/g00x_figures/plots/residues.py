@@ -13,6 +13,7 @@ from matplotlib.patches import Patch
 # plt type for type hinting
 from matplotlib.pyplot import Figure
 
+from g00x_figures.algos import grouped_quantile
 from g00x_figures.data import Data, calculate_resonse
 from g00x_figures.plot_helpers.boxplot import adjust_boxplot, format_y_axis
 from g00x_figures.plot_helpers.font import apply_global_font_settings
@@ -30,7 +31,6 @@ letter_fontsize = 20
 apply_global_font_settings()
 data = Data()
 pallete = data.get_trial_g001_g002_g003_palette()
-outdir = data.paths.figure_outdir
 
 
 def get_mutational_group(seq: pd.DataFrame, metric: str) -> pd.DataFrame:
@@ -138,11 +138,6 @@ def plot_stripbox_v_mutation_groups(
     return ax, df[metric_base_cols + [y]]
 
 
-def _get_top_n_percet(df, percent=0.9):
-    """Groupby funciton to get qunatile of key residues"""
-    return pd.Series({"residues": df["cottrell_focused_v_common_score"].quantile(percent, interpolation="midpoint")})
-
-
 def run_90_percentile_hc_residues():
     set_letters = True
     minimum_set = [
@@ -181,7 +176,13 @@ def run_90_percentile_hc_residues():
     combined["weeks"] = combined["weeks"].astype(int)
     combined = combined.query("weeks > 0")
 
-    plottable = combined.groupby(["pubID", "trial", "weeks"]).apply(_get_top_n_percet).reset_index()
+    plottable = (
+        grouped_quantile(
+            combined, ["pubID", "trial", "weeks"], "cottrell_focused_v_common_score", q=0.9, method="midpoint"
+        )
+        .rename("residues")
+        .reset_index()
+    )
 
     g = sns.boxplot(
         data=plottable,
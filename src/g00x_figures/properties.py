@@ -6,12 +6,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import seaborn as sns
-from Levenshtein import distance
 from matplotlib import pyplot as plt
 from matplotlib import ticker as mtick
 from matplotlib.patches import Patch
 
 from g00x_figures.data import Data, Transforms
+from g00x_figures.edit_distance import nearest_distance
 from g00x_figures.g00x_plot_templates.bar_plots import stacked_bar_plot_pivot_df
 from g00x_figures.plot_helpers.font import apply_global_font_settings
 from g00x_figures.plots import Plot
@@ -27,10 +27,6 @@ def single_group_freqs(df: pd.DataFrame, pivot_on: str, values: str = "v_call_to
     )
 
 
-def find_lowest_len(x, ref) -> int:
-    return min(list(map(lambda y: distance(x, y), ref)))
-
-
 def report_lcdr3(df: pd.DataFrame):
     b = df["distance_to_known_lcdr3"].value_counts().sort_index()
     c = (b / b.sum()).cumsum()
@@ -53,11 +49,11 @@ def bnab_lcdr3(seq_df: pd.DataFrame, vrc01_ref_airr: pd.DataFrame, is_vrc01_clas
         class_df_kappa = seq_df.query("locus_light == 'IGK'").query("is_vrc01_class==False").query("has_5_len").copy()
         class_df_lambda = seq_df.query("locus_light == 'IGL'").query("is_vrc01_class==False").query("has_5_len").copy()
 
-    class_df_kappa["distance_to_known_lcdr3_kappa"] = class_df_kappa["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_kappa_seqs)
+    class_df_kappa["distance_to_known_lcdr3_kappa"] = nearest_distance(
+        class_df_kappa["cdr3_aa_light"], vrc01_ref_airr_kappa_seqs
     )
-    class_df_lambda["distance_to_known_lcdr3_lambda"] = class_df_lambda["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_lambda_seqs)
+    class_df_lambda["distance_to_known_lcdr3_lambda"] = nearest_distance(
+        class_df_lambda["cdr3_aa_light"], vrc01_ref_airr_lambda_seqs
     )
     seq_df = pd.concat([class_df_kappa, class_df_lambda]).reset_index(drop=True)
     seq_df["distance_to_known_lcdr3"] = seq_df[["distance_to_known_lcdr3_kappa", "distance_to_known_lcdr3_lambda"]].min(
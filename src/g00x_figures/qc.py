@@ -7,12 +7,12 @@ import numpy as np
 import pandas as pd
 import patchworklib as pw
 import seaborn as sns
-from Levenshtein import distance
 from matplotlib import colormaps
 from matplotlib.axes import Axes
 from matplotlib.ticker import AutoMinorLocator
 
 from g00x_figures.data import Data, calculate_resonse
+from g00x_figures.edit_distance import nearest_distance
 from g00x_figures.plot_helpers.boxplot import adjust_boxplot, format_y_axis
 from g00x_figures.plot_helpers.font import apply_global_font_settings
 from g00x_figures.plot_helpers.legend import plot_legend
@@ -296,10 +296,6 @@ def _determine_metric(df: pd.DataFrame, metric: str) -> pd.Series:
     )
 
 
-def find_lowest_len(x, ref) -> int:
-    return min(list(map(lambda y: distance(x, y), ref)))
-
-
 def report_lcdr3(df: pd.DataFrame):
     b = df["distance_to_known_lcdr3"].value_counts().sort_index()
     c = (b / b.sum()).cumsum()
@@ -315,11 +311,11 @@ def get_plottable() -> pd.DataFrame:
 
     class_df_kappa = get_g00x_all().query("locus_light == 'IGK'")
     class_df_lambda = get_g00x_all().query("locus_light == 'IGL'")
-    class_df_kappa["distance_to_known_lcdr3_kappa"] = class_df_kappa["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_kappa_seqs)
+    class_df_kappa["distance_to_known_lcdr3_kappa"] = nearest_distance(
+        class_df_kappa["cdr3_aa_light"], vrc01_ref_airr_kappa_seqs
     )
-    class_df_lambda["distance_to_known_lcdr3_lambda"] = class_df_lambda["cdr3_aa_light"].apply(
-        lambda x: find_lowest_len(x, vrc01_ref_airr_lambda_seqs)
+    class_df_lambda["distance_to_known_lcdr3_lambda"] = nearest_distance(
+        class_df_lambda["cdr3_aa_light"], vrc01_ref_airr_lambda_seqs
     )
     combined_df = pd.concat([class_df_kappa, class_df_lambda]).reset_index(drop=True)
     combined_df["distance_to_known_lcdr3"] = combined_df[
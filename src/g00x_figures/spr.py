@@ -120,10 +120,11 @@ def plot_spr_core_candidates(
         pw.Brick(figsize=figsize),
     ]
 
+    spr_df = data.get_g002_spr_df_boost()
     for i, analyte, letter in zip([0, 1, 4, 5, 8, 9], analytes, ["A", "B", "C", "D", "E", "F"]):
         ax = axes[i]
         analyte_pub_name = analytes[analyte]
-        plot_df = data.get_g002_spr_df_boost().query("Analyte==@analyte").query(f"is_cp=={is_cp}")
+        plot_df = spr_df.query("Analyte==@analyte").query(f"is_cp=={is_cp}")
         plot_df = plot_df.query(f"is_vrc01_class=={is_vrc01_class}")
         plot_df.loc[plot_df[plot_df["estimated"] == True].index, "KD_fix"] = lim
         plot_df.loc[plot_df[plot_df["KD_fix"] > lim].index, "KD_fix"] = lim
@@ -581,6 +582,7 @@ def plot_core_spr(
     use_geomean: bool = True,
     median_scale: float = 1,
     sci_notation: bool = False,
+    bootstrap_ci: bool = False,
 ) -> None:
     lt = lt_mapping["core-Hx_r4.0D_TH6_g28v2_pHLsecAvi"]
     spr_df = data.get_g002_spr_df_boost()
@@ -615,6 +617,7 @@ def plot_core_spr(
         geomean=use_geomean,
         median_scale=median_scale,
         sci_notation=sci_notation,
+        bootstrap_ci=bootstrap_ci,
     )
     # table_df = table_df.reset_index(drop=False)
     table_df = table_df.T.reset_index()
@@ -731,6 +734,7 @@ def plot_core_spr(
         geomean=use_geomean,
         sci_notation=sci_notation,
         median_scale=median_scale,
+        bootstrap_ci=bootstrap_ci,
     )
     table_df = table_df.T.reset_index()
     table_df = data.populate_psname_spr(table_df)